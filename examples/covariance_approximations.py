@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+from time import perf_counter
+
+import numpy as np
+
+from mabwiser.mab import MAB, LearningPolicy
+
+######################################################################################
+#
+# MABWiser
+# Benchmark: Full vs. diagonal vs. sketch covariance for LinUCB and LinTS
+#
+# The full covariance keeps the d x d ridge matrix and its inverse for each arm,
+# the diagonal covariance keeps only the diagonal, O(d) per arm,
+# and the sketch covariance keeps a rank-r frequent directions sketch, O(d * r) per arm.
+# This script reports the memory of the models, the time of fit, partial fit and predict,
+# the agreement of the decisions with the full covariance, and for LinUCB,
+# the median relative error of the upper confidence widths.
+#
+######################################################################################
+
+# Seed
+seed = 111
+rng = np.random.default_rng(seed)
+
+# Arms
+arms = list(range(10))
+
+# Sizes
+n_train = 10000
+n_online = 100
+n_test = 2000
+rank = 20
+
+
+def model_bytes(mab):
+    # Bytes of the arrays of the models of all arms
+    return sum(array.nbytes for model in mab._imp.arm_to_model.values()
+               for array in [model.A, model.A_inv, model.sketch, model.Xty, model.beta] if array is not None)
+
+
+def widths(mab, contexts):
+    # Upper confidence widths of the first arm
+    model = mab._imp.arm_to_model[arms[0]]
+    if model.covariance == "full":
+        return np.sqrt(np.einsum('ij,jk,ik->i', contexts, model.A_inv, contexts))
+    return np.sqrt(model.get_quadratic_forms(contexts))
+
+
+print(f"{'policy':<8}{'covariance':<12}{'d':>6}{'MB':>10}{'fit':>10}{'online':>10}{'predict':>10}"
+      f"{'agreement':>12}{'width err':>12}")
+
+for num_features in [100, 400, 1000]:
+
+    # Contexts with a decaying spectrum so that a low-rank sketch captures most of the variance
+    basis = rng.standard_normal((num_features, num_features)) / np.sqrt(num_features)
+    spectrum = 1.0 / np.arange(1, num_features + 1)
+    contexts = np.dot(rng.standard_normal((n_train + n_online, num_features)) * spectrum, basis)
+    decisions = rng.choice(arms, size=n_train + n_online)
+    rewards = np.dot(contexts, rng.standard_normal(num_features)) + rng.standard_normal(n_train + n_online)
+    test = np.dot(rng.standard_normal((n_test, num_features)) * spectrum, basis)
+
+    for name in ["LinUCB", "LinTS"]:
+        predictions, exact_widths = None, None
+        for covariance in ["full", "diagonal", "sketch"]:
+
+            learning_policy = getattr(LearningPolicy, name)(alpha=1.0, covariance=covariance, rank=rank)
+            mab = MAB(arms, learning_policy, seed=seed)
+
+            start = perf_counter()
+            mab.fit(decisions[:n_train], rewards[:n_train], contexts[:n_train])
+            fit = perf_counter() - start
+
+            start = perf_counter()
+            for i in range(n_train, n_train + n_online):
+                mab.partial_fit(decisions[i:i + 1], rewards[i:i + 1], contexts[i:i + 1])
+            online = perf_counter() - start
+
+            start = perf_counter()
+            prediction = np.asarray(mab.predict(test))
+            predict = perf_counter() - start
+
+            # Compare with the full covariance
+            if covariance == "full":
+                predictions = prediction
+            agreement = np.mean(prediction == predictions)
+
+            width_error = ""
+            if name == "LinUCB":
+                width = widths(mab, test)
+                if covariance == "full":
+                    exact_widths = width
+                width_error = f"{np.median(np.abs(width - exact_widths) / exact_widths):.4f}"
+
+            print(f"{name:<8}{covariance:<12}{num_features:>6}{model_bytes(mab) / 2 ** 20:>10.1f}{fit:>10.3f}"
+                  f"{online:>10.3f}{predict:>10.3f}{agreement:>12.4f}{width_error:>12}")
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from time import perf_counter
+
+import numpy as np
+
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+
+######################################################################################
+#
+# MABWiser
+# Benchmark: float64 vs. float32 computation
+#
+# With dtype=np.float32, the contexts, the stored context history and the models of
+# linear policies are kept in float32, which halves their memory.
+# This script reports the memory of the model state, the time of fit and predict,
+# and the agreement of the decisions with the float64 bandit.
+#
+######################################################################################
+
+# Seed
+seed = 111
+rng = np.random.default_rng(seed)
+
+# Arms
+arms = list(range(200))
+
+# Historical contexts, decisions and rewards
+n_features = 64
+contexts = rng.random((50000, n_features))
+decisions = rng.choice(arms, size=len(contexts))
+rewards = rng.random(len(contexts))
+test = rng.random((10000, n_features))
+
+
+def model_bytes(mab):
+    # Bytes of the arrays of linear models, or of the stored contexts of neighborhood policies
+    if hasattr(mab._imp, "arm_to_model"):
+        return sum(array.nbytes for model in mab._imp.arm_to_model.values()
+                   for array in [model.A, model.A_inv, model.Xty, model.beta])
+    return mab._imp.contexts.nbytes
+
+
+print(f"{'policy':<12}{'dtype':<10}{'MB':>10}{'fit':>10}{'predict':>10}{'agreement':>12}")
+
+for name, learning_policy, neighborhood_policy, n_test in [
+        ("LinUCB", LearningPolicy.LinUCB(alpha=1.0), None, len(test)),
+        ("LinTS", LearningPolicy.LinTS(alpha=1.0), None, len(test)),
+        ("KNearest", LearningPolicy.EpsilonGreedy(epsilon=0), NeighborhoodPolicy.KNearest(k=100), 200)]:
+
+    predictions = dict()
+    for dtype in [np.float64, np.float32]:
+        mab = MAB(arms, learning_policy, neighborhood_policy, seed=seed, dtype=dtype)
+
+        start = perf_counter()
+        mab.fit(decisions, rewards, contexts)
+        fit = perf_counter() - start
+
+        start = perf_counter()
+        predictions[dtype] = np.asarray(mab.predict(test[:n_test]))
+        predict = perf_counter() - start
+
+        agreement = np.mean(predictions[dtype] == predictions[np.float64])
+        print(f"{name:<12}{np.dtype(dtype).name:<10}{model_bytes(mab) / 2 ** 20:>10.1f}"
+              f"{fit:>10.3f}{predict:>10.3f}{agreement:>12.4f}")
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from time import perf_counter
+
+import numpy as np
+
+from mabwiser.mab import MAB, LearningPolicy
+
+######################################################################################
+#
+# MABWiser
+# Benchmark: Inverse vs. Cholesky solver for linear policies
+#
+# The inverse solver keeps the explicit inverse of the ridge matrix A for each arm,
+# while the cholesky solver keeps the lower Cholesky factor of A and uses triangular solves.
+# This script reports the time of fit, of online partial fits with a single row,
+# and of batch prediction as the number of features grows.
+#
+######################################################################################
+
+# Seed
+seed = 111
+rng = np.random.default_rng(seed)
+
+# Arms
+arms = list(range(10))
+
+# Sizes
+n_train = 20000
+n_online = 200
+n_test = 10000
+
+
+def timeit(func):
+    start = perf_counter()
+    func()
+    return perf_counter() - start
+
+
+print(f"{'policy':<8}{'solver':<10}{'d':>6}{'fit':>10}{'online':>10}{'predict':>10}")
+
+for num_features in [10, 50, 100, 200, 400]:
+
+    # Historical contexts, decisions and rewards
+    contexts = rng.random((n_train, num_features))
+    decisions = rng.choice(arms, size=n_train)
+    rewards = rng.random(n_train)
+    test = rng.random((n_test, num_features))
+
+    for name in ["LinUCB", "LinTS"]:
+        for solver in ["inverse", "cholesky"]:
+
+            # Incremental updates of the inverse or the factor for online learning
+            learning_policy = getattr(LearningPolicy, name)(alpha=1.0, incremental=True, solver=solver)
+            mab = MAB(arms, learning_policy, seed=seed)
+
+            fit = timeit(lambda: mab.fit(decisions, rewards, contexts))
+            online = timeit(lambda: [mab.partial_fit(decisions[i:i + 1], rewards[i:i + 1], contexts[i:i + 1])
+                                     for i in range(n_online)])
+            predict = timeit(lambda: mab.predict(test))
+
+            print(f"{name:<8}{solver:<10}{num_features:>6}{fit:>10.3f}{online:>10.3f}{predict:>10.3f}")
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+from time import perf_counter
+
+import numpy as np
+
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+
+######################################################################################
+#
+# MABWiser
+# Benchmark: Latency of predictions for a single context
+#
+# Online serving asks for one decision at a time, so that the fixed cost of each call
+# dominates the cost of the prediction itself. A single context is predicted in the
+# calling process without partitioning the contexts or dispatching jobs, and the
+# policies are used in place without copies.
+# This script reports the median and the 99th percentile latency of predict
+# for a single context with each policy.
+#
+######################################################################################
+
+# Seed
+seed = 111
+rng = np.random.default_rng(seed)
+
+# Arms
+arms = list(range(20))
+
+# Sizes
+n_train = 5000
+num_features = 10
+n_calls = 1000
+
+# Historical data
+contexts = rng.random((n_train, num_features))
+decisions = rng.choice(arms, size=n_train)
+rewards = rng.integers(0, 2, size=n_train)
+context = [rng.random(num_features).tolist()]
+
+policies = [("EpsilonGreedy", LearningPolicy.EpsilonGreedy(epsilon=0.1), None),
+            ("ThompsonSampling", LearningPolicy.ThompsonSampling(), None),
+            ("LinUCB", LearningPolicy.LinUCB(alpha=1.0), None),
+            ("LinTS", LearningPolicy.LinTS(alpha=1.0), None),
+            ("LinGreedy", LearningPolicy.LinGreedy(epsilon=0.1), None),
+            ("KNearest", LearningPolicy.EpsilonGreedy(epsilon=0.1), NeighborhoodPolicy.KNearest(k=50)),
+            ("Radius", LearningPolicy.EpsilonGreedy(epsilon=0.1), NeighborhoodPolicy.Radius(radius=1)),
+            ("Clusters", LearningPolicy.EpsilonGreedy(epsilon=0.1), NeighborhoodPolicy.Clusters(n_clusters=4)),
+            ("LSHNearest", LearningPolicy.EpsilonGreedy(epsilon=0.1), NeighborhoodPolicy.LSHNearest(n_dimensions=5)),
+            ("TreeBandit", LearningPolicy.EpsilonGreedy(epsilon=0.1), NeighborhoodPolicy.TreeBandit())]
+
+print(f"{'policy':<18}{'median ms':>12}{'p99 ms':>12}")
+
+for name, learning_policy, neighborhood_policy in policies:
+
+    mab = MAB(arms, learning_policy, neighborhood_policy, seed=seed)
+    if mab.is_contextual:
+        mab.fit(decisions, rewards, contexts)
+        test = context
+    else:
+        mab.fit(decisions, rewards)
+        test = None
+
+    # Warm up
+    mab.predict(test)
+
+    latencies = np.empty(n_calls)
+    for i in range(n_calls):
+        start = perf_counter()
+        mab.predict(test)
+        latencies[i] = perf_counter() - start
+    latencies *= 1e3
+
+    print(f"{name:<18}{np.median(latencies):>12.3f}{np.percentile(latencies, 99):>12.3f}")
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import subprocess
+import sys
+
+######################################################################################
+#
+# MABWiser
+# Benchmark: Startup time and memory of each policy
+#
+# Short-lived processes, such as serverless functions and command line tools, pay for
+# the imports of the bandit on every start. The dependencies of the policies and of
+# the input types are imported on first use by the policy that needs them, so that
+# importing mabwiser.mab only imports numpy, and a policy only imports what it uses.
+# This script reports, for each policy in a new interpreter, the time to import
+# mabwiser.mab, the time to create and fit the first bandit, and the peak resident
+# memory of the process.
+#
+######################################################################################
+
+# Number of new interpreters per policy, the median of the runs is reported
+n_runs = 5
+
+policies = [("EpsilonGreedy", "LearningPolicy.EpsilonGreedy(epsilon=0.1)", "None"),
+            ("ThompsonSampling", "LearningPolicy.ThompsonSampling()", "None"),
+            ("LinUCB", "LearningPolicy.LinUCB(alpha=1.0)", "None"),
+            ("LinUCB cholesky", "LearningPolicy.LinUCB(alpha=1.0, solver='cholesky')", "None"),
+            ("LinUCB scaled", "LearningPolicy.LinUCB(alpha=1.0, scale=True)", "None"),
+            ("KNearest", "LearningPolicy.EpsilonGreedy(epsilon=0.1)", "NeighborhoodPolicy.KNearest(k=5)"),
+            ("Radius", "LearningPolicy.EpsilonGreedy(epsilon=0.1)", "NeighborhoodPolicy.Radius(radius=1)"),
+            ("Clusters", "LearningPolicy.EpsilonGreedy(epsilon=0.1)", "NeighborhoodPolicy.Clusters(n_clusters=2)"),
+            ("LSHNearest", "LearningPolicy.EpsilonGreedy(epsilon=0.1)", "NeighborhoodPolicy.LSHNearest()"),
+            ("TreeBandit", "LearningPolicy.EpsilonGreedy(epsilon=0.1)", "NeighborhoodPolicy.TreeBandit()")]
+
+# Code run in each new interpreter, prints the import time, the fit time and the peak memory in MB
+code = """
+import resource
+from time import perf_counter
+
+start = perf_counter()
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+import_time = perf_counter() - start
+
+start = perf_counter()
+mab = MAB([1, 2, 3], {learning_policy}, {neighborhood_policy}, seed=123456)
+decisions = [1, 2, 3, 1, 2, 3, 1, 2, 3, 1]
+rewards = [0, 1, 1, 0, 1, 0, 1, 1, 0, 0]
+contexts = [[i % 3, i % 2, i % 5] for i in range(len(decisions))]
+mab.fit(decisions, rewards, contexts if mab.is_contextual else None)
+mab.predict([[1, 1, 1]] if mab.is_contextual else None)
+fit_time = perf_counter() - start
+
+print(import_time, fit_time, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+"""
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+print(f"{'policy':<18}{'import ms':>12}{'first fit ms':>14}{'peak MB':>10}")
+
+for name, learning_policy, neighborhood_policy in policies:
+
+    runs = []
+    for _ in range(n_runs):
+        output = subprocess.run([sys.executable, "-c", code.format(learning_policy=learning_policy,
+                                                                   neighborhood_policy=neighborhood_policy)],
+                                capture_output=True, text=True, check=True)
+        runs.append([float(value) for value in output.stdout.split()])
+
+    import_time, fit_time, peak_memory = (median([run[i] for run in runs]) for i in range(3))
+    print(f"{name:<18}{import_time * 1e3:>12.1f}{fit_time * 1e3:>14.1f}{peak_memory:>10.1f}")
@@ -3,12 +3,11 @@
 
 import abc
 from collections import defaultdict
-from copy import deepcopy
 from itertools import chain
+from time import perf_counter
 from typing import List, NoReturn, Optional, Union
 
 import numpy as np
-from joblib import Parallel, delayed
 
 from mabwiser.greedy import _EpsilonGreedy
 from mabwiser.linear import _Linear
@@ -18,7 +17,7 @@ from mabwiser.rand import _Random
 from mabwiser.softmax import _Softmax
 from mabwiser.thompson import _ThompsonSampling
 from mabwiser.ucb import _UCB1
-from mabwiser.utils import Arm, _BaseRNG, create_rng
+from mabwiser.utils import Arm, _BaseRNG, _RowRNG
 
 
 class _ApproximateNeighbors(_Neighbors, metaclass=abc.ABCMeta):
@@ -56,34 +55,42 @@ class _ApproximateNeighbors(_Neighbors, metaclass=abc.ABCMeta):
         """Abstract method to be implemented by child classes."""
         pass
 
-    def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
-                          seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
-        # Copy learning policy object
-        lp = deepcopy(self.lp)
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
+        # Learning policy is fit on the neighborhood of each context, in place unless shared by threads
+        lp = self._get_local(self.lp)
+        lp_state = lp._get_fit_state()
 
         # Create an empty list of predictions
         predictions = [None] * len(contexts)
 
-        # For each row in the given contexts
-        for index, row in enumerate(contexts):
+        # Generator of the random streams of rows
+        row_rng = _RowRNG()
 
-            # Get random generator
-            lp.rng = create_rng(seed=seeds[index])
+        try:
+            # For each row in the given contexts
+            for index, row in enumerate(contexts):
 
-            # Prepare for hashing
-            row_2d = row[np.newaxis, :]
-            indices = self._get_neighbors(row_2d)
+                # Start the random stream of the row
+                lp.rng = row_rng.reseed(seeds[index])
 
-            # Drop duplicates from list of neighbors
-            indices = list(set(indices))
+                # Prepare for hashing
+                row_2d = row[np.newaxis, :]
+                indices = self._get_neighbors(row_2d)
 
-            # If neighbors exist
-            if len(indices) > 0:
-                predictions[index] = self._get_nhood_predictions(lp, indices, row_2d, is_predict)
-            else:  # When there are no neighbors
-                predictions[index] = self._get_no_nhood_predictions(lp, is_predict)
+                # Drop duplicates from list of neighbors
+                indices = list(set(indices))
 
-        return predictions
+                # If neighbors exist
+                if len(indices) > 0:
+                    predictions[index] = self._get_nhood_predictions(lp, indices, row_2d, is_predict)
+                else:  # When there are no neighbors
+                    predictions[index] = self._get_no_nhood_predictions_array(lp, is_predict)
+        finally:
+            # Restore the random state of learning policy and its state before fitting on neighborhoods
+            lp._set_fit_state(lp_state)
+
+        return self._stack_predictions(predictions, is_predict)
 
 
 class _LSHNearest(_ApproximateNeighbors):
@@ -115,14 +122,21 @@ class _LSHNearest(_ApproximateNeighbors):
             n_contexts = len(contexts)
 
             # Partition contexts by job
-            n_jobs, n_contexts, starts = self._partition_contexts(n_contexts)
-
-            # Get hashes in parallel
-            hash_values = Parallel(n_jobs=n_jobs, backend=self.backend)(
-                delayed(self.get_context_hash)(
-                    contexts[starts[i]:starts[i + 1]],
-                    self.table_to_plane[k])
-                for i in range(n_jobs))
+            n_jobs, backend = self._plan_jobs("hash", n_contexts, n_contexts)
+            n_jobs, n_contexts, starts = self._partition_contexts(n_contexts, n_jobs)
+
+            # Get hashes in this process for a single job, in parallel otherwise
+            start = perf_counter()
+            if n_jobs == 1:
+                hash_values = [self.get_context_hash(contexts, self.table_to_plane[k])]
+            else:
+                from joblib import delayed
+                hash_values = self._get_parallel(n_jobs, backend=backend)(
+                    delayed(self.get_context_hash)(
+                        contexts[starts[i]:starts[i + 1]],
+                        self.table_to_plane[k])
+                    for i in range(n_jobs))
+            self._record_cost("hash", len(contexts), n_jobs, backend, perf_counter() - start)
 
             # Reduce
             hash_values = list(chain.from_iterable(t for t in hash_values))
@@ -131,10 +145,14 @@ class _LSHNearest(_ApproximateNeighbors):
             hash_keys = np.unique(hash_values)
 
             # For each hash, get the indices of contexts with that hash
-            Parallel(n_jobs=n_jobs, require='sharedmem')(
-                delayed(self._add_neighbors)(
-                    hash_values, k, h, context_start)
-                for h in hash_keys)
+            if n_jobs == 1:
+                for h in hash_keys:
+                    self._add_neighbors(hash_values, k, h, context_start)
+            else:
+                self._get_parallel(n_jobs, require='sharedmem')(
+                    delayed(self._add_neighbors)(
+                        hash_values, k, h, context_start)
+                    for h in hash_keys)
 
     def _initialize(self, n_cols):
         self.table_to_plane = {i: self.rng.standard_normal(size=(n_cols, self.n_dimensions))
@@ -6,17 +6,22 @@ This module defines the abstract base class for contextual multi-armed bandit al
 """
 
 import abc
-from itertools import chain
-from typing import Callable, Dict, List, NoReturn, Optional, Union
-import multiprocessing as mp
+import math
+import uuid
+import weakref
+from copy import deepcopy
+from itertools import chain, repeat
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Dict, List, NoReturn, Optional, Tuple, Union
 
-from joblib import Parallel, delayed
-from scipy.spatial.distance import cdist
 import numpy as np
 
-from mabwiser.utils import Arm, Num, _BaseRNG, argmin
+from mabwiser.utils import Arm, Num, _ArmIndex, _BaseRNG, _Resident, is_sparse
 from mabwiser._version import __author__, __email__, __version__, __copyright__
 
+if TYPE_CHECKING:
+    from joblib import Parallel
+
 __author__ = __author__
 __email__ = __email__
 __version__ = __version__
@@ -71,21 +76,59 @@ class BaseMAB(metaclass=abc.ABCMeta):
         Arms for which at least one decision has been observed are deemed trained.
     """
 
+    # Profile of the overheads in seconds of parallel calls when n_jobs is 'auto',
+    # for dispatching a call and for each of its jobs, with threads or with processes
+    _dispatch_overhead = {"threading": 2e-4, "process": 1e-2}
+    _job_overhead = {"threading": 1e-4, "process": 2e-3}
+
+    # Number of contexts predicted serially to measure the cost of predictions when n_jobs is 'auto'
+    _calibration_size = 32
+
+    # Whether the operations release the Global Interpreter Lock, so that threads run them in parallel
+    _releases_gil = False
+
+    # Attributes changed by fit and warm start, restored after fitting on neighborhoods, see _get_fit_state()
+    _fit_attributes = ("rng", "cold_arm_to_warm_arm", "trained_arms")
+
     @abc.abstractmethod
-    def __init__(self, rng: _BaseRNG, arms: List[Arm], n_jobs: int, backend: str = None):
+    def __init__(self, rng: _BaseRNG, arms: List[Arm], n_jobs: Union[int, str], backend: str = None):
         """Abstract method.
 
         Creates a multi-armed bandit policy with the given arms.
         """
         self.rng: _BaseRNG = rng
         self.arms: List[Arm] = arms
-        self.n_jobs: int = n_jobs
+        self.n_jobs: Union[int, str] = n_jobs
         self.backend: str = backend
 
         self.arm_to_expectation: Dict[Arm, float] = dict.fromkeys(self.arms, 0)
         self.cold_arm_to_warm_arm: Dict[Arm, Arm] = dict()
         self.trained_arms: List[Arm] = list()
 
+        # Copy of the bandit with its large arrays in shared memory for process-based predictions,
+        # published once for each version of the bandit, which is kept resident in the worker processes
+        self._published: Optional[_Resident] = None
+        self._owner: str = uuid.uuid4().hex
+        weakref.finalize(self, _Resident.retire, self._owner)
+
+        # Pool of workers kept open between calls, see MAB.open()
+        self._pool: Optional[_WorkerPool] = None
+
+        # Measured cost in seconds of each unit of work of the parallel operations, when n_jobs is 'auto'
+        self._operation_to_cost: Dict[str, float] = dict()
+
+        # Whether the bandit is shared by the threads of a parallel prediction, see _get_local()
+        self._is_threaded: bool = False
+
+        # Persistent index of arms to the int32 codes of decisions, shared with the learning policies it contains
+        self._arm_index: _ArmIndex = _ArmIndex(arms)
+
+        # Decisions being fit together with their codes, if encoded by the caller, see _fit_codes()
+        self._decision_codes: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        # Minimum distances of arms to other arms, kept between warm starts, see warm_start()
+        self._arm_distances: _ArmDistances = _ArmDistances()
+
     def add_arm(self, arm: Arm, binarizer: Callable = None) -> NoReturn:
         """Introduces a new arm to the bandit.
 
@@ -93,13 +136,36 @@ class BaseMAB(metaclass=abc.ABCMeta):
         calls the ``_uptake_new_arm()`` function of the sub-class.
         """
         self.arm_to_expectation[arm] = 0
+        self._arm_index.add([arm])
         self._uptake_new_arm(arm, binarizer)
+        self._unpublish()
+
+    def add_arms(self, arms: List[Arm], binarizer: Callable = None) -> NoReturn:
+        """Introduces the new arms to the bandit at once.
+
+        Adds the new arms with zero expectations and
+        calls the ``_uptake_new_arms()`` function of the sub-class.
+        """
+        self.arm_to_expectation.update(dict.fromkeys(arms, 0))
+        self._arm_index.add(arms)
+        self._uptake_new_arms(arms, binarizer)
+        self._unpublish()
 
     def remove_arm(self, arm: Arm) -> NoReturn:
         """Removes arm from the bandit.
         """
         self.arm_to_expectation.pop(arm)
         self._drop_existing_arm(arm)
+        self._unpublish()
+
+    def remove_arms(self, arms: List[Arm]) -> NoReturn:
+        """Removes the arms from the bandit at once.
+        """
+        arm_to_expectation = self.arm_to_expectation
+        for arm in arms:
+            arm_to_expectation.pop(arm)
+        self._drop_existing_arms(arms)
+        self._unpublish()
 
     @abc.abstractmethod
     def fit(self, decisions: np.ndarray, rewards: np.ndarray,
@@ -138,11 +204,47 @@ class BaseMAB(metaclass=abc.ABCMeta):
         """
         pass
 
+    def predict_indices(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+        """Returns the indices of the predicted arms in the list of arms, one for each context.
+
+        Converts the arms returned by ``predict()``,
+        sub-classes that compute the predictions as arrays override this method.
+        """
+        predictions = self.predict(contexts)
+        predictions = predictions if isinstance(predictions, list) else [predictions]
+        arm_to_index = dict((arm, index) for index, arm in enumerate(self.arms))
+        return np.array([arm_to_index[arm] for arm in predictions], dtype=np.intp)
+
+    def predict_expectations_matrix(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+        """Returns the (n_contexts, n_arms) matrix of expected rewards, with columns in the order of the arms.
+
+        Converts the dictionaries returned by ``predict_expectations()``,
+        sub-classes that compute the expectations as arrays override this method.
+        """
+        expectations = self.predict_expectations(contexts)
+        expectations = expectations if isinstance(expectations, list) else [expectations]
+        return np.array([[arm_to_exp[arm] for arm in self.arms] for arm_to_exp in expectations]) \
+            .reshape(len(expectations), len(self.arms))
+
+    def open_pool(self) -> NoReturn:
+        """Opens the pool of workers used by the parallel operations until it is closed."""
+        if self._pool is None:
+            from joblib import cpu_count
+            self._pool = _WorkerPool(cpu_count() if self.n_jobs == 'auto' else self.n_jobs, self.backend)
+
+    def close_pool(self) -> NoReturn:
+        """Closes the pool of workers, if open, and evicts the bandit kept resident in the workers."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+            _Resident.retire(self._owner)
+
     def warm_start(self, arm_to_features: Dict[Arm, List[Num]], distance_quantile: float) -> NoReturn:
         new_cold_arm_to_warm_arm = self._get_cold_arm_to_warm_arm(self.cold_arm_to_warm_arm, arm_to_features,
                                                                   distance_quantile)
         self._copy_arms(new_cold_arm_to_warm_arm)
         self.cold_arm_to_warm_arm = {**self.cold_arm_to_warm_arm, **new_cold_arm_to_warm_arm}
+        self._unpublish()
 
     @abc.abstractmethod
     def _copy_arms(self, cold_arm_to_warm_arm: Dict[Arm, Arm]) -> NoReturn:
@@ -164,12 +266,29 @@ class BaseMAB(metaclass=abc.ABCMeta):
         """
         pass
 
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None) -> NoReturn:
+        """Updates the multi-armed bandit with the new arms.
+
+        Sub-classes override this method to resize the state of arms once for all the new arms.
+        """
+        for arm in arms:
+            self._uptake_new_arm(arm, binarizer)
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        """Removes existing arms from multi-armed bandit.
+
+        Sub-classes override this method to resize the state of arms once for all the removed arms.
+        """
+        for arm in arms:
+            self._drop_existing_arm(arm)
+
     @abc.abstractmethod
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray,
                  contexts: Optional[np.ndarray] = None) -> NoReturn:
         """Abstract method.
 
         Fit operation for individual arm.
+        The given decisions, rewards and contexts are only the rows of the arm, which can be empty.
         """
         pass
 
@@ -182,61 +301,318 @@ class BaseMAB(metaclass=abc.ABCMeta):
         """
         pass
 
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
+        """Predict operation for set of contexts, returning the indices of the arms
+        or the matrix of expectations instead of the list of arms or dictionaries.
+
+        Implemented by the sub-classes that predict with ``_parallel_predict(as_array=True)``.
+        """
+        raise NotImplementedError
+
     def _parallel_fit(self, decisions: np.ndarray, rewards: np.ndarray,
                       contexts: Optional[np.ndarray] = None):
 
-        # Compute effective number of jobs
-        n_jobs = self._effective_jobs(len(self.arms), self.n_jobs)
+        # Compute effective number of jobs, arms are fit in threads that share the bandit
+        n_jobs, backend = self._plan_jobs("fit", len(decisions), len(self.arms), require='sharedmem')
+
+        # Encode decisions once, group them by arm, arms without decisions get an empty slice
+        codes = self._encode(decisions)
+        arm_to_indices = self._get_arm_to_indices(decisions, codes)
+        no_indices = np.array([], dtype=int)
+
+        # Perform fit in this process for a single job, in parallel otherwise, each arm is given only its own rows
+        start = perf_counter()
+        if n_jobs == 1:
+            for arm in self.arms:
+                self._fit_arm(arm, *self._get_arm_data(arm_to_indices.get(arm, no_indices),
+                                                       decisions, rewards, contexts))
+        else:
+            from joblib import delayed
+            self._get_parallel(n_jobs, require='sharedmem')(
+                              delayed(self._fit_arm)(
+                                  arm, *self._get_arm_data(arm_to_indices.get(arm, no_indices),
+                                                           decisions, rewards, contexts))
+                              for arm in self.arms)
+        self._record_cost("fit", len(decisions), n_jobs, backend, perf_counter() - start)
+
+        # Update the status of arms observed in decisions
+        self._update_trained_arms(decisions, codes)
+        self._unpublish()
+
+    @staticmethod
+    def _get_arm_data(indices: np.ndarray, decisions: np.ndarray, rewards: np.ndarray,
+                      contexts: Optional[np.ndarray] = None):
+        return decisions[indices], rewards[indices], None if contexts is None else contexts[indices]
 
-        # Perform parallel fit
-        Parallel(n_jobs=n_jobs, require='sharedmem')(
-                          delayed(self._fit_arm)(
-                              arm, decisions, rewards, contexts)
-                          for arm in self.arms)
+    def _update_trained_arms(self, decisions: np.ndarray, codes: Optional[np.ndarray] = None) -> NoReturn:
 
-        # Get list of arms in decisions
+        # Get list of arms in decisions from their codes
         # If decision is observed for cold arm, drop arm from cold arm dictionary
-        arms = np.unique(decisions).tolist()
+        arms = self._arm_index.get_arms(self._encode(decisions) if codes is None else codes)
         for arm in arms:
             if arm in self.cold_arm_to_warm_arm:
                 self.cold_arm_to_warm_arm.pop(arm)
 
-        # Set/update list of arms for which at least one decision has been observed
+        # Set/update the sorted list of arms for which at least one decision has been observed
         if len(self.trained_arms) == 0:
-            self.trained_arms = arms
+            self.trained_arms = np.unique(arms).tolist()
         else:
             self.trained_arms = np.unique(self.trained_arms + arms).tolist()
 
-    def _parallel_predict(self, contexts: np.ndarray, is_predict: bool):
+    def _get_arm_to_indices(self, decisions: np.ndarray, codes: Optional[np.ndarray] = None) -> Dict[Arm, np.ndarray]:
+        """
+        Returns the indices of the decisions of each arm that has at least one decision.
 
-        # Total number of contexts to predict
-        n_contexts = len(contexts)
+        Decisions are grouped by their integer codes with a single stable sort, without comparing the arms,
+        so the indices of each arm are in increasing order.
+        """
 
-        # Partition contexts by job
-        n_jobs, n_contexts, starts = self._partition_contexts(n_contexts)
-        total_contexts = sum(n_contexts)
+        if len(decisions) == 0:
+            return dict()
 
-        # Get seed value for each context
-        seeds = self.rng.randint(np.iinfo(np.int32).max, size=total_contexts)
+        # Group the codes of decisions and match them to arms
+        value_to_indices = self._arm_index.group(self._encode(decisions) if codes is None else codes)
 
-        # Perform parallel predictions
-        predictions = Parallel(n_jobs=n_jobs, backend=self.backend)(
-                          delayed(self._predict_contexts)(
-                              contexts[starts[i]:starts[i + 1]],
-                              is_predict,
-                              seeds[starts[i]:starts[i + 1]],
-                              starts[i])
-                          for i in range(n_jobs))
+        return dict((arm, value_to_indices[arm]) for arm in self.arms if arm in value_to_indices)
+
+    def _encode(self, decisions: np.ndarray) -> np.ndarray:
+        """
+        Returns the int32 codes of the decisions in the arm index of the bandit.
+        The codes of the decisions being fit are not encoded again when given by the caller.
+        """
+        if self._decision_codes is not None and decisions is self._decision_codes[0]:
+            return self._decision_codes[1]
+        return self._arm_index.encode(decisions)
+
+    def _fit_codes(self, fit: Callable, decisions: np.ndarray, codes: np.ndarray, rewards: np.ndarray,
+                   contexts: Optional[np.ndarray] = None) -> NoReturn:
+        """
+        Calls the given fit method of the bandit with the codes of the decisions in its arm index.
+        """
+        previous = self._decision_codes
+        self._decision_codes = (decisions, codes)
+        try:
+            fit(decisions, rewards, contexts)
+        finally:
+            self._decision_codes = previous
+
+    def _parallel_predict(self, contexts: np.ndarray, is_predict: bool, as_array: bool = False):
+
+        # Total number of contexts to predict, sparse contexts do not support len
+        n_contexts = contexts.shape[0] if is_sparse(contexts) else len(contexts)
+
+        # Get seed value for each context
+        seeds = self.rng.randint(np.iinfo(np.int32).max, size=n_contexts)
+
+        # A single context is predicted in this process, without partitioning or dispatching jobs
+        if n_contexts == 1:
+            predictions = self._predict_contexts_of(self, as_array, contexts, is_predict, seeds, 0)
+            return predictions if as_array else predictions[0]
+
+        # With automatic jobs, the first contexts are predicted serially to measure the cost of predictions
+        # before partitioning the remaining contexts, which gives the same predictions since each context has a seed
+        calibration = 0
+        if self.n_jobs == 'auto' and "predict" not in self._operation_to_cost:
+            calibration = min(n_contexts, self._calibration_size)
+
+        predictions = []
+        if calibration > 0:
+            predictions += self._predict_partitions(contexts[:calibration], is_predict, as_array,
+                                                    seeds[:calibration], 0, n_jobs=1)
+        if n_contexts > calibration:
+            predictions += self._predict_partitions(contexts[calibration:], is_predict, as_array,
+                                                    seeds[calibration:], calibration)
 
         # Reduce
+        if as_array:
+            return np.concatenate(predictions)
+
         predictions = list(chain.from_iterable(t for t in predictions))
 
         return predictions if len(predictions) > 1 else predictions[0]
 
-    def _partition_contexts(self, n_contexts: int):
+    def _predict_partitions(self, contexts: np.ndarray, is_predict: bool, as_array: bool, seeds: np.ndarray,
+                            start_index: int, n_jobs: Optional[int] = None) -> List:
+
+        # Partition contexts by job
+        backend = self.backend
+        if n_jobs is None:
+            n_jobs, backend = self._plan_jobs("predict", len(seeds), len(seeds))
+        n_jobs, n_contexts, starts = self._partition_contexts(len(seeds), n_jobs)
+
+        # Processes attach to the arrays of the published bandit instead of copying them
+        bandit = self._get_published() if n_jobs > 1 and backend != "threading" else self
+
+        # Perform predictions in this process for a single job, in parallel otherwise
+        start = perf_counter()
+        if n_jobs == 1:
+            predictions = [self._predict_contexts_of(self, as_array, contexts, is_predict, seeds, start_index)]
+        else:
+            from joblib import delayed
+            self._is_threaded = backend == "threading"
+            try:
+                predictions = self._get_parallel(n_jobs, backend=backend)(
+                                  delayed(BaseMAB._predict_contexts_of)(
+                                      bandit,
+                                      as_array,
+                                      contexts[starts[i]:starts[i + 1]],
+                                      is_predict,
+                                      seeds[starts[i]:starts[i + 1]],
+                                      start_index + starts[i])
+                                  for i in range(n_jobs))
+            finally:
+                self._is_threaded = False
+        self._record_cost("predict", len(seeds), n_jobs, backend, perf_counter() - start)
+
+        return predictions
+
+    @staticmethod
+    def _predict_contexts_of(bandit: 'BaseMAB', as_array: bool, contexts: np.ndarray, is_predict: bool,
+                             seeds: np.ndarray, start_index: int) -> Union[List, np.ndarray]:
+
+        # Predict with the bandit, which is the resident bandit once unpickled in worker processes
+        if as_array:
+            return bandit._predict_contexts_array(contexts, is_predict, seeds, start_index)
+        else:
+            return bandit._predict_contexts(contexts, is_predict, seeds, start_index)
+
+    def _get_parallel(self, n_jobs: int, require: Optional[str] = None, backend: Optional[str] = None) -> 'Parallel':
+
+        # Jobs are dispatched to the open pool of workers if any, a single job runs in this process
+        # The pool is used for the backend of the bandit, threads chosen by automatic jobs are started for the call
+        backend = backend or self.backend
+        if self._pool is not None and n_jobs > 1:
+            if require == 'sharedmem':
+                return self._pool.shared_parallel
+            if backend == self.backend:
+                return self._pool.parallel
+
+        from joblib import Parallel
+        if require == 'sharedmem':
+            return Parallel(n_jobs=n_jobs, require=require)
+        else:
+            return Parallel(n_jobs=n_jobs, backend=backend)
+
+    def _plan_jobs(self, operation: str, size: int, n_tasks: int,
+                   require: Optional[str] = None) -> Tuple[int, Optional[str]]:
+
+        # Number of jobs given by n_jobs, with the backend of the bandit
+        if self.n_jobs != 'auto':
+            return self._effective_jobs(n_tasks, self.n_jobs), self.backend
+
+        # The first call of each operation runs serially to measure its cost
+        if operation not in self._operation_to_cost:
+            return 1, self.backend
+
+        from joblib import cpu_count
+
+        # Threads are candidates when the bandit releases the GIL, processes unless memory is shared
+        backends = []
+        if self._releases_gil and self.backend in (None, "threading"):
+            backends.append("threading")
+        if require != 'sharedmem' and self.backend != "threading":
+            backends.append(self.backend)
+
+        return self._get_cheapest_jobs(self._operation_to_cost[operation] * size, min(n_tasks, cpu_count()),
+                                       backends)
+
+    @staticmethod
+    def _get_cheapest_jobs(cost: float, max_jobs: int, backends: List[Optional[str]]) -> Tuple[int, Optional[str]]:
+
+        # Serial execution, unless the work split between jobs outweighs the overheads of a backend
+        # With k jobs the time is cost / k + dispatch + k * job, which is minimal at k = sqrt(cost / job)
+        n_jobs, backend, best_time = 1, None, cost
+        for candidate in backends:
+            kind = "threading" if candidate == "threading" else "process"
+            dispatch, job = BaseMAB._dispatch_overhead[kind], BaseMAB._job_overhead[kind]
+            jobs = min(max(round(math.sqrt(cost / job)), 2), max_jobs)
+            time = cost / jobs + dispatch + jobs * job
+            if jobs > 1 and time < best_time:
+                n_jobs, backend, best_time = jobs, candidate, time
+
+        return n_jobs, backend
+
+    def _record_cost(self, operation: str, size: int, n_jobs: int, backend: Optional[str], elapsed: float):
+
+        # Keep a moving average of the cost of each unit of work, without the modelled overheads of parallel calls
+        if self.n_jobs != 'auto' or size == 0:
+            return
+
+        if n_jobs > 1:
+            kind = "threading" if backend == "threading" else "process"
+            elapsed = max(elapsed - self._dispatch_overhead[kind] - n_jobs * self._job_overhead[kind], 0) * n_jobs
+
+        cost = elapsed / size
+        previous = self._operation_to_cost.get(operation)
+        self._operation_to_cost[operation] = cost if previous is None else 0.5 * (previous + cost)
+
+    def _get_local(self, obj):
+
+        # Threads of a parallel prediction share the bandit, so that each thread predicts with its own copy,
+        # while predictions in a single thread or in a process use the object in place
+        return deepcopy(obj) if self._is_threaded else obj
+
+    def _get_fit_state(self) -> Dict[str, object]:
+
+        # Copy of the attributes changed by fit and warm start, sharing the random generator,
+        # so that a policy fit in place on each neighborhood is restored afterwards, see _set_fit_state()
+        return deepcopy(dict((name, getattr(self, name)) for name in self._fit_attributes), {id(self.rng): self.rng})
+
+    def _set_fit_state(self, state: Dict[str, object]) -> NoReturn:
+        self.__dict__.update(state)
+
+    def _stack_predictions(self, predictions: List, is_predict: bool) -> np.ndarray:
+
+        # Stack the indices of the arms, or the rows of expectations into an (n_contexts x n_arms) matrix
+        if is_predict:
+            return np.array(predictions, dtype=np.intp)
+        else:
+            return np.array(predictions).reshape(len(predictions), len(self.arms))
+
+    def _get_predictions(self, predictions: np.ndarray, is_predict: bool) -> List:
+
+        # Convert the indices to arms or the rows of expectations to dictionaries of arms to expectations
+        if is_predict:
+            return [self.arms[index] for index in predictions]
+        else:
+            return [dict(zip(self.arms, row)) for row in predictions]
+
+    def _get_published(self) -> _Resident:
+
+        # Publish the bandit only once for each version,
+        # which is pickled once and unpickled once in each worker process
+        if self._published is None:
+            self._published = _Resident(self._publish(), self._owner)
+        return self._published
+
+    def _publish(self) -> 'BaseMAB':
+        """
+        Returns a copy of the bandit to predict in other processes.
+
+        Bandits with large arrays override this method to return a copy with the arrays in shared memory,
+        which processes attach to instead of copying. By default, the bandit itself is used.
+        """
+        return self
+
+    def _unpublish(self) -> NoReturn:
+
+        # The bandit changed, so that it is published again on the next process-based prediction
+        self._published = None
+
+    def __getstate__(self):
+
+        # The published copy and the pool of workers are not pickled with the bandit,
+        # the bandit is published again when needed
+        state = self.__dict__.copy()
+        state["_published"] = None
+        state["_pool"] = None
+        return state
+
+    def _partition_contexts(self, n_contexts: int, n_jobs: Optional[int] = None):
 
         # Compute effective number of jobs
-        n_jobs = self._effective_jobs(n_contexts, self.n_jobs)
+        n_jobs = self._effective_jobs(n_contexts, self.n_jobs if n_jobs is None else n_jobs)
 
         # Partition contexts between jobs
         n_contexts_per_job = np.full(n_jobs, n_contexts // n_jobs, dtype=int)
@@ -246,151 +622,167 @@ class BaseMAB(metaclass=abc.ABCMeta):
         return n_jobs, n_contexts_per_job.tolist(), [0] + starts.tolist()
 
     @staticmethod
-    def _effective_jobs(size: int, n_jobs: int):
-        if n_jobs < 0:
-            n_jobs = max(mp.cpu_count() + 1 + n_jobs, 1)
+    def _effective_jobs(size: int, n_jobs: Union[int, str]):
+        # CPUs available to the process, within the CPU quota of its container if any
+        if n_jobs == 'auto' or n_jobs < 0:
+            from joblib import cpu_count
+            n_jobs = cpu_count() if n_jobs == 'auto' else max(cpu_count() + 1 + n_jobs, 1)
         n_jobs = min(n_jobs, size)
         return n_jobs
 
-    @staticmethod
-    def _get_arm_distances(from_arm: Arm, arm_to_features: Dict[Arm, List[Num]], metric: str = 'cosine',
-                           self_distance: int = 999999) -> Dict[Arm, Num]:
-        """
-        Calculates the distances of the given from_arm to all the arms.
-
-        Distances calculated based on the feature vectors given in arm_to_features using the given distance metric.
-        The distance of the arm to itself is set as the given self_distance.
-
-        Parameters
-        ---------
-        from_arm: Arm
-            Distances from this arm.
-        arm_to_features: Dict[Arm, list[Num]]
-            Features for each arm used to calculate distances.
-        metric: str
-            Distance metric to use.
-            Default value is 'cosine'.
-        self_distance: int
-            The value to set as the distance to itself.
-            Default value is 999999.
-
-        Returns
-        -------
-        Returns distance from given arm to arm v as arm_to_distance[v].
-        """
-
-        # Find the distance of given from_arm to all arms including self
-        arm_to_distance = {}
-        for to_arm in arm_to_features.keys():
-            if from_arm == to_arm:
-                arm_to_distance[to_arm] = self_distance
-            else:
-                arm_to_distance[to_arm] = cdist(np.asarray([arm_to_features[from_arm]]),
-                                                np.asarray([arm_to_features[to_arm]]),
-                                                metric=metric)[0][0]
-
-                # Cosine similarity can be nan when a feature vector is all-zeros
-                if np.isnan(arm_to_distance[to_arm]):
-                    arm_to_distance[to_arm] = self_distance
-
-        return arm_to_distance
-
-    @staticmethod
-    def _get_pairwise_distances(arm_to_features: Dict[Arm, List[Num]], metric: str = 'cosine',
-                                self_distance: int = 999999) -> Dict[Arm, Dict[Arm, Num]]:
-        """
-        Calculates the distances between each pair of arms.
+    def _get_cold_arm_to_warm_arm(self, cold_arm_to_warm_arm, arm_to_features, distance_quantile):
 
-        Distances calculated based on the feature vectors given in arm_to_features using the given distance metric.
-        The distance of the arm to itself is set as the given self_distance.
+        # Update the minimum distances of arms to other arms based on features
+        # and then find minimum distance (threshold) required to warm start an untrained arm
+        self._arm_distances.update(arm_to_features)
+        distance_threshold = self._arm_distances.get_threshold(distance_quantile)
 
-        Parameters
-        ---------
-        arm_to_features: Dict[Arm, list[Num]]
-            Features for each arm used to calculate distances.
-        metric: str
-            Distance metric to use.
-            Default value is 'cosine'.
-        self_distance: int
-            The value to set as the distance to itself.
-            Default value is 999999.
+        # Cold arms and warm arms
+        trained_arms = set(self.trained_arms)
+        arms = set(self.arms)
+        cold_arms = [arm for arm in self.arms if ((arm not in trained_arms) and (arm not in cold_arm_to_warm_arm))]
+        warm_arms = [arm for arm in self.trained_arms if arm in arms]
+        if len(cold_arms) == 0 or len(warm_arms) == 0:
+            return dict()
 
-        Returns
-        -------
-        Returns the distance between two arms u and v as distance_from_to[u][v].
-        """
+        # Select the closest warm arm of each cold arm
+        closest, closest_distances = self._arm_distances.get_closest(cold_arms, warm_arms)
 
-        # For every arm, calculate its distance to all arms including itself
-        distance_from_to = {}
-        for from_arm in arm_to_features.keys():
-            distance_from_to[from_arm] = BaseMAB._get_arm_distances(from_arm, arm_to_features, metric, self_distance)
-        return distance_from_to
+        # Warm start if closest distance lower than minimum required distance
+        return dict((cold_arm, warm_arms[index])
+                    for cold_arm, index, distance in zip(cold_arms, closest.tolist(), closest_distances.tolist())
+                    if distance <= distance_threshold)
 
-    @staticmethod
-    def _get_distance_threshold(distance_from_to: Dict[Arm, Dict[Arm, Num]], quantile: Num,
-                                self_distance: int = 999999) -> Num:
-        """
-        Calculates a threshold for doing warm-start conditioned on minimum pairwise distances of arms.
 
-        Parameters
-        ---------
-        distance_from_to: Dict[Arm, Dict[Arm, Num]]
-            Dictionary of pairwise distances from arms to arms.
-        quantile: Num
-            Quantile used to compute threshold.
-        self_distance: int
-            The distance of arm to itself.
-            Default value is 999999.
-
-        Returns
-        -------
-        A threshold on pairwise distance for doing warm-start.
-        """
+class _ArmDistances:
+    """
+    Distances between the feature vectors of arms for warm start.
+
+    The distances are computed with one cdist call for each block of arms, which gives the same distances
+    as computing them pair by pair, so that the distance matrix of all arms is never kept in memory.
+    The minimum distance of each arm to the other arms is kept between calls, and only the arms that are new,
+    whose features changed, or whose closest arm is removed or changed, are computed again.
+    Distances that are nan, such as cosine distances of all-zero features, and the distance of an arm to itself
+    are ignored.
+    """
 
-        closest_distances = []
-        for arm, arm_to_distance in distance_from_to.items():
+    # Number of distances computed for each block of arms
+    block_size = 2 ** 22
 
-            # Get distances from one arm to others
-            distances = [distance for distance in arm_to_distance.values()]
+    def __init__(self, metric: str = 'cosine'):
+        self.metric = metric
+        self.arm_to_row: Dict[Arm, int] = dict()
+        self.features = np.empty((0, 0))
+        self.min_distances = np.empty(0)
+        self.closest = np.empty(0, dtype=np.intp)
 
-            # Get the distance to closest arm (if not equal to self_distance)
-            if min(distances) != self_distance:
-                closest_distances.append(min(distances))
+    def update(self, arm_to_features: Dict[Arm, List[Num]]) -> NoReturn:
+        """
+        Updates the minimum distance of each arm to the other arms for the given features.
+        """
+        arms = list(arm_to_features.keys())
+        features = np.asarray(list(arm_to_features.values()), dtype=np.float64) if arms else np.empty((0, 0))
+
+        # Arms with the same features keep their minimum distances, unless their closest arm is not kept
+        old_rows = np.fromiter(map(self.arm_to_row.get, arms, repeat(-1, len(arms))), np.intp, len(arms))
+        is_kept = old_rows >= 0
+        if features.shape[1] != self.features.shape[1]:
+            is_kept[:] = False
+        else:
+            is_kept[is_kept] = (features[is_kept] == self.features[old_rows[is_kept]]).all(axis=1)
+
+        old_to_new = np.full(len(self.features), -1, dtype=np.intp)
+        old_to_new[old_rows[is_kept]] = np.flatnonzero(is_kept)
+
+        min_distances = np.full(len(arms), np.inf)
+        closest = np.full(len(arms), -1, dtype=np.intp)
+        kept = np.flatnonzero(is_kept)
+        if len(kept):
+            old_closest = self.closest[old_rows[kept]]
+            kept_closest = np.where(old_closest >= 0, old_to_new[old_closest], -1)
+            has_closest = (kept_closest >= 0) | np.isinf(self.min_distances[old_rows[kept]])
+            kept = kept[has_closest]
+            min_distances[kept] = self.min_distances[old_rows[kept]]
+            closest[kept] = kept_closest[has_closest]
+
+        # New and changed arms, and kept arms whose closest arm is not kept, are compared to all arms
+        is_new = ~is_kept
+        is_computed = np.ones(len(arms), dtype=bool)
+        is_computed[kept] = False
+        rows = np.flatnonzero(is_computed)
+        for block in self._get_blocks(len(rows), len(arms)):
+            block_rows = rows[block]
+            distances = self._get_distances(features[block_rows], features)
+            distances[np.arange(len(block_rows)), block_rows] = np.inf
+
+            # Minimum distance of the computed arms to all arms
+            block_closest = np.argmin(distances, axis=1)
+            min_distances[block_rows] = distances[np.arange(len(block_rows)), block_closest]
+            closest[block_rows] = np.where(np.isinf(min_distances[block_rows]), -1, block_closest)
+
+            # Minimum distance of the kept arms to the new arms, as distances are symmetric
+            if len(kept) and is_new[block_rows].any():
+                new_distances = distances[is_new[block_rows]][:, kept]
+                new_closest = np.argmin(new_distances, axis=0)
+                new_min = new_distances[new_closest, np.arange(len(kept))]
+                is_closer = new_min < min_distances[kept]
+                min_distances[kept[is_closer]] = new_min[is_closer]
+                closest[kept[is_closer]] = block_rows[is_new[block_rows]][new_closest[is_closer]]
+
+        self.arm_to_row = dict(zip(arms, range(len(arms))))
+        self.features = features
+        self.min_distances = min_distances
+        self.closest = closest
+
+    def get_threshold(self, quantile: Num) -> Num:
+        """
+        Returns the given quantile of the minimum distances of arms to the other arms.
+        """
+        return np.quantile(self.min_distances[np.isfinite(self.min_distances)], q=quantile)
 
-        # Calculate threshold distance based on quantile
-        threshold = np.quantile(closest_distances, q=quantile)
+    def get_closest(self, from_arms: List[Arm], to_arms: List[Arm]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the index of the first closest arm in to_arms of each arm in from_arms, and its distance.
+        """
+        from_features = self.features[[self.arm_to_row[arm] for arm in from_arms]]
+        to_features = self.features[[self.arm_to_row[arm] for arm in to_arms]]
 
-        return threshold
+        closest = np.empty(len(from_arms), dtype=np.intp)
+        closest_distances = np.empty(len(from_arms))
+        for block in self._get_blocks(len(from_arms), len(to_arms)):
+            distances = self._get_distances(from_features[block], to_features)
+            closest[block] = np.argmin(distances, axis=1)
+            closest_distances[block] = distances[np.arange(len(closest[block])), closest[block]]
 
-    def _get_cold_arm_to_warm_arm(self, cold_arm_to_warm_arm, arm_to_features, distance_quantile):
+        return closest, closest_distances
 
-        # Calculate from-to distances between all pairs of arms based on features
-        # and then find minimum distance (threshold) required to warm start an untrained arm
-        distance_from_to = self._get_pairwise_distances(arm_to_features)
-        distance_threshold = self._get_distance_threshold(distance_from_to, quantile=distance_quantile)
+    def _get_blocks(self, n_rows: int, n_cols: int) -> List[slice]:
+        # Blocks of rows with at most block_size distances each
+        size = max(self.block_size // max(n_cols, 1), 1)
+        return [slice(start, start + size) for start in range(0, n_rows, size)]
 
-        # Cold arms
-        cold_arms = [arm for arm in self.arms if ((arm not in self.trained_arms) and (arm not in cold_arm_to_warm_arm))]
+    def _get_distances(self, from_features: np.ndarray, to_features: np.ndarray) -> np.ndarray:
+        from scipy.spatial.distance import cdist
 
-        # New cold arm to warm arm dictionary
-        new_cold_arm_to_warm_arm = dict()
+        # Nan distances are ignored as infinite distances
+        distances = cdist(from_features, to_features, metric=self.metric)
+        distances[np.isnan(distances)] = np.inf
+        return distances
 
-        for cold_arm in cold_arms:
 
-            # Collect distance from cold arm to warm arms
-            arm_to_distance = {}
-            for arm in self.trained_arms:
-                if arm in self.arms:
-                    arm_to_distance[arm] = distance_from_to[cold_arm][arm]
-            if len(arm_to_distance) == 0:
-                continue
+class _WorkerPool:
+    """
+    Pools of workers kept open between the calls of a bandit, so that each call does not start its workers.
 
-            # Select the closest warm arm
-            closest_arm = argmin(arm_to_distance)
-            closest_distance = distance_from_to[cold_arm][closest_arm]
+    Predictions are dispatched to the workers of the given backend,
+    and fits that share the memory of the bandit are dispatched to threads.
+    """
 
-            # Warm start if closest distance lower than minimum required distance
-            if closest_distance <= distance_threshold:
-                new_cold_arm_to_warm_arm[cold_arm] = closest_arm
+    def __init__(self, n_jobs: int, backend: Optional[str]):
+        from joblib import Parallel
+        self.parallel = Parallel(n_jobs=n_jobs, backend=backend).__enter__()
+        self.shared_parallel = Parallel(n_jobs=n_jobs, require='sharedmem').__enter__()
 
-        return new_cold_arm_to_warm_arm
+    def close(self) -> NoReturn:
+        self.parallel.__exit__(None, None, None)
+        self.shared_parallel.__exit__(None, None, None)
@@ -5,7 +5,6 @@ from copy import deepcopy
 from typing import Callable, Dict, List, NoReturn, Optional, Union
 
 import numpy as np
-from sklearn.cluster import KMeans, MiniBatchKMeans
 
 from mabwiser.base_mab import BaseMAB
 from mabwiser.greedy import _EpsilonGreedy
@@ -14,7 +13,7 @@ from mabwiser.rand import _Random
 from mabwiser.softmax import _Softmax
 from mabwiser.thompson import _ThompsonSampling
 from mabwiser.ucb import _UCB1
-from mabwiser.utils import Arm, Num, reset, _BaseRNG, create_rng
+from mabwiser.utils import Arm, Num, reset, _BaseRNG, _RowRNG
 
 
 class _Clusters(BaseMAB):
@@ -26,19 +25,22 @@ class _Clusters(BaseMAB):
 
         self.n_clusters = n_clusters
 
+        from sklearn.cluster import KMeans, MiniBatchKMeans
         if is_minibatch:
             self.kmeans = MiniBatchKMeans(n_clusters, random_state=rng.seed)
         else:
             self.kmeans = KMeans(n_clusters, random_state=rng.seed)
 
         # Create the list of learning policies for each cluster
-        # Deep copy all parameters of the lp objects, except refer to the originals of rng and arms
+        # Deep copy all parameters of the lp objects, except refer to the originals of rng, arms and arm index
         self.lp_list = [deepcopy(lp) for _ in range(self.n_clusters)]
         for c in range(self.n_clusters):
             self.lp_list[c].rng = rng
             self.lp_list[c].arms = arms
+            self.lp_list[c]._arm_index = self._arm_index
 
         self.decisions = None
+        self.decision_codes = None
         self.rewards = None
         self.contexts = None
 
@@ -52,6 +54,7 @@ class _Clusters(BaseMAB):
 
         # Set the historical data for prediction
         self.decisions = decisions
+        self.decision_codes = self._encode(decisions)
         self.contexts = contexts
 
         # Binarize the rewards if using Thompson Sampling
@@ -79,6 +82,7 @@ class _Clusters(BaseMAB):
 
         # Add more historical data for prediction
         self.decisions = np.concatenate((self.decisions, decisions))
+        self.decision_codes = np.concatenate((self.decision_codes, self._encode(decisions)))
         self.contexts = np.concatenate((self.contexts, contexts))
         self.rewards = np.concatenate((self.rewards, rewards))
 
@@ -92,6 +96,14 @@ class _Clusters(BaseMAB):
         # Return predict expectations within the cluster
         return self._parallel_predict(contexts, is_predict=False)
 
+    def predict_indices(self, contexts: np.ndarray = None) -> np.ndarray:
+        # Return the indices of the arms predicted within the cluster
+        return self._parallel_predict(contexts, is_predict=True, as_array=True)
+
+    def predict_expectations_matrix(self, contexts: np.ndarray = None) -> np.ndarray:
+        # Return the matrix of expectations within the cluster
+        return self._parallel_predict(contexts, is_predict=False, as_array=True)
+
     def warm_start(self, arm_to_features: Dict[Arm, List[Num]], distance_quantile: float):
         for c in range(self.n_clusters):
             self.lp_list[c].warm_start(arm_to_features, distance_quantile)
@@ -110,19 +122,31 @@ class _Clusters(BaseMAB):
         for lp in self.lp_list:
             lp.remove_arm(arm)
 
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
+
+        # Update each learning policy with all the arms at once
+        for lp in self.lp_list:
+            lp.add_arms(arms, binarizer)
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        # Update each learning policy with all the arms at once
+        for lp in self.lp_list:
+            lp.remove_arms(arms)
+
     def _fit_operation(self):
 
         # Train the clusters for the contexts
         self.kmeans.fit(self.contexts)
         cluster_predictions = self.kmeans.labels_
 
-        # Train the learning policy for each cluster
+        # Train the learning policy for each cluster with the codes of its decisions
         for c in range(self.n_clusters):
             indices = np.where(cluster_predictions == c)
             c_decisions = self.decisions[indices]
+            c_codes = self.decision_codes[indices]
             c_rewards = self.rewards[indices]
             c_contexts = self.contexts[indices]
-            self.lp_list[c].fit(c_decisions, c_rewards, c_contexts)
+            self.lp_list[c]._fit_codes(self.lp_list[c].fit, c_decisions, c_codes, c_rewards, c_contexts)
 
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
         pass
@@ -130,26 +154,40 @@ class _Clusters(BaseMAB):
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
 
-        # Copy learning policy object
-        lp_list = deepcopy(self.lp_list)
+        # Return the list of predictions
+        return self._get_predictions(self._predict_contexts_array(contexts, is_predict, seeds, start_index),
+                                     is_predict)
+
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
+
+        # Learning policies of clusters are used in place, only their random state is replaced for each context
+        lp_list = self._get_local(self.lp_list)
+        lp_rngs = [lp.rng for lp in lp_list]
 
         # Identify the cluster for each context to predict
         cluster_predictions = self.kmeans.predict(contexts)
 
         # Obtain prediction for each context
         predictions = [None] * len(contexts)
-        for index, row in enumerate(contexts):
-            row_2d = row[np.newaxis, :]
-            cluster = cluster_predictions[index]
-
-            # Set random state
-            lp_list[cluster].rng = create_rng(seed=seeds[index])
-
-            # Predict based on the cluster
-            if is_predict:
-                predictions[index] = lp_list[cluster].predict(row_2d)
-            else:
-                predictions[index] = lp_list[cluster].predict_expectations(row_2d)
-
-        # Return the list of predictions
-        return predictions
+        row_rng = _RowRNG()
+        try:
+            for index, row in enumerate(contexts):
+                row_2d = row[np.newaxis, :]
+                cluster = cluster_predictions[index]
+
+                # Start the random stream of the row
+                lp_list[cluster].rng = row_rng.reseed(seeds[index])
+
+                # Predict based on the cluster
+                if is_predict:
+                    predictions[index] = lp_list[cluster].predict_indices(row_2d)[0]
+                else:
+                    predictions[index] = lp_list[cluster].predict_expectations_matrix(row_2d)[0]
+        finally:
+            # Restore the random state of learning policies
+            for lp, rng in zip(lp_list, lp_rngs):
+                lp.rng = rng
+
+        # Return the indices of the arms or the expectations
+        return self._stack_predictions(predictions, is_predict)
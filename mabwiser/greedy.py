@@ -1,31 +1,37 @@
 # -*- coding: utf-8 -*-
 # SPDX-License-Identifier: Apache-2.0
 
-from copy import deepcopy
 from typing import Callable, Dict, List, NoReturn, Optional, Union
 
 import numpy as np
 
 from mabwiser.base_mab import BaseMAB
-from mabwiser.utils import argmax, reset, Arm, Num, _BaseRNG
+from mabwiser.utils import Arm, Num, _ArmStatistic, _ArmStatistics, _BaseRNG
 
 
 class _EpsilonGreedy(BaseMAB):
 
+    # Dictionaries of arms to statistics, created from the arrays of statistics on access
+    arm_to_sum = _ArmStatistic("sum")
+    arm_to_count = _ArmStatistic("count")
+    arm_to_expectation = _ArmStatistic("expectation")
+
+    # Statistics are changed by fit and warm start together with the status of arms
+    _fit_attributes = BaseMAB._fit_attributes + ("statistics",)
+
     def __init__(self, rng: _BaseRNG, arms: List[Arm], n_jobs: int, backend: Optional[str],
                  epsilon: Optional[float] = 0.05):
+
+        # Statistics of arms are stored in arrays, created before the base policy sets the expectations
+        self.statistics = _ArmStatistics(arms, {"sum": 0, "count": 0, "expectation": 0})
+
         super().__init__(rng, arms, n_jobs, backend)
         self.epsilon = epsilon
 
-        self.arm_to_sum = dict.fromkeys(self.arms, 0)
-        self.arm_to_count = dict.fromkeys(self.arms, 0)
-
     def fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
 
         # Reset the sum, count, and expectations to zero
-        reset(self.arm_to_sum, 0)
-        reset(self.arm_to_count, 0)
-        reset(self.arm_to_expectation, 0)
+        self.statistics.reset("sum", "count", "expectation")
 
         # Reset warm started arms
         self.cold_arm_to_warm_arm = dict()
@@ -38,53 +44,67 @@ class _EpsilonGreedy(BaseMAB):
     def predict(self, contexts: Optional[np.ndarray] = None) -> Union[Arm, List[Arm]]:
 
         # Return the arm with maximum expectation
-        expectations = self.predict_expectations(contexts)
-        if isinstance(expectations, dict):
-            return argmax(expectations)
-        else:
-            return [argmax(exp) for exp in expectations]
+        predictions = self.statistics.argmax(self._get_expectations(contexts))
+        return predictions[0] if len(predictions) == 1 else predictions
 
     def predict_expectations(self, contexts: Optional[np.ndarray] = None) -> Union[Dict[Arm, Num],
                                                                                    List[Dict[Arm, Num]]]:
 
+        # Return a copy of expectations dictionary from arms (key) to expectations (values) for each context
+        expectations = self.statistics.to_dicts(self._get_expectations(contexts))
+        return expectations[0] if len(expectations) == 1 else expectations
+
+    def predict_indices(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return the index of the arm with maximum expectation for each context
+        return np.argmax(self._get_expectations(contexts), axis=1)
+
+    def predict_expectations_matrix(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return a copy of the expectations of arms for each context
+        return np.array(self._get_expectations(contexts))
+
+    def _get_expectations(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
         # Return a random expectation (between 0 and 1) for each arm with epsilon probability,
-        # and the actual arm expectations otherwise.
-        # If contexts is None or has length of 1 generate single arm to expectations,
-        # otherwise use vectorized functions to generate a list of arm to expectations with same length as contexts.
+        # and the actual arm expectations otherwise, as a row of expectations of arms for each context.
+        # If contexts is None or has length of 1 generate a single row,
+        # otherwise use vectorized functions to generate a row for each context.
+        expectations = self.statistics.get("expectation")
         if contexts is None or len(contexts) == 1:
             if self.rng.rand() < self.epsilon:
-                return dict((arm, self.rng.rand()) for arm in self.arms).copy()
+                return self.rng.rand((1, len(expectations)))
             else:
-                return self.arm_to_expectation.copy()
+                return expectations[np.newaxis]
         else:
             probability = self.rng.rand(len(contexts))
             random_values = self.rng.rand((len(contexts), len(self.arms)))
-            expectations = [dict(zip(self.arms, exp)).copy() if probability[index] < self.epsilon
-                            else self.arm_to_expectation.copy() for index, exp in enumerate(random_values)]
-            return expectations
+            return np.where(probability[:, np.newaxis] < self.epsilon, random_values, expectations)
 
     def _copy_arms(self, cold_arm_to_warm_arm):
-        for cold_arm, warm_arm in cold_arm_to_warm_arm.items():
-            self.arm_to_sum[cold_arm] = deepcopy(self.arm_to_sum[warm_arm])
-            self.arm_to_count[cold_arm] = deepcopy(self.arm_to_count[warm_arm])
-            self.arm_to_expectation[cold_arm] = deepcopy(self.arm_to_expectation[warm_arm])
+        self.statistics.copy_arms(cold_arm_to_warm_arm, ["sum", "count", "expectation"])
 
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
 
-        arm_rewards = rewards[decisions == arm]
-        if arm_rewards.size:
-            self.arm_to_sum[arm] += arm_rewards.sum()
-            self.arm_to_count[arm] += arm_rewards.size
-            self.arm_to_expectation[arm] = self.arm_to_sum[arm] / self.arm_to_count[arm]
+        if rewards.size:
+            index = self.statistics.arm_to_index[arm]
+            arm_sum, arm_count = self.statistics.arrays["sum"], self.statistics.arrays["count"]
+            arm_sum[index] += rewards.sum()
+            arm_count[index] += rewards.size
+            self.statistics.arrays["expectation"][index] = arm_sum[index] / arm_count[index]
 
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
         pass
 
     def _uptake_new_arm(self, arm: Arm, binarizer: Callable = None, scaler: Callable = None):
-        self.arm_to_sum[arm] = 0
-        self.arm_to_count[arm] = 0
+        self.statistics.add(arm)
 
     def _drop_existing_arm(self, arm: Arm) -> NoReturn:
-        self.arm_to_sum.pop(arm)
-        self.arm_to_count.pop(arm)
+        self.statistics.remove(arm)
+
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
+        self.statistics.add_arms(arms)
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        self.statistics.remove_arms(arms)
@@ -1,19 +1,24 @@
 # -*- coding: utf-8 -*-
 # SPDX-License-Identifier: Apache-2.0
 
-from copy import deepcopy
-from typing import Callable, Dict, List, NoReturn, Optional, Union
+from copy import copy, deepcopy
+from typing import TYPE_CHECKING, Callable, Dict, List, NoReturn, Optional, Union
 
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 
 from mabwiser.base_mab import BaseMAB
-from mabwiser.utils import Arm, Num, argmax, _BaseRNG, create_rng
+from mabwiser.utils import Arm, Num, _BaseRNG, _RowRNG, _SharedArrays, is_sparse
+
+if TYPE_CHECKING:
+    from scipy import sparse
+    from sklearn.preprocessing import StandardScaler
 
 SCALER_TOLERANCE = 1e-6
+INCREMENTAL_TOLERANCE = 1e-8
+PREDICT_BLOCK_SIZE = 2 ** 22
 
 
-def fix_small_variance(scaler: StandardScaler) -> NoReturn:
+def fix_small_variance(scaler: 'StandardScaler') -> NoReturn:
     """
     Set variances close to zero to be equal to one in trained standard scaler to make computations stable.
 
@@ -31,33 +36,118 @@ def fix_small_variance(scaler: StandardScaler) -> NoReturn:
         scaler.var_[mask] = 0.0e+00
 
 
+def cholesky_update(L: np.ndarray, x: np.ndarray, downdate: bool = False) -> np.ndarray:
+    """
+    Returns the lower Cholesky factor of A + x xt, or of A - x xt for a downdate, given the factor L of A.
+
+    The rank-one update takes O(d^2) operations instead of the O(d^3) operations of a new factorization.
+
+    :param L: the lower triangular Cholesky factor of A
+    :param x: the vector of the rank-one modification
+    :param downdate: whether to subtract instead of add the rank-one modification
+    """
+    L = L.astype('float64')
+    x = x.astype('float64')
+    sign = -1.0 if downdate else 1.0
+
+    for k in range(x.size):
+        r_squared = L[k, k] * L[k, k] + sign * x[k] * x[k]
+        if r_squared <= 0:
+            raise np.linalg.LinAlgError("Downdated matrix is not positive definite.")
+        r = np.sqrt(r_squared)
+        c = r / L[k, k]
+        s = x[k] / L[k, k]
+        L[k, k] = r
+        L[k + 1:, k] = (L[k + 1:, k] + sign * s * x[k + 1:]) / c
+        x[k + 1:] = c * x[k + 1:] - s * L[k + 1:, k]
+
+    return L
+
+
+def _add_sparse(A: np.ndarray, S: 'sparse.spmatrix') -> NoReturn:
+    # Add the non-zeros of sparse S to dense A in place
+    S = S.tocoo()
+    np.add.at(A, (S.row, S.col), S.data)
+
+
+def _get_row_dots(X: Union[np.ndarray, 'sparse.spmatrix'], Y: np.ndarray) -> np.ndarray:
+    # Dot product of each row of X with the same row of Y
+    if is_sparse(X):
+        return np.asarray(X.multiply(Y).sum(axis=1)).ravel()
+    return np.einsum('nj,nj->n', X, Y)
+
+
+def _as_float64(array: np.ndarray) -> np.ndarray:
+    # Convert to float64 for numerical stability, without copying when already float64
+    return array.astype(np.float64, copy=False)
+
+
 class _RidgeRegression:
 
-    def __init__(self, rng: _BaseRNG, alpha: Num = 1.0, l2_lambda: Num = 1.0, scale: bool = False):
+    def __init__(self, rng: _BaseRNG, alpha: Num = 1.0, l2_lambda: Num = 1.0, scale: bool = False,
+                 incremental: bool = False, solver: str = "inverse", dtype: np.dtype = np.dtype(np.float64),
+                 covariance: str = "full", rank: int = 10, lazy: bool = False):
 
         # Ridge Regression: https://onlinecourses.science.psu.edu/stat857/node/155/
         self.rng = rng                      # random number generator
         self.alpha = alpha                  # exploration parameter
         self.l2_lambda = l2_lambda          # regularization parameter
         self.scale = scale                  # scale contexts
+        self.incremental = incremental      # low-rank updates of A_inv or L instead of a full inverse or factor
+        self.solver = solver                # solve with explicit inverse A_inv or with Cholesky factor L
+        self.dtype = np.dtype(dtype)        # floating point type of the model state
+        self.covariance = covariance        # full A, or its diagonal or sketch approximation
+        self.rank = rank                    # rank of the sketch approximation
+        self.lazy = lazy                    # defer the inverse or factor and beta until they are read
+        self.is_dirty = False               # A or Xty changed since the inverse or factor and beta were computed
 
         self.beta = None                    # (XtX + l2_lambda * I_d)^-1 * Xty = A^-1 * Xty
-        self.A = None                       # (XtX + l2_lambda * I_d)
-        self.A_inv = None                   # (XtX + l2_lambda * I_d)^-1
+        self.A = None                       # (XtX + l2_lambda * I_d), only the diagonal with diagonal covariance
+        self.A_inv = None                   # (XtX + l2_lambda * I_d)^-1, only with inverse solver
+        self.L = None                       # Lower Cholesky factor of A = L * Lt, only with cholesky solver
+        self.sketch = None                  # Sketch S with orthogonal rows, A ~ (l2_lambda + shrinkage) * I_d + St S
+        self.shrinkage = 0.0                # Total shrinkage of the sketch, St S <= XtX <= St S + shrinkage * I_d
         self.Xty = None
         self.scaler = None
 
+        self.mean = None                    # Mean of the scaler, zero before the scaler is fit
+        self.std = None                     # Standard deviation of the scaler, one before the scaler is fit
+        self.folded_beta = None             # beta / std, coefficients of raw contexts with the scaler folded in
+        self.folded_intercept = None        # -mean * beta / std, intercept of raw contexts with the scaler folded in
+        self.folded_factor = None           # Exploration factor of centered raw contexts, cached until A changes
+
     def init(self, num_features):
         # By default, assume that
         # A is the identity matrix and Xty is set to 0
-        self.Xty = np.zeros(num_features)
-        self.A = self.l2_lambda * np.identity(num_features)
-        self.A_inv = self.A.copy()
-        self.beta = np.dot(self.A_inv, self.Xty)
-        self.scaler = StandardScaler() if self.scale else None
+        self.Xty = np.zeros(num_features, dtype=self.dtype)
+        if self.covariance == "diagonal":
+            self.A = np.full(num_features, self.l2_lambda, dtype=self.dtype)
+        elif self.covariance == "sketch":
+            self.sketch = np.zeros((0, num_features), dtype=self.dtype)
+            self.shrinkage = 0.0
+        else:
+            self.A = self.l2_lambda * np.identity(num_features, dtype=self.dtype)
+            if self.solver == "cholesky":
+                self.L = np.sqrt(self.l2_lambda) * np.identity(num_features, dtype=self.dtype)
+            else:
+                self.A_inv = self.A.copy()
+        self.beta = np.zeros(num_features, dtype=self.dtype)
+        self.is_dirty = False
+        self.scaler = None
+        if self.scale:
+            from sklearn.preprocessing import StandardScaler
+            self.scaler = StandardScaler()
+        if self.scaler is not None:
+            self.mean = np.zeros(num_features)
+            self.std = np.ones(num_features)
+            self._fold_scaler()
 
     def fit(self, X, y):
 
+        # Convert to the floating point type of the model, without copying when already converted
+        X = X.astype(self.dtype, copy=False)
+        y = y.astype(self.dtype, copy=False)
+
         # Scale
         if self.scaler is not None:
             X = X.astype('float64')
@@ -66,23 +156,62 @@ class _RidgeRegression:
             else:
                 self.scaler.partial_fit(X)
             fix_small_variance(self.scaler)
-            X = self.scaler.transform(X)
+            self.mean, self.std = self.scaler.mean_, self.scaler.scale_
+            X = self.scaler.transform(X).astype(self.dtype, copy=False)
 
         # X transpose
         Xt = X.T
 
-        # Update A
-        self.A = self.A + np.dot(Xt, X)
-        self.A_inv = np.linalg.inv(self.A)
+        # Update the approximation of A, otherwise update A and its inverse or factor
+        if self.covariance == "diagonal":
+            self.A = self.A + (np.asarray(X.multiply(X).sum(axis=0)).ravel() if is_sparse(X)
+                               else np.einsum('ij,ij->j', X, X))
+        elif self.covariance == "sketch":
+            self._update_sketch(X.toarray() if is_sparse(X) else X)
+        else:
+            self._update_ridge(X)
 
         # Add new Xty values to old
-        self.Xty = self.Xty + np.dot(Xt, y)
+        self.Xty = self.Xty + (Xt @ y if is_sparse(X) else np.dot(Xt, y))
+
+        # Recalculate beta coefficients, in lazy mode only once they are read
+        self.is_dirty = True
+        if not self.lazy:
+            self.materialize()
+
+    def materialize(self) -> NoReturn:
+        """
+        Computes the inverse or factor of A and the beta coefficients after A and Xty have been updated.
+
+        In lazy mode, fit only updates A and Xty, and this is called before the model is read,
+        so that consecutive fits cost a single inversion or factorization.
+        """
+        if not self.is_dirty:
+            return
+
+        # The inverse or factor of A is computed from scratch when fit deferred it
+        if self.lazy and self.covariance == "full":
+            self._factorize()
 
         # Recalculate beta coefficients
-        self.beta = np.dot(self.A_inv, self.Xty)
+        if self.covariance != "full":
+            self.beta = self._solve_approximate(self.Xty)
+        elif self.solver == "cholesky":
+            from scipy.linalg import cho_solve
+            self.beta = cho_solve((_as_float64(self.L), True), _as_float64(self.Xty)).astype(self.dtype, copy=False)
+        else:
+            self.beta = np.dot(self.A_inv, self.Xty)
+
+        if self.scaler is not None:
+            self._fold_scaler()
+
+        self.is_dirty = False
 
     def predict(self, x):
 
+        # Compute the coefficients deferred by lazy fits
+        self.materialize()
+
         # Scale
         if self.scaler is not None:
             x = self._scale_predict_context(x)
@@ -90,64 +219,483 @@ class _RidgeRegression:
         # Calculate default expectation y = x * b
         return np.dot(x, self.beta)
 
-    def _scale_predict_context(self, x):
-        if not hasattr(self.scaler, 'scale_'):
-            return x
+    def _update_ridge(self, X) -> NoReturn:
+
+        # Update A, only the non-zeros of XtX are added for sparse X
+        if is_sparse(X):
+            self.A = self.A.copy()
+            _add_sparse(self.A, X.T @ X)
+        else:
+            self.A = self.A + np.dot(X.T, X)
+
+        # The inverse or factor is computed once the model is read in lazy mode
+        if self.lazy:
+            return
+
+        # Low-rank updates are used when the batch is smaller than the number of features
+        # The few rows of sparse X are converted to dense for the updates
+        is_low_rank = self.incremental and X.shape[0] < X.shape[1]
+        rows = X.toarray() if is_low_rank and is_sparse(X) else X
+
+        # Factors and inverses are computed in float64 for numerical stability and stored in the model type
+        if self.solver == "cholesky":
+
+            # Update L with rank-one updates, otherwise factorize A from scratch
+            if is_low_rank:
+                L = self.L
+                for x in rows:
+                    L = cholesky_update(L, x)
+                self.L = L.astype(self.dtype, copy=False)
+            else:
+                self._factorize()
 
-        # Reshape 1D array to 2D
-        x = x.reshape(1, -1)
+        else:
+
+            # Update A_inv with a low-rank update, otherwise or when the accumulated numerical drift
+            # is too large, recompute the inverse
+            if not (is_low_rank and self._update_inverse(rows)):
+                self._factorize()
+
+    def _factorize(self) -> NoReturn:
+
+        # Compute the factor or the inverse of A from scratch
+        if self.solver == "cholesky":
+            self.L = np.linalg.cholesky(_as_float64(self.A)).astype(self.dtype, copy=False)
+        else:
+            self.A_inv = np.linalg.inv(_as_float64(self.A)).astype(self.dtype, copy=False)
+
+    def _update_sketch(self, X) -> NoReturn:
+        """
+        Updates the frequent directions sketch S with the rows in X, so that St S approximates XtX with rank r.
+
+        Rows are appended to the sketch in chunks of r rows, and the sketch is shrunk back to r rows
+        by subtracting the (r+1)-th squared singular value from the squared singular values.
+        The total shrinkage is added to the regularization, i.e. A ~ (l2_lambda + shrinkage) * I_d + St S.
+        When the rank is at least the number of features, the sketch is exact.
+
+        Liberty, E. Simple and deterministic matrix sketching. KDD, 2013.
+        Kuzborskij, I., Cella, L. and Cesa-Bianchi, N. Efficient linear bandits through matrix sketching. AISTATS, 2019.
+        """
+
+        # Update in float64 and store the sketch in the model type
+        sketch, X = _as_float64(self.sketch), _as_float64(X)
+
+        for start in range(0, X.shape[0], self.rank):
+            _, singular_values, Vt = np.linalg.svd(np.vstack((sketch, X[start:start + self.rank])),
+                                                   full_matrices=False)
+            squares = np.square(singular_values)
+
+            # Shrink to rank r, and drop the directions that vanished
+            if squares.size > self.rank:
+                self.shrinkage += squares[self.rank]
+                squares, Vt = squares[:self.rank] - squares[self.rank], Vt[:self.rank]
+            is_kept = squares > 0
+            sketch = np.sqrt(squares[is_kept])[:, np.newaxis] * Vt[is_kept]
+
+        self.sketch = sketch.astype(self.dtype, copy=False)
+
+    def _get_sketch_weights(self):
+
+        # Returns the regularization l2_lambda + shrinkage and the squared norms of the orthogonal rows of the sketch
+        return self.l2_lambda + self.shrinkage, np.einsum('ij,ij->i', self.sketch, self.sketch)
+
+    def _solve_approximate(self, v):
+        """
+        Returns A^-1 v with the diagonal or the sketch approximation of A.
+
+        With the sketch S = D V, where V has orthonormal rows and D is diagonal,
+        the Woodbury identity gives A^-1 = (I_d - Vt D^2 (lambda I_r + D^2)^-1 V) / lambda.
+        """
+        if self.covariance == "diagonal":
+            return v / self.A
+
+        l2_lambda, squares = self._get_sketch_weights()
+        return (v - np.dot(np.dot(self.sketch, v) / (l2_lambda + squares), self.sketch)) / l2_lambda
+
+    def get_quadratic_forms(self, X):
+
+        # Returns x A^-1 xt for each row x of X with the diagonal or the sketch approximation of A, O(d) or O(d * r)
+        sparse_X = is_sparse(X)
+        squared_X = X.multiply(X) if sparse_X else np.square(X)
+        if self.covariance == "diagonal":
+            return np.asarray(squared_X @ (1.0 / self.A)).ravel()
+
+        l2_lambda, squares = self._get_sketch_weights()
+        projections = np.square(np.asarray(X @ self.sketch.T))
+        norms = np.asarray(squared_X.sum(axis=1)).ravel()
+        forms = (norms - np.dot(projections, 1.0 / (l2_lambda + squares))) / l2_lambda
+
+        # Rounding errors can make forms slightly negative when x is close to the sketch
+        return np.maximum(forms, 0)
+
+    def _update_inverse(self, X) -> bool:
+        """
+        Updates A_inv in place of a full inverse after A has been updated with the rows in X.
+
+        Uses the Sherman-Morrison formula for a single row and the Woodbury identity for k rows:
+        (A + Xt X)^-1 = A^-1 - A^-1 Xt (I_k + X A^-1 Xt)^-1 X A^-1
+
+        Returns False when the updated inverse drifted away from the exact inverse of A,
+        in which case the caller is expected to recompute the inverse from scratch.
+        """
+
+        # Update in float64, the tolerance of float32 models allows for the rounding of the stored inverse
+        A_inv, X = _as_float64(self.A_inv), _as_float64(X)
+        tolerance = INCREMENTAL_TOLERANCE if self.dtype == np.float64 else np.sqrt(np.finfo(self.dtype).eps)
+
+        if X.shape[0] == 1:
+            # Sherman-Morrison rank-1 update
+            x = X[0]
+            A_inv_x = np.dot(A_inv, x)
+            A_inv = A_inv - np.outer(A_inv_x, A_inv_x) / (1.0 + np.dot(x, A_inv_x))
+        else:
+            # Woodbury rank-k update
+            A_inv_Xt = np.dot(A_inv, X.T)
+            capacitance = np.identity(X.shape[0]) + np.dot(X, A_inv_Xt)
+            A_inv = A_inv - np.dot(A_inv_Xt, np.linalg.solve(capacitance, A_inv_Xt.T))
+
+        # Check the drift of the inverse using the relative residual of a probe vector, O(d^2)
+        # This also catches the initial A_inv which is only the exact inverse when l2_lambda is one
+        probe = np.ones(X.shape[1])
+        residual = np.linalg.norm(np.dot(_as_float64(self.A), np.dot(A_inv, probe)) - probe) / np.linalg.norm(probe)
+        if not residual <= tolerance:
+            return False
+
+        self.A_inv = A_inv.astype(self.dtype, copy=False)
+        return True
+
+    def _fold_scaler(self):
+        """
+        Folds the mean and the standard deviation of the scaler into the coefficients.
+
+        The expectation of the scaled context (x - mean) / std is x * (beta / std) - mean * (beta / std),
+        so that the expectations are computed on raw contexts without transforming them.
+        The folded exploration factor is recomputed on the next prediction.
+        """
+        self.folded_beta = (self.beta / self.std).astype(self.dtype, copy=False)
+        self.folded_intercept = -np.dot(self.mean, self.folded_beta).astype(self.dtype)
+        self.folded_factor = None
+
+    def get_folded_factor(self):
+        """Abstract method to be implemented by the regressions with an exploration factor."""
+        return None
+
+    def _scale_predict_contexts(self, X):
+
+        # Transform all contexts at once with the mean and the standard deviation of the scaler,
+        # in float64 similar to the scaler
+        return ((X.astype('float64') - self.mean) / self.std).astype(self.dtype, copy=False)
 
-        # Transform and return to previous shape. Convert to float64 to suppress any type warnings.
-        return self.scaler.transform(x.astype('float64')).reshape(-1)
+    def _scale_predict_context(self, x):
+        return self._scale_predict_contexts(x)
 
 
 class _LinTS(_RidgeRegression):
 
+    def __init__(self, rng: _BaseRNG, alpha: Num = 1.0, l2_lambda: Num = 1.0, scale: bool = False,
+                 incremental: bool = False, solver: str = "inverse", dtype: np.dtype = np.dtype(np.float64),
+                 covariance: str = "full", rank: int = 10, lazy: bool = False):
+        super().__init__(rng, alpha, l2_lambda, scale, incremental, solver, dtype, covariance, rank, lazy)
+
+        self.cholesky = None                # Cholesky factor of the covariance alpha^2 * A^-1, cached until A changes
+
+    def init(self, num_features):
+        super().init(num_features)
+        self.cholesky = None
+
+    def fit(self, X, y):
+        super().fit(X, y)
+
+        # Invalidate the cached factor, it is recomputed on the next prediction
+        self.cholesky = None
+
+    def get_folded_factor(self):
+
+        # The deviation of the scaled context (x - mean) D C z with D = diag(1 / std) uses the factor D C,
+        # and with the cholesky solver, D L^-t z = (diag(std) L)^-t z
+        self.materialize()
+        if self.folded_factor is None:
+            if self.solver == "cholesky":
+                self.folded_factor = (self.L * self.std[:, np.newaxis]).astype(self.dtype, copy=False)
+            else:
+                self.folded_factor = (self.get_cholesky() / self.std[:, np.newaxis]).astype(self.dtype, copy=False)
+
+        return self.folded_factor
+
     def predict(self, x):
 
+        # Compute the coefficients deferred by lazy fits
+        self.materialize()
+
         # Scale
         if self.scaler is not None:
             x = self._scale_predict_context(x)
 
         # Randomly sample coefficients from multivariate normal distribution
-        # Covariance is enhanced with the exploration factor
-        beta_sampled = self.rng.multivariate_normal(self.beta, np.square(self.alpha) * self.A_inv)
+        # Covariance is enhanced with the exploration factor, sample is beta + deviation
+        z = self.rng.standard_normal(self.beta.size).astype(self.dtype, copy=False)
+        beta_sampled = self.beta + self.get_deviations(z)
 
         # Calculate expectation y = x * beta_sampled
         return np.dot(x, beta_sampled)
 
+    def get_deviations(self, z):
+
+        # Map standard normal z to a deviation with covariance alpha^2 * A^-1
+        # With the inverse solver this is C z where C is the cached factor of the covariance,
+        # with the cholesky solver this is alpha * L^-t z since (L^-t)(L^-t)t = (L Lt)^-1 = A^-1
+        # With approximate covariances, z can also be a matrix with one standard normal sample per row
+        if self.covariance == "diagonal":
+            return self.alpha * z / np.sqrt(self.A)
+        elif self.covariance == "sketch":
+            return self._get_sketch_deviations(z)
+        elif self.solver == "cholesky":
+            from scipy.linalg import solve_triangular
+            return self.alpha * solve_triangular(self.L, z, trans='T', lower=True)
+        else:
+            return np.dot(self.get_cholesky(), z)
+
+    def _get_sketch_deviations(self, z):
+        """
+        Returns alpha * C z where C is the symmetric square root of the sketch approximation of A^-1.
+
+        With the sketch S = D V, C = (I_d - Vt W V) / sqrt(lambda) where W = I_r - (lambda I_r + D^2)^-1/2 lambda^1/2,
+        which takes O(d * r) operations per sample.
+        """
+        l2_lambda, squares = self._get_sketch_weights()
+
+        # W / D^2, written without dividing by the squared norms to stay stable for small rows of the sketch
+        roots = np.sqrt(l2_lambda / (l2_lambda + squares))
+        weights = 1.0 / ((l2_lambda + squares) * (1.0 + roots))
+
+        return self.alpha * (z - np.dot(np.dot(z, self.sketch.T) * weights, self.sketch)) / np.sqrt(l2_lambda)
+
+    def get_cholesky(self):
+
+        # Factorize the covariance only once after each fit
+        self.materialize()
+        if self.cholesky is None:
+            self.cholesky = np.linalg.cholesky(np.square(self.alpha) * _as_float64(self.A_inv)).astype(self.dtype,
+                                                                                                     copy=False)
+
+        return self.cholesky
+
 
 class _LinUCB(_RidgeRegression):
 
     def predict(self, x):
 
+        # Compute the coefficients deferred by lazy fits
+        self.materialize()
+
         # Scale
         if self.scaler is not None:
             x = self._scale_predict_context(x)
 
         # Upper confidence bound = alpha * sqrt(x A^-1 xt). Notice that, x = xt
-        ucb = (self.alpha * np.sqrt(np.dot(np.dot(x, self.A_inv), x)))
+        # With the cholesky solver x A^-1 xt = ||L^-1 xt||^2
+        if self.covariance != "full":
+            ucb = self.alpha * np.sqrt(self.get_quadratic_forms(x[np.newaxis])[0])
+        elif self.solver == "cholesky":
+            from scipy.linalg import solve_triangular
+            ucb = (self.alpha * np.sqrt(np.sum(np.square(solve_triangular(self.L, x, lower=True)))))
+        else:
+            ucb = (self.alpha * np.sqrt(np.dot(np.dot(x, self.A_inv), x)))
 
         # Calculate linucb expectation y = x * b + ucb
         return np.dot(x, self.beta) + ucb
 
+    def get_folded_factor(self):
+
+        # The quadratic form of the scaled context is (x - mean) D A^-1 D (x - mean)t with D = diag(1 / std),
+        # and with the cholesky solver, ||L^-1 D (x - mean)t||^2 = ||(diag(std) L)^-1 (x - mean)t||^2
+        self.materialize()
+        if self.folded_factor is None:
+            if self.solver == "cholesky":
+                self.folded_factor = (self.L * self.std[:, np.newaxis]).astype(self.dtype, copy=False)
+            else:
+                self.folded_factor = (self.A_inv / np.outer(self.std, self.std)).astype(self.dtype, copy=False)
+
+        return self.folded_factor
+
+
+class _ModelStore:
+    """
+    Contiguous storage for the regression models of all arms.
+
+    The arrays of the models, i.e. A, A_inv or L, Xty and beta, are stacked into
+    (capacity x n_features x n_features) and (capacity x n_features) arrays with one row per arm,
+    and each model holds views into its own row.
+    The capacity doubles when the arrays are full so that adding arms is amortized,
+    and the row of a removed arm is compacted by moving the last row into its place.
+    """
+
+    names = ("A", "A_inv", "L", "Xty", "beta")
+
+    def __init__(self, arm_to_model: Dict[Arm, _RidgeRegression]):
+        self.arm_to_model = arm_to_model                # Models of arms, shared with the owner
+        self.arm_to_index: Dict[Arm, int] = dict()      # Row of each arm in the stacked arrays
+        self.index_to_arm: List[Arm] = list()           # Arm of each row in use
+        self.arrays: Dict[str, np.ndarray] = dict()     # Stacked arrays of each model attribute
+
+    def init(self, arms: List[Arm]) -> NoReturn:
+
+        # Stack the arrays of initialized models, arrays not used by the solver are not stored
+        models = [self.arm_to_model[arm] for arm in arms]
+        self.arrays = dict((name, np.stack([getattr(model, name) for model in models]))
+                           for name in self.names if getattr(models[0], name) is not None)
+        self.index_to_arm = list(arms)
+        self.arm_to_index = dict((arm, index) for index, arm in enumerate(arms))
+
+        for arm in arms:
+            self._bind(arm)
+
+    def set(self, arm: Arm) -> NoReturn:
+        self.set_arms([arm])
+
+    def set_arms(self, arms: List[Arm]) -> NoReturn:
+
+        # Nothing to store before models are initialized
+        if not self.arrays:
+            return
+
+        # New arms are appended to the end, growing the arrays once when they are full
+        new_arms = [arm for arm in dict.fromkeys(arms) if arm not in self.arm_to_index]
+        if new_arms:
+            capacity = max(1, self.capacity)
+            while len(self.index_to_arm) + len(new_arms) > capacity:
+                capacity *= 2
+            if capacity > self.capacity:
+                self._resize(capacity)
+            self.arm_to_index.update(zip(new_arms, range(len(self.index_to_arm),
+                                                         len(self.index_to_arm) + len(new_arms))))
+            self.index_to_arm.extend(new_arms)
+
+        # Copy the arrays of the models into their rows
+        for arm in arms:
+            index = self.arm_to_index[arm]
+            model = self.arm_to_model[arm]
+            for name, array in self.arrays.items():
+                array[index] = getattr(model, name)
+            self._bind(arm)
+
+    def remove(self, arm: Arm) -> NoReturn:
+        self.remove_arms([arm])
+
+    def remove_arms(self, arms: List[Arm]) -> NoReturn:
+
+        indices = [self.arm_to_index.pop(arm) for arm in dict.fromkeys(arms) if arm in self.arm_to_index]
+        if not indices:
+            return
+
+        # Move the last rows into the rows of the removed arms
+        size = len(self.index_to_arm) - len(indices)
+        is_removed = np.zeros(len(self.index_to_arm), dtype=bool)
+        is_removed[indices] = True
+        holes = np.flatnonzero(is_removed[:size])
+        last = size + np.flatnonzero(~is_removed[size:])
+        for array in self.arrays.values():
+            array[holes] = array[last]
+        for index, last_index in zip(holes.tolist(), last.tolist()):
+            last_arm = self.index_to_arm[last_index]
+            self.arm_to_index[last_arm] = index
+            self.index_to_arm[index] = last_arm
+            self._bind(last_arm)
+        del self.index_to_arm[size:]
+
+        # Shrink the arrays when they are mostly empty
+        capacity = self.capacity
+        while capacity > 1 and len(self.index_to_arm) <= capacity // 4:
+            capacity //= 2
+        if capacity < self.capacity:
+            self._resize(capacity)
+
+    def get_indices(self, arms: List[Arm]) -> np.ndarray:
+        return np.array([self.arm_to_index[arm] for arm in arms], dtype=int)
+
+    def take(self, name: str, arms: List[Arm]) -> np.ndarray:
+
+        # Return a view without copying when arms are stored in the same order
+        indices = self.get_indices(arms)
+        if np.array_equal(indices, np.arange(len(arms))):
+            return self.arrays[name][:len(arms)]
+
+        return self.arrays[name][indices]
+
+    @property
+    def capacity(self) -> int:
+        return len(self.arrays["beta"]) if self.arrays else 0
+
+    def _resize(self, capacity: int) -> NoReturn:
+
+        # Copy the rows in use into new arrays with the given capacity
+        size = len(self.index_to_arm)
+        for name, array in self.arrays.items():
+            resized = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            resized[:size] = array[:size]
+            self.arrays[name] = resized
+
+        for arm in self.index_to_arm:
+            self._bind(arm)
+
+    def _bind(self, arm: Arm) -> NoReturn:
+
+        # Point the arrays of the model to its row
+        model = self.arm_to_model[arm]
+        index = self.arm_to_index[arm]
+        for name, array in self.arrays.items():
+            setattr(model, name, array[index])
+
+    def __setstate__(self, state):
+
+        # Views are copied as separate arrays when pickled or copied, bind them to the stacked arrays again
+        self.__dict__.update(state)
+        for arm in self.index_to_arm:
+            self._bind(arm)
+
 
 class _Linear(BaseMAB):
 
     factory = {"ts": _LinTS, "ucb": _LinUCB, "ridge": _RidgeRegression}
 
+    # Fits and predictions are computed with numpy, which releases the GIL, so threads run them in parallel
+    _releases_gil = True
+
+    # Models of arms are changed by fit and warm start together with the status of arms
+    _fit_attributes = BaseMAB._fit_attributes + ("num_features", "scaler", "arm_to_model", "model_store")
+
     def __init__(self, rng: _BaseRNG, arms: List[Arm], n_jobs: int, backend: Optional[str],
-                 alpha: Num, epsilon: Num, l2_lambda: Num, regression: str, scale: bool):
+                 alpha: Num, epsilon: Num, l2_lambda: Num, regression: str, scale: bool, incremental: bool = False,
+                 solver: str = "inverse", stacked: bool = False, dtype: np.dtype = np.dtype(np.float64),
+                 covariance: str = "full", rank: int = 10, shared_scaler: bool = False, lazy: bool = False):
         super().__init__(rng, arms, n_jobs, backend)
         self.alpha = alpha
         self.epsilon = epsilon
         self.l2_lambda = l2_lambda
         self.regression = regression
         self.scale = scale
+        self.incremental = incremental
+        self.solver = solver
+        self.stacked = stacked
+        self.dtype = np.dtype(dtype)
+        self.covariance = covariance
+        self.rank = rank
+        self.shared_scaler = shared_scaler
+        self.lazy = lazy
         self.num_features = None
 
+        # A single scaler shared by all arms scales the contexts before the models, otherwise each model scales
+        self.scaler = None
+        self.is_model_scaled = scale and not shared_scaler
+
         # Create regression model for each arm
-        self.arm_to_model = dict((arm, _Linear.factory.get(regression)(rng, alpha, l2_lambda, scale)) for arm in arms)
+        self.arm_to_model = dict((arm, _Linear.factory.get(regression)(rng, alpha, l2_lambda, self.is_model_scaled,
+                                                                       incremental, solver, self.dtype,
+                                                                       covariance, rank, lazy))
+                                 for arm in arms)
+
+        # Keep the arrays of all models in contiguous stacked arrays
+        self.model_store = _ModelStore(self.arm_to_model) if stacked else None
 
     def fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
 
@@ -155,16 +703,22 @@ class _Linear(BaseMAB):
         self.num_features = contexts.shape[1]
         for arm in self.arms:
             self.arm_to_model[arm].init(num_features=self.num_features)
+        if self.stacked:
+            self.model_store.init(self.arms)
+        self.scaler = None
+        if self.scale and self.shared_scaler:
+            from sklearn.preprocessing import StandardScaler
+            self.scaler = StandardScaler()
 
         # Reset warm started arms
         self.cold_arm_to_warm_arm = dict()
 
         # Perform parallel fit
-        self._parallel_fit(decisions, rewards, contexts)
+        self._parallel_fit(decisions, rewards, self._scale_contexts(contexts, is_fit=True))
 
     def partial_fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
         # Perform parallel fit
-        self._parallel_fit(decisions, rewards, contexts)
+        self._parallel_fit(decisions, rewards, self._scale_contexts(contexts, is_fit=True))
 
     def predict(self, contexts: np.ndarray = None) -> Union[Arm, List[Arm]]:
         # Return predict for the given context
@@ -174,74 +728,424 @@ class _Linear(BaseMAB):
         # Return predict expectations for the given context
         return self._parallel_predict(contexts, is_predict=False)
 
+    def predict_indices(self, contexts: np.ndarray = None) -> np.ndarray:
+        # Return the indices of the arms predicted for the given contexts
+        return self._parallel_predict(contexts, is_predict=True, as_array=True)
+
+    def predict_expectations_matrix(self, contexts: np.ndarray = None) -> np.ndarray:
+        # Return the matrix of expectations for the given contexts
+        return self._parallel_predict(contexts, is_predict=False, as_array=True)
+
     def _copy_arms(self, cold_arm_to_warm_arm):
+
+        # Cold arms copy the coefficients of warm arms, which are computed first in lazy mode
+        self._materialize()
         for cold_arm, warm_arm in cold_arm_to_warm_arm.items():
-            self.arm_to_model[cold_arm] = deepcopy(self.arm_to_model[warm_arm])
+            self.arm_to_model[cold_arm] = deepcopy(self.arm_to_model[warm_arm], {id(self.rng): self.rng})
+            if self.stacked:
+                self.model_store.set(cold_arm)
+
+    def _parallel_fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
+
+        if not self.stacked:
+            return super()._parallel_fit(decisions, rewards, contexts)
+
+        # Fit all arms at once on the stacked arrays, decisions are encoded once
+        codes = self._encode(decisions)
+        self._fit_stacked(decisions, codes, rewards, contexts)
+
+        # Update the status of arms observed in decisions
+        self._update_trained_arms(decisions, codes)
+        self._unpublish()
+
+    def _fit_stacked(self, decisions: np.ndarray, codes: np.ndarray, rewards: np.ndarray,
+                     contexts: np.ndarray) -> NoReturn:
+
+        arm_to_indices = self._get_arm_to_indices(decisions, codes)
+        if not arm_to_indices:
+            return
+
+        # Scaled or incremental models update their scalers and factors one arm at a time,
+        # the results are copied back into the stacked arrays
+        if self.is_model_scaled or self.incremental:
+            for arm, indices in arm_to_indices.items():
+                self.arm_to_model[arm].fit(contexts[indices], rewards[indices])
+                self.model_store.set(arm)
+            return
+
+        arms = list(arm_to_indices.keys())
+        rows = self.model_store.get_indices(arms)
+        arrays = self.model_store.arrays
+
+        # Convert to the floating point type of the models, without copying when already converted
+        contexts = contexts.astype(self.dtype, copy=False)
+        rewards = rewards.astype(self.dtype, copy=False)
+
+        # Scatter-add the XtX and Xty blocks of all arms into their rows
+        if is_sparse(contexts):
+            # Only the non-zeros of XtX are added for sparse contexts
+            for row, indices in zip(rows, arm_to_indices.values()):
+                X = contexts[indices]
+                _add_sparse(arrays["A"][row], X.T @ X)
+                arrays["Xty"][row] += X.T @ rewards[indices]
+        else:
+            arrays["A"][rows] += np.stack([np.dot(contexts[indices].T, contexts[indices])
+                                           for indices in arm_to_indices.values()])
+            arrays["Xty"][rows] += np.stack([np.dot(contexts[indices].T, rewards[indices])
+                                             for indices in arm_to_indices.values()])
+
+        # In lazy mode, the updated arms are solved at once when they are read
+        if self.lazy:
+            for arm in arms:
+                self.arm_to_model[arm].is_dirty = True
+        else:
+            self._solve_stacked(arms)
+
+    def _solve_stacked(self, arms: List[Arm]) -> NoReturn:
+
+        rows = self.model_store.get_indices(arms)
+        arrays = self.model_store.arrays
+
+        # Recalculate the inverses or factors and the beta coefficients of all updated arms
+        # Factors and inverses are computed in float64 for numerical stability and stored in the model type
+        if self.solver == "cholesky":
+            from scipy.linalg import cho_solve
+            arrays["L"][rows] = np.linalg.cholesky(_as_float64(arrays["A"][rows]))
+            for row in rows:
+                arrays["beta"][row] = cho_solve((_as_float64(arrays["L"][row]), True), _as_float64(arrays["Xty"][row]))
+        else:
+            arrays["A_inv"][rows] = np.linalg.inv(_as_float64(arrays["A"][rows]))
+            arrays["beta"][rows] = np.einsum('aij,aj->ai', arrays["A_inv"][rows], arrays["Xty"][rows])
+
+        # Invalidate the cached factors of the covariance
+        if self.regression == "ts":
+            for arm in arms:
+                self.arm_to_model[arm].cholesky = None
+
+        for arm in arms:
+            self.arm_to_model[arm].is_dirty = False
+
+    def _materialize(self) -> NoReturn:
+
+        # Compute the inverses or factors and the coefficients of the arms updated by lazy fits
+        dirty_arms = [arm for arm in self.arms if self.arm_to_model[arm].is_dirty]
+        if not dirty_arms:
+            return
+
+        # Stacked models that are not scaled are solved at once, other models one arm at a time,
+        # in which case the arrays of stacked models are copied back into their rows
+        if self.stacked and not self.is_model_scaled:
+            self._solve_stacked(dirty_arms)
+        else:
+            for arm in dirty_arms:
+                self.arm_to_model[arm].materialize()
+                if self.stacked:
+                    self.model_store.set(arm)
+
+    def _parallel_predict(self, contexts: np.ndarray, is_predict: bool, as_array: bool = False):
+
+        # Compute the coefficients deferred by lazy fits before the models are read
+        self._materialize()
+
+        # Factorize the covariance of sampled models once before sharing them with the jobs,
+        # so that the cached factors are reused across predictions in all backends
+        # The cholesky solver samples with the factor L of A which is always up to date,
+        # and approximate covariances are sampled without a factor
+        if self.regression == "ts" and self.solver == "inverse" and self.covariance == "full":
+            for arm in self.arms:
+                self.arm_to_model[arm].get_cholesky()
+
+        # Similarly, fold the scalers into the exploration factors once
+        if self.is_model_scaled and self.covariance == "full":
+            for arm in self.arms:
+                self.arm_to_model[arm].get_folded_factor()
+
+        return super()._parallel_predict(contexts, is_predict, as_array)
+
+    def _publish(self) -> '_Linear':
+
+        # Copy the models with the arrays used for predictions in shared memory
+        # A and Xty are only used to fit, except for the diagonal of A with the diagonal covariance
+        published = copy(self)
+        published.arm_to_model = dict((arm, copy(model)) for arm, model in self.arm_to_model.items())
+        for model in published.arm_to_model.values():
+            if self.covariance != "diagonal":
+                model.A = None
+            model.Xty = None
+
+        # Stacked models are views into the stacked arrays, which are shared instead of the arrays of each model
+        owners, names = [], []
+        if self.stacked:
+            published.model_store = copy(self.model_store)
+            published.model_store.arm_to_model = published.arm_to_model
+            published.model_store.arrays = dict((name, array) for name, array in self.model_store.arrays.items()
+                                                if name not in ("A", "Xty"))
+            owners += [published.model_store.arrays] * len(published.model_store.arrays)
+            names += list(published.model_store.arrays)
+        for model in published.arm_to_model.values():
+            for name in ("A", "A_inv", "L", "beta", "cholesky", "sketch", "folded_beta", "folded_factor",
+                         "mean", "std"):
+                if getattr(model, name, None) is not None and not (self.stacked and name in self.model_store.arrays):
+                    owners.append(model)
+                    names.append(name)
+
+        # Place the arrays into shared memory, and point the models to the shared arrays
+        get = lambda owner, name: owner[name] if isinstance(owner, dict) else getattr(owner, name)
+        published.shared_arrays = _SharedArrays([get(owner, name) for owner, name in zip(owners, names)])
+        for owner, name, array in zip(owners, names, published.shared_arrays.arrays):
+            if isinstance(owner, dict):
+                owner[name] = array
+            else:
+                setattr(owner, name, array)
+        if self.stacked:
+            for arm in published.model_store.index_to_arm:
+                published.model_store._bind(arm)
+
+        return published
+
+    def _scale_contexts(self, contexts: np.ndarray, is_fit: bool = False) -> np.ndarray:
+
+        # Contexts are scaled once for all arms with the shared scaler, updating it with the contexts to fit
+        if self.scaler is None:
+            return contexts
+
+        contexts = contexts.astype('float64')
+        if is_fit:
+            self.scaler.partial_fit(contexts)
+            fix_small_variance(self.scaler)
+        return self.scaler.transform(contexts).astype(self.dtype, copy=False)
 
     def _uptake_new_arm(self, arm: Arm, binarizer: Callable = None):
+        self._uptake_new_arms([arm], binarizer)
 
-        # Add to untrained_arms arms
-        self.arm_to_model[arm] = _Linear.factory.get(self.regression)(self.rng, self.alpha, self.l2_lambda, self.scale)
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
 
-        # If fit happened, initialize the new arm to defaults
+        # Add to untrained_arms arms
+        for arm in arms:
+            self.arm_to_model[arm] = _Linear.factory.get(self.regression)(self.rng, self.alpha, self.l2_lambda,
+                                                                          self.is_model_scaled, self.incremental,
+                                                                          self.solver,
+                                                                          self.dtype, self.covariance, self.rank,
+                                                                          self.lazy)
+
+        # If fit happened, initialize the new arms to defaults, stored in the stacked arrays at once
         is_fitted = self.num_features is not None
         if is_fitted:
-            self.arm_to_model[arm].init(num_features=self.num_features)
+            for arm in arms:
+                self.arm_to_model[arm].init(num_features=self.num_features)
+            if self.stacked:
+                self.model_store.set_arms(arms)
 
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
 
         # Get local copy of model to minimize communication overhead
-        # between arms (processes) using shared object
-        lr = deepcopy(self.arm_to_model[arm])
+        # between arms (processes) using shared object, which keeps sharing the random generator of the bandit
+        lr = deepcopy(self.arm_to_model[arm], {id(self.rng): self.rng})
 
         # Skip the arms with no data
-        indices = np.where(decisions == arm)
-        if indices[0].size == 0:
+        if decisions.size == 0:
             return lr
 
         # Fit the regression
-        X = contexts[indices]
-        y = rewards[indices]
-        lr.fit(X, y)
+        lr.fit(contexts, rewards)
 
         self.arm_to_model[arm] = lr
 
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
 
-        # Get local copy of model, arm_to_expectation and arms to minimize
-        # communication overhead between arms (processes) using shared objects
-        arm_to_model = deepcopy(self.arm_to_model)
-        arm_to_expectation = deepcopy(self.arm_to_expectation)
-        arms = deepcopy(self.arms)
+        # Return list of predictions
+        return self._get_predictions(self._predict_contexts_array(contexts, is_predict, seeds, start_index),
+                                     is_predict)
+
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
+
+        # Arms are only read, so they are used without a copy
+        arms = self.arms
+
+        # Calculate the expectations of all arms for all contexts at once, (n_contexts x n_arms)
+        expectations = self._get_expectations(contexts, arms, seeds)
+
+        # With epsilon probability set arm expectations to random values
+        # Each row needs a separately seeded stream for reproducibility in parallel
+        if self.epsilon > 0:
+            rng = _RowRNG()
+            for index in range(contexts.shape[0]):
+                rng.reseed(seeds[index])
+                if rng.rand() < self.epsilon:
+                    expectations[index] = rng.rand(len(arms))
+
+        # Return the indices of the best arms or the expectations
+        return np.argmax(expectations, axis=1) if is_predict else expectations
+
+    def _get_expectations(self, contexts: np.ndarray, arms: List[Arm], seeds: np.ndarray) -> np.ndarray:
+
+        models = [self.arm_to_model[arm] for arm in arms]
+
+        # Scale contexts with the shared scaler, and convert to the floating point type of the models,
+        # without copying when already converted
+        contexts = self._scale_contexts(contexts).astype(self.dtype, copy=False)
+
+        # Stack the coefficients of all arms into a single (n_arms x n_features) matrix
+        beta = self._get_stacked("beta", arms)
+
+        # Contexts are shared by all arms unless each arm has its own scaler
+        # Stacked contexts are (n_arms x n_contexts x n_features), or (1 x n_contexts x n_features) when shared
+        if self.is_model_scaled:
+
+            # Scalers are folded into the coefficients so that expectations are computed on raw contexts,
+            # x * (b / std) - mean * (b / std), without transforming the contexts for each arm
+            folded_beta = np.stack([model.folded_beta for model in models])
+            intercepts = np.array([model.folded_intercept for model in models], dtype=self.dtype)
+            expectations = np.dot(contexts, folded_beta.T) + intercepts
+
+            # Contexts are only centered for the folded exploration factors of arms, which ridge does not use
+            # Approximate covariances are not folded, so that centered contexts are also divided by the deviations
+            stacked_contexts = None
+            if self.regression != "ridge":
+                means = np.stack([model.mean for model in models])[:, np.newaxis]
+                stacked_contexts = contexts[np.newaxis, :, :] - means
+                if self.covariance != "full":
+                    stacked_contexts /= np.stack([model.std for model in models])[:, np.newaxis]
+                stacked_contexts = stacked_contexts.astype(self.dtype, copy=False)
+
+        elif is_sparse(contexts):
+            # Sparse contexts are shared by all arms as a single (n_contexts x n_features) matrix
+            stacked_contexts = contexts
+            expectations = np.asarray(contexts @ beta.T)
+        else:
+            stacked_contexts = contexts[np.newaxis, :, :]
+
+            # Calculate default expectations y = x * b with a single matrix multiplication
+            expectations = np.dot(contexts, beta.T)
+
+        if self.regression == "ucb":
+
+            # Upper confidence bound = alpha * sqrt(x A^-1 xt) using the stacked A_inv or L of arms,
+            # or the models themselves with approximate covariances
+            if self.covariance != "full":
+                factors = models
+            elif self.is_model_scaled:
+                factors = np.stack([model.get_folded_factor() for model in models])
+            else:
+                factors = self._get_stacked("L" if self.solver == "cholesky" else "A_inv", arms)
+            for start, end in self._get_blocks(contexts.shape[0], len(arms)):
+                X = self._get_block(stacked_contexts, start, end)
+                expectations[start:end] += self.alpha * np.sqrt(self._get_quadratic_forms(X, factors))
+
+        elif self.regression == "ts":
+
+            # Sampled coefficients b + C z, where C is the Cholesky factor of the covariance alpha^2 * A^-1
+            # The expectation x * (b + C z) is then x * b + (x C) z
+            if self.covariance != "full":
+                factors = models
+            elif self.is_model_scaled:
+                factors = np.stack([model.get_folded_factor() for model in models])
+            elif self.solver == "cholesky":
+                factors = self._get_stacked("L", arms)
+            else:
+                factors = np.stack([model.get_cholesky() for model in models])
+            rng = _RowRNG()
+            for start, end in self._get_blocks(contexts.shape[0], len(arms)):
 
-        # Create an empty list of predictions
-        predictions = [None] * len(contexts)
-        for index, row in enumerate(contexts):
-            # Each row needs a separately seeded rng for reproducibility in parallel
-            rng = create_rng(seed=seeds[index])
+                # Standard normal samples for all arms for each context from its own seeded stream
+                z = np.stack([rng.reseed(seed).standard_normal((len(arms), self.num_features))
+                              for seed in seeds[start:end]], axis=1).astype(self.dtype, copy=False)
+                X = self._get_block(stacked_contexts, start, end)
+                expectations[start:end] += self._get_sampled_deviations(X, factors, z)
 
-            # With epsilon probability set arm expectation to random value
-            if rng.rand() < self.epsilon:
-                for arm in arms:
-                    arm_to_expectation[arm] = rng.rand()
+        return expectations
 
-            else:
-                # Create new seeded generator for model to ensure reproducibility
-                model_rng = create_rng(seed=seeds[index])
-                for arm in arms:
-                    arm_to_model[arm].rng = model_rng
+    def _get_quadratic_forms(self, X: np.ndarray, factors: np.ndarray) -> np.ndarray:
 
-                    # Get the expectation of each arm from its trained model
-                    arm_to_expectation[arm] = arm_to_model[arm].predict(row)
+        # Returns x A^-1 xt of each arm for each context as (n_contexts x n_arms)
+        # Factors are the stacked L with the cholesky solver, otherwise the stacked A_inv
+        if self.covariance != "full":
 
-            if is_predict:
-                predictions[index] = argmax(arm_to_expectation)
-            else:
-                predictions[index] = arm_to_expectation.copy()
+            # Factors are the models with approximate covariances, sparse contexts are shared by all arms
+            return np.column_stack([model.get_quadratic_forms(X if is_sparse(X) else X[index % len(X)])
+                                    for index, model in enumerate(factors)])
 
-        # Return list of predictions
-        return predictions
+        elif self.solver == "cholesky":
+            from scipy.linalg import solve_triangular
+
+            # With the cholesky solver x A^-1 xt = ||L^-1 xt||^2, one triangular solve per arm
+            forms = np.empty((X.shape[1], len(factors)), dtype=self.dtype)
+            for index, L in enumerate(factors):
+                W = solve_triangular(L, X[index % len(X)].T, lower=True)
+                forms[:, index] = np.einsum('jn,jn->n', W, W)
+            return forms
+
+        # Sparse contexts are multiplied with each A_inv as sparse-dense products
+        if is_sparse(X):
+            return np.column_stack([np.asarray(X.multiply(X @ A_inv).sum(axis=1)).ravel() for A_inv in factors])
+
+        return np.einsum('anj,anj->na', np.matmul(X, factors), X)
+
+    def _get_sampled_deviations(self, X: np.ndarray, factors: np.ndarray, z: np.ndarray) -> np.ndarray:
+
+        # Returns x C z of each arm for each context as (n_contexts x n_arms)
+        # Factors are the stacked L with the cholesky solver, otherwise the stacked C
+        if self.covariance != "full":
+
+            # Factors are the models with approximate covariances, C z of each context is x * C z_n
+            deviations = np.empty((X.shape[-2], len(factors)), dtype=self.dtype)
+            for index, model in enumerate(factors):
+                X_arm = X if is_sparse(X) else X[index % len(X)]
+                deviations[:, index] = _get_row_dots(X_arm, model.get_deviations(z[index]))
+            return deviations
+
+        elif self.solver == "cholesky":
+            from scipy.linalg import solve_triangular
+
+            # With the cholesky solver C z = alpha * L^-t z so that x C z = alpha * (L^-1 xt) z
+            deviations = np.empty((X.shape[1], len(factors)), dtype=self.dtype)
+            for index, L in enumerate(factors):
+                W = solve_triangular(L, X[index % len(X)].T, lower=True)
+                deviations[:, index] = self.alpha * np.einsum('jn,nj->n', W, z[index])
+            return deviations
+
+        # Sparse contexts are multiplied with each C as sparse-dense products
+        if is_sparse(X):
+            return np.column_stack([np.einsum('nj,nj->n', X @ C, z[index]) for index, C in enumerate(factors)])
+
+        return np.einsum('anj,anj->na', np.matmul(X, factors), z)
+
+    def _get_block(self, stacked_contexts: Union[np.ndarray, 'sparse.spmatrix'], start: int, end: int) -> np.ndarray:
+
+        # Rows of sparse contexts are converted to dense only for the triangular solves of the cholesky solver
+        if is_sparse(stacked_contexts):
+            block = stacked_contexts[start:end]
+            return block.toarray()[np.newaxis] if self.solver == "cholesky" else block
+
+        return stacked_contexts[:, start:end]
+
+    def _get_stacked(self, name: str, arms: List[Arm]) -> np.ndarray:
+
+        # Arrays are already stacked in the store, otherwise stack the arrays of the models
+        if self.stacked:
+            return self.model_store.take(name, arms)
+
+        return np.stack([getattr(self.arm_to_model[arm], name) for arm in arms])
+
+    def _get_blocks(self, n_contexts: int, n_arms: int):
+
+        # Split contexts into blocks to limit the size of the (n_arms x block_size x n_features) intermediates
+        block_size = max(1, PREDICT_BLOCK_SIZE // (n_arms * self.num_features))
+        return [(start, min(start + block_size, n_contexts)) for start in range(0, n_contexts, block_size)]
+
+    def __getstate__(self):
+
+        # Pickled and copied bandits hold the coefficients deferred by lazy fits
+        self._materialize()
+        return super().__getstate__()
 
     def _drop_existing_arm(self, arm: Arm) -> NoReturn:
-        self.arm_to_model.pop(arm)
+        self._drop_existing_arms([arm])
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        if self.stacked:
+            self.model_store.remove_arms(arms)
+        for arm in arms:
+            self.arm_to_model.pop(arm)
@@ -8,14 +8,13 @@ This module defines the public interface of the **MABWiser Library** providing a
     - ``MAB``
     - ``LearningPolicy``
     - ``NeighborhoodPolicy``
+    - ``DecisionBatch``
 """
 
-from typing import List, Union, Dict, NamedTuple, NoReturn, Callable, Optional
+import os
+from typing import TYPE_CHECKING, List, Union, Dict, NamedTuple, NoReturn, Callable, Optional, Tuple
 
 import numpy as np
-import pandas as pd
-from sklearn.cluster import MiniBatchKMeans
-from sklearn.tree import DecisionTreeRegressor
 
 from mabwiser._version import __author__, __email__, __version__, __copyright__
 from mabwiser.approximate import _LSHNearest
@@ -29,7 +28,11 @@ from mabwiser.softmax import _Softmax
 from mabwiser.thompson import _ThompsonSampling
 from mabwiser.treebandit import _TreeBandit
 from mabwiser.ucb import _UCB1
-from mabwiser.utils import Constants, Arm, Num, check_true, check_false, create_rng
+from mabwiser.utils import Constants, Arm, Num, check_true, check_false, create_rng, is_pandas, is_sparse, _ModelFile
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from scipy import sparse
 
 __author__ = __author__
 __email__ = __email__
@@ -90,6 +93,37 @@ class LearningPolicy(NamedTuple):
             Whether to scale features to have zero mean and unit variance.
             Uses StandardScaler in sklearn.preprocessing.
             Default value is False.
+        incremental: bool
+            Whether to update the inverse of the ridge matrix with Sherman-Morrison (single row)
+            or Woodbury (multiple rows) low-rank updates when the batch has fewer rows than features,
+            instead of recomputing the inverse on each fit.
+            The inverse is recomputed when the batch is large or the accumulated numerical drift exceeds a tolerance.
+            With the cholesky solver, the Cholesky factor is updated with rank-one updates instead.
+            Default value is False.
+        solver: str
+            The method to solve the ridge regression.
+            Either "inverse" to keep the explicit inverse of the ridge matrix,
+            or "cholesky" to keep its Cholesky factor and use triangular solves instead,
+            which is numerically more stable for ill-conditioned contexts.
+            The cholesky solver requires l2_lambda to be positive.
+            Default value is "inverse".
+        stacked: bool
+            Whether to store the models of all arms in contiguous stacked arrays with one row per arm,
+            instead of separate arrays for each arm.
+            Fit updates the rows of all arms at once and predict operates on the stacked arrays,
+            which reduces the overhead with many arms.
+            Default value is False.
+        shared_scaler: bool
+            Whether to use a single scaler for the contexts of all arms when scale is True,
+            instead of a scaler for each arm, so that contexts are scaled once for all arms.
+            Default value is False.
+        lazy: bool
+            Whether to defer computing the inverse or factor of the ridge matrix and the coefficients
+            until they are read, i.e. on the next prediction, warm start or pickling.
+            Fit only accumulates the ridge matrix and marks the arm as outdated, so that consecutive fits
+            cost a single inversion for each updated arm before the next prediction.
+            Cannot be combined with incremental updates.
+            Default value is False.
 
         Example
         -------
@@ -106,6 +140,11 @@ class LearningPolicy(NamedTuple):
         epsilon: Num = 0.1
         l2_lambda: Num = 1.0
         scale: bool = False
+        incremental: bool = False
+        solver: str = "inverse"
+        stacked: bool = False
+        shared_scaler: bool = False
+        lazy: bool = False
 
         def _validate(self):
             check_true(isinstance(self.epsilon, (int, float)), TypeError("Epsilon must be an integer or float."))
@@ -113,6 +152,18 @@ class LearningPolicy(NamedTuple):
             check_true(isinstance(self.l2_lambda, (int, float)), TypeError("L2_lambda must be an integer or float."))
             check_true(0 <= self.l2_lambda, ValueError("The value of l2_lambda cannot be negative."))
             check_true(isinstance(self.scale, bool), TypeError("Standardize must be True or False."))
+            check_true(isinstance(self.incremental, bool), TypeError("Incremental must be True or False."))
+            check_true(isinstance(self.solver, str), TypeError("Solver must be a string."))
+            check_true(self.solver in ("inverse", "cholesky"), ValueError("Solver must be inverse or cholesky."))
+            check_true(self.solver == "inverse" or 0 < self.l2_lambda,
+                       ValueError("The value of l2_lambda must be positive for the cholesky solver."))
+            check_true(isinstance(self.stacked, bool), TypeError("Stacked must be True or False."))
+            check_true(isinstance(self.shared_scaler, bool), TypeError("Shared scaler must be True or False."))
+            check_true(self.scale or not self.shared_scaler,
+                       ValueError("Shared scaler requires scale to be True."))
+            check_true(isinstance(self.lazy, bool), TypeError("Lazy must be True or False."))
+            check_true(not (self.lazy and self.incremental),
+                       ValueError("Lazy cannot be combined with incremental updates."))
 
     class LinTS(NamedTuple):
         """ LinTS Learning Policy
@@ -149,6 +200,50 @@ class LearningPolicy(NamedTuple):
             Whether to scale features to have zero mean and unit variance.
             Uses StandardScaler in sklearn.preprocessing.
             Default value is False.
+        incremental: bool
+            Whether to update the inverse of the ridge matrix with Sherman-Morrison (single row)
+            or Woodbury (multiple rows) low-rank updates when the batch has fewer rows than features,
+            instead of recomputing the inverse on each fit.
+            The inverse is recomputed when the batch is large or the accumulated numerical drift exceeds a tolerance.
+            With the cholesky solver, the Cholesky factor is updated with rank-one updates instead.
+            Default value is False.
+        solver: str
+            The method to solve the ridge regression.
+            Either "inverse" to keep the explicit inverse of the ridge matrix,
+            or "cholesky" to keep its Cholesky factor and use triangular solves instead,
+            which is numerically more stable for ill-conditioned contexts.
+            The cholesky solver requires l2_lambda to be positive.
+            Default value is "inverse".
+        stacked: bool
+            Whether to store the models of all arms in contiguous stacked arrays with one row per arm,
+            instead of separate arrays for each arm.
+            Fit updates the rows of all arms at once and predict operates on the stacked arrays,
+            which reduces the overhead with many arms.
+            Default value is False.
+        covariance: str
+            The representation of the ridge matrix used for the posterior sampling and the coefficients.
+            Either "full" to keep the exact d x d matrix,
+            "diagonal" to approximate it with its diagonal, which keeps O(d) state per arm,
+            or "sketch" to approximate it with a rank-r frequent directions sketch of the contexts,
+            which keeps O(d * r) state per arm.
+            The approximations are always updated incrementally, and require the inverse solver,
+            a positive l2_lambda and are not stacked.
+            Default value is "full".
+        rank: int
+            The rank r of the sketch when covariance is "sketch".
+            Integer. Must be greater than zero.
+            Default value is 10.
+        shared_scaler: bool
+            Whether to use a single scaler for the contexts of all arms when scale is True,
+            instead of a scaler for each arm, so that contexts are scaled once for all arms.
+            Default value is False.
+        lazy: bool
+            Whether to defer computing the inverse or factor of the ridge matrix and the coefficients
+            until they are read, i.e. on the next prediction, warm start or pickling.
+            Fit only accumulates the ridge matrix and marks the arm as outdated, so that consecutive fits
+            cost a single inversion for each updated arm before the next prediction.
+            Cannot be combined with incremental updates.
+            Default value is False.
 
         Example
         -------
@@ -165,6 +260,13 @@ class LearningPolicy(NamedTuple):
         alpha: Num = 1.0
         l2_lambda: Num = 1.0
         scale: bool = False
+        incremental: bool = False
+        solver: str = "inverse"
+        stacked: bool = False
+        covariance: str = "full"
+        rank: int = 10
+        shared_scaler: bool = False
+        lazy: bool = False
 
         def _validate(self):
             check_true(isinstance(self.alpha, (int, float)), TypeError("Alpha must be an integer or float."))
@@ -172,6 +274,27 @@ class LearningPolicy(NamedTuple):
             check_true(isinstance(self.l2_lambda, (int, float)), TypeError("L2_lambda must be an integer or float."))
             check_true(0 < self.l2_lambda, ValueError("The value of l2_lambda must be greater than zero."))
             check_true(isinstance(self.scale, bool), TypeError("Scale must be True or False."))
+            check_true(isinstance(self.incremental, bool), TypeError("Incremental must be True or False."))
+            check_true(isinstance(self.solver, str), TypeError("Solver must be a string."))
+            check_true(self.solver in ("inverse", "cholesky"), ValueError("Solver must be inverse or cholesky."))
+            check_true(self.solver == "inverse" or 0 < self.l2_lambda,
+                       ValueError("The value of l2_lambda must be positive for the cholesky solver."))
+            check_true(isinstance(self.stacked, bool), TypeError("Stacked must be True or False."))
+            check_true(isinstance(self.shared_scaler, bool), TypeError("Shared scaler must be True or False."))
+            check_true(self.scale or not self.shared_scaler,
+                       ValueError("Shared scaler requires scale to be True."))
+            check_true(isinstance(self.lazy, bool), TypeError("Lazy must be True or False."))
+            check_true(not (self.lazy and self.incremental),
+                       ValueError("Lazy cannot be combined with incremental updates."))
+            check_true(isinstance(self.covariance, str), TypeError("Covariance must be a string."))
+            check_true(self.covariance in ("full", "diagonal", "sketch"),
+                       ValueError("Covariance must be full, diagonal or sketch."))
+            check_true(isinstance(self.rank, int), TypeError("Rank must be an integer."))
+            check_true(0 < self.rank, ValueError("The value of rank must be greater than zero."))
+            check_true(self.covariance == "full" or (self.solver == "inverse" and 0 < self.l2_lambda
+                                                     and not self.stacked),
+                       ValueError("Approximate covariances require the inverse solver, "
+                                  "a positive l2_lambda and cannot be stacked."))
 
     class LinUCB(NamedTuple):
         """LinUCB Learning Policy.
@@ -206,6 +329,50 @@ class LearningPolicy(NamedTuple):
             Whether to scale features to have zero mean and unit variance.
             Uses StandardScaler in sklearn.preprocessing.
             Default value is False.
+        incremental: bool
+            Whether to update the inverse of the ridge matrix with Sherman-Morrison (single row)
+            or Woodbury (multiple rows) low-rank updates when the batch has fewer rows than features,
+            instead of recomputing the inverse on each fit.
+            The inverse is recomputed when the batch is large or the accumulated numerical drift exceeds a tolerance.
+            With the cholesky solver, the Cholesky factor is updated with rank-one updates instead.
+            Default value is False.
+        solver: str
+            The method to solve the ridge regression.
+            Either "inverse" to keep the explicit inverse of the ridge matrix,
+            or "cholesky" to keep its Cholesky factor and use triangular solves instead,
+            which is numerically more stable for ill-conditioned contexts.
+            The cholesky solver requires l2_lambda to be positive.
+            Default value is "inverse".
+        stacked: bool
+            Whether to store the models of all arms in contiguous stacked arrays with one row per arm,
+            instead of separate arrays for each arm.
+            Fit updates the rows of all arms at once and predict operates on the stacked arrays,
+            which reduces the overhead with many arms.
+            Default value is False.
+        covariance: str
+            The representation of the ridge matrix used for the upper confidence bounds and the coefficients.
+            Either "full" to keep the exact d x d matrix,
+            "diagonal" to approximate it with its diagonal, which keeps O(d) state per arm,
+            or "sketch" to approximate it with a rank-r frequent directions sketch of the contexts,
+            which keeps O(d * r) state per arm.
+            The approximations are always updated incrementally, and require the inverse solver,
+            a positive l2_lambda and are not stacked.
+            Default value is "full".
+        rank: int
+            The rank r of the sketch when covariance is "sketch".
+            Integer. Must be greater than zero.
+            Default value is 10.
+        shared_scaler: bool
+            Whether to use a single scaler for the contexts of all arms when scale is True,
+            instead of a scaler for each arm, so that contexts are scaled once for all arms.
+            Default value is False.
+        lazy: bool
+            Whether to defer computing the inverse or factor of the ridge matrix and the coefficients
+            until they are read, i.e. on the next prediction, warm start or pickling.
+            Fit only accumulates the ridge matrix and marks the arm as outdated, so that consecutive fits
+            cost a single inversion for each updated arm before the next prediction.
+            Cannot be combined with incremental updates.
+            Default value is False.
 
         Example
         -------
@@ -222,6 +389,13 @@ class LearningPolicy(NamedTuple):
         alpha: Num = 1.0
         l2_lambda: Num = 1.0
         scale: bool = False
+        incremental: bool = False
+        solver: str = "inverse"
+        stacked: bool = False
+        covariance: str = "full"
+        rank: int = 10
+        shared_scaler: bool = False
+        lazy: bool = False
 
         def _validate(self):
             check_true(isinstance(self.alpha, (int, float)), TypeError("Alpha must be an integer or float."))
@@ -229,6 +403,27 @@ class LearningPolicy(NamedTuple):
             check_true(isinstance(self.l2_lambda, (int, float)), TypeError("L2_lambda must be an integer or float."))
             check_true(0 <= self.l2_lambda, ValueError("The value of l2_lambda cannot be negative."))
             check_true(isinstance(self.scale, bool), TypeError("Scale must be True or False."))
+            check_true(isinstance(self.incremental, bool), TypeError("Incremental must be True or False."))
+            check_true(isinstance(self.solver, str), TypeError("Solver must be a string."))
+            check_true(self.solver in ("inverse", "cholesky"), ValueError("Solver must be inverse or cholesky."))
+            check_true(self.solver == "inverse" or 0 < self.l2_lambda,
+                       ValueError("The value of l2_lambda must be positive for the cholesky solver."))
+            check_true(isinstance(self.stacked, bool), TypeError("Stacked must be True or False."))
+            check_true(isinstance(self.shared_scaler, bool), TypeError("Shared scaler must be True or False."))
+            check_true(self.scale or not self.shared_scaler,
+                       ValueError("Shared scaler requires scale to be True."))
+            check_true(isinstance(self.lazy, bool), TypeError("Lazy must be True or False."))
+            check_true(not (self.lazy and self.incremental),
+                       ValueError("Lazy cannot be combined with incremental updates."))
+            check_true(isinstance(self.covariance, str), TypeError("Covariance must be a string."))
+            check_true(self.covariance in ("full", "diagonal", "sketch"),
+                       ValueError("Covariance must be full, diagonal or sketch."))
+            check_true(isinstance(self.rank, int), TypeError("Rank must be an integer."))
+            check_true(0 < self.rank, ValueError("The value of rank must be greater than zero."))
+            check_true(self.covariance == "full" or (self.solver == "inverse" and 0 < self.l2_lambda
+                                                     and not self.stacked),
+                       ValueError("Approximate covariances require the inverse solver, "
+                                  "a positive l2_lambda and cannot be stacked."))
 
     class Popularity(NamedTuple):
         """Randomized Popularity Learning Policy.
@@ -655,6 +850,7 @@ class NeighborhoodPolicy(NamedTuple):
 
         def _validate(self):
             check_true(isinstance(self.tree_parameters, dict), TypeError("tree_parameters must be a dictionary."))
+            from sklearn.tree import DecisionTreeRegressor
             tree = DecisionTreeRegressor()
             for key in self.tree_parameters.keys():
                 check_true(key in tree.__dict__.keys(),
@@ -667,6 +863,142 @@ class NeighborhoodPolicy(NamedTuple):
                                                 LearningPolicy.ThompsonSampling))
 
 
+class DecisionBatch:
+    """Decisions, rewards and contexts that are validated, converted and encoded once.
+
+    Each call of ``fit``, ``partial_fit`` and ``predict`` validates and converts its arguments.
+    When the same data is given to several bandits or to the same bandit many times,
+    as in simulations and replays, a decision batch can be given instead,
+    so that the bandits only check that the data suits their policies.
+
+    Decisions and rewards are converted to contiguous numpy arrays and rewards are checked to be finite.
+    Contexts are converted to contiguous numpy arrays, or to compressed sparse row format for sparse matrices.
+    Decisions are encoded as the indices of their arms in the sorted list of distinct arms,
+    which group the decisions by arm without comparing the arms.
+    Context-free bandits ignore the contexts of a batch when fitting, so that a batch can be given to all bandits.
+
+    Attributes
+    ----------
+    decisions : Union[None, np.ndarray]
+        The decisions that are made.
+    rewards : Union[None, np.ndarray]
+        The rewards that are received corresponding to the decisions.
+    contexts : Union[None, np.ndarray, sparse.csr_matrix]
+        The contexts under which the decisions are made, or the contexts to predict.
+    arms : List[Arm]
+        The sorted list of the distinct arms of the decisions.
+    codes : np.ndarray
+        The index of the arm in ``arms`` of each decision.
+    arm_to_indices : Dict[Arm, np.ndarray]
+        The indices of the decisions of each arm in increasing order.
+
+    Examples
+    --------
+        >>> from mabwiser.mab import MAB, LearningPolicy, DecisionBatch
+        >>> batch = DecisionBatch(['Arm1', 'Arm1', 'Arm2', 'Arm1'], [20, 17, 25, 9])
+        >>> mab1 = MAB(['Arm1', 'Arm2'], LearningPolicy.EpsilonGreedy(epsilon=0.25), seed=123456)
+        >>> mab2 = MAB(['Arm1', 'Arm2'], LearningPolicy.UCB1(alpha=1.25), seed=123456)
+        >>> mab1.fit(batch)
+        >>> mab2.fit(batch)
+        >>> mab1.predict(), mab2.predict()
+        ('Arm2', 'Arm2')
+    """
+
+    def __init__(self,
+                 decisions: Union[None, List[Arm], np.ndarray, 'pd.Series'] = None,  # Decisions that are made
+                 rewards: Union[None, List[Num], np.ndarray, 'pd.Series'] = None,  # Rewards that are received
+                 contexts: Union[None, List[List[Num]], np.ndarray, 'pd.Series', 'pd.DataFrame',
+                                 'sparse.spmatrix'] = None):  # Contexts, optional
+        """Validates, converts and encodes the given data.
+
+        Parameters
+        ----------
+        decisions : Union[None, List[Arm], np.ndarray, pd.Series]
+            The decisions that are made. Default value is ``None``, i.e., contexts to predict only.
+        rewards : Union[None, List[Num], np.ndarray, pd.Series]
+            The rewards that are received corresponding to the decisions.
+            Must be given if and only if decisions are given. Default value is ``None``.
+        contexts : Union[None, List[List[Num]], np.ndarray, pd.Series, pd.DataFrame, sparse.spmatrix]
+            The context under which each decision is made, or the contexts to predict without decisions.
+            A pandas series is a single context without decisions. Default value is ``None``, i.e., no contexts.
+
+        Raises
+        ------
+        TypeError:  Decisions and rewards are not given as list, numpy array or pandas series.
+        TypeError:  Contexts is not given as ``None``, list, numpy array, pandas series or data frames.
+        TypeError:  Rewards contain ``None``, ``Nan``, or ``Infinity``.
+
+        ValueError: Decisions are given without rewards or rewards without decisions.
+        ValueError: Length mismatch between decisions, rewards, and contexts.
+        """
+
+        # Validate arguments
+        check_true((decisions is None) == (rewards is None),
+                   ValueError("Decisions and rewards should be given together."))
+        if decisions is not None:
+            check_true(isinstance(decisions, (list, np.ndarray)) or is_pandas(decisions, "Series"),
+                       TypeError("The decisions should be given as list, numpy array, or pandas series."))
+            check_true(isinstance(rewards, (list, np.ndarray)) or is_pandas(rewards, "Series"),
+                       TypeError("The rewards should be given as list, numpy array, or pandas series."))
+            check_true(len(decisions) == len(rewards), ValueError("Decisions and rewards should be same length."))
+        if contexts is not None:
+            MAB._validate_context_type(contexts)
+
+        # Convert to contiguous numpy arrays, sparse contexts are kept sparse in compressed sparse row format
+        # A pandas series is a single context unless it has the single feature of many decisions
+        self.decisions, self.rewards = None, None
+        if decisions is not None:
+            self.decisions = np.ascontiguousarray(MAB._convert_array(decisions))
+            self.rewards = np.ascontiguousarray(MAB._convert_array(rewards))
+            MAB._validate_rewards(self.rewards)
+        if is_sparse(contexts):
+            self.contexts = contexts.tocsr()
+        else:
+            self.contexts = MAB._convert_matrix(contexts, row=decisions is None or len(decisions) == 1)
+
+        # Validate the number of contexts
+        if self.decisions is not None and self.contexts is not None:
+            check_true(len(self.decisions) == self.contexts.shape[0],
+                       ValueError("Decisions and contexts should be same length: len(decision) = " +
+                                  str(len(self.decisions)) + " vs. len(contexts) = " + str(self.contexts.shape[0])))
+
+        # Encode decisions as the indices of their arms, and group them by arm with a single stable sort
+        self.arms, self.codes, self.arm_to_indices = [], np.array([], dtype=np.intp), dict()
+        if self.decisions is not None and len(self.decisions) > 0:
+            arms, codes = np.unique(self.decisions, return_inverse=True)
+            self.arms, self.codes = arms.tolist(), codes.reshape(-1)
+            order = np.argsort(self.codes, kind='stable')
+            self.arm_to_indices = dict(zip(self.arms, np.split(order, np.cumsum(np.bincount(self.codes))[:-1])))
+
+        # Checks and conversions of the bandits, computed on first use
+        self._is_binary = None
+        self._dtype_to_contexts = dict()
+
+    @property
+    def is_binary(self) -> bool:
+        """
+        Returns whether the rewards are binary.
+        """
+        if self._is_binary is None:
+            self._is_binary = self.rewards is None or not np.setdiff1d(self.rewards, [0, 0.0, 1, 1.0]).size
+        return self._is_binary
+
+    def get_contexts(self, dtype: np.dtype) -> Union[None, np.ndarray, 'sparse.csr_matrix']:
+        """
+        Returns the contexts converted to the given floating point type, without copying when already of the type.
+        """
+        if self.contexts is None:
+            return None
+        if dtype not in self._dtype_to_contexts:
+            self._dtype_to_contexts[dtype] = self.contexts.astype(dtype, copy=False)
+        return self._dtype_to_contexts[dtype]
+
+    def __len__(self):
+        if self.decisions is not None:
+            return len(self.decisions)
+        return 0 if self.contexts is None else self.contexts.shape[0]
+
+
 class MAB:
     """**MABWiser: Contextual Multi-Armed Bandit Library**
 
@@ -685,11 +1017,12 @@ class MAB:
         True if contextual policy is given, false otherwise. This is a read-only data field.
     seed : numbers.Rational
         The random seed to initialize the internal random number generator. This is a read-only data field.
-    n_jobs: int
+    n_jobs: Union[int, str]
         This is used to specify how many concurrent processes/threads should be used for parallelized routines.
         Default value is set to 1.
         If set to -1, all CPUs are used.
         If set to -2, all CPUs but one are used, and so on.
+        If set to 'auto', the number of jobs and the backend are chosen for each call from the measured cost.
     backend: str, optional
         Specify a parallelization backend implementation supported in the joblib library. Supported options are:
         - “loky” used by default, can induce some communication and memory overhead when exchanging input and
@@ -747,8 +1080,9 @@ class MAB:
                                             NeighborhoodPolicy.Radius,
                                             NeighborhoodPolicy.TreeBandit] = None,  # The context policy, optional
                  seed: int = Constants.default_seed,  # The random seed
-                 n_jobs: int = 1,  # Number of parallel jobs
-                 backend: str = None  # Parallel backend implementation
+                 n_jobs: Union[int, str] = 1,  # Number of parallel jobs
+                 backend: str = None,  # Parallel backend implementation
+                 dtype: Union[str, type, np.dtype] = np.float64  # Floating point type of contexts and models
                  ):
         """Initializes a multi-armed bandit (MAB) with the given arguments.
 
@@ -766,11 +1100,17 @@ class MAB:
         seed : numbers.Rational, optional
             The random seed to initialize the random number generator.
             Default value is set to Constants.default_seed.value
-        n_jobs: int, optional
+        n_jobs: Union[int, str], optional
             This is used to specify how many concurrent processes/threads should be used for parallelized routines.
             Default value is set to 1.
             If set to -1, all CPUs are used.
             If set to -2, all CPUs but one are used, and so on.
+            CPUs are counted within the CPU quota of the container, if any.
+            If set to 'auto', each call measures or estimates the cost of its work, and runs serially,
+            with threads or with processes of the given backend, with as many jobs as the work outweighs
+            the overhead of starting them. The first fit and the first contexts of the first prediction
+            run serially to measure the cost, and threads are only used by LinGreedy, LinTS and LinUCB,
+            which release the Global Interpreter Lock. This avoids fanning out small batches to all CPUs.
         backend: str, optional
             Specify a parallelization backend implementation supported in the joblib library. Supported options are:
             - “loky” used by default, can induce some communication and memory overhead when exchanging input and
@@ -779,6 +1119,12 @@ class MAB:
             - “threading” is a very low-overhead backend but it suffers from the Python Global Interpreter Lock if the
               called function relies a lot on Python objects.
             Default value is None. In this case the default backend selected by joblib will be used.
+        dtype: Union[str, type, np.dtype], optional
+            The floating point type of the contexts, the stored context history and the models of linear policies.
+            Supported options are float32 and float64.
+            With float32, model state, stored contexts and distances take half of the memory,
+            while inverses and factorizations are still computed in float64 for numerical stability.
+            Default value is float64.
 
         Raises
         ------
@@ -788,6 +1134,7 @@ class MAB:
         TypeError:  Seed is not an integer.
         TypeError:  Number of parallel jobs is not an integer.
         TypeError:  Parallel backend is not a string.
+        TypeError:  Dtype is not a data type.
         TypeError:  For EpsilonGreedy, epsilon must be integer or float.
         TypeError:  For LinGreedy, epsilon must be an integer or float.
         TypeError:  For LinGreedy, l2_lambda must be an integer or float.
@@ -811,6 +1158,7 @@ class MAB:
         ValueError: Invalid values (None, NaN, Inf) in arms.
         ValueError: Duplicate values in arms.
         ValueError: Number of parallel jobs is 0.
+        ValueError: Dtype is not float32 or float64.
         ValueError: For EpsilonGreedy, epsilon must be between 0 and 1.
         ValueError: For LinGreedy, epsilon must be between 0 and 1.
         ValueError: For LinGreedy, l2_lambda cannot be negative.
@@ -831,13 +1179,14 @@ class MAB:
         """
 
         # Validate arguments
-        MAB._validate_mab_args(arms, learning_policy, neighborhood_policy, seed, n_jobs, backend)
+        MAB._validate_mab_args(arms, learning_policy, neighborhood_policy, seed, n_jobs, backend, dtype)
 
         # Save the arguments
         self.arms = arms.copy()
         self.seed = seed
         self.n_jobs = n_jobs
         self.backend = backend
+        self.dtype = np.dtype(dtype)
 
         # Create the random number generator
         self._rng = create_rng(self.seed)
@@ -859,13 +1208,19 @@ class MAB:
             lp = _UCB1(self._rng, self.arms, self.n_jobs, self.backend, learning_policy.alpha)
         elif isinstance(learning_policy, LearningPolicy.LinGreedy):
             lp = _Linear(self._rng, self.arms, self.n_jobs, self.backend, 0, learning_policy.epsilon,
-                         learning_policy.l2_lambda, "ridge", learning_policy.scale)
+                         learning_policy.l2_lambda, "ridge", learning_policy.scale, learning_policy.incremental,
+                         learning_policy.solver, learning_policy.stacked, self.dtype,
+                         shared_scaler=learning_policy.shared_scaler, lazy=learning_policy.lazy)
         elif isinstance(learning_policy, LearningPolicy.LinTS):
             lp = _Linear(self._rng, self.arms, self.n_jobs, self.backend, learning_policy.alpha, 0,
-                         learning_policy.l2_lambda, "ts", learning_policy.scale)
+                         learning_policy.l2_lambda, "ts", learning_policy.scale, learning_policy.incremental,
+                         learning_policy.solver, learning_policy.stacked, self.dtype, learning_policy.covariance,
+                         learning_policy.rank, learning_policy.shared_scaler, learning_policy.lazy)
         elif isinstance(learning_policy, LearningPolicy.LinUCB):
             lp = _Linear(self._rng, self.arms, self.n_jobs, self.backend, learning_policy.alpha, 0,
-                         learning_policy.l2_lambda, "ucb", learning_policy.scale)
+                         learning_policy.l2_lambda, "ucb", learning_policy.scale, learning_policy.incremental,
+                         learning_policy.solver, learning_policy.stacked, self.dtype, learning_policy.covariance,
+                         learning_policy.rank, learning_policy.shared_scaler, learning_policy.lazy)
         else:
             check_true(False, ValueError("Undefined learning policy " + str(learning_policy)))
 
@@ -928,11 +1283,14 @@ class MAB:
                 return LearningPolicy.EpsilonGreedy(lp.epsilon)
         elif isinstance(lp, _Linear):
             if lp.regression == 'ridge':
-                return LearningPolicy.LinGreedy(lp.epsilon, lp.l2_lambda, lp.scale)
+                return LearningPolicy.LinGreedy(lp.epsilon, lp.l2_lambda, lp.scale, lp.incremental, lp.solver,
+                                                lp.stacked, lp.shared_scaler, lp.lazy)
             elif lp.regression == 'ts':
-                return LearningPolicy.LinTS(lp.alpha, lp.l2_lambda, lp.scale)
+                return LearningPolicy.LinTS(lp.alpha, lp.l2_lambda, lp.scale, lp.incremental, lp.solver,
+                                            lp.stacked, lp.covariance, lp.rank, lp.shared_scaler, lp.lazy)
             elif lp.regression == 'ucb':
-                return LearningPolicy.LinUCB(lp.alpha, lp.l2_lambda, lp.scale)
+                return LearningPolicy.LinUCB(lp.alpha, lp.l2_lambda, lp.scale, lp.incremental, lp.solver,
+                                             lp.stacked, lp.covariance, lp.rank, lp.shared_scaler, lp.lazy)
             else:
                 check_true(False, ValueError("Undefined regression " + str(lp.regression)))
         elif isinstance(lp, _Random):
@@ -956,6 +1314,7 @@ class MAB:
         The neighborhood policy
         """
         if isinstance(self._imp, _Clusters):
+            from sklearn.cluster import MiniBatchKMeans
             return NeighborhoodPolicy.Clusters(self._imp.n_clusters, isinstance(self._imp.kmeans, MiniBatchKMeans))
         elif isinstance(self._imp, _KNearest):
             return NeighborhoodPolicy.KNearest(self._imp.k, self._imp.metric)
@@ -995,21 +1354,51 @@ class MAB:
         ValueError: The arm is ``NaN``.
         ValueError: The arm is ``Infinity``.
         """
-        if binarizer:
-            check_true(isinstance(self._imp, _ThompsonSampling) or isinstance(self._imp.lp, _ThompsonSampling),
-                       ValueError("Learning policy must be Thompson Sampling to use a binarizer function."))
-
-            check_true(callable(binarizer), TypeError("Binarizer must be a callable function that returns True/False "
-                                                      "or 0/1 to denote whether a given reward value counts as a "
-                                                      "success for a given arm decision. Specifically, the function "
-                                                      "signature is binarize(arm: Arm, reward: Num) -> True/False "
-                                                      "or 0/1"))
+        self._validate_binarizer(binarizer)
         check_false(arm in self.arms, ValueError("The arm is already in the list of arms."))
 
         self._validate_arm(arm)
         self.arms.append(arm)
         self._imp.add_arm(arm, binarizer)
 
+    def add_arms(self, arms: List[Arm], binarizer: Callable = None) -> NoReturn:
+        """ Adds the list of _arms_ to the list of arms at once.
+
+        Incorporates the arms into the learning and neighborhood policies with no training data.
+        The arms are validated once, and the state of arms in each policy is resized once for all the arms,
+        which is faster than adding the arms one by one with ``add_arm``.
+
+        Parameters
+        ----------
+        arms: List[Arm]
+            The new arms to be added.
+        binarizer: Callable
+            The new binarizer function for Thompson Sampling.
+
+        Returns
+        -------
+        No return.
+
+        Raises
+        ------
+        TypeError:  The arms are not given in a list.
+        TypeError:  For ThompsonSampling, binarizer must be a callable function.
+
+        ValueError: A binarizer function was provided but the learning policy is not Thompson Sampling.
+        ValueError: The list of arms contains duplicate values.
+        ValueError: An arm already exists.
+        ValueError: An arm is ``None``.
+        ValueError: An arm is ``NaN``.
+        ValueError: An arm is ``Infinity``.
+        """
+        self._validate_binarizer(binarizer)
+        self._validate_arms(arms)
+        existing = set(self.arms)
+        check_false(any(arm in existing for arm in arms), ValueError("The arm is already in the list of arms."))
+
+        self.arms.extend(arms)
+        self._imp.add_arms(arms, binarizer)
+
     def remove_arm(self, arm: Arm) -> NoReturn:
         """Removes an _arm_ from the list of arms.
 
@@ -1036,11 +1425,45 @@ class MAB:
         self.arms.remove(arm)
         self._imp.remove_arm(arm)
 
+    def remove_arms(self, arms: List[Arm]) -> NoReturn:
+        """Removes the list of _arms_ from the list of arms at once.
+
+        The arms are validated once, and the state of arms in each policy is resized once for all the arms,
+        which is faster than removing the arms one by one with ``remove_arm``.
+
+        Parameters
+        ----------
+        arms: List[Arm]
+            The existing arms to be removed.
+
+        Returns
+        -------
+        No return.
+
+        Raises
+        ------
+        TypeError:  The arms are not given in a list.
+
+        ValueError: The list of arms contains duplicate values.
+        ValueError: An arm does not exist.
+        ValueError: An arm is ``None``.
+        ValueError: An arm is ``NaN``.
+        ValueError: An arm is ``Infinity``.
+        """
+        self._validate_arms(arms)
+        existing = set(self.arms)
+        check_true(all(arm in existing for arm in arms), ValueError("The arm is not in the list of arms."))
+
+        # Arms are removed in place, as the list of arms is shared with the policies
+        removed = set(arms)
+        self.arms[:] = [arm for arm in self.arms if arm not in removed]
+        self._imp.remove_arms(arms)
+
     def fit(self,
-            decisions: Union[List[Arm], np.ndarray, pd.Series],  # Decisions that are made
-            rewards: Union[List[Num], np.ndarray, pd.Series],  # Rewards that are received
+            decisions: Union[List[Arm], np.ndarray, 'pd.Series', DecisionBatch],  # Decisions that are made
+            rewards: Union[None, List[Num], np.ndarray, 'pd.Series'] = None,  # Rewards that are received
             contexts: Union[None, List[List[Num]],
-                            np.ndarray, pd.Series, pd.DataFrame] = None  # Contexts, optional
+                            np.ndarray, 'pd.Series', 'pd.DataFrame', 'sparse.spmatrix'] = None  # Contexts, optional
             ) -> NoReturn:
         """Fits the multi-armed bandit to the given *decisions*, their corresponding *rewards*
         and *contexts*, if any.
@@ -1053,12 +1476,15 @@ class MAB:
 
         Parameters
         ----------
-         decisions : Union[List[Arm], np.ndarray, pd.Series]
-            The decisions that are made.
-         rewards : Union[List[Num], np.ndarray, pd.Series]
+         decisions : Union[List[Arm], np.ndarray, pd.Series, DecisionBatch]
+            The decisions that are made, or the decision batch of the decisions, rewards and contexts.
+            A decision batch is not validated and converted again, its rewards and contexts are not given separately.
+         rewards : Union[None, List[Num], np.ndarray, pd.Series]
             The rewards that are received corresponding to the decisions.
-         contexts : Union[None, List[List[Num]], np.ndarray, pd.Series, pd.DataFrame]
+         contexts : Union[None, List[List[Num]], np.ndarray, pd.Series, pd.DataFrame, sparse.spmatrix]
             The context under which each decision is made. Default value is ``None``, i.e., no contexts.
+            Sparse matrices are supported by LinGreedy, LinTS and LinUCB without scaling and neighborhood policy,
+            and are kept in compressed sparse row format.
 
         Returns
         -------
@@ -1073,31 +1499,23 @@ class MAB:
         ValueError: Fitting contexts data when there is no contextual policy.
         ValueError: Contextual policy when fitting no contexts data.
         ValueError: Rewards contain ``None``, ``Nan``, or ``Infinity``.
+        ValueError: Rewards or contexts are given with a decision batch.
         """
 
-        # Validate arguments
-        self._validate_fit_args(decisions, rewards, contexts)
-
-        # Convert to numpy array for efficiency
-        decisions = MAB._convert_array(decisions)
-        rewards = MAB._convert_array(rewards)
-
-        # Check rewards are valid
-        check_true(np.isfinite(sum(rewards)), TypeError("Rewards cannot contain None, nan or infinity."))
-
-        # Convert contexts to numpy array for efficiency
-        contexts = self.__convert_context(contexts, decisions)
+        # Validate arguments and convert them to numpy arrays for efficiency
+        batch, decisions, rewards, contexts = self.__get_fit_data(decisions, rewards, contexts)
 
         # Call the fit method
-        self._imp.fit(decisions, rewards, contexts)
+        self.__fit_imp(self._imp.fit, batch, decisions, rewards, contexts)
 
         # Turn initial to true
         self._is_initial_fit = True
 
     def partial_fit(self,
-                    decisions: Union[List[Arm], np.ndarray, pd.Series],
-                    rewards: Union[List[Num], np.ndarray, pd.Series],
-                    contexts: Union[None, List[List[Num]], np.ndarray, pd.Series, pd.DataFrame] = None) -> NoReturn:
+                    decisions: Union[List[Arm], np.ndarray, 'pd.Series', DecisionBatch],
+                    rewards: Union[None, List[Num], np.ndarray, 'pd.Series'] = None,
+                    contexts: Union[None, List[List[Num]], np.ndarray, 'pd.Series', 'pd.DataFrame',
+                                    'sparse.spmatrix'] = None) -> NoReturn:
         """Updates the multi-armed bandit with the given *decisions*, their corresponding *rewards*
         and *contexts*, if any.
 
@@ -1109,12 +1527,15 @@ class MAB:
 
         Parameters
         ----------
-         decisions : Union[List[Arm], np.ndarray, pd.Series]
-            The decisions that are made.
-         rewards : Union[List[Num], np.ndarray, pd.Series]
+         decisions : Union[List[Arm], np.ndarray, pd.Series, DecisionBatch]
+            The decisions that are made, or the decision batch of the decisions, rewards and contexts.
+            A decision batch is not validated and converted again, its rewards and contexts are not given separately.
+         rewards : Union[None, List[Num], np.ndarray, pd.Series]
             The rewards that are received corresponding to the decisions.
-         contexts : Union[None, List[List[Num]], np.ndarray, pd.Series, pd.DataFrame] =
+         contexts : Union[None, List[List[Num]], np.ndarray, pd.Series, pd.DataFrame, sparse.spmatrix] =
             The context under which each decision is made. Default value is ``None``, i.e., no contexts.
+            Sparse matrices are supported by LinGreedy, LinTS and LinUCB without scaling and neighborhood policy,
+            and are kept in compressed sparse row format.
 
         Returns
         -------
@@ -1129,31 +1550,24 @@ class MAB:
         ValueError: Fitting contexts data when there is no contextual policy.
         ValueError: Contextual policy when fitting no contexts data.
         ValueError: Rewards contain ``None``, ``Nan``, or ``Infinity``
+        ValueError: Rewards or contexts are given with a decision batch.
         """
 
-        # Validate arguments
-        self._validate_fit_args(decisions, rewards, contexts)
-
-        # Convert to numpy array for efficiency
-        decisions = MAB._convert_array(decisions)
-        rewards = MAB._convert_array(rewards)
-
-        # Check rewards are valid
-        check_true(np.isfinite(sum(rewards)), TypeError("Rewards cannot contain None, NaN or infinity."))
-
-        # Convert contexts to numpy array for efficiency
-        contexts = self.__convert_context(contexts, decisions)
+        # Validate arguments and convert them to numpy arrays for efficiency
+        batch, decisions, rewards, contexts = self.__get_fit_data(decisions, rewards, contexts)
 
         # Call the fit or partial fit method
         if self._is_initial_fit:
-            self._imp.partial_fit(decisions, rewards, contexts)
+            self.__fit_imp(self._imp.partial_fit, batch, decisions, rewards, contexts)
         else:
-            self.fit(decisions, rewards, contexts)
+            self.__fit_imp(self._imp.fit, batch, decisions, rewards, contexts)
+            self._is_initial_fit = True
 
     def predict(self,
-                contexts: Union[None, List[Num], List[List[Num]],
-                                np.ndarray, pd.Series, pd.DataFrame] = None  # Contexts, optional
-                ) -> Union[Arm, List[Arm]]:
+                contexts: Union[None, List[Num], List[List[Num]], np.ndarray, 'pd.Series', 'pd.DataFrame',
+                                'sparse.spmatrix', DecisionBatch] = None,  # Contexts, optional
+                as_array: bool = False
+                ) -> Union[Arm, List[Arm], np.ndarray]:
         """Returns the "best" arm (or arms list if multiple contexts are given) based on the expected reward.
 
         The definition of the *best* depends on the specified learning policy.
@@ -1162,19 +1576,28 @@ class MAB:
 
         Parameters
         ----------
-        contexts : Union[None, List[Num], List[List[Num]], np.ndarray, pd.Series, pd.DataFrame]
+        contexts : Union[None, List[Num], List[List[Num]], np.ndarray, pd.Series, pd.DataFrame, sparse.spmatrix,
+                         DecisionBatch]
             The context for the expected rewards. Default value is None.
+            Sparse matrices are supported by LinGreedy, LinTS and LinUCB without scaling and neighborhood policy.
+            The contexts of a decision batch are not validated and converted again.
             If contexts is not ``None`` for context-free bandits, the predictions returned will be a
             list of the same length as contexts.
+        as_array : bool
+            Whether to return the indices of the recommended arms in ``arms`` as a numpy array
+            with one index for each context, even for a single context.
+            The indices are computed without creating the list of arms. Default value is False.
 
         Returns
         -------
-        The recommended arm or recommended arms list.
+        The recommended arm or recommended arms list, or the array of their indices when ``as_array`` is True.
 
         Raises
         ------
         TypeError:  Contexts is not given as ``None``, list, numpy array, pandas series or data frames.
 
+        TypeError:  As array is not given as a boolean.
+
         ValueError: Prediction with context policy requires context data.
         """
 
@@ -1182,37 +1605,53 @@ class MAB:
         check_true(self._is_initial_fit, Exception("Call fit before prediction"))
 
         # Validate arguments
-        self._validate_predict_args(contexts)
+        self._validate_predict_args(contexts, as_array)
 
         # Convert contexts to numpy array for efficiency
         contexts = self.__convert_context(contexts)
 
+        # Return the indices of the arms with the best expectation
+        if as_array:
+            return self._imp.predict_indices(contexts)
+
         # Return the arm with the best expectation
         return self._imp.predict(contexts)
 
     def predict_expectations(self,
                              contexts: Union[None, List[Num], List[List[Num]],
-                                             np.ndarray, pd.Series, pd.DataFrame] = None  # Contexts, optional
-                             ) -> Union[Dict[Arm, Num], List[Dict[Arm, Num]]]:
+                                             np.ndarray, 'pd.Series', 'pd.DataFrame',
+                                             'sparse.spmatrix', DecisionBatch] = None,  # Contexts, optional
+                             as_array: bool = False
+                             ) -> Union[Dict[Arm, Num], List[Dict[Arm, Num]], Tuple[np.ndarray, List[Arm]]]:
         """Returns a dictionary of arms (key) to their expected rewards (value).
 
         Contextual learning policies and neighborhood policies require contexts data for expected rewards.
 
         Parameters
         ----------
-        contexts : Union[None, List[Num], List[List[Num]], np.ndarray, pd.Series, pd.DataFrame]
+        contexts : Union[None, List[Num], List[List[Num]], np.ndarray, pd.Series, pd.DataFrame, sparse.spmatrix,
+                         DecisionBatch]
             The context for the expected rewards. Default value is None.
+            Sparse matrices are supported by LinGreedy, LinTS and LinUCB without scaling and neighborhood policy.
+            The contexts of a decision batch are not validated and converted again.
             If contexts is not ``None`` for context-free bandits, the predicted expectations returned will be a
             list of the same length as contexts.
+        as_array : bool
+            Whether to return the expected rewards as a numpy array of shape (n_contexts, n_arms),
+            even for a single context, together with the list of arms in the order of its columns.
+            The array is computed without creating the dictionaries of arms. Default value is False.
 
         Returns
         -------
-        The dictionary of arms (key) to their expected rewards (value), or a list of such dictionaries.
+        The dictionary of arms (key) to their expected rewards (value), or a list of such dictionaries,
+        or the tuple of the expected rewards array and the list of arms when ``as_array`` is True.
 
         Raises
         ------
         TypeError:  Contexts is not given as ``None``, list, numpy array or pandas data frames.
 
+        TypeError:  As array is not given as a boolean.
+
         ValueError: Prediction with context policy requires context data.
         """
 
@@ -1220,11 +1659,15 @@ class MAB:
         check_true(self._is_initial_fit, Exception("Call fit before prediction"))
 
         # Validate arguments
-        self._validate_predict_args(contexts)
+        self._validate_predict_args(contexts, as_array)
 
         # Convert contexts to numpy array for efficiency
         contexts = self.__convert_context(contexts)
 
+        # Return the matrix of expectations with the arms of its columns
+        if as_array:
+            return self._imp.predict_expectations_matrix(contexts), list(self.arms)
+
         # Return a dictionary from arms (key) to expectations (value)
         return self._imp.predict_expectations(contexts)
 
@@ -1265,8 +1708,146 @@ class MAB:
                    ValueError("The arms in arm features do not match arms."))
         self._imp.warm_start(arm_to_features, distance_quantile)
 
+    def open(self) -> 'MAB':
+        """Opens a pool of workers that is kept for the parallel operations of the bandit until it is closed.
+
+        By default, each parallel fit and predict starts its jobs and dispatches the model to them.
+        With an open pool, the workers are started once, and process-based workers keep the model resident
+        between predictions, receiving it again only after fit, partial_fit, add_arm, remove_arm or warm_start.
+        The bandit can also be used as a context manager, which opens the pool and closes it on exit.
+
+        Returns
+        -------
+        The bandit itself.
+        """
+        self._imp.open_pool()
+        return self
+
+    def close(self) -> NoReturn:
+        """Closes the pool of workers opened with ``open()``, if any.
+
+        Returns
+        -------
+        No return.
+        """
+        self._imp.close_pool()
+
+    def save(self, path: str) -> NoReturn:
+        """Saves the bandit into a directory, which is loaded with ``MAB.load()``.
+
+        The directory holds:
+
+            - ``header.json``, a small JSON header with the format version, the version of mabwiser,
+              and the arms, the parameters of the policies, the seed, the number of jobs, the backend and the dtype
+              of the bandit, from which the policies are created when loaded,
+            - ``state.json``, the state of the policies, e.g. the statistics of the arms and the status of warm starts,
+              where the arrays refer to their .npy files,
+            - ``arrays/``, the numeric arrays of the policies, e.g. the models of linear policies or the context
+              history of neighborhood policies, one .npy file for each array, or for each array that others are views
+              into, so that stacked models are stored contiguously,
+            - ``objects.pkl``, only when the bandit has values that cannot be described by the state,
+              e.g. the binarizer function of ThompsonSampling or arms of user classes, which are pickled.
+
+        The pool of workers, if open, is not saved.
+
+        Parameters
+        ----------
+        path : str
+            The directory to save into, which is created if it does not exist.
+
+        Returns
+        -------
+        No return.
+
+        Raises
+        ------
+        TypeError:  Path is not given as a string.
+        """
+        check_true(isinstance(path, (str, os.PathLike)), TypeError("Path must be a string."))
+
+        learning_policy = self.learning_policy
+        neighborhood_policy = self.neighborhood_policy
+        fields = {"arms": list(self.arms),
+                  "learning_policy": {"name": type(learning_policy).__name__,
+                                      "parameters": learning_policy._asdict()},
+                  "neighborhood_policy": {"name": type(neighborhood_policy).__name__,
+                                          "parameters": neighborhood_policy._asdict()}
+                  if neighborhood_policy is not None else None,
+                  "seed": self.seed, "n_jobs": self.n_jobs, "backend": self.backend, "dtype": self.dtype.name}
+        _ModelFile.save(self, os.fspath(path), fields)
+
     @staticmethod
-    def _validate_mab_args(arms, learning_policy, neighborhood_policy, seed, n_jobs, backend):
+    def load(path: str, mmap: bool = True) -> 'MAB':
+        """Loads a bandit saved with ``MAB.save()``.
+
+        The bandit is created from the arms and the parameters of the policies in the header,
+        and the state of its policies is restored from the state and the arrays.
+        With memory mapping, the arrays are mapped from their .npy files instead of being read into memory,
+        so that a large model is ready to predict without reading all of its data.
+        Pages of the files are read when they are first used, and updates of the bandit,
+        e.g. with ``partial_fit()``, are made on private copies of the pages without changing the files.
+
+        Only the classes of mabwiser and the scikit-learn estimators used by its policies are created from the state.
+        When the bandit has values that cannot be described by the state, such as the binarizer function
+        of ThompsonSampling, they are unpickled from ``objects.pkl``, and unpickling can execute arbitrary code,
+        so only load such bandits from trusted sources.
+        The state refers to the private classes of mabwiser, so a warning is issued when the bandit was saved
+        with a different version of mabwiser than the installed version.
+
+        Parameters
+        ----------
+        path : str
+            The directory of the saved bandit.
+        mmap : bool
+            Whether to memory map the arrays, otherwise they are read into memory.
+            Default value is True.
+
+        Returns
+        -------
+        The loaded bandit.
+
+        Raises
+        ------
+        TypeError:  Path is not given as a string.
+        TypeError:  Mmap is not given as a boolean.
+        TypeError:  The saved object is not a bandit.
+
+        ValueError: The path is not a saved bandit, or its format is not supported.
+        ValueError: The saved policies are not supported.
+        """
+        check_true(isinstance(path, (str, os.PathLike)), TypeError("Path must be a string."))
+        check_true(isinstance(mmap, bool), TypeError("Mmap must be True or False."))
+
+        mab = _ModelFile.load(os.fspath(path), mmap, MAB._create)
+        check_true(isinstance(mab, MAB), TypeError("The saved object is not a bandit."))
+        return mab
+
+    @staticmethod
+    def _create(fields: Dict) -> 'MAB':
+
+        # Create the bandit from the fields of a saved bandit, its state is restored afterwards
+        learning_policy = MAB._create_policy(LearningPolicy, fields["learning_policy"])
+        neighborhood_policy = MAB._create_policy(NeighborhoodPolicy, fields["neighborhood_policy"]) \
+            if fields["neighborhood_policy"] is not None else None
+        return MAB(fields["arms"], learning_policy, neighborhood_policy, fields["seed"], fields["n_jobs"],
+                   fields["backend"], fields["dtype"])
+
+    @staticmethod
+    def _create_policy(policies: type, policy: Dict):
+        policy_type = getattr(policies, str(policy["name"]), None)
+        check_true(isinstance(policy_type, type) and issubclass(policy_type, tuple) and
+                   policy_type.__qualname__ == policies.__name__ + "." + str(policy["name"]),
+                   ValueError("The saved policy is not supported: " + str(policy["name"])))
+        return policy_type(**policy["parameters"])
+
+    def __enter__(self) -> 'MAB':
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> NoReturn:
+        self.close()
+
+    @staticmethod
+    def _validate_mab_args(arms, learning_policy, neighborhood_policy, seed, n_jobs, backend, dtype=np.float64):
         """
         Validates arguments for the MAB constructor.
         """
@@ -1307,22 +1888,91 @@ class MAB:
         check_true(isinstance(seed, int), TypeError("The seed must be an integer."))
 
         # Parallel jobs
-        check_true(isinstance(n_jobs, int), TypeError("Number of parallel jobs must be an integer."))
+        check_true(isinstance(n_jobs, int) or n_jobs == 'auto',
+                   TypeError("Number of parallel jobs must be an integer or 'auto'."))
         check_true(n_jobs != 0, ValueError('Number of parallel jobs cannot be zero.'))
         if backend is not None:
             check_true(isinstance(backend, str), TypeError("Parallel backend must be a string."))
 
+        # Data type
+        check_true(isinstance(dtype, (str, type, np.dtype)), TypeError("Dtype must be a data type."))
+        check_true(np.dtype(dtype) in (np.float32, np.float64), ValueError("Dtype must be float32 or float64."))
+
+    def __get_fit_data(self, decisions, rewards,
+                       contexts) -> Tuple[Optional[DecisionBatch], np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        Validates and converts the arguments of fit and partial_fit.
+        Returns the decision batch if one is given, together with the decisions, rewards and contexts.
+        """
+
+        # A decision batch is validated and converted when it is created, only the checks of the bandit remain
+        # Context-free bandits ignore the contexts of the batch
+        if isinstance(decisions, DecisionBatch):
+            self._validate_fit_batch(decisions, rewards, contexts)
+            contexts = decisions.get_contexts(self.dtype) if self.is_contextual else None
+            return decisions, decisions.decisions, decisions.rewards, contexts
+
+        # Validate arguments
+        self._validate_fit_args(decisions, rewards, contexts)
+
+        # Convert to numpy array for efficiency
+        decisions = MAB._convert_array(decisions)
+        rewards = MAB._convert_array(rewards)
+
+        # Check rewards are valid
+        MAB._validate_rewards(rewards)
+
+        # Convert contexts to numpy array for efficiency
+        contexts = self.__convert_context(contexts, decisions)
+
+        return None, decisions, rewards, contexts
+
+    def __fit_imp(self, fit: Callable, batch: Optional[DecisionBatch], decisions: np.ndarray, rewards: np.ndarray,
+                  contexts: Union[None, np.ndarray, 'sparse.csr_matrix']) -> NoReturn:
+        """
+        Calls the given fit method of the implementation with the codes of the decisions in its arm index.
+        The codes of a decision batch are mapped from the codes of the batch without encoding the decisions again.
+        """
+        arm_index = self._imp._arm_index
+        if batch is None:
+            codes = arm_index.encode(decisions)
+        else:
+            arm_index.add(batch.arms)
+            codes = np.array([arm_index.arm_to_code[arm] for arm in batch.arms], dtype=np.int32)[batch.codes]
+        self._imp._fit_codes(fit, decisions, codes, rewards, contexts)
+
+    def _validate_fit_batch(self, batch, rewards, contexts):
+        """
+        Validates that the decision batch given to fit and partial_fit suits the bandit.
+        """
+        check_true(rewards is None and contexts is None,
+                   ValueError("Rewards and contexts should be given within the decision batch."))
+        check_true(batch.decisions is not None, ValueError("Fitting requires a decision batch with decisions."))
+
+        # Contextual policy requires contexts data, context-free policies ignore the contexts of the batch
+        if self.is_contextual:
+            check_true(batch.contexts is not None,
+                       TypeError("Fitting contextual policy or parametric learning policy requires contexts data."))
+            self._validate_sparse_contexts(batch.contexts)
+
+        # Thompson Sampling: works with binary rewards or requires function to convert non-binary rewards
+        if isinstance(self.learning_policy, LearningPolicy.ThompsonSampling) and \
+                self.learning_policy.binarizer is None:
+            check_true(batch.is_binary,
+                       ValueError("Thompson Sampling requires binary rewards when binarizer function is not "
+                                  "provided."))
+
     def _validate_fit_args(self, decisions, rewards, contexts):
         """"
         Validates argument types for fit and partial_fit functions.
         """
 
         # Type check for decisions
-        check_true(isinstance(decisions, (list, np.ndarray, pd.Series)),
+        check_true(isinstance(decisions, (list, np.ndarray)) or is_pandas(decisions, "Series"),
                    TypeError("The decisions should be given as list, numpy array, or pandas series."))
 
         # Type check for rewards
-        check_true(isinstance(rewards, (list, np.ndarray, pd.Series)),
+        check_true(isinstance(rewards, (list, np.ndarray)) or is_pandas(rewards, "Series"),
                    TypeError("The rewards should be given as list, numpy array, or pandas series."))
 
         # Type check for contexts --don't use "if contexts" since it's n-dim array
@@ -1332,9 +1982,11 @@ class MAB:
             # Sync contexts data with contextual policy
             check_true(self.is_contextual,
                        TypeError("Fitting contexts data requires context policy or parametric learning policy."))
-            check_true((len(decisions) == len(contexts)) or (len(decisions) == 1 and isinstance(contexts, pd.Series)),
+            self._validate_sparse_contexts(contexts)
+            n_contexts = contexts.shape[0] if is_sparse(contexts) else len(contexts)
+            check_true((len(decisions) == n_contexts) or (len(decisions) == 1 and is_pandas(contexts, "Series")),
                        ValueError("Decisions and contexts should be same length: len(decision) = " +
-                                  str(len(decisions)) + " vs. len(contexts) = " + str(len(contexts))))
+                                  str(len(decisions)) + " vs. len(contexts) = " + str(n_contexts)))
 
         else:
             check_false(self.is_contextual,
@@ -1350,11 +2002,20 @@ class MAB:
                         ValueError("Thompson Sampling requires binary rewards when binarizer function is not "
                                    "provided."))
 
-    def _validate_predict_args(self, contexts):
+    def _validate_predict_args(self, contexts, as_array=False):
         """"
         Validates argument types for predict and predict_expectation functions.
         """
 
+        check_true(isinstance(as_array, bool), TypeError("As array must be True or False."))
+
+        # Contexts of a decision batch are validated when the batch is created
+        if isinstance(contexts, DecisionBatch):
+            check_false(self.is_contextual and contexts.contexts is None,
+                        ValueError("Prediction with context policy requires context data."))
+            self._validate_sparse_contexts(contexts.contexts)
+            return
+
         # Context policy and context data should match
         if self.is_contextual:  # don't use "if contexts" since it's n-dim array
             check_true(contexts is not None, ValueError("Prediction with context policy requires context data."))
@@ -1362,6 +2023,17 @@ class MAB:
         else:
             if contexts is not None:
                 MAB._validate_context_type(contexts)
+        self._validate_sparse_contexts(contexts)
+
+    def _validate_sparse_contexts(self, contexts):
+        """
+        Validates that sparse context data is only used with linear policies without scaling
+        """
+        if is_sparse(contexts):
+            check_true(isinstance(self._imp, _Linear),
+                       TypeError("Sparse contexts are only supported by LinGreedy, LinTS and LinUCB "
+                                 "without a neighborhood policy."))
+            check_false(self._imp.scale, ValueError("Sparse contexts cannot be scaled."))
 
     @staticmethod
     def _validate_context_type(contexts):
@@ -1371,13 +2043,27 @@ class MAB:
         if isinstance(contexts, np.ndarray):
             check_true(contexts.ndim == 2,
                        TypeError("The contexts should be given as 2D list, numpy array, pandas series or data frames."))
+        elif is_sparse(contexts):
+            # Sparse matrices are always 2D
+            pass
         elif isinstance(contexts, list):
             check_true(np.array(contexts).ndim == 2,
                        TypeError("The contexts should be given as 2D list, numpy array, pandas series or data frames."))
         else:
-            check_true(isinstance(contexts, (pd.Series, pd.DataFrame)),
+            check_true(is_pandas(contexts, "Series", "DataFrame"),
                        TypeError("The contexts should be given as 2D list, numpy array, pandas series or data frames."))
 
+    @staticmethod
+    def _validate_rewards(rewards: np.ndarray):
+        """
+        Validates that rewards are finite numbers, with a single vectorized check.
+        """
+        try:
+            is_finite = np.isfinite(rewards.astype(np.float64, copy=False)).all()
+        except (TypeError, ValueError):
+            is_finite = False
+        check_true(is_finite, TypeError("Rewards cannot contain None, nan or infinity."))
+
     @staticmethod
     def _validate_arm(arm):
         """
@@ -1387,6 +2073,31 @@ class MAB:
         check_false(np.nan in [arm], ValueError("The arm cannot be NaN."))
         check_false(np.inf in [arm], ValueError("The arm cannot be Infinity."))
 
+    @staticmethod
+    def _validate_arms(arms):
+        """
+        Validates the list of new arms at once.
+        """
+        check_true(isinstance(arms, list), TypeError("The arms should be provided in a list."))
+        check_false(None in arms, ValueError("The arm cannot be None."))
+        check_false(np.nan in arms, ValueError("The arm cannot be NaN."))
+        check_false(np.inf in arms, ValueError("The arm cannot be Infinity."))
+        check_true(len(arms) == len(set(arms)), ValueError("The list of arms cannot contain duplicate values."))
+
+    def _validate_binarizer(self, binarizer):
+        """
+        Validates the binarizer function of new arms.
+        """
+        if binarizer:
+            check_true(isinstance(self.learning_policy, LearningPolicy.ThompsonSampling),
+                       ValueError("Learning policy must be Thompson Sampling to use a binarizer function."))
+
+            check_true(callable(binarizer), TypeError("Binarizer must be a callable function that returns True/False "
+                                                      "or 0/1 to denote whether a given reward value counts as a "
+                                                      "success for a given arm decision. Specifically, the function "
+                                                      "signature is binarize(arm: Arm, reward: Num) -> True/False "
+                                                      "or 0/1"))
+
     @staticmethod
     def _convert_array(array_like) -> np.ndarray:
         """
@@ -1396,21 +2107,24 @@ class MAB:
             return array_like
         elif isinstance(array_like, list):
             return np.asarray(array_like)
-        elif isinstance(array_like, pd.Series):
+        elif is_pandas(array_like, "Series"):
             return array_like.values
         else:
             raise NotImplementedError("Unsupported data type")
 
     @staticmethod
-    def _convert_matrix(matrix_like, row=False) -> Union[None, np.ndarray]:
+    def _convert_matrix(matrix_like, row=False, dtype=None) -> Union[None, np.ndarray]:
         """
         Convert contexts to numpy array for efficiency.
         For fit and partial fit, decisions must be provided.
         The numpy array need to be in C row-major order for efficiency.
         If the data is a series for a single row, set the row flag to True.
+        If dtype is given, the numpy array is converted to dtype without copying when it is already of dtype.
         """
         if matrix_like is None:
             return None
+        elif dtype is not None:
+            return MAB._convert_matrix(matrix_like, row).astype(dtype, copy=False)
         elif isinstance(matrix_like, np.ndarray):
             if matrix_like.flags['C_CONTIGUOUS']:
                 return matrix_like
@@ -1418,12 +2132,12 @@ class MAB:
                 return np.asarray(matrix_like, order="C")
         elif isinstance(matrix_like, list):
             return np.asarray(matrix_like, order="C")
-        elif isinstance(matrix_like, pd.DataFrame):
+        elif is_pandas(matrix_like, "DataFrame"):
             if matrix_like.values.flags['C_CONTIGUOUS']:
                 return matrix_like.values
             else:
                 return np.asarray(matrix_like.values, order="C")
-        elif isinstance(matrix_like, pd.Series):
+        elif is_pandas(matrix_like, "Series"):
             if row:
                 return np.asarray(matrix_like.values, order="C").reshape(1, -1)
             else:
@@ -1433,10 +2147,26 @@ class MAB:
 
     def __convert_context(self, contexts, decisions=None) -> Union[None, np.ndarray]:
         """
-        Convert contexts to numpy array for efficiency.
+        Convert contexts to numpy array of the floating point type of the bandit for efficiency.
         For fit and partial fit, decisions must be provided.
         The numpy array need to be in C row-major order for efficiency.
         """
+        # Contexts of a decision batch are converted once for each floating point type
+        if isinstance(contexts, DecisionBatch):
+            return contexts.get_contexts(self.dtype)
+
+        # Sparse contexts are kept sparse in compressed sparse row format
+        if is_sparse(contexts):
+            return contexts.tocsr().astype(self.dtype, copy=False)
+
+        contexts = self.__convert_context_array(contexts, decisions)
+        if contexts is None:
+            return None
+
+        # Convert without copying when contexts are already of the floating point type
+        return contexts.astype(self.dtype, copy=False)
+
+    def __convert_context_array(self, contexts, decisions=None) -> Union[None, np.ndarray]:
         if contexts is None:
             return None
         elif isinstance(contexts, np.ndarray):
@@ -1446,12 +2176,12 @@ class MAB:
                 return np.asarray(contexts, order="C")
         elif isinstance(contexts, list):
             return np.asarray(contexts, order="C")
-        elif isinstance(contexts, pd.DataFrame):
+        elif is_pandas(contexts, "DataFrame"):
             if contexts.values.flags['C_CONTIGUOUS']:
                 return contexts.values
             else:
                 return np.asarray(contexts.values, order="C")
-        elif isinstance(contexts, pd.Series):
+        elif is_pandas(contexts, "Series"):
             # When context is a series, we need to differentiate between
             # a single context with multiple features vs. multiple contexts with single feature
             is_called_from_fit = decisions is not None
@@ -1,11 +1,10 @@
 # -*- coding: utf-8 -*-
 # SPDX-License-Identifier: Apache-2.0
 
-from copy import deepcopy
+from copy import copy
 from typing import Callable, Dict, List, NoReturn, Optional, Union
 
 import numpy as np
-from scipy.spatial.distance import cdist
 
 from mabwiser.base_mab import BaseMAB
 from mabwiser.greedy import _EpsilonGreedy
@@ -15,7 +14,7 @@ from mabwiser.rand import _Random
 from mabwiser.softmax import _Softmax
 from mabwiser.thompson import _ThompsonSampling
 from mabwiser.ucb import _UCB1
-from mabwiser.utils import Arm, Num, reset, _BaseRNG, create_rng
+from mabwiser.utils import Arm, Num, reset, _BaseRNG, _RowRNG, _SharedArrays
 
 
 class _Neighbors(BaseMAB):
@@ -28,7 +27,11 @@ class _Neighbors(BaseMAB):
         self.metric = metric
         self.no_nhood_prob_of_arm = no_nhood_prob_of_arm
 
+        # The learning policy shares the arm index, so that it is fit with the codes of the neighbors
+        self.lp._arm_index = self._arm_index
+
         self.decisions = None
+        self.decision_codes = None
         self.rewards = None
         self.contexts = None
 
@@ -45,6 +48,7 @@ class _Neighbors(BaseMAB):
 
         # Set the historical data for prediction
         self.decisions = decisions
+        self.decision_codes = self._encode(decisions)
         self.contexts = contexts
 
         # Binarize the rewards if using Thompson Sampling
@@ -53,6 +57,8 @@ class _Neighbors(BaseMAB):
         else:
             self.rewards = rewards
 
+        self._unpublish()
+
     def partial_fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
 
         # Binarize the rewards if using Thompson Sampling
@@ -61,9 +67,12 @@ class _Neighbors(BaseMAB):
 
         # Add more historical data for prediction
         self.decisions = np.concatenate((self.decisions, decisions))
+        self.decision_codes = np.concatenate((self.decision_codes, self._encode(decisions)))
         self.contexts = np.concatenate((self.contexts, contexts))
         self.rewards = np.concatenate((self.rewards, rewards))
 
+        self._unpublish()
+
     def predict(self, contexts: np.ndarray = None) -> Union[Arm, List[Arm]]:
 
         # Return predict within the neighborhood
@@ -74,6 +83,16 @@ class _Neighbors(BaseMAB):
         # Return predict expectations within the neighborhood
         return self._parallel_predict(contexts, is_predict=False)
 
+    def predict_indices(self, contexts: np.ndarray = None) -> np.ndarray:
+
+        # Return the indices of the arms predicted within the neighborhood
+        return self._parallel_predict(contexts, is_predict=True, as_array=True)
+
+    def predict_expectations_matrix(self, contexts: np.ndarray = None) -> np.ndarray:
+
+        # Return the matrix of expectations within the neighborhood
+        return self._parallel_predict(contexts, is_predict=False, as_array=True)
+
     def warm_start(self, arm_to_features: Dict[Arm, List[Num]], distance_quantile: float):
         # Can only execute warm start when learning policy has been fit in _get_nhood_predictions
         self.arm_to_features = arm_to_features
@@ -83,15 +102,41 @@ class _Neighbors(BaseMAB):
         # Copy arms executed on learning policy in _get_nhood_predictions
         pass
 
+    def _publish(self) -> '_Neighbors':
+
+        # Copy the bandit with the historical data in shared memory
+        published = copy(self)
+        published.shared_arrays = _SharedArrays([self.decisions, self.decision_codes, self.rewards, self.contexts])
+        published.decisions, published.decision_codes, published.rewards, published.contexts = \
+            published.shared_arrays.arrays
+
+        return published
+
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
         """Abstract method to be implemented by child classes."""
         pass
 
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
+
+        # Return the list of predictions
+        return self._get_predictions(self._predict_contexts_array(contexts, is_predict, seeds, start_index),
+                                     is_predict)
+
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
         """Abstract method to be implemented by child classes."""
         pass
 
+    def _get_predictions(self, predictions: np.ndarray, is_predict: bool) -> List:
+
+        # Rows of expectations without neighbors are the nan expectations of arms
+        if is_predict:
+            return super()._get_predictions(predictions, is_predict)
+        else:
+            return [self.arm_to_expectation.copy() if np.isnan(row).all() else dict(zip(self.arms, row))
+                    for row in predictions]
+
     def _binarize_ts_rewards(self, decisions, rewards):
         self.lp.is_contextual_binarized = False
         rewards = self.lp._get_binary_rewards(decisions, rewards)
@@ -99,20 +144,38 @@ class _Neighbors(BaseMAB):
 
         return rewards
 
+    def _get_distances(self, row_2d: np.ndarray) -> np.ndarray:
+
+        # cdist computes in float64, so the common metrics are computed in float32 for float32 contexts
+        if self.contexts.dtype == np.float32 and self.metric in ("euclidean", "sqeuclidean", "cosine"):
+            if self.metric == "cosine":
+                norms = np.linalg.norm(self.contexts, axis=1) * np.linalg.norm(row_2d)
+                return 1 - np.dot(self.contexts, row_2d[0]) / norms
+
+            differences = self.contexts - row_2d
+            distances = np.einsum('ij,ij->i', differences, differences)
+            return np.sqrt(distances) if self.metric == "euclidean" else distances
+
+        from scipy.spatial.distance import cdist
+
+        # Reshape to flatten the output distances list
+        return cdist(self.contexts, row_2d, metric=self.metric).reshape(-1)
+
     def _get_nhood_predictions(self, lp, indices, row_2d, is_predict):
 
-        # Fit the decisions and rewards of the neighbors
-        lp.fit(self.decisions[indices], self.rewards[indices], self.contexts[indices])
+        # Fit the decisions and rewards of the neighbors, grouped by the codes of their decisions
+        lp._fit_codes(lp.fit, self.decisions[indices], self.decision_codes[indices],
+                      self.rewards[indices], self.contexts[indices])
 
         # Warm start
         if self.arm_to_features is not None:
             lp.warm_start(self.arm_to_features, self.distance_quantile)
 
-        # Predict based on the neighbors
+        # Predict the index of the arm or the expectations based on the neighbors
         if is_predict:
-            return lp.predict(row_2d)
+            return lp.predict_indices(row_2d)[0]
         else:
-            return lp.predict_expectations(row_2d)
+            return lp.predict_expectations_matrix(row_2d)[0]
 
     def _get_no_nhood_predictions(self, lp, is_predict):
 
@@ -126,12 +189,27 @@ class _Neighbors(BaseMAB):
             # Expectations will be nan when there are no neighbors
             return self.arm_to_expectation.copy()
 
+    def _get_no_nhood_predictions_array(self, lp, is_predict):
+
+        if is_predict:
+            # Select the index of a random arm, uniform or with the given probabilities
+            return lp.rng.choice(len(self.arms), size=1, p=self.no_nhood_prob_of_arm)[0]
+        else:
+            # Expectations will be nan when there are no neighbors
+            return np.array([self.arm_to_expectation[arm] for arm in self.arms], dtype=float)
+
     def _uptake_new_arm(self, arm: Arm, binarizer: Callable = None, scaler: Callable = None):
         self.lp.add_arm(arm, binarizer)
 
     def _drop_existing_arm(self, arm: Arm) -> NoReturn:
         self.lp.remove_arm(arm)
 
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
+        self.lp.add_arms(arms, binarizer)
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        self.lp.remove_arms(arms)
+
 
 class _Radius(_Neighbors):
 
@@ -142,39 +220,46 @@ class _Radius(_Neighbors):
 
         self.radius = radius
 
-    def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
-                          seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
 
-        # Copy learning policy object
-        lp = deepcopy(self.lp)
+        # Learning policy is fit on the neighborhood of each context, in place unless shared by threads
+        lp = self._get_local(self.lp)
+        lp_state = lp._get_fit_state()
 
         # Create an empty list of predictions
         predictions = [None] * len(contexts)
 
-        # For each row in the given contexts
-        for index, row in enumerate(contexts):
+        # Generator of the random streams of rows
+        row_rng = _RowRNG()
 
-            # Get random generator
-            lp.rng = create_rng(seed=seeds[index])
+        try:
+            # For each row in the given contexts
+            for index, row in enumerate(contexts):
 
-            # Calculate the distances from the historical contexts
-            # Row is 1D so convert it to 2D array for cdist using newaxis
-            # Finally, reshape to flatten the output distances list
-            row_2d = row[np.newaxis, :]
-            distances_to_row = cdist(self.contexts, row_2d, metric=self.metric).reshape(-1)
+                # Start the random stream of the row
+                lp.rng = row_rng.reseed(seeds[index])
 
-            # Find the neighbor indices within the radius
-            # np.where with a condition returns a tuple where the first element is an array of indices
-            indices = np.where(distances_to_row <= self.radius)
+                # Calculate the distances from the historical contexts
+                # Row is 1D so convert it to 2D array using newaxis
+                row_2d = row[np.newaxis, :]
+                distances_to_row = self._get_distances(row_2d)
 
-            # If neighbors exist
-            if indices[0].size > 0:
-                predictions[index] = self._get_nhood_predictions(lp, indices, row_2d, is_predict)
-            else:  # When there are no neighbors
-                predictions[index] = self._get_no_nhood_predictions(lp, is_predict)
+                # Find the neighbor indices within the radius
+                # np.where with a condition returns a tuple where the first element is an array of indices
+                indices = np.where(distances_to_row <= self.radius)
 
-        # Return the list of predictions
-        return predictions
+                # If neighbors exist
+                if indices[0].size > 0:
+                    predictions[index] = self._get_nhood_predictions(lp, indices, row_2d, is_predict)
+                else:  # When there are no neighbors
+                    predictions[index] = self._get_no_nhood_predictions_array(lp, is_predict)
+        finally:
+            # Restore the random state of learning policy and its state before fitting on neighborhoods
+            lp._set_fit_state(lp_state)
+
+        # Return the indices of the arms or the expectations
+        return self._stack_predictions(predictions, is_predict)
 
 
 class _KNearest(_Neighbors):
@@ -186,31 +271,38 @@ class _KNearest(_Neighbors):
 
         self.k = k
 
-    def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
-                          seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
 
-        # Copy Learning Policy object and set random state
-        lp = deepcopy(self.lp)
+        # Learning policy is fit on the neighborhood of each context, in place unless shared by threads
+        lp = self._get_local(self.lp)
+        lp_state = lp._get_fit_state()
 
         # Create an empty list of predictions
         predictions = [None] * len(contexts)
 
-        # For each row in the given contexts
-        for index, row in enumerate(contexts):
+        # Generator of the random streams of rows
+        row_rng = _RowRNG()
 
-            # Get random generator
-            lp.rng = create_rng(seed=seeds[index])
+        try:
+            # For each row in the given contexts
+            for index, row in enumerate(contexts):
 
-            # Calculate the distances from the historical contexts
-            # Row is 1D so convert it to 2D array for cdist using newaxis
-            # Finally, reshape to flatten the output distances list
-            row_2d = row[np.newaxis, :]
-            distances_to_row = cdist(self.contexts, row_2d, metric=self.metric).reshape(-1)
+                # Start the random stream of the row
+                lp.rng = row_rng.reseed(seeds[index])
 
-            # Find the k nearest neighbor indices
-            indices = np.argpartition(distances_to_row, self.k - 1)[:self.k]
+                # Calculate the distances from the historical contexts
+                # Row is 1D so convert it to 2D array using newaxis
+                row_2d = row[np.newaxis, :]
+                distances_to_row = self._get_distances(row_2d)
 
-            predictions[index] = self._get_nhood_predictions(lp, indices, row_2d, is_predict)
+                # Find the k nearest neighbor indices
+                indices = np.argpartition(distances_to_row, self.k - 1)[:self.k]
 
-        # Return the list of predictions
-        return predictions
+                predictions[index] = self._get_nhood_predictions(lp, indices, row_2d, is_predict)
+        finally:
+            # Restore the random state of learning policy and its state before fitting on neighborhoods
+            lp._set_fit_state(lp_state)
+
+        # Return the indices of the arms or the expectations
+        return self._stack_predictions(predictions, is_predict)
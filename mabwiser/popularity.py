@@ -1,11 +1,11 @@
 # -*- coding: utf-8 -*-
 # SPDX-License-Identifier: Apache-2.0
 
-from typing import Dict, List, Optional, NoReturn, Union
+from typing import List, Optional, NoReturn
 import numpy as np
 
 from mabwiser.greedy import _EpsilonGreedy
-from mabwiser.utils import argmax, reset, Arm, Num, _BaseRNG
+from mabwiser.utils import Arm, _BaseRNG
 
 
 class _Popularity(_EpsilonGreedy):
@@ -31,17 +31,7 @@ class _Popularity(_EpsilonGreedy):
         # Make sure expectations sum up to 1 like probabilities
         self._normalize_expectations()
 
-    def predict(self, contexts: Optional[np.ndarray] = None) -> Union[Arm, List[Arm]]:
-
-        # Return the arm with maximum expectation
-        expectations = self.predict_expectations(contexts)
-        if isinstance(expectations, dict):
-            return argmax(expectations)
-        else:
-            return [argmax(exp) for exp in expectations]
-
-    def predict_expectations(self, contexts: Optional[np.ndarray] = None) -> Union[Dict[Arm, Num],
-                                                                                   List[Dict[Arm, Num]]]:
+    def _get_expectations(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
 
         # Return a random value between 0 and 1 for each arm that is "proportional" to the
         # expectation of the arm and sums to 1 by sampling from a Dirichlet distribution.
@@ -49,25 +39,23 @@ class _Popularity(_EpsilonGreedy):
         # Add a very small epsilon to ensure each of the expectations is positive.
         # TODO: this would not work for negative rewards!
         size = 1 if contexts is None else len(contexts)
-        alpha = [v + np.finfo(float).eps for v in self.arm_to_expectation.values()]
-        dirichlet_random_values = self.rng.dirichlet(alpha, size)
-        expectations = [dict(zip(self.arm_to_expectation.keys(), exp)).copy() for exp in dirichlet_random_values]
-        if size == 1:
-            return expectations[0]
-        else:
-            return expectations
+        alpha = self.statistics.get("expectation") + np.finfo(float).eps
+        return self.rng.dirichlet(alpha, size)
 
     def _normalize_expectations(self):
         # TODO: this would not work for negative rewards!
-        total = sum(self.arm_to_expectation.values())
+        expectations = self.statistics.get("expectation")
+        total = expectations.sum()
         if total == 0:
             # set equal probabilities
-            reset(self.arm_to_expectation, 1.0 / len(self.arms))
+            self.statistics.set("expectation", np.full(len(expectations), 1.0 / len(self.arms)))
         else:
-            for k, v in self.arm_to_expectation.items():
-                self.arm_to_expectation[k] = v / total
+            self.statistics.set("expectation", expectations / total)
 
     def _drop_existing_arm(self, arm: Arm) -> NoReturn:
-        self.arm_to_sum.pop(arm)
-        self.arm_to_count.pop(arm)
+        self.statistics.remove(arm)
+        self._normalize_expectations()
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        self.statistics.remove_arms(arms)
         self._normalize_expectations()
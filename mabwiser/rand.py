@@ -43,6 +43,17 @@ class _Random(BaseMAB):
         else:
             return expectations
 
+    def predict_indices(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return the index of the arm with maximum expectation for each context
+        return np.argmax(self.predict_expectations_matrix(contexts), axis=1)
+
+    def predict_expectations_matrix(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return a random expectation (between 0 and 1) for each arm and context
+        size = 1 if contexts is None else len(contexts)
+        return self.rng.rand((size, len(self.arms)))
+
     def warm_start(self, arm_to_features: Dict[Arm, List[Num]], distance_quantile: float):
         pass
 
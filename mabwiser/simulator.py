@@ -13,10 +13,8 @@ from itertools import chain
 from typing import Union, List, Optional, NoReturn
 
 import math
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn as sns
 from joblib import Parallel, delayed
 from scipy.spatial.distance import cdist
 from sklearn.metrics import confusion_matrix
@@ -25,7 +23,7 @@ from sklearn.model_selection import train_test_split
 from mabwiser.base_mab import BaseMAB
 from mabwiser.greedy import _EpsilonGreedy
 from mabwiser.linear import _Linear
-from mabwiser.mab import MAB
+from mabwiser.mab import MAB, DecisionBatch
 from mabwiser.neighbors import _Neighbors, _Radius, _KNearest
 from mabwiser.approximate import _LSHNearest
 from mabwiser.popularity import _Popularity
@@ -33,7 +31,7 @@ from mabwiser.rand import _Random
 from mabwiser.softmax import _Softmax
 from mabwiser.thompson import _ThompsonSampling
 from mabwiser.ucb import _UCB1
-from mabwiser.utils import Arm, Num, check_true, Constants, _BaseRNG, create_rng
+from mabwiser.utils import Arm, Num, check_true, Constants, is_sparse, _ArmIndex, _BaseRNG, _RowRNG
 from mabwiser._version import __author__, __email__, __version__, __copyright__
 
 __author__ = __author__
@@ -213,26 +211,26 @@ class _NeighborsSimulator(_Neighbors):
     def _get_nhood_predictions(self, lp, row_2d, indices, is_predict):
 
         nn_decisions = self.decisions[indices]
+        nn_codes = self.decision_codes[indices]
         nn_rewards = self.rewards[indices]
 
         if isinstance(lp, _ThompsonSampling) and self.lp.binarizer:
             nn_raw_rewards = self.raw_rewards[indices]
+        else:
+            nn_raw_rewards = nn_rewards
 
         arm_to_stat = {}
         if not self.is_quick:
+            # Group the rewards of the neighbors by the codes of their decisions
+            arm_to_indices = self._arm_index.group(nn_codes)
             for arm in self.arms:
-                if isinstance(lp, _ThompsonSampling) and self.lp.binarizer:
-                    arm_rewards = nn_raw_rewards[nn_decisions == arm]
-                else:
-                    arm_rewards = nn_rewards[nn_decisions == arm]
-
-                if len(arm_rewards > 0):
-                    arm_to_stat[arm] = Simulator.get_stats(arm_rewards)
+                if arm in arm_to_indices:
+                    arm_to_stat[arm] = Simulator.get_stats(nn_raw_rewards[arm_to_indices[arm]])
                 else:
                     arm_to_stat[arm] = {}
 
-        # Fit the decisions and rewards of the neighbors
-        lp.fit(nn_decisions, nn_rewards, self.contexts[indices])
+        # Fit the decisions and rewards of the neighbors with their codes
+        lp._fit_codes(lp.fit, nn_decisions, nn_codes, nn_rewards, self.contexts[indices])
 
         # Predict based on the neighbors
         if is_predict:
@@ -266,11 +264,14 @@ class _RadiusSimulator(_NeighborsSimulator):
         # Create an empty list of predictions
         predictions = [None] * len(contexts)
 
+        # Generator of the random streams of rows
+        row_rng = _RowRNG()
+
         # For each row in the given contexts
         for index, row in enumerate(contexts):
 
-            # Get random generator
-            lp.rng = create_rng(seeds[index])
+            # Start the random stream of the row
+            lp.rng = row_rng.reseed(seeds[index])
 
             # Calculate the distances from the historical contexts
             # Row is 1D so convert it to 2D array for cdist using newaxis
@@ -315,11 +316,14 @@ class _KNearestSimulator(_NeighborsSimulator):
         # Create an empty list of predictions
         predictions = [None] * len(contexts)
 
+        # Generator of the random streams of rows
+        row_rng = _RowRNG()
+
         # For each row in the given contexts
         for index, row in enumerate(contexts):
 
-            # Get random generator
-            lp.rng = create_rng(seed=seeds[index])
+            # Start the random stream of the row
+            lp.rng = row_rng.reseed(seeds[index])
 
             # Calculate the distances from the historical contexts
             # Row is 1D so convert it to 2D array for cdist using newaxis
@@ -364,11 +368,14 @@ class _ApproximateSimulator(_NeighborsSimulator, metaclass=abc.ABCMeta):
         # Create an empty list of predictions
         predictions = [None] * len(contexts)
 
+        # Generator of the random streams of rows
+        row_rng = _RowRNG()
+
         # For each row in the given contexts
         for index, row in enumerate(contexts):
 
-            # Get random generator
-            lp.rng = create_rng(seed=seeds[index])
+            # Start the random stream of the row
+            lp.rng = row_rng.reseed(seeds[index])
 
             # Prepare for hashing
             row_2d = row[np.newaxis, :]
@@ -569,8 +576,9 @@ class Simulator:
     """
 
     def __init__(self, bandits: List[tuple],                                    # List of tuples of names and bandits
-                 decisions: Union[List[Arm], np.ndarray, pd.Series],            # Decisions that are made
-                 rewards: Union[List[Num], np.ndarray, pd.Series],              # Rewards that are received
+                 decisions: Union[List[Arm], np.ndarray, pd.Series,
+                                  DecisionBatch],                               # Decisions that are made
+                 rewards: Union[None, List[Num], np.ndarray, pd.Series] = None,  # Rewards that are received
                  contexts: Union[None, List[List[Num]],
                                  np.ndarray, pd.Series, pd.DataFrame] = None,   # Contexts, optional
                  scaler: callable = None,                                       # Scaler for contexts
@@ -592,9 +600,10 @@ class Simulator:
         bandits: list[tuple(str, MAB)]
             The set of bandits to run the simulation with. Must be a list of tuples of an identifier for the bandit and
             the bandit object, of type mabwiser.mab.MAB or that inherits from mabwiser.base_mab.BaseMAB
-        decisions : Union[List[Arm], np.ndarray, pd.Series]
-            The decisions that are made.
-        rewards : Union[List[Num], np.ndarray, pd.Series]
+        decisions : Union[List[Arm], np.ndarray, pd.Series, DecisionBatch]
+            The decisions that are made, or the decision batch of the decisions, rewards and contexts.
+            A decision batch is not validated and converted again, its rewards and contexts are not given separately.
+        rewards : Union[None, List[Num], np.ndarray, pd.Series]
             The rewards that are received corresponding to the decisions.
         contexts : Union[None, List[List[Num]], np.ndarray, pd.Series, pd.DataFrame]
             The context under which each decision is made. Default value is None.
@@ -637,6 +646,7 @@ class Simulator:
         TypeError   The is_ordered flag must be a boolean.
         TypeError   The evaluation function must be callable.
         ValueError  The length of decisions and rewards must match.
+        ValueError  The rewards and contexts must be given within the decision batch.
         ValueError  The test_size size must be greater than 0 and less than 1.
         ValueError  The batch size cannot exceed the size of the test set.
         """
@@ -645,10 +655,13 @@ class Simulator:
                             test_size=test_size, ordered=is_ordered, batch_size=batch_size,
                             evaluation=evaluator, is_quick=is_quick)
 
-        # Convert decisions, rewards and contexts to numpy arrays
-        decisions = MAB._convert_array(decisions)
-        rewards = MAB._convert_array(rewards)
-        contexts = MAB._convert_matrix(contexts)
+        # Convert decisions, rewards and contexts to numpy arrays, a decision batch is converted already
+        if isinstance(decisions, DecisionBatch):
+            decisions, rewards, contexts = decisions.decisions, decisions.rewards, decisions.contexts
+        else:
+            decisions = MAB._convert_array(decisions)
+            rewards = MAB._convert_array(rewards)
+            contexts = MAB._convert_matrix(contexts)
 
         # Save the simulation parameters
         self.bandits = bandits
@@ -743,11 +756,14 @@ class Simulator:
         Arm_to_stats dictionary.
         Dictionary has the format {arm {'count', 'sum', 'min', 'max', 'mean', 'std'}}
         """
+        # Group the rewards by the codes of the decisions instead of comparing each arm
+        arm_index = _ArmIndex(self.arms)
+        arm_to_indices = arm_index.group(arm_index.encode(np.asarray(decisions)))
+
         stats = dict((arm, {}) for arm in self.arms)
         for arm in self.arms:
-            indices = np.where(decisions == arm)
-            if indices[0].shape[0] > 0:
-                arm_rewards = rewards[indices]
+            if arm in arm_to_indices:
+                arm_rewards = rewards[arm_to_indices[arm]]
                 stats[arm] = self.get_stats(arm_rewards)
             else:
                 stats[arm] = {'count': 0, 'sum': 0, 'min': 0,
@@ -788,6 +804,9 @@ class Simulator:
         check_true(bool(self.bandit_to_arm_to_stats_min),
                    AssertionError('Descriptive statistics for predictions missing. ' + complete))
 
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         if metric == 'avg':
             stats = self.bandit_to_arm_to_stats_avg
         elif metric == 'min':
@@ -1227,6 +1246,9 @@ class Simulator:
                     batch_predictions[name] = batch_predictions[name] + predictions
                     batch_expectations[name] = batch_expectations[name] + expectations
 
+            # Batch data is validated and encoded once for the bandits of type MAB
+            update = None
+
             for name, mab in self.bandits:
                 if not mab.is_contextual:
                     batch_expectations[name] = [mab._imp.arm_to_expectation.copy()]
@@ -1247,7 +1269,11 @@ class Simulator:
                                              batch_rewards, start, nn)
 
                 # Update the model
-                if mab.is_contextual:
+                if isinstance(mab, MAB):
+                    if update is None:
+                        update = DecisionBatch(batch_decisions, batch_rewards, batch_contexts)
+                    mab.partial_fit(update)
+                elif mab.is_contextual:
                     mab.partial_fit(batch_decisions, batch_rewards, batch_contexts)
                 else:
                     mab.partial_fit(batch_decisions, batch_rewards)
@@ -1390,6 +1416,9 @@ class Simulator:
 
         self.logger.info("Training Bandits")
 
+        # Training data is validated and encoded once for the bandits of type MAB
+        batch = None
+
         new_bandits = []
         for name, mab in self.bandits:
             # Add the current bandit
@@ -1420,7 +1449,11 @@ class Simulator:
                                     no_nhood_prob_of_arm=imp.no_nhood_prob_of_arm)
 
             new_bandits.append((name, mab))
-            if mab.is_contextual:
+            if isinstance(mab, MAB):
+                if batch is None:
+                    batch = DecisionBatch(train_decisions, train_rewards, train_contexts)
+                mab.fit(batch)
+            elif mab.is_contextual:
                 mab.fit(train_decisions, train_rewards, train_contexts)
             else:
                 mab.fit(train_decisions, train_rewards)
@@ -1459,31 +1492,42 @@ class Simulator:
             check_true(isinstance(mab, (MAB, BaseMAB)),
                        TypeError('All bandits must be MAB objects or inherit from BaseMab.'))
 
-        # Type check for decisions
-        check_true(isinstance(decisions, (list, np.ndarray, pd.Series)),
-                   TypeError("The decisions should be given as list, numpy array, or pandas series."))
-
-        # Type check for rewards
-        check_true(isinstance(rewards, (list, np.ndarray, pd.Series)),
-                   TypeError("The rewards should be given as list, numpy array, or pandas series."))
-
-        # Type check for contexts --don't use "if contexts" since it's n-dim array
-        if contexts is not None:
-            if isinstance(contexts, np.ndarray):
-                check_true(contexts.ndim == 2,
-                           TypeError("The contexts should be given as 2D list, numpy array, or pandas series or "
-                                     "data frames."))
-            elif isinstance(contexts, list):
-                check_true(np.array(contexts).ndim == 2,
-                           TypeError("The contexts should be given as 2D list, numpy array, or pandas series or "
-                                     "data frames."))
-            else:
-                check_true(isinstance(contexts, (pd.Series, pd.DataFrame)),
-                           TypeError("The contexts should be given as 2D list, numpy array, or pandas series or "
-                                     "data frames."))
+        # A decision batch is validated when it is created
+        if isinstance(decisions, DecisionBatch):
+            check_true(rewards is None and contexts is None,
+                       ValueError("Rewards and contexts should be given within the decision batch."))
+            check_true(decisions.decisions is not None,
+                       ValueError("The decision batch should have decisions and rewards."))
+            check_true(not is_sparse(decisions.contexts),
+                       TypeError("The contexts should be given as 2D list, numpy array, or pandas series or "
+                                 "data frames."))
+
+        else:
+            # Type check for decisions
+            check_true(isinstance(decisions, (list, np.ndarray, pd.Series)),
+                       TypeError("The decisions should be given as list, numpy array, or pandas series."))
+
+            # Type check for rewards
+            check_true(isinstance(rewards, (list, np.ndarray, pd.Series)),
+                       TypeError("The rewards should be given as list, numpy array, or pandas series."))
+
+            # Type check for contexts --don't use "if contexts" since it's n-dim array
+            if contexts is not None:
+                if isinstance(contexts, np.ndarray):
+                    check_true(contexts.ndim == 2,
+                               TypeError("The contexts should be given as 2D list, numpy array, or pandas series or "
+                                         "data frames."))
+                elif isinstance(contexts, list):
+                    check_true(np.array(contexts).ndim == 2,
+                               TypeError("The contexts should be given as 2D list, numpy array, or pandas series or "
+                                         "data frames."))
+                else:
+                    check_true(isinstance(contexts, (pd.Series, pd.DataFrame)),
+                               TypeError("The contexts should be given as 2D list, numpy array, or pandas series or "
+                                         "data frames."))
 
-        # Length check for decisions and rewards
-        check_true(len(decisions) == len(rewards), ValueError("Decisions and rewards should be same length."))
+            # Length check for decisions and rewards
+            check_true(len(decisions) == len(rewards), ValueError("Decisions and rewards should be same length."))
 
         check_true(isinstance(test_size, float), TypeError("Test size must be a float."))
         check_true(0.0 < test_size < 1.0, ValueError("Test size must be greater than zero and less than one."))
@@ -1,35 +1,39 @@
 # -*- coding: utf-8 -*-
 # SPDX-License-Identifier: Apache-2.0
 
-import math
-from copy import deepcopy
 from typing import Dict, Callable, List, NoReturn, Optional, Union
 
 import numpy as np
 
 from mabwiser.base_mab import BaseMAB
-from mabwiser.utils import argmax, reset, Arm, Num, _BaseRNG
+from mabwiser.utils import Arm, Num, _ArmStatistic, _ArmStatistics, _BaseRNG
 
 
 class _Softmax(BaseMAB):
 
+    # Dictionaries of arms to statistics, created from the arrays of statistics on access
+    arm_to_sum = _ArmStatistic("sum")
+    arm_to_count = _ArmStatistic("count")
+    arm_to_mean = _ArmStatistic("mean")
+    arm_to_exponent = _ArmStatistic("exponent")
+    arm_to_expectation = _ArmStatistic("expectation")
+
+    # Statistics are changed by fit and warm start together with the status of arms
+    _fit_attributes = BaseMAB._fit_attributes + ("statistics",)
+
     def __init__(self, rng: _BaseRNG, arms: List[Arm], n_jobs: int, backend: Optional[str],
                  tau: Optional[Union[int, float]] = 1):
 
+        # Statistics of arms are stored in arrays, created before the base policy sets the expectations
+        self.statistics = _ArmStatistics(arms, {"sum": 0, "count": 0, "mean": 0, "exponent": 0, "expectation": 0})
+
         super().__init__(rng, arms, n_jobs, backend)
         self.tau = tau
 
-        self.arm_to_sum = dict.fromkeys(self.arms, 0)
-        self.arm_to_count = dict.fromkeys(self.arms, 0)
-        self.arm_to_mean = dict.fromkeys(self.arms, 0)
-        self.arm_to_exponent = dict.fromkeys(self.arms, 0)
-
     def fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
 
         # Reset the sum, count, and expectations to zero
-        reset(self.arm_to_sum, 0)
-        reset(self.arm_to_count, 0)
-        reset(self.arm_to_mean, 0)
+        self.statistics.reset("sum", "count", "mean")
 
         # Reset warm started arms
         self.cold_arm_to_warm_arm = dict()
@@ -48,78 +52,87 @@ class _Softmax(BaseMAB):
     def predict(self, contexts: Optional[np.ndarray] = None) -> Union[Arm, List[Arm]]:
 
         # Return the arm with maximum expectation
-        expectations = self.predict_expectations(contexts)
-        if isinstance(expectations, dict):
-            return argmax(expectations)
-        else:
-            return [argmax(exp) for exp in expectations]
+        predictions = self.statistics.argmax(self._get_expectations(contexts))
+        return predictions[0] if len(predictions) == 1 else predictions
 
     def predict_expectations(self, contexts: Optional[np.ndarray] = None) -> Union[Dict[Arm, Num],
                                                                                    List[Dict[Arm, Num]]]:
 
+        # Return a copy of expectations dictionary from arms (key) to expectations (values) for each context
+        expectations = self.statistics.to_dicts(self._get_expectations(contexts))
+        return expectations[0] if len(expectations) == 1 else expectations
+
+    def predict_indices(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return the index of the arm with maximum expectation for each context
+        return np.argmax(self._get_expectations(contexts), axis=1)
+
+    def predict_expectations_matrix(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return a copy of the expectations of arms for each context
+        return np.array(self._get_expectations(contexts))
+
+    def _get_expectations(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
         # Return a random value between 0 and 1 for each arm that is "proportional" to the
         # expectation of the arm and sums to 1 by sampling from a Dirichlet distribution.
         # The Dirichlet distribution can be seen as a multivariate generalization of the Beta distribution.
         # Add a very small epsilon to ensure each of the expectations is positive.
         size = 1 if contexts is None else len(contexts)
-        alpha = [v + np.finfo(float).eps for v in self.arm_to_expectation.values()]
-        dirichlet_random_values = self.rng.dirichlet(alpha, size)
-        expectations = [dict(zip(self.arm_to_expectation.keys(), exp)).copy() for exp in dirichlet_random_values]
-        if size == 1:
-            return expectations[0]
-        else:
-            return expectations
+        alpha = self.statistics.get("expectation") + np.finfo(float).eps
+        return self.rng.dirichlet(alpha, size)
 
     def _copy_arms(self, cold_arm_to_warm_arm):
-        for cold_arm, warm_arm in cold_arm_to_warm_arm.items():
-            self.arm_to_sum[cold_arm] = deepcopy(self.arm_to_sum[warm_arm])
-            self.arm_to_count[cold_arm] = deepcopy(self.arm_to_count[warm_arm])
-            self.arm_to_mean[cold_arm] = deepcopy(self.arm_to_mean[warm_arm])
+        self.statistics.copy_arms(cold_arm_to_warm_arm, ["sum", "count", "mean"])
         self._expectation_operation()
 
     def _expectation_operation(self):
 
         # Scaling range
-        max_mean = max(self.arm_to_mean.values())
+        means = self.statistics.get("mean")
+        max_mean = means.max()
 
         # Scale the means and calculate the natural exponents --decrement max to avoid overflow from np.exp(x)
         # Reference: https://stackoverflow.com/questions/42599498/numercially-stable-softmax
-        for arm in self.arm_to_exponent:
-            self.arm_to_exponent[arm] = math.exp((self.arm_to_mean[arm] - max_mean) / self.tau)
-
-        # Total exponent sum
-        total_exponent = sum(self.arm_to_exponent.values())
+        exponents = np.exp((means - max_mean) / self.tau)
+        self.statistics.set("exponent", exponents)
 
         # Expectation as the ratio over total exponent
-        for arm in self.arm_to_expectation:
-            self.arm_to_expectation[arm] = self.arm_to_exponent[arm] / total_exponent
+        self.statistics.set("expectation", exponents / exponents.sum())
 
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
 
-        arm_rewards = rewards[decisions == arm]
-        if arm_rewards.size:
-            self.arm_to_sum[arm] += arm_rewards.sum()
-            self.arm_to_count[arm] += arm_rewards.size
-            self.arm_to_mean[arm] = self.arm_to_sum[arm] / self.arm_to_count[arm]
+        if rewards.size:
+            index = self.statistics.arm_to_index[arm]
+            arm_sum, arm_count = self.statistics.arrays["sum"], self.statistics.arrays["count"]
+            arm_sum[index] += rewards.sum()
+            arm_count[index] += rewards.size
+            self.statistics.arrays["mean"][index] = arm_sum[index] / arm_count[index]
 
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
         pass
 
     def _uptake_new_arm(self, arm: Arm, binarizer: Callable = None, scaler: Callable = None):
-        self.arm_to_sum[arm] = 0
-        self.arm_to_count[arm] = 0
-        self.arm_to_mean[arm] = 0
-        self.arm_to_exponent[arm] = 0
+        self.statistics.add(arm)
 
         # Recalculate the expected values
         self._expectation_operation()
 
     def _drop_existing_arm(self, arm: Arm):
-        self.arm_to_sum.pop(arm)
-        self.arm_to_count.pop(arm)
-        self.arm_to_mean.pop(arm)
-        self.arm_to_exponent.pop(arm)
+        self.statistics.remove(arm)
 
         # Recalculate the expected values
         self._expectation_operation()
+
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
+        self.statistics.add_arms(arms)
+
+        # Recalculate the expected values once for all arms
+        self._expectation_operation()
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        self.statistics.remove_arms(arms)
+
+        # Recalculate the expected values once for all arms
+        self._expectation_operation()
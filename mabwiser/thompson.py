@@ -1,26 +1,35 @@
 # -*- coding: utf-8 -*-
 # SPDX-License-Identifier: Apache-2.0
 
-from copy import deepcopy
 from typing import Callable, Dict, List, NoReturn, Optional, Union
 
 import numpy as np
 
 from mabwiser.base_mab import BaseMAB
-from mabwiser.utils import Arm, Num, reset, argmax, _BaseRNG
+from mabwiser.utils import Arm, Num, _ArmStatistic, _ArmStatistics, _BaseRNG
 
 
 class _ThompsonSampling(BaseMAB):
 
+    # Dictionaries of arms to statistics, created from the arrays of statistics on access
+    arm_to_success_count = _ArmStatistic("success_count")
+    arm_to_fail_count = _ArmStatistic("fail_count")
+    arm_to_expectation = _ArmStatistic("expectation")
+
+    # Statistics are changed by fit and warm start together with the status of arms
+    _fit_attributes = BaseMAB._fit_attributes + ("statistics",)
+
     def __init__(self, rng: _BaseRNG, arms: List[Arm], n_jobs: int, backend: Optional[str],
                  binarizer: Optional[Callable] = None):
+
+        # Statistics of arms are stored in arrays, created before the base policy sets the expectations
+        self.statistics = _ArmStatistics(arms, {"success_count": 1, "fail_count": 1, "expectation": 0})
+
         super().__init__(rng, arms, n_jobs, backend)
         self.binarizer = binarizer
 
         # Track whether the rewards have been binarized already by a context policy external
         self.is_contextual_binarized = False
-        self.arm_to_success_count = dict.fromkeys(self.arms, 1)
-        self.arm_to_fail_count = dict.fromkeys(self.arms, 1)
 
     def fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
 
@@ -28,8 +37,7 @@ class _ThompsonSampling(BaseMAB):
         rewards = self._get_binary_rewards(decisions, rewards)
 
         # Reset the success and failure counters to 1 (beta distribution is undefined for 0)
-        reset(self.arm_to_success_count, 1)
-        reset(self.arm_to_fail_count, 1)
+        self.statistics.reset("success_count", "fail_count")
 
         # Reset warm started arms
         self.cold_arm_to_warm_arm = dict()
@@ -51,40 +59,52 @@ class _ThompsonSampling(BaseMAB):
     def predict(self, contexts: Optional[np.ndarray] = None) -> Union[Arm, List[Arm]]:
 
         # Return the arm with maximum expectation
-        expectations = self.predict_expectations(contexts)
-        if isinstance(expectations, dict):
-            return argmax(expectations)
-        else:
-            return [argmax(exp) for exp in expectations]
+        predictions = self.statistics.argmax(self._get_expectations(contexts))
+        return predictions[0] if len(predictions) == 1 else predictions
 
     def predict_expectations(self, contexts: Optional[np.ndarray] = None) -> Union[Dict[Arm, Num],
                                                                                    List[Dict[Arm, Num]]]:
 
+        # Return a copy of expectations dictionary from arms (key) to expectations (values) for each context
+        expectations = self.statistics.to_dicts(self._get_expectations(contexts))
+        return expectations[0] if len(expectations) == 1 else expectations
+
+    def predict_indices(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return the index of the arm with maximum expectation for each context
+        return np.argmax(self._get_expectations(contexts), axis=1)
+
+    def predict_expectations_matrix(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return a copy of the expectations of arms for each context
+        return np.array(self._get_expectations(contexts))
+
+    def _get_expectations(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
         # Expectation of each arm is a random sample from beta distribution with success and fail counters.
-        # If contexts is None or has length of 1 generate single arm to expectations,
-        # otherwise use vectorized functions to generate a list of arm to expectations with same length as contexts.
+        # If contexts is None or has length of 1 generate a single row of expectations of arms,
+        # otherwise generate a row for each context.
+        # Samples of all arms are drawn in a single broadcasted call, arm by arm as in separate calls for each arm,
+        # so that the same seed yields the same expectations
         size = 1 if contexts is None else len(contexts)
-        arm_to_random_beta = dict()
-        for arm in self.arm_to_expectation:
-            arm_to_random_beta[arm] = self.rng.beta(self.arm_to_success_count[arm], self.arm_to_fail_count[arm], size)
-        arm_to_expectation = [{arm: arm_to_random_beta[arm][i] for arm in self.arms} for i in range(size)]
-        self.arm_to_expectation = arm_to_expectation[-1]
-        if size == 1:
-            return arm_to_expectation[0]
-        else:
-            return arm_to_expectation
+        success_counts, fail_counts = self.statistics.get("success_count"), self.statistics.get("fail_count")
+        expectations = self.rng.beta(success_counts[:, np.newaxis], fail_counts[:, np.newaxis],
+                                     (len(success_counts), size)).T
+
+        # Keep the expectations of the last context
+        self.statistics.set("expectation", expectations[-1])
+
+        return expectations
 
     def _copy_arms(self, cold_arm_to_warm_arm):
-        for cold_arm, warm_arm in cold_arm_to_warm_arm.items():
-            self.arm_to_success_count[cold_arm] = deepcopy(self.arm_to_success_count[warm_arm])
-            self.arm_to_fail_count[cold_arm] = deepcopy(self.arm_to_fail_count[warm_arm])
+        self.statistics.copy_arms(cold_arm_to_warm_arm, ["success_count", "fail_count"])
 
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
 
-        arm_rewards = rewards[decisions == arm]
-        count_of_ones = arm_rewards.sum()
-        self.arm_to_success_count[arm] += count_of_ones
-        self.arm_to_fail_count[arm] += len(arm_rewards) - count_of_ones
+        count_of_ones = rewards.sum()
+        index = self.statistics.arm_to_index[arm]
+        self.statistics.arrays["success_count"][index] += count_of_ones
+        self.statistics.arrays["fail_count"][index] += len(rewards) - count_of_ones
 
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
@@ -104,9 +124,17 @@ class _ThompsonSampling(BaseMAB):
         # Don't override the existing binarizer unless a new one is given
         if binarizer:
             self.binarizer = binarizer
-        self.arm_to_success_count[arm] = 1
-        self.arm_to_fail_count[arm] = 1
+        self.statistics.add(arm)
 
     def _drop_existing_arm(self, arm: Arm):
-        self.arm_to_success_count.pop(arm)
-        self.arm_to_fail_count.pop(arm)
+        self.statistics.remove(arm)
+
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
+
+        # Don't override the existing binarizer unless a new one is given
+        if binarizer:
+            self.binarizer = binarizer
+        self.statistics.add_arms(arms)
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        self.statistics.remove_arms(arms)
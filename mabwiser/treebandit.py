@@ -7,7 +7,6 @@ from functools import partial
 from typing import Union, Dict, List, NoReturn, Optional, Callable
 
 import numpy as np
-from sklearn.tree import DecisionTreeRegressor
 
 from mabwiser.base_mab import BaseMAB
 from mabwiser.greedy import _EpsilonGreedy
@@ -17,7 +16,7 @@ from mabwiser.rand import _Random
 from mabwiser.softmax import _Softmax
 from mabwiser.thompson import _ThompsonSampling
 from mabwiser.ucb import _UCB1
-from mabwiser.utils import argmax, Arm, Num, _BaseRNG, create_rng
+from mabwiser.utils import Arm, Num, _BaseRNG, _RowRNG
 
 
 class _TreeBandit(BaseMAB):
@@ -26,17 +25,18 @@ class _TreeBandit(BaseMAB):
                  tree_parameters: Dict):
         super().__init__(rng, arms, n_jobs, backend)
         self.lp = lp
+        self.lp._arm_index = self._arm_index
         self.tree_parameters = tree_parameters
         self.tree_parameters["random_state"] = rng.seed
 
         # Reset the decision tree and rewards of each arm
-        self.arm_to_tree = {arm: DecisionTreeRegressor(**self.tree_parameters) for arm in self.arms}
+        self.arm_to_tree = {arm: self._create_tree() for arm in self.arms}
         self.arm_to_leaf_to_rewards = {arm: defaultdict(partial(np.ndarray, 0)) for arm in self.arms}
 
     def fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
 
         # Reset the decision tree and rewards of each arm
-        self.arm_to_tree = {arm: DecisionTreeRegressor(**self.tree_parameters) for arm in self.arms}
+        self.arm_to_tree = {arm: self._create_tree() for arm in self.arms}
         self.arm_to_leaf_to_rewards = {arm: defaultdict(partial(np.ndarray, 0)) for arm in self.arms}
 
         # Reset warm started arms
@@ -70,6 +70,14 @@ class _TreeBandit(BaseMAB):
 
         return self._parallel_predict(contexts, is_predict=False)
 
+    def predict_indices(self, contexts: np.ndarray = None) -> np.ndarray:
+
+        return self._parallel_predict(contexts, is_predict=True, as_array=True)
+
+    def predict_expectations_matrix(self, contexts: np.ndarray = None) -> np.ndarray:
+
+        return self._parallel_predict(contexts, is_predict=False, as_array=True)
+
     def _copy_arms(self, cold_arm_to_warm_arm):
         for cold_arm, warm_arm in cold_arm_to_warm_arm.items():
             self.arm_to_tree[cold_arm] = deepcopy(self.arm_to_tree[warm_arm])
@@ -78,22 +86,18 @@ class _TreeBandit(BaseMAB):
 
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
 
-        # Create dataset for the given arm
-        arm_contexts = contexts[decisions == arm]
-        arm_rewards = rewards[decisions == arm]
-
         # Check that the dataset for the given arm is not empty
-        if arm_contexts.size != 0:
+        if contexts.size != 0:
 
             # If the arm is unfitted, train decision tree on arm dataset
             if len(self.arm_to_leaf_to_rewards[arm]) == 0:
-                self.arm_to_tree[arm].fit(arm_contexts, arm_rewards)
+                self.arm_to_tree[arm].fit(contexts, rewards)
 
             # For each leaf, keep a list of rewards
             # DecisionTreeClassifier's apply() method returns the indices of the nodes in the tree
             # that the specified contexts lead to. Therefore, the indices returned are not necessarily
             # consecutive/follow numerical order, but are always representative of leaf nodes.
-            leaf_indices = self.arm_to_tree[arm].apply(arm_contexts)
+            leaf_indices = self.arm_to_tree[arm].apply(contexts)
 
             # Use set() to create a list of unique indices
             # These indices represent the leaves reached via the given contexts
@@ -101,7 +105,7 @@ class _TreeBandit(BaseMAB):
 
             for index in unique_leaf_indices:
                 # Get rewards list for each leaf
-                rewards_to_add = arm_rewards[leaf_indices == index]
+                rewards_to_add = rewards[leaf_indices == index]
 
                 # Add rewards
                 # NB: No need to check if index key in arm_to_rewards dict
@@ -112,57 +116,78 @@ class _TreeBandit(BaseMAB):
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
 
-        # Get local copy of arm_to_tree, arm_to_expectation, arm_to_rewards, and arms
-        # to minimize communication overhead between arms (processes) using shared objects
-        arm_to_tree = deepcopy(self.arm_to_tree)
-        arm_to_rewards = deepcopy(self.arm_to_leaf_to_rewards)
-        arm_to_expectation = deepcopy(self.arm_to_expectation)
-        arms = deepcopy(self.arms)
+        # Return list of predictions
+        return self._get_predictions(self._predict_contexts_array(contexts, is_predict, seeds, start_index),
+                                     is_predict)
+
+    def _predict_contexts_array(self, contexts: np.ndarray, is_predict: bool,
+                                seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> np.ndarray:
+
+        arms = self.arms
+
+        # Arms without prior data keep their expectations for all rows, (n_contexts x n_arms)
+        expectations = np.tile(np.array([self.arm_to_expectation[arm] for arm in arms], dtype=float),
+                               (len(contexts), 1))
 
-        # Create an empty list of predictions
-        predictions = [None] * len(contexts)
-        for index, row in enumerate(contexts):
-            # Each row needs a separately seeded rng for reproducibility in parallel
-            rng = create_rng(seed=seeds[index])
+        # Get the leaf index of each context in the tree of each arm with prior data at once
+        # Trees and rewards are only read, so they are used without copies
+        arm_to_leaf_indices = dict((arm, self.arm_to_tree[arm].apply(contexts)) for arm in arms
+                                   if self.arm_to_leaf_to_rewards[arm])
 
-            for arm in arms:
+        # Leaf lps fit on the rewards of each leaf, shared by the contexts that reach the same leaf
+        arm_leaf_to_lp = dict()
 
-                # Copy the row rng to the deep copied model in arm_to_tree
-                arm_to_tree[arm].rng = rng
+        # Create an empty array of predictions
+        predictions = np.empty(len(contexts), dtype=np.intp)
+        row_rng = _RowRNG()
+        for index in range(len(contexts)):
+
+            # Each row needs a separately seeded stream for reproducibility in parallel
+            rng = row_rng.reseed(seeds[index])
+
+            for arm_index, arm in enumerate(arms):
 
                 # If there was prior data for this arm, get expectation for arm
-                if arm_to_rewards[arm]:
+                if arm in arm_to_leaf_indices:
                     # Get leaf index for that context
-                    leaf_index = arm_to_tree[arm].apply([row])[0]
+                    leaf_index = arm_to_leaf_indices[arm][index]
 
-                    # Get the rewards list of that leaf
-                    leaf_rewards = arm_to_rewards[arm][leaf_index]
+                    leaf_lp = arm_leaf_to_lp.get((arm, leaf_index))
+                    if leaf_lp is None:
+                        # Get the rewards list of that leaf
+                        leaf_rewards = self.arm_to_leaf_to_rewards[arm].get(leaf_index, np.ndarray(0))
 
-                    # Create leaf lp
-                    leaf_lp = self._create_leaf_lp(arm)
+                        # Create leaf lp
+                        leaf_lp = self._create_leaf_lp(arm)
 
-                    # Leaf LP: fit the same arm decision with the leaf rewards
-                    leaf_lp.fit(np.asarray([arm] * len(leaf_rewards)), leaf_rewards)
+                        # Leaf LP: fit the same arm decision with the leaf rewards
+                        leaf_codes = np.full(len(leaf_rewards), self._arm_index.arm_to_code[arm], dtype=np.int32)
+                        leaf_lp._fit_codes(leaf_lp.fit, np.asarray([arm] * len(leaf_rewards)), leaf_codes,
+                                           leaf_rewards)
+                        arm_leaf_to_lp[(arm, leaf_index)] = leaf_lp
 
-                    # Leaf LP: predict expectation
-                    arm_to_expectation[arm] = leaf_lp.predict_expectations()[arm]
+                    # Leaf LP: predict expectation with the stream of the row
+                    leaf_lp.rng = rng
+                    expectations[index, arm_index] = leaf_lp.predict_expectations_matrix()[0, 0]
 
             if is_predict:
                 # Return a random arm with less than epsilon probability
-                if isinstance(self.lp, _EpsilonGreedy) and self.rng.rand() < self.lp.epsilon:
-                    predictions[index] = self.arms[self.rng.randint(0, len(self.arms))]
+                if isinstance(self.lp, _EpsilonGreedy) and rng.rand() < self.lp.epsilon:
+                    predictions[index] = rng.randint(0, len(arms))
                 else:
-                    predictions[index] = argmax(arm_to_expectation)
-            else:
-                predictions[index] = arm_to_expectation.copy()
+                    predictions[index] = np.argmax(expectations[index])
 
-        # Return list of predictions
-        return predictions
+        # Return the indices of the arms or the expectations
+        return predictions if is_predict else expectations
+
+    def _create_tree(self):
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(**self.tree_parameters)
 
     def _uptake_new_arm(self, arm: Arm, binarizer: Callable = None, scaler: Callable = None):
 
         self.lp.add_arm(arm, binarizer)
-        self.arm_to_tree[arm] = DecisionTreeRegressor(**self.tree_parameters)
+        self.arm_to_tree[arm] = self._create_tree()
         self.arm_to_leaf_to_rewards[arm] = defaultdict(partial(np.ndarray, 0))
 
     def _drop_existing_arm(self, arm: Arm):
@@ -170,6 +195,19 @@ class _TreeBandit(BaseMAB):
         self.arm_to_tree.pop(arm)
         self.arm_to_leaf_to_rewards.pop(arm)
 
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
+
+        self.lp.add_arms(arms, binarizer)
+        for arm in arms:
+            self.arm_to_tree[arm] = self._create_tree()
+            self.arm_to_leaf_to_rewards[arm] = defaultdict(partial(np.ndarray, 0))
+
+    def _drop_existing_arms(self, arms: List[Arm]):
+        self.lp.remove_arms(arms)
+        for arm in arms:
+            self.arm_to_tree.pop(arm)
+            self.arm_to_leaf_to_rewards.pop(arm)
+
     def _create_leaf_lp(self, arm: Arm):
 
         # Create a new learning policy object for each leaf
@@ -183,4 +221,7 @@ class _TreeBandit(BaseMAB):
         else:
             raise ValueError("Incompatible leaf lp for TreeBandit: ", self.lp)
 
+        # Share the arm index, so that leaves are fit with the code of the arm
+        leaf_lp._arm_index = self._arm_index
+
         return leaf_lp
@@ -2,34 +2,40 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import math
-from copy import deepcopy
 from typing import Callable, Dict, List, NoReturn, Optional, Union
 
 import numpy as np
 
 from mabwiser.base_mab import BaseMAB
-from mabwiser.utils import argmax, reset, Arm, Num, _BaseRNG
+from mabwiser.utils import Arm, Num, _ArmStatistic, _ArmStatistics, _BaseRNG
 
 
 class _UCB1(BaseMAB):
 
+    # Dictionaries of arms to statistics, created from the arrays of statistics on access
+    arm_to_sum = _ArmStatistic("sum")
+    arm_to_count = _ArmStatistic("count")
+    arm_to_mean = _ArmStatistic("mean")
+    arm_to_expectation = _ArmStatistic("expectation")
+
+    # Statistics are changed by fit and warm start together with the status of arms
+    _fit_attributes = BaseMAB._fit_attributes + ("statistics", "total_count")
+
     def __init__(self, rng: _BaseRNG, arms: List[Arm], n_jobs: int, backend: Optional[str],
                  alpha: Optional[Num] = 0.05):
+
+        # Statistics of arms are stored in arrays, created before the base policy sets the expectations
+        self.statistics = _ArmStatistics(arms, {"sum": 0, "count": 0, "mean": 0, "expectation": 0})
+
         super().__init__(rng, arms, n_jobs, backend)
         self.alpha = alpha
 
         self.total_count = 0
-        self.arm_to_sum = dict.fromkeys(self.arms, 0)
-        self.arm_to_count = dict.fromkeys(self.arms, 0)
-        self.arm_to_mean = dict.fromkeys(self.arms, 0)
 
     def fit(self, decisions: np.ndarray, rewards: np.ndarray, contexts: np.ndarray = None) -> NoReturn:
 
         # Reset the sum, count, and expectations to zero
-        reset(self.arm_to_sum, 0)
-        reset(self.arm_to_count, 0)
-        reset(self.arm_to_mean, 0)
-        reset(self.arm_to_expectation, 0)
+        self.statistics.reset("sum", "count", "mean", "expectation")
 
         # Reset warm started arms
         self.cold_arm_to_warm_arm = dict()
@@ -51,41 +57,51 @@ class _UCB1(BaseMAB):
 
     def predict(self, contexts: Optional[np.ndarray] = None) -> Union[Arm, List[Arm]]:
 
-        # Return the arm with maximum expectation
-        expectations = self.predict_expectations(contexts)
-        if isinstance(expectations, dict):
-            return argmax(expectations)
+        # Return the arm with maximum expectation, which is the same for all contexts
+        arm = self.statistics.argmax(self.statistics.get("expectation")[np.newaxis])[0]
+        if contexts is None or len(contexts) == 1:
+            return arm
         else:
-            return [argmax(exp) for exp in expectations]
+            return [arm] * len(contexts)
 
     def predict_expectations(self, contexts: Optional[np.ndarray] = None) -> Union[Dict[Arm, Num],
                                                                                    List[Dict[Arm, Num]]]:
 
         # Return a copy of expectations dictionary from arms (key) to expectations (values)
+        arm_to_expectation = self.arm_to_expectation
         if contexts is None or len(contexts) == 1:
-            return self.arm_to_expectation.copy()
+            return arm_to_expectation
         else:
-            return [self.arm_to_expectation.copy() for _ in range(len(contexts))]
+            return [arm_to_expectation.copy() for _ in range(len(contexts))]
+
+    def predict_indices(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return the index of the arm with maximum expectation, which is the same for all contexts
+        size = 1 if contexts is None else len(contexts)
+        return np.full(size, np.argmax(self.statistics.get("expectation")), dtype=np.intp)
+
+    def predict_expectations_matrix(self, contexts: Optional[np.ndarray] = None) -> np.ndarray:
+
+        # Return a row of expectations of arms for each context
+        size = 1 if contexts is None else len(contexts)
+        return np.tile(self.statistics.get("expectation"), (size, 1))
 
     def _copy_arms(self, cold_arm_to_warm_arm):
-        for cold_arm, warm_arm in cold_arm_to_warm_arm.items():
-            self.arm_to_sum[cold_arm] = deepcopy(self.arm_to_sum[warm_arm])
-            self.arm_to_count[cold_arm] = deepcopy(self.arm_to_count[warm_arm])
-            self.arm_to_mean[cold_arm] = deepcopy(self.arm_to_mean[warm_arm])
-            self.arm_to_expectation[cold_arm] = deepcopy(self.arm_to_expectation[warm_arm])
+        self.statistics.copy_arms(cold_arm_to_warm_arm, ["sum", "count", "mean", "expectation"])
 
     def _fit_arm(self, arm: Arm, decisions: np.ndarray, rewards: np.ndarray, contexts: Optional[np.ndarray] = None):
 
         # Fit individual arm
-        arm_rewards = rewards[decisions == arm]
-        if arm_rewards.size:
-            self.arm_to_sum[arm] += arm_rewards.sum()
-            self.arm_to_count[arm] += arm_rewards.size
-            self.arm_to_mean[arm] = self.arm_to_sum[arm] / self.arm_to_count[arm]
+        index = self.statistics.arm_to_index[arm]
+        arm_sum, arm_count, arm_mean = (self.statistics.arrays[name] for name in ("sum", "count", "mean"))
+        if rewards.size:
+            arm_sum[index] += rewards.sum()
+            arm_count[index] += rewards.size
+            arm_mean[index] = arm_sum[index] / arm_count[index]
 
-        if self.arm_to_count[arm]:
-            self.arm_to_expectation[arm] = _UCB1._get_ucb(self.arm_to_mean[arm], self.alpha,
-                                                          self.total_count, self.arm_to_count[arm])
+        if arm_count[index]:
+            self.statistics.arrays["expectation"][index] = _UCB1._get_ucb(arm_mean[index], self.alpha,
+                                                                          self.total_count, arm_count[index])
 
     def _predict_contexts(self, contexts: np.ndarray, is_predict: bool,
                           seeds: Optional[np.ndarray] = None, start_index: Optional[int] = None) -> List:
@@ -98,11 +114,13 @@ class _UCB1(BaseMAB):
         return arm_mean + alpha * math.sqrt((2 * math.log(total_count)) / arm_count)
 
     def _uptake_new_arm(self, arm: Arm, binarizer: Callable = None, scaler: Callable = None):
-        self.arm_to_sum[arm] = 0
-        self.arm_to_count[arm] = 0
-        self.arm_to_mean[arm] = 0
+        self.statistics.add(arm)
 
     def _drop_existing_arm(self, arm: Arm):
-        self.arm_to_sum.pop(arm)
-        self.arm_to_count.pop(arm)
-        self.arm_to_mean.pop(arm)
+        self.statistics.remove(arm)
+
+    def _uptake_new_arms(self, arms: List[Arm], binarizer: Callable = None):
+        self.statistics.add_arms(arms)
+
+    def _drop_existing_arms(self, arms: List[Arm]) -> NoReturn:
+        self.statistics.remove_arms(arms)
@@ -6,7 +6,21 @@ This module provides a number of constants and helper functions.
 """
 
 import abc
-from typing import Dict, Union, Iterable, NamedTuple, Tuple, NewType, NoReturn, List
+import atexit
+import gc
+import importlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import uuid
+import warnings
+import weakref
+from collections import OrderedDict, defaultdict
+from functools import partial
+from itertools import repeat
+from typing import Callable, Dict, Union, Iterable, NamedTuple, Tuple, NewType, NoReturn, List, Optional
 
 import numpy as np
 
@@ -61,6 +75,24 @@ def check_true(expression: bool, exception: Exception) -> NoReturn:
         raise exception
 
 
+def is_pandas(obj, *names: str) -> bool:
+    """
+    Checks whether the given object is an instance of the given pandas classes, such as ``"Series"``.
+    Pandas is not imported for the check, an object cannot be a pandas object unless pandas was imported.
+    """
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(obj, tuple(getattr(pd, name) for name in names))
+
+
+def is_sparse(obj) -> bool:
+    """
+    Checks whether the given object is a scipy sparse matrix.
+    Scipy is not imported for the check, an object cannot be a sparse matrix unless scipy.sparse was imported.
+    """
+    sparse = sys.modules.get("scipy.sparse")
+    return sparse is not None and sparse.issparse(obj)
+
+
 def reset(dictionary: Dict, value) -> NoReturn:
     """
     Maps every key to the given value.
@@ -68,6 +100,253 @@ def reset(dictionary: Dict, value) -> NoReturn:
     dictionary.update({}.fromkeys(dictionary, value))
 
 
+class _ArmStatistics:
+    """
+    Statistics of arms stored in arrays with one position for each arm.
+
+    Each arm is registered at a position in the arrays. New arms are appended, and the arrays double their
+    capacity when full so that adding arms is amortized. The position of a removed arm is filled by moving
+    the last arm into it. Arms keep the order in which they were added, as in dictionaries,
+    which is the order of the values returned by get.
+    """
+
+    def __init__(self, arms: List[Arm], name_to_default: Dict[str, Num]):
+        self.name_to_default = name_to_default                  # Value of each statistic for new arms
+        self.arm_to_index: Dict[Arm, int] = dict()              # Position of each arm, in the order arms are added
+        self.index_to_arm: List[Arm] = list()                   # Arm at each position in use
+        self.arrays: Dict[str, np.ndarray] = dict((name, np.zeros(max(1, len(arms))))
+                                                  for name in name_to_default)
+
+        # Arms and their positions in order, cached until arms change
+        self._arms = None
+        self._order = None
+        self._is_order_valid = False
+
+        self.add_arms(arms)
+
+    def __len__(self) -> int:
+        return len(self.index_to_arm)
+
+    def __contains__(self, arm: Arm) -> bool:
+        return arm in self.arm_to_index
+
+    @property
+    def capacity(self) -> int:
+        return len(self.arrays[next(iter(self.arrays))])
+
+    @property
+    def arms(self) -> List[Arm]:
+        if self._arms is None:
+            self._arms = list(self.arm_to_index)
+        return self._arms
+
+    @property
+    def order(self) -> Optional[np.ndarray]:
+
+        # Positions of arms in order, None when arms are stored in order so that arrays are used without copying
+        if not self._is_order_valid:
+            order = np.fromiter(self.arm_to_index.values(), dtype=np.intp, count=len(self.arm_to_index))
+            self._order = None if np.array_equal(order, np.arange(len(order))) else order
+            self._is_order_valid = True
+        return self._order
+
+    def add(self, arm: Arm) -> NoReturn:
+        self.add_arms([arm])
+
+    def add_arms(self, arms: List[Arm]) -> NoReturn:
+
+        # New arms are appended to the end, growing the arrays once when they are full
+        new_arms = [arm for arm in dict.fromkeys(arms) if arm not in self.arm_to_index]
+        if new_arms:
+            capacity = self.capacity
+            while len(self.index_to_arm) + len(new_arms) > capacity:
+                capacity *= 2
+            if capacity > self.capacity:
+                self._resize(capacity)
+            self.arm_to_index.update(zip(new_arms, range(len(self.index_to_arm),
+                                                         len(self.index_to_arm) + len(new_arms))))
+            self.index_to_arm.extend(new_arms)
+            self._invalidate()
+
+        # Set the statistics of the arms to their defaults
+        indices = [self.arm_to_index[arm] for arm in arms]
+        for name, default in self.name_to_default.items():
+            self.arrays[name][indices] = default
+
+    def remove(self, arm: Arm) -> NoReturn:
+        self.remove_arms([arm])
+
+    def remove_arms(self, arms: List[Arm]) -> NoReturn:
+
+        indices = [self.arm_to_index.pop(arm) for arm in dict.fromkeys(arms) if arm in self.arm_to_index]
+        if not indices:
+            return
+
+        # Move the last arms into the positions of the removed arms
+        size = len(self.index_to_arm) - len(indices)
+        is_removed = np.zeros(len(self.index_to_arm), dtype=bool)
+        is_removed[indices] = True
+        holes = np.flatnonzero(is_removed[:size])
+        last = size + np.flatnonzero(~is_removed[size:])
+        for array in self.arrays.values():
+            array[holes] = array[last]
+        for index, last_index in zip(holes.tolist(), last.tolist()):
+            self.arm_to_index[self.index_to_arm[last_index]] = index
+            self.index_to_arm[index] = self.index_to_arm[last_index]
+        del self.index_to_arm[size:]
+        self._invalidate()
+
+        # Shrink the arrays when they are mostly empty
+        capacity = self.capacity
+        while capacity > 1 and len(self.index_to_arm) <= capacity // 4:
+            capacity //= 2
+        if capacity < self.capacity:
+            self._resize(capacity)
+
+    def reset(self, *names: str) -> NoReturn:
+
+        # Set the given statistics of all arms to their defaults
+        for name in names:
+            self.arrays[name][:] = self.name_to_default[name]
+
+    def get(self, name: str) -> np.ndarray:
+
+        # Return the statistic of arms in order, without copying when arms are stored in order
+        values = self.arrays[name][:len(self.index_to_arm)]
+        return values if self.order is None else values[self.order]
+
+    def set(self, name: str, values: np.ndarray) -> NoReturn:
+
+        # Set the statistic of arms in order
+        if self.order is None:
+            self.arrays[name][:len(self.index_to_arm)] = values
+        else:
+            self.arrays[name][self.order] = values
+
+    def copy_arms(self, cold_arm_to_warm_arm: Dict[Arm, Arm], names: Iterable[str]) -> NoReturn:
+
+        # Copy the given statistics of warm arms to cold arms
+        cold_indices = [self.arm_to_index[arm] for arm in cold_arm_to_warm_arm.keys()]
+        warm_indices = [self.arm_to_index[arm] for arm in cold_arm_to_warm_arm.values()]
+        for name in names:
+            self.arrays[name][cold_indices] = self.arrays[name][warm_indices]
+
+    def to_dict(self, name: str) -> Dict[Arm, Num]:
+        return dict(zip(self.arms, self.get(name).tolist()))
+
+    def update(self, name: str, arm_to_value: Dict[Arm, Num]) -> NoReturn:
+        for arm, value in arm_to_value.items():
+            self.arrays[name][self.arm_to_index[arm]] = value
+
+    def argmax(self, expectations: np.ndarray) -> List[Arm]:
+
+        # Return the first arm with the maximum expectation for each row of expectations of arms in order
+        arms = self.arms
+        return [arms[index] for index in np.argmax(expectations, axis=1)]
+
+    def to_dicts(self, expectations: np.ndarray) -> List[Dict[Arm, Num]]:
+
+        # Return a dictionary of arms to expectations for each row of expectations of arms in order
+        arms = self.arms
+        return [dict(zip(arms, row)) for row in expectations.tolist()]
+
+    def _invalidate(self) -> NoReturn:
+        self._arms = None
+        self._order = None
+        self._is_order_valid = False
+
+    def _resize(self, capacity: int) -> NoReturn:
+
+        # Copy the positions in use into new arrays with the given capacity
+        size = len(self.index_to_arm)
+        for name, array in self.arrays.items():
+            resized = np.zeros(capacity)
+            resized[:size] = array[:size]
+            self.arrays[name] = resized
+
+
+class _ArmStatistic:
+    """
+    Dictionary of arms to a statistic, created from the arrays of the arm statistics of the bandit on access.
+
+    Provides the dictionaries of the statistics of arms for compatibility,
+    updates to the returned dictionary do not change the statistic.
+    Assigning a dictionary sets the statistic of the arms in the dictionary.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.statistics.to_dict(self.name)
+
+    def __set__(self, instance, arm_to_value: Dict[Arm, Num]):
+        instance.statistics.update(self.name, arm_to_value)
+
+
+class _ArmIndex:
+    """
+    Persistent index of arms to the int32 codes of decisions.
+
+    Codes are assigned to arms in the order they are first seen, as arms of the bandit or in decisions,
+    and are never reused, so that removed and added arms keep their codes.
+    Decisions are grouped and counted by their codes instead of comparing or sorting the arms,
+    which are only decoded from the codes when returned.
+    """
+
+    def __init__(self, arms: List[Arm]):
+        self.arms: List[Arm] = []
+        self.arm_to_code: Dict[Arm, int] = dict()
+        self.add(arms)
+
+    def add(self, arms: Iterable[Arm]) -> NoReturn:
+        for arm in arms:
+            if arm not in self.arm_to_code:
+                self.arm_to_code[arm] = len(self.arms)
+                self.arms.append(arm)
+
+    def encode(self, decisions: np.ndarray) -> np.ndarray:
+        """
+        Returns the code of each decision, arms that are seen for the first time are added to the index.
+        """
+
+        # Numeric decisions are encoded from their sorted distinct values, other arms with hash lookups
+        if decisions.dtype.kind in "biuf":
+            values, inverse = np.unique(decisions, return_inverse=True)
+            values = values.tolist()
+            self.add(values)
+            return np.fromiter(map(self.arm_to_code.__getitem__, values), np.int32, len(values))[inverse.reshape(-1)]
+
+        labels = decisions.tolist()
+        codes = np.fromiter(map(self.arm_to_code.get, labels, repeat(-1, len(labels))), np.int32, len(labels))
+        if len(codes) and codes.min() < 0:
+            self.add(labels[index] for index in np.flatnonzero(codes < 0).tolist())
+            return np.fromiter(map(self.arm_to_code.__getitem__, labels), np.int32, len(labels))
+        return codes
+
+    def get_arms(self, codes: np.ndarray) -> List[Arm]:
+        """
+        Returns the distinct arms of the given codes, in the order of their codes.
+        """
+        arms = self.arms
+        return [arms[code] for code in np.flatnonzero(np.bincount(codes, minlength=0)).tolist()]
+
+    def group(self, codes: np.ndarray) -> Dict[Arm, np.ndarray]:
+        """
+        Returns the indices of the codes of each arm that has at least one code, in increasing order.
+
+        Codes are grouped with a single stable sort of the integer codes and split by their counts.
+        """
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=0)
+        ends = np.cumsum(counts)
+        arms = self.arms
+        return dict((arms[code], order[ends[code] - counts[code]:ends[code]])
+                    for code in np.flatnonzero(counts).tolist())
+
+
 class _BaseRNG(metaclass=abc.ABCMeta):
 
     @abc.abstractmethod
@@ -261,6 +540,35 @@ class _NumpyRNG(_BaseRNG):
         return self.rng.dirichlet(alpha, size)
 
 
+class _RowRNG(_NumpyRNG):
+    """
+    Random number generator of the rows of a prediction.
+
+    The stream of each row is a counter-based Philox stream keyed by the seed of the row,
+    so that moving to the next row sets the key and resets the counter of a single generator,
+    instead of creating a new generator for each row.
+    Each row gets the same stream for the same seed, independent of the rows before it.
+    """
+
+    def __init__(self, seed: int = 0):
+        _BaseRNG.__init__(self, seed)
+
+        # State of the bit generator, with the key of the row and the counter at the start of the stream
+        self._key = np.zeros(2, dtype=np.uint64)
+        self._state = {"bit_generator": "Philox",
+                       "state": {"counter": np.zeros(4, dtype=np.uint64), "key": self._key},
+                       "buffer": np.zeros(4, dtype=np.uint64), "buffer_pos": 4, "has_uint32": 0, "uinteger": 0}
+        self.rng = np.random.Generator(np.random.Philox(key=self._key))
+        self.reseed(seed)
+
+    def reseed(self, seed: int) -> '_RowRNG':
+        """ Start the stream of the row with the given seed and return the generator."""
+        self.seed = seed
+        self._key[0] = seed
+        self.rng.bit_generator.state = self._state
+        return self
+
+
 def create_rng(seed: int) -> _BaseRNG:
     """ Returns an rng object
 
@@ -275,3 +583,643 @@ def create_rng(seed: int) -> _BaseRNG:
             An rng object that implements the base rng class
     """
     return _NumpyRNG(seed)
+
+
+class _SharedArray(np.ndarray):
+    """
+    Read-only array in a memory mapped file, which is pickled by its location in the file instead of its data.
+
+    Processes that unpickle the array attach to the file and map it into memory,
+    so that large arrays are not copied to each process.
+    Arrays computed from a shared array, which are not in the file, are pickled by their data as usual.
+    """
+
+    # Files attached by this process, only the most recent files are kept open
+    _filename_to_buffer: Dict[str, np.memmap] = OrderedDict()
+    _max_buffers = 4
+
+    def __array_finalize__(self, obj):
+        self._buffer = getattr(obj, '_buffer', None)
+
+    def __reduce__(self):
+
+        # Arrays outside of the file, e.g. results of operations on shared arrays, are pickled by their data
+        if self._buffer is None or not np.may_share_memory(self, self._buffer):
+            return np.asarray(self).__reduce__()
+
+        offset = self.__array_interface__['data'][0] - self._buffer.__array_interface__['data'][0]
+        return _SharedArray._attach, (self._buffer.filename, offset, self.shape, self.strides, self.dtype.str)
+
+    @staticmethod
+    def _attach(filename: str, offset: int, shape: Tuple, strides: Tuple, dtype: str) -> np.ndarray:
+
+        # Map each file only once in each process
+        buffer = _SharedArray._filename_to_buffer.get(filename)
+        if buffer is None:
+            buffer = np.memmap(filename, dtype=np.uint8, mode='r')
+            _SharedArray._filename_to_buffer[filename] = buffer
+            while len(_SharedArray._filename_to_buffer) > _SharedArray._max_buffers:
+                _SharedArray._filename_to_buffer.popitem(last=False)
+
+        return _SharedArray._view(buffer, offset, shape, strides, dtype)
+
+    @staticmethod
+    def _view(buffer: np.memmap, offset: int, shape: Tuple, strides: Tuple, dtype: str) -> np.ndarray:
+        array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset, strides=strides).view(_SharedArray)
+        array._buffer = buffer
+        return array
+
+
+class _SharedArrays:
+    """
+    Copies numeric arrays into a single memory mapped file, and provides them as read-only shared arrays.
+
+    The file is created in shared memory when available, and it is removed when this object is garbage collected.
+    Arrays of other types, such as arrays of objects, are not copied.
+
+    Removing the file depends on the platform. On POSIX systems, the file is removed while it is still mapped,
+    and its memory is released when the last map is closed. On Windows, a mapped file cannot be removed,
+    so the files that are still mapped when this object is collected are removed once their maps are released,
+    which is retried when new shared arrays are created and when the interpreter exits.
+    """
+
+    alignment = 64
+
+    # Files that could not be removed yet, as they were still mapped
+    _pending_filenames: Dict[str, None] = OrderedDict()
+
+    def __init__(self, arrays: List[np.ndarray]):
+
+        # Remove the files of collected shared arrays whose maps have been released since
+        if _SharedArrays._pending_filenames:
+            _SharedArrays._remove_pending()
+
+        # Numeric arrays are placed in the file at aligned offsets
+        is_shared = [isinstance(array, np.ndarray) and array.dtype.kind in "biuf" and array.size > 0
+                     for array in arrays]
+        offsets, size = [], 0
+        for array, shared in zip(arrays, is_shared):
+            offsets.append(size)
+            if shared:
+                size += -(-array.nbytes // self.alignment) * self.alignment
+
+        # Write the arrays into the file, then map the file read-only
+        folder = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        descriptor, self.filename = tempfile.mkstemp(prefix="mabwiser_", suffix=".mmap", dir=folder)
+        os.close(descriptor)
+        self._finalizer = weakref.finalize(self, _SharedArrays._remove, self.filename)
+
+        writer = np.memmap(self.filename, dtype=np.uint8, mode='w+', shape=(max(size, 1),))
+        for array, shared, offset in zip(arrays, is_shared, offsets):
+            if shared:
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=writer, offset=offset)
+                view[...] = array
+        writer.flush()
+        del writer
+
+        buffer = np.memmap(self.filename, dtype=np.uint8, mode='r')
+        self.arrays = [_SharedArray._view(buffer, offset, array.shape, None, array.dtype.str) if shared else array
+                       for array, shared, offset in zip(arrays, is_shared, offsets)]
+
+    @staticmethod
+    def _remove(filename: str) -> NoReturn:
+
+        # Release the map of the file attached by this process, if any, before removing the file
+        _SharedArray._filename_to_buffer.pop(filename, None)
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # The file is still mapped, e.g. on Windows, so it is removed later
+            _SharedArrays._pending_filenames[filename] = None
+
+    @staticmethod
+    def _remove_pending() -> NoReturn:
+        for filename in list(_SharedArrays._pending_filenames):
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            _SharedArrays._pending_filenames.pop(filename)
+
+    @staticmethod
+    def _remove_pending_at_exit() -> NoReturn:
+
+        # Release the maps of the arrays that are no longer referenced, then remove their files
+        if _SharedArrays._pending_filenames:
+            gc.collect()
+            _SharedArrays._remove_pending()
+
+    def __getstate__(self):
+
+        # Processes that unpickle the shared arrays do not own the file
+        return {"filename": self.filename, "arrays": None, "_finalizer": None}
+
+
+atexit.register(_SharedArrays._remove_pending_at_exit)
+
+
+class _Resident:
+    """
+    Wraps an object sent to worker processes in each task, which is kept resident in the workers between tasks.
+
+    The object is pickled once, and each worker unpickles it once and reuses it in the following tasks,
+    until a new version of the object of the same owner is sent, which replaces it.
+    Each process keeps the objects of at most max_owners owners, evicting the least recently used owner.
+    Owners that are retired, when their bandit closes its pool or is garbage collected, are sent with each task,
+    so that the workers evict their objects and release the shared memory they map.
+    """
+
+    # Number of owners whose objects are kept in each process, and number of retired owners sent with each task
+    max_owners = 8
+    max_retired_owners = 64
+
+    # Objects unpickled in this process, by owner, with their version, in the order they are used
+    owner_to_version_object: Dict[str, Tuple[str, object]] = OrderedDict()
+
+    # Owners retired in this process, most recent last
+    retired_owners: Dict[str, None] = OrderedDict()
+
+    def __init__(self, obj, owner: str):
+        self.obj = obj
+        self.owner = owner
+        self.version = uuid.uuid4().hex
+        self._payload: Optional[bytes] = None
+
+    def __reduce__(self):
+        if self._payload is None:
+            self._payload = pickle.dumps(self.obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # An owner that is sent again is no longer retired
+        _Resident.retired_owners.pop(self.owner, None)
+        return _Resident._load, (self.owner, self.version, self._payload, tuple(_Resident.retired_owners))
+
+    @staticmethod
+    def retire(owner: str) -> NoReturn:
+
+        # Evict the object of the owner in this process, and in the workers with the following tasks
+        _Resident.owner_to_version_object.pop(owner, None)
+        _Resident.retired_owners[owner] = None
+        _Resident.retired_owners.move_to_end(owner)
+        while len(_Resident.retired_owners) > _Resident.max_retired_owners:
+            _Resident.retired_owners.popitem(last=False)
+
+    @staticmethod
+    def _load(owner: str, version: str, payload: bytes, retired_owners: Tuple[str, ...] = ()):
+        owner_to_version_object = _Resident.owner_to_version_object
+        for retired_owner in retired_owners:
+            owner_to_version_object.pop(retired_owner, None)
+
+        version_object = owner_to_version_object.get(owner)
+        if version_object is None or version_object[0] != version:
+            version_object = (version, pickle.loads(payload))
+            owner_to_version_object[owner] = version_object
+        owner_to_version_object.move_to_end(owner)
+
+        # Evict the least recently used owners
+        while len(owner_to_version_object) > _Resident.max_owners:
+            owner_to_version_object.popitem(last=False)
+
+        return version_object[1]
+
+
+class _ModelFile:
+    """
+    Saves an object into a directory of JSON files and numpy arrays in .npy files,
+    and loads it back with the arrays memory mapped from their files.
+
+    The directory contains:
+
+        header.json  Format name and version, version of mabwiser, and the given fields,
+                     e.g. the arms and the parameters of the policies that the object is created from.
+        state.json   State of the object, the attributes of the object and of the objects it contains.
+        arrays/      One .npy file for each numeric array, or for each array that other arrays are views into,
+                     loaded with ``numpy.load(mmap_mode='c')`` without pickles.
+        objects.pkl  Only when needed, pickle of the list of values that cannot be described by the state,
+                     e.g. functions given by the user or arms of user classes.
+
+    Fields and state are JSON values, where numbers, strings, lists and dictionaries with string keys
+    are stored as is, and other values are dictionaries with a "__type__" key:
+
+        array        Numeric array in the .npy "file", or a view into that array with its "dtype", "shape",
+                     "strides" and byte "offset". Small or empty arrays that are not views are stored with their
+                     "dtype", "shape" and the flat list of their "items" instead.
+        objects      Array of objects with its "shape" and the flat list of its "items".
+        list, dict, ordereddict, defaultdict, tuple, set, frozenset
+                     Containers of "items", which are [key, value] pairs for dictionaries,
+                     and the "factory" value of default dictionaries.
+        scalar       Numpy scalar of "dtype" and "value".
+        dtype        Numpy data type, the type string or the dictionary of names, formats, offsets and itemsize.
+        generator    Numpy random generator with the "state" of its bit generator.
+        function     Builtin or numpy type of "name", e.g. the factory of default dictionaries.
+        partial      Partial of "function" with "args" and "keywords".
+        namedtuple   Named tuple of "class" with its "items".
+        object       Object of "class" with its "state", the dictionary of its attributes,
+                     or for extension types the "args" of the class and the "state" of the object.
+                     Classes are restricted to the classes of mabwiser and the estimators of scikit-learn it uses.
+        ref          Reference to the value with the same "id", for values that are shared.
+        pickle       Value at "index" of the list in objects.pkl.
+
+    When loaded, objects are restored into the objects of the same class that the created object holds
+    in the same place, so that attributes not in the state keep the values given when the object was created.
+    """
+
+    format = "mabwiser"
+    version = 2
+
+    header_file = "header.json"
+    state_file = "state.json"
+    arrays_folder = "arrays"
+    objects_file = "objects.pkl"
+
+    # Keys of the header that are not fields
+    header_keys = ("format", "version", "mabwiser_version")
+
+    # Arrays with at most this number of elements that are not views are stored in the state
+    max_items = 64
+
+    # Classes of scikit-learn stored by their state, classes of mabwiser are always stored by their state
+    sklearn_classes = ("sklearn.cluster._kmeans:KMeans", "sklearn.cluster._kmeans:MiniBatchKMeans",
+                       "sklearn.preprocessing._data:StandardScaler", "sklearn.tree._classes:DecisionTreeRegressor",
+                       "sklearn.tree._tree:Tree")
+
+    # Functions stored by name
+    functions = {"builtins.list": list, "builtins.dict": dict, "builtins.int": int, "builtins.float": float,
+                 "builtins.set": set, "numpy.ndarray": np.ndarray}
+
+    # Bit generators of numpy random generators
+    bit_generators = ("MT19937", "PCG64", "PCG64DXSM", "Philox", "SFC64")
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.mmap = mmap
+
+        # Nodes of the values being saved by their id, the values are kept until saved so that ids are not reused
+        self._id_to_node: Dict[int, Dict] = dict()
+        self._values: List = list()
+        self._n_ids = 0
+
+        # Files of the arrays that other arrays are views into, by id
+        self._root_id_to_file: Dict[int, str] = dict()
+
+        # Values that are pickled into objects.pkl
+        self._objects: List = list()
+
+        # Loaded values and arrays, and the objects of the created object that are restored
+        self._id_to_value: Dict[int, object] = dict()
+        self._file_to_array: Dict[str, np.ndarray] = dict()
+        self._restored_ids = set()
+
+    @staticmethod
+    def save(obj, path: str, fields: Dict) -> NoReturn:
+
+        folder = os.path.join(path, _ModelFile.arrays_folder)
+        os.makedirs(folder, exist_ok=True)
+        for name in os.listdir(folder):
+            if name.endswith(".npy"):
+                os.remove(os.path.join(folder, name))
+
+        # Fields are encoded before the state, since values shared by both are described where first seen
+        model_file = _ModelFile(path)
+        fields = dict((name, model_file._encode(value)) for name, value in fields.items())
+        state = model_file._encode(obj)
+        fields, state = model_file._compact(fields), model_file._compact(state)
+
+        with open(os.path.join(path, _ModelFile.state_file), "w") as file:
+            json.dump(state, file)
+
+        objects_file = os.path.join(path, _ModelFile.objects_file)
+        if model_file._objects:
+            with open(objects_file, "wb") as file:
+                pickle.dump(model_file._objects, file, protocol=pickle.HIGHEST_PROTOCOL)
+        elif os.path.exists(objects_file):
+            os.remove(objects_file)
+
+        # Write the header last, so that a directory with a header is complete
+        from mabwiser._version import __version__
+        header = {"format": _ModelFile.format, "version": _ModelFile.version, "mabwiser_version": __version__}
+        header.update(fields)
+        with open(os.path.join(path, _ModelFile.header_file), "w") as file:
+            json.dump(header, file, indent=4)
+
+    @staticmethod
+    def load(path: str, mmap: bool, create: Callable[[Dict], object]):
+
+        check_true(os.path.isfile(os.path.join(path, _ModelFile.header_file)),
+                   ValueError("The path is not a saved model: " + str(path)))
+        with open(os.path.join(path, _ModelFile.header_file)) as file:
+            header = json.load(file)
+        check_true(header.get("format") == _ModelFile.format and header.get("version") == _ModelFile.version,
+                   ValueError("The saved model format is not supported: " + str(header.get("format")) +
+                              " version " + str(header.get("version"))))
+
+        # The state refers to the private classes of the version of mabwiser that saved the model
+        from mabwiser._version import __version__
+        if header.get("mabwiser_version") != __version__:
+            warnings.warn("The model was saved with mabwiser version " + str(header.get("mabwiser_version")) +
+                          " and is loaded with version " + __version__ + ", it may not load or behave correctly.",
+                          UserWarning)
+
+        # Create the object from the fields, and restore its state
+        model_file = _ModelFile(path, mmap)
+        obj = create(dict((name, model_file._decode(value)) for name, value in header.items()
+                          if name not in _ModelFile.header_keys))
+        with open(os.path.join(path, _ModelFile.state_file)) as file:
+            state = json.load(file)
+        return model_file._decode(state, obj)
+
+    def _encode(self, value):
+
+        # Numbers, strings and None are stored as is
+        if value is None or type(value) in (bool, int, float, str):
+            return value
+
+        # Values seen before refer to the first one, which is given an id
+        node = self._id_to_node.get(id(value))
+        if node is not None:
+            if "id" not in node:
+                node["id"] = self._n_ids
+                self._n_ids += 1
+            return {"__type__": "ref", "id": node["id"]}
+
+        # The node is known before the values it contains are encoded, so that they can refer to it
+        node = self._id_to_node[id(value)] = dict()
+        self._values.append(value)
+        node.update(self._encode_value(value))
+        return node
+
+    def _encode_value(self, value) -> Dict:
+
+        value_type = type(value)
+        if isinstance(value, np.ndarray):
+            if not value.dtype.hasobject:
+                return self._encode_array(value)
+            elif value.dtype == object:
+                return {"__type__": "objects", "shape": list(value.shape),
+                        "items": [self._encode(item) for item in value.reshape(-1).tolist()]}
+
+        elif value_type in (list, tuple, set, frozenset):
+            return {"__type__": value_type.__name__, "items": [self._encode(item) for item in value]}
+
+        elif value_type in (dict, OrderedDict, defaultdict):
+            node = {"__type__": value_type.__name__.lower()}
+            if value_type is defaultdict:
+                node["factory"] = self._encode(value.default_factory)
+            node["items"] = [[self._encode(key), self._encode(item)] for key, item in value.items()]
+            return node
+
+        elif isinstance(value, np.generic):
+            item = value.item()
+            if type(item) in (bool, int, float, str):
+                return {"__type__": "scalar", "dtype": value.dtype.str, "value": item}
+
+        elif isinstance(value, np.dtype):
+            return {"__type__": "dtype", "dtype": _ModelFile._dtype(value)}
+
+        elif value_type is np.random.Generator and type(value.bit_generator).__name__ in _ModelFile.bit_generators:
+            return {"__type__": "generator", "state": self._encode(value.bit_generator.state)}
+
+        elif value_type is partial:
+            return {"__type__": "partial", "function": self._encode(value.func),
+                    "args": self._encode(list(value.args)), "keywords": self._encode(value.keywords)}
+
+        elif any(value is function for function in _ModelFile.functions.values()):
+            return {"__type__": "function",
+                    "name": next(name for name, function in _ModelFile.functions.items() if value is function)}
+
+        elif _ModelFile._is_supported(value_type):
+            name = value_type.__module__ + ":" + value_type.__qualname__
+            if isinstance(value, tuple):
+                return {"__type__": "namedtuple", "class": name, "items": [self._encode(item) for item in value]}
+            elif hasattr(value, "__dict__"):
+                state = value.__getstate__() if hasattr(value, "__getstate__") else value.__dict__
+                return {"__type__": "object", "class": name, "state": self._encode(state if state else dict())}
+            else:
+                function, args, state = value.__reduce__()[:3]
+                if function is value_type:
+                    return {"__type__": "object", "class": name, "args": self._encode(list(args)),
+                            "state": self._encode(state)}
+
+        # Other values are pickled
+        self._objects.append(value)
+        return {"__type__": "pickle", "index": len(self._objects) - 1}
+
+    def _encode_array(self, array: np.ndarray) -> Dict:
+
+        # Small arrays that own their memory are stored in the state
+        if array.size == 0 or (array.size <= _ModelFile.max_items and not isinstance(array.base, np.ndarray)
+                               and array.dtype.kind in "biuf"):
+            return {"__type__": "array", "dtype": array.dtype.str, "shape": list(array.shape),
+                    "items": array.reshape(-1).tolist()}
+
+        # Find the array that owns the memory of a view, arrays that are not within their owner are stored alone
+        root = array
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        offset = array.__array_interface__['data'][0] - root.__array_interface__['data'][0]
+        if not (root.flags.c_contiguous or root.flags.f_contiguous) or min(array.strides, default=0) < 0 or \
+                offset < 0 or offset + _ModelFile._extent(array) > root.nbytes:
+            root = np.ascontiguousarray(array)
+            self._values.append(root)
+            offset = 0
+
+        file = self._root_id_to_file.get(id(root))
+        if file is None:
+            file = self._root_id_to_file[id(root)] = str(len(self._root_id_to_file)) + ".npy"
+            np.save(os.path.join(self.path, _ModelFile.arrays_folder, file), root, allow_pickle=False)
+
+        node = {"__type__": "array", "file": file}
+        if offset != 0 or array.dtype != root.dtype or array.shape != root.shape or array.strides != root.strides:
+            node.update({"dtype": _ModelFile._dtype(array.dtype), "shape": list(array.shape),
+                         "strides": list(array.strides), "offset": offset})
+        return node
+
+    def _compact(self, node):
+
+        # Lists and dictionaries with string keys that are not referred to are stored as plain JSON values
+        if type(node) is list:
+            return [self._compact(item) for item in node]
+        elif type(node) is not dict:
+            return node
+
+        node = dict((key, self._compact(item)) for key, item in node.items())
+        if "id" not in node:
+            if node.get("__type__") == "list":
+                return node["items"]
+            elif node.get("__type__") == "dict" and \
+                    all(type(key) is str and key != "__type__" for key, _ in node["items"]):
+                return dict((key, item) for key, item in node["items"])
+        return node
+
+    def _decode(self, node, restored=None):
+
+        if node is None or type(node) in (bool, int, float, str):
+            return node
+        elif type(node) is list:
+            return [self._decode(item) for item in node]
+        elif "__type__" not in node:
+            return dict((key, self._decode(item)) for key, item in node.items())
+
+        node_type = node["__type__"]
+        if node_type == "ref":
+            return self._id_to_value[node["id"]]
+        elif node_type == "list":
+            value = self._register(node, list())
+            value.extend(self._decode(item) for item in node["items"])
+        elif node_type in ("dict", "ordereddict", "defaultdict"):
+            if node_type == "defaultdict":
+                value = self._register(node, defaultdict(self._decode(node["factory"])))
+            else:
+                value = self._register(node, dict() if node_type == "dict" else OrderedDict())
+            for key, item in node["items"]:
+                value[self._decode(key)] = self._decode(item)
+        elif node_type in ("tuple", "set", "frozenset"):
+            value_type = {"tuple": tuple, "set": set, "frozenset": frozenset}[node_type]
+            value = self._register(node, value_type(self._decode(item) for item in node["items"]))
+        elif node_type == "array":
+            value = self._register(node, self._decode_array(node))
+        elif node_type == "objects":
+            value = np.empty(len(node["items"]), dtype=object)
+            for index, item in enumerate(node["items"]):
+                value[index] = self._decode(item)
+            value = self._register(node, value.reshape(node["shape"]))
+        elif node_type == "scalar":
+            value = np.dtype(node["dtype"]).type(node["value"])
+        elif node_type == "dtype":
+            value = self._register(node, np.dtype(node["dtype"]))
+        elif node_type == "generator":
+            state = self._decode(node["state"])
+            check_true(state.get("bit_generator") in _ModelFile.bit_generators,
+                       ValueError("The saved model refers to an unsupported bit generator."))
+            bit_generator = getattr(np.random, state["bit_generator"])()
+            bit_generator.state = state
+            value = self._register(node, np.random.Generator(bit_generator))
+        elif node_type == "function":
+            check_true(node["name"] in _ModelFile.functions,
+                       ValueError("The saved model refers to an unsupported function: " + str(node["name"])))
+            value = self._register(node, _ModelFile.functions[node["name"]])
+        elif node_type == "partial":
+            value = self._register(node, partial(self._decode(node["function"]), *self._decode(node["args"]),
+                                                 **self._decode(node["keywords"])))
+        elif node_type == "namedtuple":
+            value_type = _ModelFile._get_class(node["class"])
+            check_true(issubclass(value_type, tuple), ValueError("The saved named tuple is not a tuple."))
+            value = self._register(node, value_type(*[self._decode(item) for item in node["items"]]))
+        elif node_type == "object":
+            value = self._decode_object(node, restored)
+        elif node_type == "pickle":
+            value = self._register(node, self._get_objects()[node["index"]])
+        else:
+            raise ValueError("The saved model has an unsupported value: " + str(node_type))
+
+        return value
+
+    def _decode_array(self, node: Dict) -> np.ndarray:
+
+        if "file" not in node:
+            return np.array(node["items"], dtype=np.dtype(node["dtype"])).reshape(node["shape"])
+
+        # Load each file once, views are created on the memory of the array of the file
+        file = node["file"]
+        check_true(os.path.basename(file) == file and file.endswith(".npy"),
+                   ValueError("The saved model refers to an unsupported array file: " + str(file)))
+        root = self._file_to_array.get(file)
+        if root is None:
+            root = np.load(os.path.join(self.path, _ModelFile.arrays_folder, file),
+                           mmap_mode='c' if self.mmap else None, allow_pickle=False).view(np.ndarray)
+            self._file_to_array[file] = root
+
+        if "shape" not in node:
+            return root
+        buffer = np.ravel(root, order="K" if root.flags.f_contiguous else "C")
+        return np.ndarray(node["shape"], dtype=np.dtype(node["dtype"]), buffer=buffer,
+                          offset=node["offset"], strides=node["strides"])
+
+    def _decode_object(self, node: Dict, restored=None):
+
+        value_type = _ModelFile._get_class(node["class"])
+
+        # Objects of extension types are created from the arguments of their class
+        if "args" in node:
+            value = self._register(node, value_type(*self._decode(node["args"])))
+            value.__setstate__(self._decode(node["state"]))
+            return value
+
+        # Restore the object of the same class held by the created object, each only once, or create a new one
+        if type(restored) is value_type and id(restored) not in self._restored_ids:
+            value = restored
+        else:
+            value = value_type.__new__(value_type)
+        self._restored_ids.add(id(value))
+        self._register(node, value)
+
+        # Attributes are restored into the objects held by the same attributes
+        state = node["state"]
+        if type(state) is dict and "__type__" not in state:
+            attributes = getattr(value, "__dict__", dict())
+            state = dict((key, self._decode(item, attributes.get(key))) for key, item in state.items())
+        else:
+            state = self._decode(state)
+
+        if hasattr(value, "__setstate__"):
+            value.__setstate__(state)
+        else:
+            value.__dict__.update(state)
+        return value
+
+    def _register(self, node: Dict, value):
+
+        # Values with an id are referred to by other values
+        if "id" in node:
+            self._id_to_value[node["id"]] = value
+        return value
+
+    def _get_objects(self) -> List:
+
+        # Values that cannot be described by the state are unpickled, only when referred to
+        if not self._objects:
+            with open(os.path.join(self.path, _ModelFile.objects_file), "rb") as file:
+                self._objects = pickle.load(file)
+        return self._objects
+
+    @staticmethod
+    def _is_supported(value_type: type) -> bool:
+        module = value_type.__module__
+        return module == "mabwiser" or module.startswith("mabwiser.") or \
+            module + ":" + value_type.__qualname__ in _ModelFile.sklearn_classes
+
+    @staticmethod
+    def _get_class(name: str) -> type:
+
+        # Import only the supported classes, which are found by the name of their module and class
+        module_name, _, qualname = str(name).partition(":")
+        check_true(module_name == "mabwiser" or module_name.startswith("mabwiser.") or
+                   name in _ModelFile.sklearn_classes,
+                   ValueError("The saved model refers to an unsupported class: " + str(name)))
+        value_type = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            value_type = getattr(value_type, part, None)
+        check_true(isinstance(value_type, type) and value_type.__module__ == module_name and
+                   value_type.__qualname__ == qualname,
+                   ValueError("The saved model refers to an unsupported class: " + str(name)))
+        return value_type
+
+    @staticmethod
+    def _dtype(dtype: np.dtype) -> Union[str, Dict]:
+
+        # Structured types are described by the name, type and offset of each field, with their total size
+        if dtype.names is None:
+            return dtype.str
+        return {"names": list(dtype.names), "formats": [dtype.fields[name][0].str for name in dtype.names],
+                "offsets": [dtype.fields[name][1] for name in dtype.names], "itemsize": dtype.itemsize}
+
+    @staticmethod
+    def _extent(array: np.ndarray) -> int:
+
+        # Number of bytes from the start of the array to the end of its last element, for non-negative strides
+        if array.size == 0:
+            return 0
+        return sum((n - 1) * s for n, s in zip(array.shape, array.strides)) + array.itemsize
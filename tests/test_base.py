@@ -117,6 +117,22 @@ class BaseTest(unittest.TestCase):
             expectations = [mab.predict_expectations(contexts) for _ in range(num_run)]
             return expectations[0] if num_run == 1 else expectations, mab
 
+    @staticmethod
+    def get_history() -> (List[Arm], np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+        """Returns arms, decisions, rewards, contexts and test contexts of a seeded random history.
+
+        Decisions are drawn from string arms, rewards are binary, contexts have four features.
+        """
+
+        rng = np.random.RandomState(seed=7)
+        arms = ['a', 'b', 'c']
+        decisions = rng.choice(arms, size=100)
+        rewards = rng.randint(2, size=100)
+        contexts = rng.rand(100, 4)
+        test = rng.rand(10, 4)
+
+        return arms, decisions, rewards, contexts, test
+
     @staticmethod
     def is_compatible(learning_policy, neighborhood_policy):
 
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import json
+import os
+
 import numpy as np
 import pandas as pd
 import logging
+import tempfile
+from scipy import sparse
 
 from copy import deepcopy
 from sklearn.preprocessing import StandardScaler
@@ -10,7 +15,7 @@ from sklearn.preprocessing import StandardScaler
 from tests.test_base import BaseTest
 
 from mabwiser.base_mab import BaseMAB
-from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy, DecisionBatch
 from mabwiser.simulator import Simulator
 
 
@@ -566,6 +571,32 @@ class InvalidTest(BaseTest):
         with self.assertRaises(ValueError):
             mab.add_arm(3)
 
+    def test_invalid_add_remove_arms(self):
+        mab = MAB([1, 2, 3], LearningPolicy.EpsilonGreedy(epsilon=0))
+        with self.assertRaises(TypeError):
+            mab.add_arms((4, 5))
+        with self.assertRaises(ValueError):
+            mab.add_arms([4, None])
+        with self.assertRaises(ValueError):
+            mab.add_arms([4, np.nan])
+        with self.assertRaises(ValueError):
+            mab.add_arms([4, np.inf])
+        with self.assertRaises(ValueError):
+            mab.add_arms([4, 4])
+        with self.assertRaises(ValueError):
+            mab.add_arms([4, 3])
+        with self.assertRaises(ValueError):
+            mab.add_arms([4], binarizer=lambda arm, reward: reward > 0)
+        with self.assertRaises(TypeError):
+            mab.remove_arms((1, 2))
+        with self.assertRaises(ValueError):
+            mab.remove_arms([1, 1])
+        with self.assertRaises(ValueError):
+            mab.remove_arms([1, 4])
+
+        # Invalid arms are not added or removed
+        self.assertListEqual(mab.arms, [1, 2, 3])
+
     def test_exps_without_fit(self):
         for lp in BaseTest.lps:
             with self.assertRaises(Exception):
@@ -622,11 +653,179 @@ class InvalidTest(BaseTest):
                          num_run=4,
                          is_predict=True,
                          n_jobs=0)
+        with self.assertRaises(TypeError):
+            MAB([1, 2, 3], LearningPolicy.EpsilonGreedy(), n_jobs='all')
+        with self.assertRaises(TypeError):
+            MAB([1, 2, 3], LearningPolicy.EpsilonGreedy(), n_jobs=None)
 
     def test_invalid_scale(self):
         with self.assertRaises(TypeError):
             mab = MAB([0, 1], LearningPolicy.LinUCB(scale=1))
 
+    def test_invalid_incremental(self):
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinGreedy(incremental=1))
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinTS(incremental=None))
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB(incremental="True"))
+
+    def test_invalid_solver(self):
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinGreedy(solver=None))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinTS(solver="qr"))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(solver="Cholesky"))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(l2_lambda=0, solver="cholesky"))
+
+    def test_invalid_dtype(self):
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB(), dtype=32)
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB(), dtype="double precision")
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(), dtype=np.int32)
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(), dtype="float16")
+
+    def test_invalid_sparse_contexts(self):
+        contexts = sparse.csr_matrix(np.array([[1, 0, 0], [0, 0, 1], [0, 2, 0], [1, 0, 1]]))
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.UCB1()).fit([0, 1, 0, 1], [1, 0, 1, 0], contexts)
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB(), NeighborhoodPolicy.KNearest()).fit([0, 1, 0, 1], [1, 0, 1, 0],
+                                                                                   contexts)
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinTS(scale=True)).fit([0, 1, 0, 1], [1, 0, 1, 0], contexts)
+
+        mab = MAB([0, 1], LearningPolicy.EpsilonGreedy())
+        mab.fit([0, 1, 0, 1], [1, 0, 1, 0])
+        with self.assertRaises(TypeError):
+            mab.predict(contexts)
+
+    def test_invalid_covariance(self):
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB(covariance=None))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinTS(covariance="low rank"))
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB(covariance="sketch", rank=2.5))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinTS(covariance="sketch", rank=0))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(covariance="diagonal", solver="cholesky"))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(covariance="diagonal", l2_lambda=0))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinTS(covariance="sketch", stacked=True))
+
+    def test_invalid_shared_scaler(self):
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinGreedy(scale=True, shared_scaler=1))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinTS(shared_scaler=True))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(scale=False, shared_scaler=True))
+
+    def test_invalid_lazy(self):
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinGreedy(lazy=1))
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinTS(lazy="True"))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(lazy=True, incremental=True))
+
+    def test_invalid_as_array(self):
+        mab = MAB([0, 1], LearningPolicy.EpsilonGreedy())
+        mab.fit([0, 1], [1, 0])
+        with self.assertRaises(TypeError):
+            mab.predict(as_array=1)
+        with self.assertRaises(TypeError):
+            mab.predict_expectations(as_array="True")
+
+    def test_invalid_save_load(self):
+        mab = MAB([0, 1], LearningPolicy.EpsilonGreedy())
+        mab.fit([0, 1], [1, 0])
+        with self.assertRaises(TypeError):
+            mab.save(None)
+        with self.assertRaises(TypeError):
+            MAB.load(1)
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaises(ValueError):
+                MAB.load(path)
+            mab.save(path)
+            with self.assertRaises(TypeError):
+                MAB.load(path, mmap=1)
+
+            # Policies and classes that are not part of mabwiser are not loaded
+            with open(os.path.join(path, "header.json")) as file:
+                header = json.load(file)
+            with open(os.path.join(path, "header.json"), "w") as file:
+                json.dump(dict(header, learning_policy={"name": "_make", "parameters": {}}), file)
+            with self.assertRaises(ValueError):
+                MAB.load(path)
+            with open(os.path.join(path, "header.json"), "w") as file:
+                json.dump(header, file)
+            with open(os.path.join(path, "state.json"), "w") as file:
+                json.dump({"__type__": "object", "class": "subprocess:Popen", "args": [["echo"]], "state": {}}, file)
+            with self.assertRaises(ValueError):
+                MAB.load(path)
+
+    def test_invalid_decision_batch(self):
+        with self.assertRaises(ValueError):
+            DecisionBatch([0, 1])
+        with self.assertRaises(ValueError):
+            DecisionBatch(rewards=[0, 1])
+        with self.assertRaises(TypeError):
+            DecisionBatch({0: 1}, [0])
+        with self.assertRaises(TypeError):
+            DecisionBatch([0, 1], (0, 1))
+        with self.assertRaises(TypeError):
+            DecisionBatch([0, 1], [0, 1], [0, 1])
+        with self.assertRaises(ValueError):
+            DecisionBatch([0, 1], [0, 1, 1])
+        with self.assertRaises(ValueError):
+            DecisionBatch([0, 1], [0, 1], [[0, 1], [1, 0], [1, 1]])
+        with self.assertRaises(TypeError):
+            DecisionBatch([0, 1], [0, np.nan])
+        with self.assertRaises(TypeError):
+            DecisionBatch([0, 1], [0, None])
+        with self.assertRaises(TypeError):
+            DecisionBatch([0, 1], ['a', 'b'])
+
+        batch = DecisionBatch([0, 1], [0, 2], [[0, 1], [1, 0]])
+        mab = MAB([0, 1], LearningPolicy.EpsilonGreedy())
+        with self.assertRaises(ValueError):
+            mab.fit(batch, [0, 2])
+        with self.assertRaises(ValueError):
+            mab.partial_fit(batch, contexts=[[0, 1], [1, 0]])
+        with self.assertRaises(ValueError):
+            mab.fit(DecisionBatch(contexts=[[0, 1], [1, 0]]))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.ThompsonSampling()).fit(batch)
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB()).fit(DecisionBatch([0, 1], [0, 2]))
+        with self.assertRaises(ValueError):
+            MAB([0, 1], LearningPolicy.LinUCB(scale=True)).fit(DecisionBatch([0, 1], [0, 2],
+                                                                             sparse.csr_matrix([[0, 1], [1, 0]])))
+
+        mab = MAB([0, 1], LearningPolicy.LinUCB())
+        mab.fit(batch)
+        with self.assertRaises(ValueError):
+            mab.predict(DecisionBatch())
+        with self.assertRaises(TypeError):
+            mab.predict(DecisionBatch(contexts=[[0, 1]]), as_array=1)
+
+    def test_invalid_stacked(self):
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinGreedy(stacked=1))
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinTS(stacked=None))
+        with self.assertRaises(TypeError):
+            MAB([0, 1], LearningPolicy.LinUCB(stacked="True"))
+
     def test_convert_array_invalid(self):
         df = pd.DataFrame({'a': [1, 1, 1, 1, 1]})
         with self.assertRaises(NotImplementedError):
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
 
+from copy import deepcopy
 import datetime
 import math
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
 
-from mabwiser.mab import LearningPolicy
+from mabwiser.linear import _LinTS
+from mabwiser.mab import MAB, LearningPolicy
+from mabwiser.utils import _RowRNG, create_rng
 from tests.test_base import BaseTest
 
 
@@ -28,7 +32,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 3)
-        self.assertEqual(arm, [[2, 3], [2, 3], [3, 3]])
+        self.assertEqual(arm, [[2, 2], [2, 3], [2, 2]])
 
     def test_alpha0_0001_expectations(self):
         exps, mab = self.predict(arms=[1, 2, 3],
@@ -45,9 +49,9 @@ class LinTSTest(BaseTest):
                                  is_predict=False)
 
         self.assertListAlmostEqual(exps[0].values(),
-                                   [-0.23459369004297587, 0.0002702455674444537, 4.588547880979047e-05])
+                                   [-0.2345053244207727, 7.518098260931803e-05, -7.486573244629515e-05])
         self.assertListAlmostEqual(exps[1].values(),
-                                   [-0.192811601170233, -2.3415795345448245e-05, 0.00016619626256880228])
+                                   [-0.19285337165649283, -6.004422972209888e-05, -8.651536868023435e-05])
 
     def test_alpha1(self):
         arm, mab = self.predict(arms=[1, 2, 3],
@@ -78,8 +82,9 @@ class LinTSTest(BaseTest):
                                  seed=123456,
                                  num_run=1,
                                  is_predict=False)
-        self.assertListAlmostEqual(exps[0].values(), [-0.6029872358950072, 3.105765259323796, 1.0208598325762464])
-        self.assertListAlmostEqual(exps[1].values(), [0.572141413757231, 0.45473267178654997, 1.773376616755168])
+        self.assertListAlmostEqual(exps[0].values(), [0.27138429155092286, 0.42990646739665556,
+                                                      -0.6080211118488527])
+        self.assertListAlmostEqual(exps[1].values(), [0.1053295440811625, -0.726187695407686, 0.876495770111343])
 
     def test_np(self):
 
@@ -97,7 +102,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 3)
-        self.assertEqual(arm, [[2, 3], [2, 1], [3, 1]])
+        self.assertEqual(arm, [[2, 3], [2, 3], [3, 1]])
 
     def test_df(self):
 
@@ -118,7 +123,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 3)
-        self.assertEqual(arm, [[2, 3], [2, 1], [3, 1]])
+        self.assertEqual(arm, [[2, 3], [2, 3], [3, 1]])
 
     def test_df_list(self):
 
@@ -139,7 +144,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 3)
-        self.assertEqual(arm, [[2, 3], [2, 1], [3, 1]])
+        self.assertEqual(arm, [[2, 3], [2, 3], [3, 1]])
 
     def test_lints_t1(self):
 
@@ -157,7 +162,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 4)
-        self.assertEqual(arm, [[2, 1], [2, 1], [2, 1], [1, 2]])
+        self.assertEqual(arm, [[2, 1], [2, 1], [1, 1], [1, 1]])
 
     def test_lints_t2(self):
 
@@ -175,7 +180,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 4)
-        self.assertEqual(arm, [[3, 1], [2, 1], [2, 3], [3, 3]])
+        self.assertEqual(arm, [[1, 2], [1, 2], [2, 2], [2, 3]])
 
     def test_lints_t3(self):
 
@@ -194,7 +199,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 4)
-        self.assertEqual(arm, [[4, 4], [4, 4], [1, 4], [1, 4]])
+        self.assertEqual(arm, [[1, 4], [1, 4], [1, 4], [1, 4]])
 
     def test_lints_t4(self):
 
@@ -213,7 +218,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 4)
-        self.assertEqual(arm, [[4, 4], [1, 4], [4, 4], [4, 4]])
+        self.assertEqual(arm, [[4, 4], [4, 4], [4, 4], [1, 4]])
 
     def test_lints_t5(self):
 
@@ -231,7 +236,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 4)
-        self.assertEqual(arm, [['two', 'two'], ['three', 'two'], ['two', 'two'], ['one', 'two']])
+        self.assertEqual(arm, [['one', 'two'], ['two', 'two'], ['one', 'one'], ['two', 'two']])
 
     def test_lints_t6(self):
 
@@ -250,7 +255,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 4)
-        self.assertEqual(arm, [['three', 'one'], ['two', 'one'], ['two', 'one'], ['three', 'one']])
+        self.assertEqual(arm, [['three', 'one'], ['three', 'one'], ['three', 'one'], ['three', 'one']])
 
     def test_lints_t7(self):
 
@@ -327,7 +332,7 @@ class LinTSTest(BaseTest):
                                 is_predict=True)
 
         self.assertEqual(len(arm), 4)
-        self.assertEqual(arm, [[b, b], [b, b], [b, b], [b, b]])
+        self.assertEqual(arm, [[c, b], [b, b], [b, b], [b, b]])
 
     def test_unused_arm_scale(self):
 
@@ -344,7 +349,7 @@ class LinTSTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertEqual(arms, [4, 3])
+        self.assertEqual(arms, [2, 3])
 
     def test_unused_arm(self):
 
@@ -361,10 +366,10 @@ class LinTSTest(BaseTest):
                                  num_run=1,
                                  is_predict=False)
 
-        self.assertListAlmostEqual(exps[0].values(), [-0.6029872358950072, 3.10576525932379,
-                                                      1.0208598325762497, 4.45334163892619])
-        self.assertListAlmostEqual(exps[1].values(), [0.5721414137572303, 0.4547326717865491,
-                                                      1.773376616755162, -1.4333556875425306])
+        self.assertListAlmostEqual(exps[0].values(), [0.27138429155092286, 0.42990646739665556,
+                                                      -0.6080211118488527, -2.4465465870829455])
+        self.assertListAlmostEqual(exps[1].values(), [0.1053295440811625, -0.726187695407686, 0.876495770111343,
+                                                      -0.2502009374966905])
 
     def test_unused_arm2(self):
 
@@ -381,7 +386,7 @@ class LinTSTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertEqual(arms, [4, 3])
+        self.assertEqual(arms, [2, 3])
 
     def test_unused_arm_scaled(self):
 
@@ -403,10 +408,10 @@ class LinTSTest(BaseTest):
                                  num_run=1,
                                  is_predict=False)
 
-        self.assertListAlmostEqual(exps[0].values(), [-0.6846042491588905, 1.8728586982060706,
-                                                      0.39597711947956443, 2.326370889902805])
-        self.assertListAlmostEqual(exps[1].values(), [-0.9156881567627143, -1.01000793116177,
-                                                      1.6774048483779203, 0.6624211256038636])
+        self.assertListAlmostEqual(exps[0].values(), [0.4162072064416378, 0.8109013733372188, -1.008116553471442,
+                                                      0.18076905150475098])
+        self.assertListAlmostEqual(exps[1].values(), [-1.3093567495731726, -0.19776800131438624,
+                                                      0.7111147979785143, -1.090164416959422])
 
     def test_unused_arm_scaled2(self):
 
@@ -428,7 +433,7 @@ class LinTSTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertEqual(arms, [3, 3])
+        self.assertEqual(arms, [4, 4])
 
     def test_fit_twice(self):
 
@@ -445,7 +450,7 @@ class LinTSTest(BaseTest):
                                 num_run=1,
                                 is_predict=True)
 
-        self.assertEqual(arm, [4, 3])
+        self.assertEqual(arm, [2, 3])
 
         b_1 = mab._imp.arm_to_model[1].beta
         self.assertTrue(math.isclose(-0.0825688, b_1[0], abs_tol=0.00001))
@@ -488,7 +493,7 @@ class LinTSTest(BaseTest):
                                 num_run=1,
                                 is_predict=True)
 
-        self.assertEqual(arm, [4, 3])
+        self.assertEqual(arm, [2, 3])
 
         b_1 = mab._imp.arm_to_model[1].beta
         self.assertTrue(math.isclose(-0.0825688, b_1[0], abs_tol=0.00001))
@@ -605,3 +610,258 @@ class LinTSTest(BaseTest):
         mab.warm_start(arm_to_features={1: [0, 1], 2: [0.5, 0.5], 3: [0.5, 0.5]}, distance_quantile=0.5)
         self.assertListAlmostEqual(mab._imp.arm_to_model[3].beta,
                                    [0.19635284, 0.11556404, 0.57675997, 0.30597964, -0.39100933])
+
+    def test_batch_expectations(self):
+        rng = np.random.default_rng(7)
+        context_history = rng.random((100, 5))
+        decisions = rng.integers(0, 3, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((20, 5))
+
+        for scale in [False, True]:
+            exps, mab = self.predict(arms=[0, 1, 2],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=LearningPolicy.LinTS(alpha=0.5, scale=scale),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=123456,
+                                     num_run=1,
+                                     is_predict=False)
+
+            # Batch sampling matches sampling each arm model with the seeded stream of each row
+            seeds = create_rng(123456).randint(np.iinfo(np.int32).max, size=len(contexts))
+            for index, row in enumerate(contexts):
+                row_rng = _RowRNG(seeds[index])
+                expected = []
+                for arm in [0, 1, 2]:
+                    model = deepcopy(mab._imp.arm_to_model[arm])
+                    model.rng = row_rng
+                    expected.append(model.predict(row))
+                self.assertListAlmostEqual(exps[index].values(), expected)
+
+            # Predictions are reproducible across parallel jobs
+            _, parallel_mab = self.predict(arms=[0, 1, 2],
+                                           decisions=decisions,
+                                           rewards=rewards,
+                                           learning_policy=LearningPolicy.LinTS(alpha=0.5, scale=scale),
+                                           context_history=context_history,
+                                           contexts=contexts,
+                                           seed=123456,
+                                           num_run=1,
+                                           is_predict=False,
+                                           n_jobs=2)
+            self.assertEqual(mab.predict(contexts), parallel_mab.predict(contexts))
+
+    def test_cholesky_solver(self):
+        rng = np.random.default_rng(13)
+        context_history = rng.random((100, 5))
+        decisions = rng.integers(0, 3, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((20, 5))
+
+        for scale in [False, True]:
+            exps, mab = self.predict(arms=[0, 1, 2],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=LearningPolicy.LinTS(alpha=0.5, scale=scale, solver="cholesky"),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=123456,
+                                     num_run=1,
+                                     is_predict=False)
+
+            # Batch sampling matches sampling each arm model with the seeded stream of each row
+            seeds = create_rng(123456).randint(np.iinfo(np.int32).max, size=len(contexts))
+            for index, row in enumerate(contexts):
+                row_rng = _RowRNG(seeds[index])
+                expected = []
+                for arm in [0, 1, 2]:
+                    model = deepcopy(mab._imp.arm_to_model[arm])
+                    model.rng = row_rng
+                    expected.append(model.predict(row))
+                self.assertListAlmostEqual(exps[index].values(), expected)
+
+    def test_cholesky_solver_sample(self):
+        context = np.array([[1, 0, 2, 1, 1], [3, 1, 2, 3, 4], [2, -1, 1, 0, 2]])
+        rewards = np.array([3, 3, 1])
+
+        inverse = _LinTS(create_rng(7), alpha=0.8, l2_lambda=2.0)
+        cholesky = _LinTS(create_rng(7), alpha=0.8, l2_lambda=2.0, solver="cholesky")
+        for ts in [inverse, cholesky]:
+            ts.init(context.shape[1])
+            ts.fit(context, rewards)
+
+        # Deviations sampled with the factor of A have the covariance alpha^2 * A^-1
+        z = create_rng(3).standard_normal((5, 100000))
+        deviations = cholesky.get_deviations(z)
+        self.assertTrue(np.allclose(np.cov(deviations), np.square(0.8) * inverse.A_inv, atol=0.01))
+        self.assertTrue(np.allclose(cholesky.beta, inverse.beta))
+
+    def test_cached_cholesky(self):
+        rng = np.random.default_rng(11)
+        context_history = rng.random((60, 4))
+        decisions = rng.integers(0, 2, 60)
+        rewards = rng.random(60)
+        contexts = rng.random((5, 4))
+
+        _, mab = self.predict(arms=[0, 1],
+                              decisions=decisions,
+                              rewards=rewards,
+                              learning_policy=LearningPolicy.LinTS(alpha=0.5),
+                              context_history=context_history,
+                              contexts=contexts,
+                              seed=123456,
+                              num_run=1,
+                              is_predict=True)
+
+        # Factor of the covariance is cached after prediction and reused by the next one
+        model = mab._imp.arm_to_model[0]
+        cholesky = model.cholesky
+        self.assertTrue(np.allclose(cholesky, np.linalg.cholesky(np.square(0.5) * model.A_inv)))
+        mab.predict(contexts)
+        self.assertIs(mab._imp.arm_to_model[0].cholesky, cholesky)
+
+        # Fit changes A and invalidates the cached factor
+        mab.partial_fit([0, 0], [1, 0], contexts[:2])
+        self.assertIsNone(mab._imp.arm_to_model[0].cholesky)
+        mab.predict(contexts)
+        model = mab._imp.arm_to_model[0]
+        self.assertTrue(np.allclose(model.cholesky, np.linalg.cholesky(np.square(0.5) * model.A_inv)))
+
+    def test_cached_cholesky_sample(self):
+        context = np.array([[1, 0, 2, 1, 1], [3, 1, 2, 3, 4], [2, -1, 1, 0, 2]])
+        rewards = np.array([3, 3, 1])
+
+        ts = _LinTS(create_rng(7), alpha=0.8, l2_lambda=1.0)
+        ts.init(context.shape[1])
+        ts.fit(context, rewards)
+
+        # Sampling with the cached factor matches sampling the multivariate normal distribution
+        x = np.array([0, 1, 2, 3, 5])
+        beta_sampled = create_rng(3).multivariate_normal(ts.beta, np.square(0.8) * ts.A_inv)
+        ts.rng = create_rng(3)
+        self.assertAlmostEqual(ts.predict(x), np.dot(x, beta_sampled))
+
+    def test_stacked(self):
+        rng = np.random.default_rng(23)
+        context_history = rng.random((100, 5))
+        decisions = rng.integers(0, 3, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((20, 5))
+
+        for scale in [False, True]:
+            exps, mab = self.predict(arms=[0, 1, 2],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=LearningPolicy.LinTS(alpha=0.5, scale=scale),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=123456,
+                                     num_run=1,
+                                     is_predict=False)
+
+            stacked_exps, stacked_mab = self.predict(arms=[0, 1, 2],
+                                                     decisions=decisions,
+                                                     rewards=rewards,
+                                                     learning_policy=LearningPolicy.LinTS(alpha=0.5, scale=scale,
+                                                                                          stacked=True),
+                                                     context_history=context_history,
+                                                     contexts=contexts,
+                                                     seed=123456,
+                                                     num_run=1,
+                                                     is_predict=False)
+            for exp, stacked_exp in zip(exps, stacked_exps):
+                self.assertListAlmostEqual(exp.values(), stacked_exp.values())
+
+            # Fit invalidates the cached factors of updated arms
+            stacked_mab.partial_fit([0, 0], [1, 0], contexts[:2])
+            self.assertIsNone(stacked_mab._imp.arm_to_model[0].cholesky)
+            self.assertIsNotNone(stacked_mab._imp.arm_to_model[1].cholesky)
+            mab.partial_fit([0, 0], [1, 0], contexts[:2])
+            self.assertEqual(mab.predict(contexts), stacked_mab.predict(contexts))
+
+    def test_sparse_contexts(self):
+        rng = np.random.default_rng(7)
+        context_history = rng.random((200, 6))
+        context_history[context_history < 0.7] = 0
+        decisions = rng.integers(0, 3, 200)
+        rewards = rng.random(200)
+        contexts = rng.random((30, 6))
+        contexts[contexts < 0.7] = 0
+
+        for solver in ["inverse", "cholesky"]:
+            for stacked in [False, True]:
+                for incremental in [False, True]:
+                    results = []
+                    for convert in [np.asarray, sparse.csr_matrix]:
+                        mab = MAB([0, 1, 2], LearningPolicy.LinTS(alpha=1.0, solver=solver, stacked=stacked,
+                                                                 incremental=incremental), seed=123456)
+                        mab.fit(decisions[:150], rewards[:150], convert(context_history[:150]))
+                        mab.partial_fit(decisions[150:152], rewards[150:152], convert(context_history[150:152]))
+                        mab.partial_fit(decisions[152:], rewards[152:], convert(context_history[152:]))
+                        results.append((mab.predict(convert(contexts)), mab.predict_expectations(convert(contexts))))
+
+                    self.assertListEqual(results[0][0], results[1][0])
+                    for exp, sparse_exp in zip(results[0][1], results[1][1]):
+                        self.assertListAlmostEqual(exp.values(), sparse_exp.values())
+
+    def test_covariance_approximations(self):
+        rng = np.random.default_rng(43)
+        context = rng.random((50, 6))
+        rewards = rng.random(50)
+
+        full = _LinTS(create_rng(7), alpha=1.5, l2_lambda=2.0)
+        full.init(6)
+        full.fit(context, rewards)
+
+        # Deviations of the exact sketch have the covariance alpha^2 * A^-1
+        sketch = _LinTS(create_rng(7), alpha=1.5, l2_lambda=2.0, covariance="sketch", rank=6)
+        sketch.init(6)
+        sketch.fit(context, rewards)
+        C = sketch.get_deviations(np.identity(6))
+        self.assertTrue(np.allclose(np.dot(C, C.T), np.square(1.5) * full.A_inv))
+        self.assertTrue(np.allclose(sketch.beta, full.beta))
+
+        # Deviations of the diagonal have the covariance alpha^2 * diag(A)^-1
+        diagonal = _LinTS(create_rng(7), alpha=1.5, l2_lambda=2.0, covariance="diagonal")
+        diagonal.init(6)
+        diagonal.fit(context, rewards)
+        C = diagonal.get_deviations(np.identity(6))
+        self.assertTrue(np.allclose(np.dot(C, C.T), np.square(1.5) * np.diag(1.0 / np.diag(full.A))))
+
+        # Batch and sparse predictions, partial fit, new arms and warm start
+        for covariance in ["diagonal", "sketch"]:
+            results = []
+            for convert in [np.asarray, sparse.csr_matrix]:
+                mab = MAB([0, 1, 2], LearningPolicy.LinTS(covariance=covariance, rank=3), seed=123456, n_jobs=2)
+                mab.fit(np.arange(50) % 3, rewards, convert(context))
+                mab.partial_fit([0, 1], [1, 0], convert(context[:2]))
+                mab.add_arm(3)
+                mab.warm_start({0: [0, 1], 1: [5, 5], 2: [9, 9], 3: [0, 1.1]}, 0.5)
+                self.assertTrue(np.allclose(mab._imp.arm_to_model[3].beta, mab._imp.arm_to_model[0].beta))
+                results.append(mab.predict_expectations(convert(context[:10])))
+            for exp, sparse_exp in zip(*results):
+                self.assertListAlmostEqual(exp.values(), sparse_exp.values())
+
+    def test_scaler_folded(self):
+        rng = np.random.default_rng(59)
+        context_history = rng.random((100, 4)) * 10 + 5
+        decisions = rng.integers(0, 2, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((10, 4)) * 10 + 5
+
+        for solver in ["inverse", "cholesky"]:
+            mab = MAB([0, 1], LearningPolicy.LinTS(alpha=1.5, scale=True, solver=solver), seed=123456)
+            mab.fit(decisions, rewards, context_history)
+            exps = mab.predict_expectations(contexts)
+
+            # Deviations of raw centered contexts with the folded factor match the scaled contexts
+            seeds = create_rng(123456).randint(np.iinfo(np.int32).max, size=len(contexts))
+            for arm_index, arm in enumerate([0, 1]):
+                model = mab._imp.arm_to_model[arm]
+                scaled = model.scaler.transform(contexts)
+                for index, seed in enumerate(seeds):
+                    z = _RowRNG(seed).standard_normal((2, 4))[arm_index]
+                    expected = np.dot(scaled[index], model.beta + model.get_deviations(z))
+                    self.assertAlmostEqual(exps[index][arm], expected)
@@ -1,14 +1,16 @@
 # -*- coding: utf-8 -*-
 
-from copy import deepcopy
 import datetime
 import math
+from copy import deepcopy
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
 
-from mabwiser.mab import LearningPolicy, NeighborhoodPolicy
+from mabwiser import linear
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
 from tests.test_base import BaseTest
 
 
@@ -692,3 +694,327 @@ class LinUCBTest(BaseTest):
         # Warm start again, #3 shouldn't change even though it's closer to #2 now
         mab.warm_start(arm_to_features={1: [0, 1], 2: [0.5, 0.5], 3: [0.5, 0.5]}, distance_quantile=0.5)
         self.assertListAlmostEqual(mab._imp.arm_to_model[3].beta, [0.19635284, 0.11556404, 0.57675997, 0.30597964, -0.39100933])
+
+    def test_batch_expectations(self):
+        rng = np.random.default_rng(3)
+        context_history = rng.random((100, 5))
+        decisions = rng.integers(0, 3, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((20, 5))
+
+        for scale in [False, True]:
+            exps, mab = self.predict(arms=[0, 1, 2, 3],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=LearningPolicy.LinUCB(alpha=1.5, scale=scale),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=123456,
+                                     num_run=1,
+                                     is_predict=False)
+
+            # Stacked batch scoring matches scoring each row with each arm model
+            for index, row in enumerate(contexts):
+                self.assertListAlmostEqual(exps[index].values(),
+                                           [mab._imp.arm_to_model[arm].predict(row) for arm in [0, 1, 2, 3]])
+
+            # Scoring in multiple blocks gives the same expectations
+            block_size = linear.PREDICT_BLOCK_SIZE
+            linear.PREDICT_BLOCK_SIZE = 3 * 4 * 5
+            try:
+                block_exps = mab.predict_expectations(contexts)
+            finally:
+                linear.PREDICT_BLOCK_SIZE = block_size
+            for exp, block_exp in zip(exps, block_exps):
+                self.assertListAlmostEqual(exp.values(), block_exp.values())
+
+    def test_cholesky_solver(self):
+        rng = np.random.default_rng(5)
+        context_history = rng.random((100, 5))
+        decisions = rng.integers(0, 3, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((20, 5))
+
+        for scale in [False, True]:
+            exps, mab = self.predict(arms=[0, 1, 2, 3],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=LearningPolicy.LinUCB(alpha=1.5, scale=scale),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=123456,
+                                     num_run=1,
+                                     is_predict=False)
+
+            cholesky_exps, cholesky_mab = self.predict(arms=[0, 1, 2, 3],
+                                                       decisions=decisions,
+                                                       rewards=rewards,
+                                                       learning_policy=LearningPolicy.LinUCB(alpha=1.5, scale=scale,
+                                                                                             solver="cholesky"),
+                                                       context_history=context_history,
+                                                       contexts=contexts,
+                                                       seed=123456,
+                                                       num_run=1,
+                                                       is_predict=False)
+            self.assertEqual(cholesky_mab.learning_policy.solver, "cholesky")
+
+            # Triangular solves give the same upper confidence bounds as the explicit inverse
+            for index, row in enumerate(contexts):
+                self.assertListAlmostEqual(cholesky_exps[index].values(), exps[index].values())
+                self.assertListAlmostEqual(cholesky_exps[index].values(),
+                                           [cholesky_mab._imp.arm_to_model[arm].predict(row)
+                                            for arm in [0, 1, 2, 3]])
+
+    def test_stacked(self):
+        rng = np.random.default_rng(17)
+        context_history = rng.random((100, 5))
+        decisions = rng.integers(0, 4, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((20, 5))
+
+        for solver in ["inverse", "cholesky"]:
+            exps, mab = self.predict(arms=[0, 1, 2, 3],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=LearningPolicy.LinUCB(alpha=1.5, solver=solver),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=123456,
+                                     num_run=1,
+                                     is_predict=False)
+
+            stacked_exps, stacked_mab = self.predict(arms=[0, 1, 2, 3],
+                                                     decisions=decisions,
+                                                     rewards=rewards,
+                                                     learning_policy=LearningPolicy.LinUCB(alpha=1.5, solver=solver,
+                                                                                           stacked=True),
+                                                     context_history=context_history,
+                                                     contexts=contexts,
+                                                     seed=123456,
+                                                     num_run=1,
+                                                     is_predict=False)
+            self.assertTrue(stacked_mab.learning_policy.stacked)
+            for exp, stacked_exp in zip(exps, stacked_exps):
+                self.assertListAlmostEqual(exp.values(), stacked_exp.values())
+
+            # Models hold views into the stacked arrays
+            store = stacked_mab._imp.model_store
+            for arm in [0, 1, 2, 3]:
+                self.assertTrue(np.shares_memory(stacked_mab._imp.arm_to_model[arm].beta, store.arrays["beta"]))
+
+            # Add, remove and warm start arms
+            for m in [mab, stacked_mab]:
+                m.add_arm(4)
+                m.add_arm(5)
+                m.partial_fit([4, 4, 0], [1, 0, 1], contexts[:3])
+                m.remove_arm(1)
+                m.warm_start(arm_to_features={0: [1, 0], 2: [0, 1], 3: [1, 1], 4: [0.5, 0.5], 5: [1, 0.1]},
+                             distance_quantile=0.5)
+                m.partial_fit([5, 3], [1, 1], contexts[3:5])
+
+            self.assertListEqual(store.index_to_arm, [0, 5, 2, 3, 4])
+            for exp, stacked_exp in zip(mab.predict_expectations(contexts), stacked_mab.predict_expectations(contexts)):
+                self.assertListAlmostEqual(exp.values(), stacked_exp.values())
+
+    def test_stacked_store(self):
+        rng = np.random.default_rng(19)
+        context_history = rng.random((20, 3))
+        decisions = rng.integers(0, 2, 20)
+        rewards = rng.random(20)
+
+        mab = MAB([0, 1], LearningPolicy.LinUCB(stacked=True))
+        mab.fit(decisions, rewards, context_history)
+        store = mab._imp.model_store
+        self.assertEqual(store.arrays["A"].shape, (2, 3, 3))
+        self.assertNotIn("L", store.arrays)
+
+        # Capacity doubles when full
+        for arm in range(2, 10):
+            mab.add_arm(arm)
+        self.assertEqual(store.capacity, 16)
+        self.assertEqual(store.arrays["A"].shape, (16, 3, 3))
+
+        # Removed arms are compacted and capacity shrinks when mostly empty
+        for arm in range(2, 9):
+            mab.remove_arm(arm)
+        self.assertListEqual(store.index_to_arm, [0, 1, 9])
+        self.assertEqual(store.capacity, 8)
+        for arm in [0, 1, 9]:
+            model = mab._imp.arm_to_model[arm]
+            self.assertTrue(np.shares_memory(model.A, store.arrays["A"]))
+            self.assertTrue(np.array_equal(model.A, store.arrays["A"][store.arm_to_index[arm]]))
+        self.assertTrue(np.array_equal(mab._imp.arm_to_model[9].A, np.identity(3)))
+
+        # Copies of the bandit keep views into their own stacked arrays
+        copied = deepcopy(mab)
+        copied_store = copied._imp.model_store
+        for arm in [0, 1, 9]:
+            self.assertTrue(np.shares_memory(copied._imp.arm_to_model[arm].A, copied_store.arrays["A"]))
+            self.assertFalse(np.shares_memory(copied._imp.arm_to_model[arm].A, store.arrays["A"]))
+
+    def test_sparse_contexts(self):
+        rng = np.random.default_rng(7)
+        context_history = rng.random((200, 6))
+        context_history[context_history < 0.7] = 0
+        decisions = rng.integers(0, 3, 200)
+        rewards = rng.random(200)
+        contexts = rng.random((30, 6))
+        contexts[contexts < 0.7] = 0
+
+        for solver in ["inverse", "cholesky"]:
+            for stacked in [False, True]:
+                for incremental in [False, True]:
+                    results = []
+                    for convert in [np.asarray, sparse.csr_matrix]:
+                        mab = MAB([0, 1, 2], LearningPolicy.LinUCB(alpha=1.0, solver=solver, stacked=stacked,
+                                                                 incremental=incremental), seed=123456)
+                        mab.fit(decisions[:150], rewards[:150], convert(context_history[:150]))
+                        mab.partial_fit(decisions[150:152], rewards[150:152], convert(context_history[150:152]))
+                        mab.partial_fit(decisions[152:], rewards[152:], convert(context_history[152:]))
+                        results.append((mab.predict(convert(contexts)), mab.predict_expectations(convert(contexts))))
+
+                    self.assertListEqual(results[0][0], results[1][0])
+                    for exp, sparse_exp in zip(results[0][1], results[1][1]):
+                        self.assertListAlmostEqual(exp.values(), sparse_exp.values())
+
+    def test_covariance_approximations(self):
+        rng = np.random.default_rng(47)
+        context_history = rng.random((200, 6))
+        decisions = rng.integers(0, 3, 200)
+        rewards = rng.random(200)
+        contexts = rng.random((20, 6))
+
+        # Sketch with rank at least the number of features matches the full covariance
+        for scale in [False, True]:
+            exps, mab = self.predict(arms=[0, 1, 2],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=LearningPolicy.LinUCB(alpha=1.5, scale=scale),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=123456,
+                                     num_run=1,
+                                     is_predict=False)
+
+            sketch_exps, sketch_mab = self.predict(arms=[0, 1, 2],
+                                                   decisions=decisions,
+                                                   rewards=rewards,
+                                                   learning_policy=LearningPolicy.LinUCB(alpha=1.5, scale=scale,
+                                                                                         covariance="sketch",
+                                                                                         rank=6),
+                                                   context_history=context_history,
+                                                   contexts=contexts,
+                                                   seed=123456,
+                                                   num_run=1,
+                                                   is_predict=False)
+            self.assertEqual(sketch_mab.learning_policy.covariance, "sketch")
+            for exp, sketch_exp in zip(exps, sketch_exps):
+                self.assertListAlmostEqual(exp.values(), sketch_exp.values())
+
+            # Partial fit and single context prediction
+            mab.partial_fit(decisions[:3], rewards[:3], context_history[:3])
+            sketch_mab.partial_fit(decisions[:3], rewards[:3], context_history[:3])
+            for arm, expectation in mab.predict_expectations(contexts[:1]).items():
+                self.assertAlmostEqual(expectation, sketch_mab.predict_expectations(contexts[:1])[arm])
+
+        # Diagonal and lower rank sketch keep O(d) and O(d * r) state
+        for covariance in ["diagonal", "sketch"]:
+            mab = MAB([0, 1, 2], LearningPolicy.LinUCB(alpha=1.5, covariance=covariance, rank=2), seed=123456)
+            mab.fit(decisions, rewards, context_history)
+            mab.add_arm(3)
+            mab.warm_start({0: [0, 1], 1: [5, 5], 2: [9, 9], 3: [0, 1.1]}, 0.5)
+            model = mab._imp.arm_to_model[3]
+            self.assertIsNone(model.A_inv)
+            self.assertEqual(model.A.shape if covariance == "diagonal" else model.sketch.shape,
+                             (6,) if covariance == "diagonal" else (2, 6))
+            self.assertEqual(len(mab.predict(contexts)), 20)
+
+    def test_scaler_folded(self):
+        rng = np.random.default_rng(53)
+        context_history = rng.random((200, 5)) * 100 + 50
+        decisions = rng.integers(0, 3, 200)
+        rewards = rng.random(200)
+        contexts = rng.random((20, 5)) * 100 + 50
+
+        for solver, covariance in [("inverse", "full"), ("cholesky", "full"), ("inverse", "sketch")]:
+            mab = MAB([0, 1, 2], LearningPolicy.LinUCB(alpha=1.5, scale=True, solver=solver,
+                                                       covariance=covariance, rank=5), seed=123456)
+            mab.fit(decisions[:150], rewards[:150], context_history[:150])
+            mab.partial_fit(decisions[150:], rewards[150:], context_history[150:])
+            exps = mab.predict_expectations(contexts)
+
+            # Expectations on raw contexts match the scaled contexts of each arm
+            for arm in [0, 1, 2]:
+                model = mab._imp.arm_to_model[arm]
+                scaled = model.scaler.transform(contexts)
+                if covariance == "sketch":
+                    A_inv = np.linalg.inv(np.dot(model.sketch.T, model.sketch) + model.l2_lambda * np.identity(5))
+                else:
+                    A_inv = np.linalg.inv(model.A)
+                ucb = 1.5 * np.sqrt(np.einsum('ij,jk,ik->i', scaled, A_inv, scaled))
+                for exp, expected in zip(exps, np.dot(scaled, model.beta) + ucb):
+                    self.assertAlmostEqual(exp[arm], expected)
+                self.assertAlmostEqual(model.predict(contexts[0]), exps[0][arm])
+
+        # Shared scaler scales contexts once for all arms
+        scaler = StandardScaler().fit(context_history)
+        exps, mab = self.predict(arms=[0, 1, 2],
+                                 decisions=decisions,
+                                 rewards=rewards,
+                                 learning_policy=LearningPolicy.LinUCB(alpha=1.5),
+                                 context_history=scaler.transform(context_history),
+                                 contexts=scaler.transform(contexts),
+                                 seed=123456,
+                                 num_run=1,
+                                 is_predict=False)
+
+        for stacked in [False, True]:
+            shared_exps, shared_mab = self.predict(arms=[0, 1, 2],
+                                                   decisions=decisions,
+                                                   rewards=rewards,
+                                                   learning_policy=LearningPolicy.LinUCB(alpha=1.5, scale=True,
+                                                                                         shared_scaler=True,
+                                                                                         stacked=stacked),
+                                                   context_history=context_history,
+                                                   contexts=contexts,
+                                                   seed=123456,
+                                                   num_run=1,
+                                                   is_predict=False)
+            self.assertTrue(shared_mab.learning_policy.shared_scaler)
+            self.assertIsNone(shared_mab._imp.arm_to_model[0].scaler)
+            for exp, shared_exp in zip(exps, shared_exps):
+                self.assertListAlmostEqual(exp.values(), shared_exp.values())
+
+    def test_lazy(self):
+        rng = np.random.default_rng(17)
+        context_history = rng.random((300, 5))
+        decisions = rng.integers(0, 3, 300)
+        rewards = rng.random(300)
+        contexts = rng.random((20, 5))
+
+        for kwargs in [dict(), dict(solver="cholesky"), dict(stacked=True), dict(stacked=True, scale=True),
+                       dict(covariance="sketch", rank=3)]:
+            eager = MAB([0, 1, 2], LearningPolicy.LinUCB(alpha=1.5, **kwargs), seed=123456)
+            lazy = MAB([0, 1, 2], LearningPolicy.LinUCB(alpha=1.5, lazy=True, **kwargs), seed=123456)
+            for mab in [eager, lazy]:
+                mab.fit(decisions[:100], rewards[:100], context_history[:100])
+                for start in range(100, 300, 50):
+                    mab.partial_fit(decisions[start:start + 50], rewards[start:start + 50],
+                                    context_history[start:start + 50])
+
+            # Lazy fits only mark the arms as dirty until the models are read
+            self.assertTrue(all(model.is_dirty for model in lazy._imp.arm_to_model.values()))
+            for eager_exp, lazy_exp in zip(eager.predict_expectations(contexts), lazy.predict_expectations(contexts)):
+                self.assertListAlmostEqual(list(eager_exp.values()), list(lazy_exp.values()))
+            self.assertFalse(any(model.is_dirty for model in lazy._imp.arm_to_model.values()))
+
+            # Warm start and pickling compute the deferred coefficients
+            lazy.partial_fit(decisions, rewards, context_history)
+            copied = deepcopy(lazy)
+            self.assertFalse(any(model.is_dirty for model in copied._imp.arm_to_model.values()))
+
+            lazy.partial_fit(decisions, rewards, context_history)
+            lazy.add_arm(3)
+            lazy.warm_start({0: [0, 1], 1: [1, 0], 2: [1, 1], 3: [0, 0.9]}, distance_quantile=0.5)
+            self.assertListAlmostEqual(lazy._imp.arm_to_model[3].beta, lazy._imp.arm_to_model[0].beta)
+
@@ -201,7 +201,7 @@ class LSHNearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [3, 4])
+        self.assertListEqual(arms, [3, 3])
 
     def test_thompson_d2(self):
 
@@ -219,7 +219,7 @@ class LSHNearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [3, 1])
+        self.assertListEqual(arms, [4, 1])
 
     def test_ucb_d2(self):
 
@@ -255,7 +255,7 @@ class LSHNearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [3, 3])
+        self.assertListEqual(arms, [3, 1])
 
     def test_no_neighbors_hash(self):
         contexts = [[0, -1, -2, -3, -5], [-1, -1, -1, -1, -1], [0, -1, -2, -3, -5], [-1, -1, -1, -1, -1],
@@ -307,7 +307,7 @@ class LSHNearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [4, 3, 4, 3, 4])
+        self.assertListEqual(arms, [4, 3, 1, 3, 4])
 
         arms, mab = self.predict(arms=[1, 2, 3, 4],
                                  decisions=[1, 1, 1, 2, 2, 2],
@@ -322,7 +322,7 @@ class LSHNearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [2, 4, 4, 4, 4])
 
     def test_no_neighbors_expectations(self):
 
@@ -412,7 +412,7 @@ class LSHNearestTest(BaseTest):
                                  is_predict=True)
 
         self.assertTrue(mab._imp.lp.is_contextual_binarized)
-        self.assertListEqual(arms, [3, 1])
+        self.assertListEqual(arms, [4, 1])
         self.assertEqual(len(mab._imp.decisions), 10)
         self.assertEqual(len(mab._imp.rewards), 10)
         self.assertEqual(len(mab._imp.contexts), 10)
@@ -452,7 +452,7 @@ class LSHNearestTest(BaseTest):
                                  is_predict=True)
 
         self.assertTrue(mab._imp.lp.is_contextual_binarized)
-        self.assertListEqual(arms, [3, 1])
+        self.assertListEqual(arms, [4, 1])
         self.assertEqual(len(mab._imp.decisions), 10)
         self.assertEqual(len(mab._imp.rewards), 10)
         self.assertEqual(len(mab._imp.contexts), 10)
@@ -508,8 +508,8 @@ class LSHNearestTest(BaseTest):
                                  is_predict=True)
 
         # 3rd arm was never seen but picked up by random neighborhood in both tests
-        self.assertListEqual(arms[0], [3, 3])
-        self.assertListEqual(arms[1], [1, 1])
+        self.assertListEqual(arms[0], [2, 1])
+        self.assertListEqual(arms[1], [1, 3])
 
     def test_greedy0_no_nhood_predict_weighted(self):
 
@@ -529,7 +529,7 @@ class LSHNearestTest(BaseTest):
                                  is_predict=True)
 
         # 2nd arm is weighted highly but 3rd is picked too
-        self.assertListEqual(arms[0], [3, 2])
+        self.assertListEqual(arms[0], [2, 3])
         self.assertListEqual(arms[1], [2, 2])
 
     def test_greedy0_no_nhood_expectation_nan(self):
@@ -1,15 +1,27 @@
 # -*- coding: utf-8 -*-
 
+import gc
+import json
 import os
 import pickle
+import subprocess
+import sys
+import tempfile
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
+from scipy.spatial.distance import cdist
 
-from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy, DecisionBatch
 from tests.test_base import BaseTest
 
 
+def _binarize(arm, reward):
+    # Binarizer of saved bandits, which is pickled by reference
+    return reward > 0
+
+
 class MABTest(BaseTest):
 
     #################################################
@@ -1891,6 +1903,176 @@ class MABTest(BaseTest):
                 self.assertEqual(mab._imp.arm_to_status,
                                  {1: {'is_trained': False, 'is_warm': False, 'warm_started_by': None}})
 
+    def test_arm_statistics(self):
+
+        arms = list(range(10))
+        decisions = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9] * 3
+        rewards = [1, 0, 1, 1, 0, 0, 1, 0, 1, 1] * 3
+
+        for lp in [LearningPolicy.EpsilonGreedy(epsilon=0), LearningPolicy.Popularity(), LearningPolicy.UCB1(),
+                   LearningPolicy.Softmax(), LearningPolicy.ThompsonSampling()]:
+            mab = MAB(list(arms), lp, seed=123456)
+            mab.fit(decisions, rewards)
+
+            # Arrays grow as arms are added, and removed arms are replaced by the last arm
+            for arm in range(10, 40):
+                mab.add_arm(arm)
+            for arm in [0, 2, 35, 7, 11]:
+                mab.remove_arm(arm)
+            statistics = mab._imp.statistics
+            self.assertEqual(len(statistics), 35)
+            self.assertEqual(sorted(statistics.index_to_arm), sorted(mab.arms))
+            for arm, index in statistics.arm_to_index.items():
+                self.assertEqual(statistics.index_to_arm[index], arm)
+
+            # Dictionaries of statistics keep the order of arms
+            self.assertListEqual(list(mab._imp.arm_to_expectation.keys()), mab.arms)
+            self.assertListEqual(statistics.arms, mab.arms)
+
+            # Ties are broken by the order of arms, as with dictionaries
+            if isinstance(lp, (LearningPolicy.EpsilonGreedy, LearningPolicy.UCB1)):
+                expectations = mab.predict_expectations()
+                self.assertEqual(mab.predict(), max(expectations, key=expectations.get))
+            mab.partial_fit([12, 13], [1, 1])
+
+            # Statistics are kept by pickling
+            copied = pickle.loads(pickle.dumps(mab))
+            self.assertDictEqual(copied._imp.arm_to_expectation, mab._imp.arm_to_expectation)
+
+        # Arrays shrink when most arms are removed
+        mab = MAB(list(range(100)), LearningPolicy.EpsilonGreedy(epsilon=0))
+        mab.fit(list(range(100)), [arm % 7 for arm in range(100)])
+        for arm in range(90):
+            mab.remove_arm(arm)
+        self.assertLess(mab._imp.statistics.capacity, 100)
+        self.assertDictEqual(mab._imp.arm_to_expectation, dict((arm, arm % 7) for arm in range(90, 100)))
+        self.assertEqual(mab.predict(), 90)
+
+    def test_predict_as_array(self):
+
+        arms, decisions, rewards, contexts, test = self.get_history()
+
+        policies = [(lp, None) for lp in BaseTest.lps + BaseTest.para_lps[::4]]
+        policies += [(lp, nbp) for lp in [LearningPolicy.EpsilonGreedy(epsilon=0.5), LearningPolicy.UCB1(),
+                                          LearningPolicy.ThompsonSampling(), LearningPolicy.LinTS()]
+                     for nbp in BaseTest.nps[::3] + BaseTest.cps[:1] if self.is_compatible(lp, nbp)]
+        policies += [(LearningPolicy.Softmax(), NeighborhoodPolicy.Radius(0.1))]
+
+        for lp, nbp in policies:
+            for n_jobs in [1, 2]:
+                mab = MAB(arms, lp, nbp, seed=123456, n_jobs=n_jobs)
+                mab.fit(decisions, rewards, contexts if mab.is_contextual else None)
+                inputs = test if mab.is_contextual else [[0]] * 10
+
+                # Predictions with the same seed are the same as the arms and dictionaries
+                copied = pickle.loads(pickle.dumps(mab))
+                indices = mab.predict(inputs, as_array=True)
+                self.assertEqual(indices.shape, (10,))
+                self.assertListEqual([mab.arms[index] for index in indices], copied.predict(inputs))
+
+                expectations, columns = mab.predict_expectations(inputs, as_array=True)
+                arm_to_expectations = copied.predict_expectations(inputs)
+                self.assertListEqual(columns, arms)
+                self.assertEqual(expectations.shape, (10, 3))
+                for row, arm_to_expectation in zip(expectations, arm_to_expectations):
+                    np.testing.assert_array_equal(row, [arm_to_expectation[arm] for arm in arms])
+
+                # A single context is returned as arrays
+                self.assertEqual(mab.predict(inputs[:1], as_array=True).shape, (1,))
+                self.assertEqual(mab.predict_expectations(inputs[:1], as_array=True)[0].shape, (1, 3))
+
+    def test_save_load(self):
+
+        arms, decisions, rewards, contexts, test = self.get_history()
+
+        policies = [(LearningPolicy.UCB1(), None), (LearningPolicy.ThompsonSampling(), None),
+                    (LearningPolicy.LinUCB(scale=True), None), (LearningPolicy.LinTS(stacked=True), None),
+                    (LearningPolicy.EpsilonGreedy(), NeighborhoodPolicy.KNearest(5)),
+                    (LearningPolicy.UCB1(), NeighborhoodPolicy.Clusters(2)),
+                    (LearningPolicy.EpsilonGreedy(), NeighborhoodPolicy.TreeBandit()),
+                    (LearningPolicy.ThompsonSampling(), NeighborhoodPolicy.LSHNearest())]
+
+        for lp, nbp in policies:
+            mab = MAB(arms, lp, nbp, seed=123456)
+            mab.fit(decisions, rewards, contexts if mab.is_contextual else None)
+            inputs = test if mab.is_contextual else None
+
+            with tempfile.TemporaryDirectory() as path:
+                mab.save(path)
+
+                # Policies are described by the header, the state and the arrays, without pickles
+                self.assertSetEqual(set(os.listdir(path)), {"header.json", "state.json", "arrays"})
+                with open(os.path.join(path, "header.json")) as file:
+                    header = json.load(file)
+                self.assertListEqual(header["arms"], arms)
+                self.assertEqual(header["learning_policy"]["name"], type(lp).__name__)
+                self.assertDictEqual(header["learning_policy"]["parameters"], lp._asdict())
+                size = sum(os.path.getsize(os.path.join(path, "arrays", file))
+                           for file in os.listdir(os.path.join(path, "arrays")))
+
+                for mmap in [True, False]:
+
+                    # Loaded bandits predict the same as copies of the bandit
+                    loaded = MAB.load(path, mmap=mmap)
+                    copied = pickle.loads(pickle.dumps(mab))
+                    self.assertListEqual(loaded.arms, arms)
+                    self.assertEqual(loaded.learning_policy, mab.learning_policy)
+                    self.assertEqual(type(loaded.neighborhood_policy), type(mab.neighborhood_policy))
+                    self.assertEqual(loaded.predict(inputs), copied.predict(inputs))
+                    self.assertEqual(loaded.predict_expectations(inputs), copied.predict_expectations(inputs))
+
+                    # Loaded bandits are updated without changing the saved bandit
+                    loaded.partial_fit(decisions[:10], rewards[:10], contexts[:10] if mab.is_contextual else None)
+                    copied.partial_fit(decisions[:10], rewards[:10], contexts[:10] if mab.is_contextual else None)
+                    self.assertEqual(loaded.predict(inputs), copied.predict(inputs))
+                    self.assertEqual(sum(os.path.getsize(os.path.join(path, "arrays", file))
+                                         for file in os.listdir(os.path.join(path, "arrays"))), size)
+
+                    # Release the memory map of the files before the directory is removed
+                    del loaded, copied
+                    gc.collect()
+
+        with tempfile.TemporaryDirectory() as path:
+
+            # Context history is memory mapped from its file
+            mab = MAB(arms, LearningPolicy.EpsilonGreedy(), NeighborhoodPolicy.KNearest(5), seed=123456)
+            mab.fit(decisions, rewards, contexts)
+            mab.save(path)
+            loaded = MAB.load(path)
+            self.assertTrue(isinstance(loaded._imp.contexts.base, np.memmap))
+            self.assertTrue(np.array_equal(loaded._imp.contexts, mab._imp.contexts))
+            self.assertFalse(isinstance(MAB.load(path, mmap=False)._imp.contexts.base, np.memmap))
+
+            # Models of stacked arms remain views into the stacked arrays
+            mab = MAB(arms, LearningPolicy.LinUCB(stacked=True), seed=123456)
+            mab.fit(decisions, rewards, contexts)
+            mab.save(path)
+            loaded = MAB.load(path)
+            self.assertTrue(np.shares_memory(loaded._imp.arm_to_model['b'].beta,
+                                             loaded._imp.model_store.arrays["beta"]))
+
+            # Only values that cannot be described by the state are pickled
+            mab = MAB(arms, LearningPolicy.ThompsonSampling(binarizer=_binarize), seed=123456)
+            mab.fit(decisions, rewards)
+            mab.save(path)
+            self.assertSetEqual(set(os.listdir(path)), {"header.json", "state.json", "arrays", "objects.pkl"})
+            loaded = MAB.load(path)
+            self.assertIs(loaded.learning_policy.binarizer, _binarize)
+            self.assertIs(loaded._imp.binarizer, _binarize)
+            self.assertEqual(loaded.predict_expectations(), mab.predict_expectations())
+
+            # Bandits saved by another version of mabwiser are loaded with a warning
+            with open(os.path.join(path, "header.json")) as file:
+                header = json.load(file)
+            header["mabwiser_version"] = "0.0.0"
+            with open(os.path.join(path, "header.json"), "w") as file:
+                json.dump(header, file)
+            with self.assertWarns(UserWarning):
+                MAB.load(path, mmap=False)
+
+            del loaded
+            gc.collect()
+
     def test_reset_status(self):
         rng = np.random.RandomState(seed=9)
         train_data = pd.DataFrame({'a': [0.1, 0, 0.1, 0, 0, 0.1, 0, 0, 0.1, 0, 0, 0.1, 0, 0.1, 0, 0, 0.1, 0, 0.1, 0],
@@ -1959,3 +2141,293 @@ class MABTest(BaseTest):
             mab.warm_start(arm_to_features={1: [0, 1], 2: [0, 0], 3: [0.5, 0.5]}, distance_quantile=0.5)
             self.assertListEqual(mab.cold_arms, list())
 
+    def test_fit_grouped_arms(self):
+        rng = np.random.default_rng(3)
+        arms = ['a', 'b', 'c', 'd']
+        decisions = rng.choice(['a', 'b', 'c'], size=200)
+        rewards = rng.random(200)
+
+        mab = MAB(arms, LearningPolicy.EpsilonGreedy(epsilon=0))
+        mab.fit(decisions, rewards)
+
+        # Decisions are grouped once in increasing order, arms without decisions are not grouped
+        arm_to_indices = mab._imp._get_arm_to_indices(decisions)
+        self.assertListEqual(list(arm_to_indices.keys()), ['a', 'b', 'c'])
+        for arm, indices in arm_to_indices.items():
+            self.assertTrue(np.array_equal(indices, np.flatnonzero(decisions == arm)))
+
+        # Each arm is fitted with its own rows only
+        for arm in ['a', 'b', 'c']:
+            self.assertAlmostEqual(mab._imp.arm_to_expectation[arm], rewards[decisions == arm].mean())
+        self.assertEqual(mab._imp.arm_to_expectation['d'], 0)
+        self.assertDictEqual(mab._imp._get_arm_to_indices(np.array([])), dict())
+
+    def test_dtype(self):
+        rng = np.random.default_rng(7)
+        context_history = rng.random((200, 5))
+        decisions = rng.integers(0, 3, 200)
+        rewards = rng.random(200)
+        contexts = rng.random((50, 5))
+
+        for lp in [LearningPolicy.LinGreedy(epsilon=0), LearningPolicy.LinUCB(alpha=1, scale=True),
+                   LearningPolicy.LinUCB(solver="cholesky", incremental=True), LearningPolicy.LinTS(stacked=True)]:
+            mab = MAB([0, 1, 2], lp, dtype=np.float64)
+            mab.fit(decisions, rewards, context_history)
+            mab32 = MAB([0, 1, 2], lp, dtype='float32')
+            mab32.fit(decisions, rewards, context_history)
+            for index in range(5):
+                mab.partial_fit(decisions[index:index + 1], rewards[index:index + 1], context_history[index:index + 1])
+                mab32.partial_fit(decisions[index:index + 1], rewards[index:index + 1],
+                                  context_history[index:index + 1])
+
+            # Model state is kept in float32
+            self.assertEqual(mab32.dtype, np.float32)
+            for arm in [0, 1, 2]:
+                model = mab32._imp.arm_to_model[arm]
+                for array in [model.A, model.Xty, model.beta, model.A_inv if model.L is None else model.L]:
+                    self.assertEqual(array.dtype, np.float32)
+
+            # Expectations are close to float64
+            exps = mab.predict_expectations(contexts)
+            exps32 = mab32.predict_expectations(contexts)
+            for exp, exp32 in zip(exps, exps32):
+                self.assertTrue(np.allclose(list(exp.values()), list(exp32.values()), atol=1e-4))
+                self.assertEqual(type(exp32[0]), np.float32)
+
+    def test_dtype_neighbors(self):
+        rng = np.random.default_rng(9)
+        context_history = rng.random((100, 4))
+        decisions = rng.integers(0, 3, 100)
+        rewards = rng.random(100)
+        contexts = rng.random((10, 4))
+
+        for metric in ["euclidean", "sqeuclidean", "cosine", "cityblock"]:
+            mab = MAB([0, 1, 2], LearningPolicy.LinGreedy(epsilon=0), NeighborhoodPolicy.KNearest(k=10, metric=metric))
+            mab.fit(decisions, rewards, context_history)
+            mab32 = MAB([0, 1, 2], LearningPolicy.LinGreedy(epsilon=0),
+                        NeighborhoodPolicy.KNearest(k=10, metric=metric), dtype=np.float32)
+            mab32.fit(pd.Series(decisions), pd.Series(rewards), pd.DataFrame(context_history))
+            mab32.partial_fit(decisions[:2], rewards[:2], context_history[:2].tolist())
+            mab.partial_fit(decisions[:2], rewards[:2], context_history[:2])
+
+            # Stored contexts and distances are float32
+            self.assertEqual(mab32._imp.contexts.dtype, np.float32)
+            distances = mab32._imp._get_distances(contexts[:1].astype(np.float32))
+            self.assertTrue(np.allclose(distances, mab._imp._get_distances(contexts[:1]), atol=1e-5))
+            if metric != "cityblock":
+                self.assertEqual(distances.dtype, np.float32)
+
+            self.assertListEqual(mab.predict(contexts), mab32.predict(contexts))
+
+    def test_lazy_imports(self):
+
+        # Importing the bandit does not import the dependencies of the policies and inputs
+        code = ("import sys; import mabwiser.mab; "
+                "print(' '.join(m for m in ('joblib', 'pandas', 'scipy', 'sklearn') if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "")
+
+        # Dependencies are imported on first use by the policy that needs them
+        code = ("import sys; from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy; "
+                "mab = MAB([1, 2], LearningPolicy.EpsilonGreedy(), NeighborhoodPolicy.TreeBandit()); "
+                "mab.fit([1, 2, 1], [0, 1, 1], [[0, 1], [1, 0], [1, 1]]); "
+                "print(' '.join(m for m in ('pandas', 'sklearn.cluster', 'sklearn.tree') if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "sklearn.tree")
+
+    def test_decision_batch(self):
+
+        arms, decisions, rewards, contexts, test = self.get_history()
+
+        batch = DecisionBatch(pd.Series(decisions), rewards.tolist(), pd.DataFrame(contexts))
+        self.assertEqual(len(batch), 100)
+        self.assertListEqual(batch.arms, arms)
+        self.assertTrue(np.array_equal(np.asarray(arms)[batch.codes], decisions))
+        for arm in arms:
+            self.assertTrue(np.array_equal(batch.arm_to_indices[arm], np.flatnonzero(decisions == arm)))
+        self.assertTrue(batch.contexts.flags['C_CONTIGUOUS'])
+        self.assertTrue(batch.is_binary)
+
+        # Contexts are converted once for each floating point type
+        self.assertIs(batch.get_contexts(np.float64), batch.contexts)
+        self.assertIs(batch.get_contexts(np.float32), batch.get_contexts(np.float32))
+
+        # Fitting, updating and predicting with a batch is the same as with the data
+        for learning_policy, neighborhood_policy in [(LearningPolicy.EpsilonGreedy(epsilon=0.1), None),
+                                                     (LearningPolicy.ThompsonSampling(), None),
+                                                     (LearningPolicy.LinUCB(alpha=1.0), None),
+                                                     (LearningPolicy.LinTS(alpha=1.0), None),
+                                                     (LearningPolicy.UCB1(), NeighborhoodPolicy.KNearest(k=10)),
+                                                     (LearningPolicy.EpsilonGreedy(),
+                                                      NeighborhoodPolicy.TreeBandit())]:
+            mab = MAB(arms, learning_policy, neighborhood_policy, seed=7)
+            batch_mab = MAB(arms, learning_policy, neighborhood_policy, seed=7)
+            mab_contexts = contexts if mab.is_contextual else None
+            mab_test = test if mab.is_contextual else None
+
+            mab.partial_fit(decisions[:50], rewards[:50], None if mab_contexts is None else mab_contexts[:50])
+            mab.partial_fit(decisions[50:], rewards[50:], None if mab_contexts is None else mab_contexts[50:])
+            batch_mab.partial_fit(DecisionBatch(decisions[:50], rewards[:50], contexts[:50]))
+            batch_mab.partial_fit(DecisionBatch(decisions[50:], rewards[50:], contexts[50:]))
+            self.assertEqual(mab.predict(mab_test), batch_mab.predict(DecisionBatch(contexts=mab_test)))
+
+            mab.fit(decisions, rewards, mab_contexts)
+            batch_mab.fit(batch)
+            self.assertEqual(mab.predict(test), batch_mab.predict(DecisionBatch(contexts=test)))
+            expectations = mab.predict_expectations(test, as_array=True)[0]
+            batch_expectations = batch_mab.predict_expectations(DecisionBatch(contexts=test), as_array=True)[0]
+            self.assertTrue(np.allclose(expectations, batch_expectations))
+
+        # Sparse contexts are kept sparse
+        sparse_batch = DecisionBatch(decisions, rewards, sparse.csc_matrix(contexts))
+        self.assertTrue(sparse.isspmatrix_csr(sparse_batch.contexts))
+        mab = MAB(arms, LearningPolicy.LinUCB(alpha=1.0), seed=7)
+        mab.fit(sparse_batch)
+        self.assertEqual(mab.predict(DecisionBatch(contexts=sparse.csr_matrix(test[:1]))),
+                         mab.predict(test[:1]))
+
+        # A series is a single context without decisions
+        self.assertEqual(DecisionBatch(contexts=pd.Series(test[0])).contexts.shape, (1, 4))
+
+    def test_decision_codes(self):
+
+        arms, decisions, rewards, contexts, test = self.get_history()
+
+        # Arms keep their codes when arms are removed and added, unknown decisions get new codes
+        mab = MAB(arms, LearningPolicy.EpsilonGreedy(epsilon=0.1), seed=7)
+        arm_index = mab._imp._arm_index
+        self.assertDictEqual(arm_index.arm_to_code, {'a': 0, 'b': 1, 'c': 2})
+        mab.remove_arm('b')
+        mab.add_arm('d')
+        mab.add_arm('b')
+        self.assertDictEqual(arm_index.arm_to_code, {'a': 0, 'b': 1, 'c': 2, 'd': 3})
+        codes = arm_index.encode(np.asarray(['d', 'a', 'e', 'a']))
+        self.assertEqual(codes.dtype, np.int32)
+        self.assertListEqual(codes.tolist(), [3, 0, 4, 0])
+        self.assertListEqual(arm_index.get_arms(codes), ['a', 'd', 'e'])
+        groups = arm_index.group(codes)
+        self.assertListEqual(list(groups.keys()), ['a', 'd', 'e'])
+        self.assertListEqual(groups['a'].tolist(), [1, 3])
+
+        # Numeric decisions are encoded to the codes of the equal arms
+        arm_index = MAB([1, 2, 3], LearningPolicy.EpsilonGreedy(epsilon=0.1))._imp._arm_index
+        self.assertListEqual(arm_index.encode(np.asarray([3.0, 1.0, 3.0])).tolist(), [2, 0, 2])
+
+        # Policies that contain learning policies share the arm index and fit them with codes,
+        # so that string arms give the same results as the integer arms they are mapped to
+        to_int = dict((arm, index) for index, arm in enumerate(arms))
+        int_decisions = np.asarray([to_int[decision] for decision in decisions])
+        for neighborhood_policy in [NeighborhoodPolicy.KNearest(k=10), NeighborhoodPolicy.Radius(radius=1),
+                                    NeighborhoodPolicy.Clusters(n_clusters=2), NeighborhoodPolicy.TreeBandit()]:
+            mab = MAB(arms, LearningPolicy.EpsilonGreedy(epsilon=0.1), neighborhood_policy, seed=7)
+            int_mab = MAB(list(range(3)), LearningPolicy.EpsilonGreedy(epsilon=0.1), neighborhood_policy, seed=7)
+            mab.fit(decisions, rewards, contexts)
+            int_mab.fit(int_decisions, rewards, contexts)
+            self.assertListEqual([to_int[arm] for arm in mab.predict(test)], int_mab.predict(test))
+
+    def test_warm_start_distances(self):
+
+        rng = np.random.RandomState(seed=7)
+        arm_to_features = dict((arm, rng.randint(3, size=4).tolist()) for arm in range(50))
+        arm_to_features[0] = [0, 0, 0, 0]
+
+        # Minimum distances kept between warm starts are the same as computed for all arms,
+        # when arms are added or removed and features change
+        mab = MAB(list(range(50)), LearningPolicy.EpsilonGreedy(epsilon=0.0), seed=7)
+        mab._imp._arm_distances.block_size = 64
+        mab.fit(rng.randint(10, size=200), rng.randint(2, size=200))
+        for step in range(3):
+            mab.warm_start(arm_to_features, distance_quantile=0.5)
+            distances = mab._imp._arm_distances
+            fresh = MAB(list(arm_to_features.keys()), LearningPolicy.EpsilonGreedy(epsilon=0.0))._imp._arm_distances
+            fresh.update(arm_to_features)
+            self.assertListEqual(list(distances.arm_to_row.keys()), list(fresh.arm_to_row.keys()))
+            self.assertTrue(np.allclose(distances.min_distances, fresh.min_distances))
+            self.assertTrue(np.isinf(distances.min_distances[distances.arm_to_row[0]]))
+
+            mab.add_arm(50 + step)
+            mab.remove_arm(20 + step)
+            arm_to_features.pop(20 + step)
+            arm_to_features[50 + step] = rng.randint(3, size=4).tolist()
+            arm_to_features[10 + step] = rng.randint(3, size=4).tolist()
+
+        # Cold arms are warm started by their closest trained arm within the threshold
+        mab = MAB(['a', 'b', 'c', 'd'], LearningPolicy.EpsilonGreedy(epsilon=0.0), seed=7)
+        mab.fit(['a', 'b'], [1, 0])
+        mab.warm_start({'a': [1, 0], 'b': [0, 1], 'c': [1, 0.1], 'd': [-1, -1]}, distance_quantile=0.5)
+        self.assertDictEqual(mab._imp.cold_arm_to_warm_arm, {'c': 'a'})
+
+        # Cold arms with the same features as trained arms are at distance zero, within a zero threshold
+        mab = MAB(['a', 'b', 'c', 'd'], LearningPolicy.EpsilonGreedy(epsilon=0.0), seed=7)
+        mab.fit(['a', 'b'], [1, 0])
+        mab.warm_start({'a': [1, 2, 2], 'b': [3, 1, 1], 'c': [1, 2, 2], 'd': [3, 1, 1]}, distance_quantile=0.5)
+        self.assertDictEqual(mab._imp.cold_arm_to_warm_arm, {'c': 'a', 'd': 'b'})
+
+        # Cold arms are matched as with the distances of each pair of arms, ties going to the first trained arm
+        for seed in range(10):
+            rng = np.random.RandomState(seed=seed)
+            arm_to_features = dict((arm, rng.randint(3, size=3).tolist()) for arm in range(20))
+            mab = MAB(list(range(20)), LearningPolicy.EpsilonGreedy(epsilon=0.0), seed=7)
+            mab.fit(list(range(10)), rng.randint(2, size=10))
+            mab.warm_start(arm_to_features, distance_quantile=0.5)
+
+            # Nan distances of all-zero features are ignored
+            distances = dict(((from_arm, to_arm), np.nan_to_num(cdist([arm_to_features[from_arm]],
+                                                                      [arm_to_features[to_arm]],
+                                                                      metric='cosine')[0, 0], nan=np.inf))
+                             for from_arm in range(20) for to_arm in range(20) if from_arm != to_arm)
+            closest_distances = [min(distances[arm, other] for other in range(20) if other != arm)
+                                 for arm in range(20)]
+            threshold = np.quantile([distance for distance in closest_distances if np.isfinite(distance)], q=0.5)
+            expected = dict()
+            for cold_arm in range(10, 20):
+                warm_arm = min(range(10), key=lambda arm: distances[cold_arm, arm])
+                if distances[cold_arm, warm_arm] <= threshold:
+                    expected[cold_arm] = warm_arm
+            self.assertDictEqual(mab._imp.cold_arm_to_warm_arm, expected)
+
+    def test_add_remove_arms(self):
+
+        rng = np.random.RandomState(seed=7)
+        decisions = rng.randint(5, size=100)
+        rewards = rng.randint(2, size=100)
+        contexts = rng.rand(100, 3)
+        test = rng.rand(10, 3)
+
+        # Adding and removing arms at once is the same as one by one
+        for learning_policy, neighborhood_policy in [(LearningPolicy.EpsilonGreedy(epsilon=0.1), None),
+                                                     (LearningPolicy.Popularity(), None),
+                                                     (LearningPolicy.Softmax(tau=1), None),
+                                                     (LearningPolicy.ThompsonSampling(), None),
+                                                     (LearningPolicy.UCB1(alpha=1), None),
+                                                     (LearningPolicy.LinUCB(alpha=1), None),
+                                                     (LearningPolicy.LinUCB(alpha=1, scale=True), None),
+                                                     (LearningPolicy.UCB1(alpha=1),
+                                                      NeighborhoodPolicy.KNearest(k=10)),
+                                                     (LearningPolicy.EpsilonGreedy(epsilon=0.1),
+                                                      NeighborhoodPolicy.Clusters(n_clusters=2)),
+                                                     (LearningPolicy.EpsilonGreedy(epsilon=0.1),
+                                                      NeighborhoodPolicy.TreeBandit())]:
+            mab = MAB(list(range(5)), learning_policy, neighborhood_policy, seed=7)
+            bulk_mab = MAB(list(range(5)), learning_policy, neighborhood_policy, seed=7)
+            mab_contexts = contexts if mab.is_contextual else None
+            mab_test = test if mab.is_contextual else None
+            mab.fit(decisions, rewards, mab_contexts)
+            bulk_mab.fit(decisions, rewards, mab_contexts)
+
+            for arm in range(5, 50):
+                mab.add_arm(arm)
+            for arm in [1, 3] + list(range(10, 45)):
+                mab.remove_arm(arm)
+            bulk_mab.add_arms(list(range(5, 50)))
+            bulk_mab.remove_arms([1, 3] + list(range(10, 45)))
+
+            self.assertListEqual(mab.arms, bulk_mab.arms)
+            self.assertEqual(mab.predict(mab_test), bulk_mab.predict(mab_test))
+            if neighborhood_policy is None:
+                self.assertTrue(np.allclose(mab.predict_expectations(mab_test, as_array=True)[0],
+                                            bulk_mab.predict_expectations(mab_test, as_array=True)[0]))
+
+            mab.partial_fit(decisions, rewards, mab_contexts)
+            bulk_mab.partial_fit(decisions, rewards, mab_contexts)
+            self.assertEqual(mab.predict(mab_test), bulk_mab.predict(mab_test))
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from copy import deepcopy
+
 import numpy as np
 
 from mabwiser.mab import LearningPolicy, NeighborhoodPolicy
@@ -115,7 +117,7 @@ class NearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [2, 1])
+        self.assertListEqual(arms, [1, 3])
 
     def test_thompson_k2(self):
 
@@ -133,7 +135,7 @@ class NearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [2, 1])
+        self.assertListEqual(arms, [4, 1])
 
     def test_ucb_k2(self):
 
@@ -169,7 +171,7 @@ class NearestTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
 
-        self.assertListEqual(arms, [1, 3])
+        self.assertListEqual(arms, [4, 4])
 
     def test_max_k(self):
 
@@ -243,7 +245,7 @@ class NearestTest(BaseTest):
                                  is_predict=True)
 
         self.assertTrue(mab._imp.lp.is_contextual_binarized)
-        self.assertListEqual(arms, [2, 1])
+        self.assertListEqual(arms, [4, 1])
         self.assertEqual(len(mab._imp.decisions), 10)
         self.assertEqual(len(mab._imp.rewards), 10)
         self.assertEqual(len(mab._imp.contexts), 10)
@@ -260,7 +262,7 @@ class NearestTest(BaseTest):
         self.assertEqual(len(mab._imp.contexts), 13)
         self.assertEqual(np.ndim(mab._imp.decisions), 1)
         arm = mab.predict([[0, 1, 2, 3, 5]])
-        self.assertEqual(arm, 2)
+        self.assertEqual(arm, 1)
         self.assertListEqual(list(set(mab._imp.rewards)), [0, 1])
 
     def test_fit_twice_thompson_thresholds(self):
@@ -285,7 +287,7 @@ class NearestTest(BaseTest):
                                  is_predict=True)
 
         self.assertTrue(mab._imp.lp.is_contextual_binarized)
-        self.assertListEqual(arms, [2, 1])
+        self.assertListEqual(arms, [4, 1])
         self.assertEqual(len(mab._imp.decisions), 10)
         self.assertEqual(len(mab._imp.rewards), 10)
         self.assertEqual(len(mab._imp.contexts), 10)
@@ -383,3 +385,38 @@ class NearestTest(BaseTest):
         self.assertTrue(mab._imp.arm_to_features is not None)
         self.assertTrue(mab._imp.distance_quantile is not None)
         self.assertTrue(len(mab._imp.cold_arm_to_warm_arm) == 0)
+
+    def test_warm_start_predict_twice(self):
+        rng = np.random.RandomState(seed=7)
+        decisions = rng.choice([1, 2, 3], size=200)
+        rewards = rng.rand(200)
+        context_history = rng.normal(size=(200, 3))
+        contexts = rng.normal(size=(40, 3))
+
+        for lp in [LearningPolicy.EpsilonGreedy(epsilon=0.1), LearningPolicy.UCB1(), LearningPolicy.Softmax(),
+                   LearningPolicy.LinUCB()]:
+            exps, mab = self.predict(arms=[1, 2, 3, 4, 5],
+                                     decisions=decisions,
+                                     rewards=rewards,
+                                     learning_policy=lp,
+                                     neighborhood_policy=NeighborhoodPolicy.KNearest(3),
+                                     context_history=context_history,
+                                     contexts=contexts,
+                                     seed=3,
+                                     num_run=1,
+                                     is_predict=False)
+            mab.warm_start(arm_to_features=dict((arm, [arm, 1.0]) for arm in mab.arms), distance_quantile=0.9)
+            trained_arms = list(mab._imp.lp.trained_arms)
+            cold_arm_to_warm_arm = dict(mab._imp.lp.cold_arm_to_warm_arm)
+            arm_to_expectation = dict(mab._imp.lp.arm_to_expectation)
+
+            # Predictions on neighborhoods do not change the learning policy, so do not depend on earlier predictions
+            copied = deepcopy(mab)
+            mab.predict_expectations(contexts)
+            copied._rng.rng.bit_generator.state = mab._rng.rng.bit_generator.state
+            first, arms = mab.predict_expectations(contexts, as_array=True)
+            second, arms = copied.predict_expectations(contexts, as_array=True)
+            self.assertTrue(np.array_equal(first, second))
+            self.assertListEqual(mab._imp.lp.trained_arms, trained_arms)
+            self.assertDictEqual(mab._imp.lp.cold_arm_to_warm_arm, cold_arm_to_warm_arm)
+            self.assertDictEqual(mab._imp.lp.arm_to_expectation, arm_to_expectation)
@@ -1,8 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import gc
+import os
+import pickle
+from unittest.mock import patch
+
 import numpy as np
+from joblib import cpu_count
 
-from mabwiser.mab import LearningPolicy, NeighborhoodPolicy
+from mabwiser.base_mab import BaseMAB
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+from mabwiser.utils import _Resident, _SharedArrays
 from tests.test_base import BaseTest
 
 
@@ -281,7 +289,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -295,7 +303,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -309,7 +317,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
     def test_greedy1_r2(self):
 
@@ -325,7 +333,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -339,7 +347,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -353,7 +361,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
     def test_greedy1_n3(self):
         rng = np.random.RandomState(seed=7)
@@ -370,7 +378,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -384,7 +392,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -398,7 +406,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
     def test_greedy1_a2(self):
         rng = np.random.RandomState(seed=7)
@@ -415,7 +423,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [1, 3, 3, 3, 1, 2, 1, 1, 2, 2])
+        self.assertListEqual(arms, [2, 3, 1, 2, 2, 2, 3, 1, 3, 2])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -429,7 +437,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [1, 3, 3, 3, 1, 2, 1, 1, 2, 2])
+        self.assertListEqual(arms, [2, 3, 1, 2, 2, 2, 3, 1, 3, 2])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -443,7 +451,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [1, 3, 3, 3, 1, 2, 1, 1, 2, 2])
+        self.assertListEqual(arms, [2, 3, 1, 2, 2, 2, 3, 1, 3, 2])
 
     def test_thompson_k2(self):
 
@@ -459,7 +467,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 1, 1, 1, 2, 2, 1])
+        self.assertListEqual(arms, [2, 1, 1, 3, 3, 1, 1, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -473,7 +481,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 1, 1, 1, 2, 2, 1])
+        self.assertListEqual(arms, [2, 1, 1, 3, 3, 1, 1, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -487,7 +495,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 1, 1, 1, 2, 2, 1])
+        self.assertListEqual(arms, [2, 1, 1, 3, 3, 1, 1, 1, 2, 1])
 
     def test_thompson_r2(self):
 
@@ -503,7 +511,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -517,7 +525,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -531,7 +539,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
     def test_thompson_n3(self):
         rng = np.random.RandomState(seed=7)
@@ -548,7 +556,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [1, 2, 3, 3, 2, 1, 3, 1, 1, 3])
+        self.assertListEqual(arms, [1, 3, 1, 2, 3, 3, 1, 2, 1, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -562,7 +570,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [3, 1, 1, 2, 1, 1, 1, 1, 1, 3])
+        self.assertListEqual(arms, [1, 1, 1, 1, 2, 3, 1, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -576,7 +584,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [3, 2, 3, 2, 2, 2, 3, 3, 2, 3])
+        self.assertListEqual(arms, [2, 3, 3, 2, 2, 3, 3, 2, 1, 3])
 
     def test_thompson_a2(self):
 
@@ -592,7 +600,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=1)
 
-        self.assertListEqual(arms, [3, 1, 2, 2, 2, 3, 1, 2, 3, 1])
+        self.assertListEqual(arms, [3, 3, 3, 2, 2, 1, 2, 1, 1, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -606,7 +614,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=2)
 
-        self.assertListEqual(arms, [3, 1, 2, 2, 2, 3, 1, 2, 3, 1])
+        self.assertListEqual(arms, [3, 3, 3, 2, 2, 1, 2, 1, 1, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -620,7 +628,7 @@ class ParallelTest(BaseTest):
                                  is_predict=True,
                                  n_jobs=-1)
 
-        self.assertListEqual(arms, [3, 1, 2, 2, 2, 3, 1, 2, 3, 1])
+        self.assertListEqual(arms, [3, 3, 3, 2, 2, 1, 2, 1, 1, 1])
 
 
     def test_linUCB(self):
@@ -759,7 +767,7 @@ class ParallelTest(BaseTest):
                                 is_predict=True,
                                 n_jobs=1)
 
-        self.assertEqual(arm, [4, 4, 3, 3, 4, 4, 4, 3, 4, 5])
+        self.assertEqual(arm, [3, 4, 4, 3, 4, 5, 4, 3, 4, 3])
 
         arm, mab = self.predict(arms=[1, 2, 3, 4, 5],
                                 decisions=[1, 1, 4, 2, 2, 2, 3, 3, 3, 1],
@@ -775,7 +783,7 @@ class ParallelTest(BaseTest):
                                 is_predict=True,
                                 n_jobs=2)
 
-        self.assertEqual(arm, [4, 4, 3, 3, 4, 4, 4, 3, 4, 5])
+        self.assertEqual(arm, [3, 4, 4, 3, 4, 5, 4, 3, 4, 3])
 
         arm, mab = self.predict(arms=[1, 2, 3, 4, 5],
                                 decisions=[1, 1, 4, 2, 2, 2, 3, 3, 3, 1],
@@ -791,23 +799,23 @@ class ParallelTest(BaseTest):
                                 is_predict=True,
                                 n_jobs=-1)
 
-        self.assertEqual(arm, [4, 4, 3, 3, 4, 4, 4, 3, 4, 5])
+        self.assertEqual(arm, [3, 4, 4, 3, 4, 5, 4, 3, 4, 3])
 
     def test_linTS_expectations(self):
 
         rng = np.random.RandomState(seed=111)
         contexts = rng.randint(0, 5, (5, 5))
 
-        expected_pred = [[0.9167267352065508, 0.6800548963827412, 1.4147481760827891,
-                          2.061680527026926, -0.6516833696912612],
-                         [0.8104296620172513, 0.26691232761493117, 0.6503604017431508,
-                          0.9977263420741849, -0.6447229745688157],
-                         [-0.009581460000014294, 0.881059511216882, 1.0576520008395551,
-                          0.4150322121520029, -0.26918983719229994],
-                         [-0.38164469675190177, -0.3264960369736939, 1.3695993885284545,
-                          0.55178010066725, 0.021790663220199458],
-                         [-1.2613045626465647, -0.7305818793806982, 0.41438283892450944,
-                          0.5208181269433911, -0.2673124934389858]]
+        expected_pred = [[0.7160536960712682, 0.4027447616435099, 2.2456132726190354,
+                          1.1022168754672363, -0.8446135282905317],
+                         [0.9955221526544797, -0.09328567808260507, 0.4466859478930213,
+                          1.187409752102058, -0.3682130077273106],
+                         [0.2876953323692319, -0.16030288501161566, 1.0059909827468427,
+                          1.0965620192588694, 0.06283464021384078],
+                         [-0.7883721002194066, -0.3991929658410217, 1.109835801528951,
+                          -1.029481810882744, 0.01200552066289462],
+                         [-1.1303301571050237, 0.5011505407787392, 0.9591881746202175,
+                          1.8221756468698573, -0.8025693546422074]]
 
         exps, mab = self.predict(arms=[1, 2, 3, 4, 5],
                                  decisions=[1, 1, 4, 2, 2, 2, 3, 3, 3, 1],
@@ -927,7 +935,7 @@ class ParallelTest(BaseTest):
                                  n_jobs=2,
                                  backend=None)
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -942,7 +950,7 @@ class ParallelTest(BaseTest):
                                  n_jobs=2,
                                  backend='loky')
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -957,7 +965,7 @@ class ParallelTest(BaseTest):
                                  n_jobs=2,
                                  backend='threading')
 
-        self.assertListEqual(arms, [2, 1, 1, 2, 3, 3, 3, 1, 3, 2])
+        self.assertListEqual(arms, [1, 3, 3, 1, 2, 1, 3, 1, 2, 1])
 
     def test_greedy1_r2_backend(self):
         arms, mab = self.predict(arms=[1, 2, 3],
@@ -973,7 +981,7 @@ class ParallelTest(BaseTest):
                                  n_jobs=2,
                                  backend=None)
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -988,7 +996,7 @@ class ParallelTest(BaseTest):
                                  n_jobs=2,
                                  backend='loky')
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
         arms, mab = self.predict(arms=[1, 2, 3],
                                  decisions=[1, 2, 1, 2, 1, 2, 1, 2, 1, 2],
@@ -1003,7 +1011,7 @@ class ParallelTest(BaseTest):
                                  n_jobs=2,
                                  backend='threading')
 
-        self.assertListEqual(arms, [3, 1, 1, 3, 1, 3, 3, 1, 3, 1])
+        self.assertListEqual(arms, [1, 2, 1, 2, 2, 3, 2, 2, 2, 3])
 
     def test_linUCB_backend(self):
 
@@ -1098,7 +1106,7 @@ class ParallelTest(BaseTest):
                                 n_jobs=2,
                                 backend=None)
 
-        self.assertEqual(arm, [4, 4, 3, 3, 4, 4, 4, 3, 4, 5])
+        self.assertEqual(arm, [3, 4, 4, 3, 4, 5, 4, 3, 4, 3])
 
         arm, mab = self.predict(arms=[1, 2, 3, 4, 5],
                                 decisions=[1, 1, 4, 2, 2, 2, 3, 3, 3, 1],
@@ -1115,7 +1123,7 @@ class ParallelTest(BaseTest):
                                 n_jobs=2,
                                 backend='loky')
 
-        self.assertEqual(arm, [4, 4, 3, 3, 4, 4, 4, 3, 4, 5])
+        self.assertEqual(arm, [3, 4, 4, 3, 4, 5, 4, 3, 4, 3])
 
         arm, mab = self.predict(arms=[1, 2, 3, 4, 5],
                                 decisions=[1, 1, 4, 2, 2, 2, 3, 3, 3, 1],
@@ -1132,4 +1140,283 @@ class ParallelTest(BaseTest):
                                 n_jobs=2,
                                 backend='threading')
 
-        self.assertEqual(arm, [4, 4, 3, 3, 4, 4, 4, 3, 4, 5])
+        self.assertEqual(arm, [3, 4, 4, 3, 4, 5, 4, 3, 4, 3])
+
+    def test_shared_arrays(self):
+
+        rng = np.random.default_rng(seed=7)
+        arrays = [rng.random((100, 50)), rng.integers(0, 5, 100), np.array(["a", "b"], dtype=object)]
+        shared = _SharedArrays(arrays)
+
+        for array, shared_array in zip(arrays, shared.arrays):
+            self.assertTrue(np.array_equal(array, shared_array))
+
+        # Non-numeric arrays are not shared
+        self.assertIs(shared.arrays[2], arrays[2])
+
+        # Shared arrays and their views are pickled by reference to the shared memory
+        for shared_array in [shared.arrays[0], shared.arrays[0][10:20, ::2], shared.arrays[1]]:
+            pickled = pickle.dumps(shared_array)
+            self.assertLess(len(pickled), 1000)
+            self.assertTrue(np.array_equal(pickle.loads(pickled), shared_array))
+
+        # New arrays derived from shared arrays are pickled by value
+        derived = shared.arrays[0] * 2
+        self.assertTrue(np.array_equal(pickle.loads(pickle.dumps(derived)), arrays[0] * 2))
+
+        # The file is removed when the shared arrays are collected
+        filename = shared.filename
+        del shared, shared_array, pickled
+        gc.collect()
+        self.assertFalse(os.path.exists(filename))
+
+    def test_shared_arrays_pending_removal(self):
+
+        # Files that are still mapped, as on Windows, are removed once they can be
+        shared = _SharedArrays([np.arange(10.0)])
+        filename = shared.filename
+        with patch("mabwiser.utils.os.remove", side_effect=PermissionError):
+            del shared
+            gc.collect()
+        self.assertIn(filename, _SharedArrays._pending_filenames)
+        self.assertTrue(os.path.exists(filename))
+
+        _SharedArrays([np.arange(10.0)])
+        self.assertNotIn(filename, _SharedArrays._pending_filenames)
+        self.assertFalse(os.path.exists(filename))
+
+    def test_published_linear(self):
+
+        rng = np.random.default_rng(seed=7)
+        contexts = rng.standard_normal((500, 10))
+        decisions = rng.integers(0, 3, 500)
+        rewards = rng.standard_normal(500)
+        test = rng.standard_normal((50, 10))
+
+        for learning_policy in [LearningPolicy.LinUCB(alpha=1, scale=True),
+                                LearningPolicy.LinUCB(alpha=1, stacked=True),
+                                LearningPolicy.LinUCB(alpha=1, covariance="sketch", rank=3),
+                                LearningPolicy.LinTS(alpha=1, solver="cholesky"),
+                                LearningPolicy.LinGreedy(epsilon=0.1)]:
+
+            single = MAB([0, 1, 2], learning_policy, seed=123456)
+            single.fit(decisions, rewards, contexts)
+            parallel = MAB([0, 1, 2], learning_policy, seed=123456, n_jobs=2, backend='loky')
+            parallel.fit(decisions, rewards, contexts)
+
+            self.assertListEqual(single.predict(test), parallel.predict(test))
+
+            # The bandit is published once, until it is trained again
+            published = parallel._imp._published
+            self.assertIsNotNone(published)
+            for single_exp, parallel_exp in zip(single.predict_expectations(test),
+                                                parallel.predict_expectations(test)):
+                self.assertListAlmostEqual(list(single_exp.values()), list(parallel_exp.values()))
+            self.assertIs(parallel._imp._published, published)
+
+            parallel.partial_fit(decisions[:10], rewards[:10], contexts[:10])
+            self.assertIsNone(parallel._imp._published)
+
+            # The published bandit is not pickled with the bandit
+            parallel.predict(test)
+            self.assertIsNone(pickle.loads(pickle.dumps(parallel))._imp._published)
+
+    def test_published_neighbors(self):
+
+        rng = np.random.default_rng(seed=7)
+        contexts = rng.standard_normal((500, 5))
+        decisions = rng.choice(["a", "b", "c"], 500)
+        rewards = rng.integers(0, 2, 500)
+        test = rng.standard_normal((50, 5))
+
+        for neighborhood_policy in [NeighborhoodPolicy.KNearest(k=10), NeighborhoodPolicy.Radius(radius=2),
+                                    NeighborhoodPolicy.LSHNearest(n_dimensions=3, n_tables=2)]:
+
+            single = MAB(["a", "b", "c"], LearningPolicy.ThompsonSampling(), neighborhood_policy, seed=123456)
+            single.fit(decisions, rewards, contexts)
+            parallel = MAB(["a", "b", "c"], LearningPolicy.ThompsonSampling(), neighborhood_policy, seed=123456,
+                           n_jobs=2, backend='loky')
+            parallel.fit(decisions, rewards, contexts)
+
+            self.assertListEqual(single.predict(test), parallel.predict(test))
+            self.assertIsNotNone(parallel._imp._published)
+
+            parallel.add_arm("d")
+            self.assertIsNone(parallel._imp._published)
+
+    def test_resident(self):
+
+        # Objects are unpickled once for each version of their owner
+        resident = _Resident([1, 2, 3], "owner")
+        pickled = pickle.dumps(resident)
+        loaded = pickle.loads(pickled)
+        self.assertListEqual(loaded, [1, 2, 3])
+        self.assertIs(pickle.loads(pickled), loaded)
+        self.assertIs(pickle.loads(pickle.dumps(resident)), loaded)
+
+        # A new version replaces the resident object of the owner
+        newer = pickle.loads(pickle.dumps(_Resident([4, 5], "owner")))
+        self.assertListEqual(newer, [4, 5])
+        self.assertIsNot(pickle.loads(pickled), loaded)
+        _Resident.owner_to_version_object.pop("owner")
+
+    def test_resident_eviction(self):
+
+        # Retired owners are evicted by the following tasks, in this process and in the workers
+        resident = _Resident([1, 2, 3], "retired")
+        pickle.loads(pickle.dumps(resident))
+        _Resident.retire("retired")
+        self.assertNotIn("retired", _Resident.owner_to_version_object)
+        _Resident.owner_to_version_object["retired"] = ("version", [1, 2, 3])
+        pickle.loads(pickle.dumps(_Resident([4, 5], "owner")))
+        self.assertNotIn("retired", _Resident.owner_to_version_object)
+
+        # An owner that is sent again is no longer retired
+        pickle.loads(pickle.dumps(resident))
+        self.assertNotIn("retired", _Resident.retired_owners)
+        self.assertIn("retired", _Resident.owner_to_version_object)
+
+        # Only the most recently used owners are kept
+        for index in range(_Resident.max_owners + 2):
+            pickle.loads(pickle.dumps(_Resident([index], "owner" + str(index))))
+        self.assertEqual(len(_Resident.owner_to_version_object), _Resident.max_owners)
+        self.assertNotIn("owner0", _Resident.owner_to_version_object)
+
+        # Bandits retire their owner when they close their pool or are garbage collected
+        mab = MAB([1, 2], LearningPolicy.EpsilonGreedy(epsilon=0.1))
+        owner = mab._imp._owner
+        mab.open()
+        mab.close()
+        self.assertIn(owner, _Resident.retired_owners)
+        _Resident.retired_owners.pop(owner)
+        del mab
+        gc.collect()
+        self.assertIn(owner, _Resident.retired_owners)
+
+        _Resident.owner_to_version_object.clear()
+        _Resident.retired_owners.clear()
+
+    def test_worker_pool(self):
+
+        rng = np.random.default_rng(seed=7)
+        contexts = rng.standard_normal((500, 5))
+        decisions = rng.integers(0, 3, 500)
+        rewards = rng.integers(0, 2, 500)
+        test = rng.standard_normal((20, 5))
+
+        for backend in ['loky', 'threading']:
+            for learning_policy, neighborhood_policy in [(LearningPolicy.LinUCB(alpha=1), None),
+                                                         (LearningPolicy.UCB1(), NeighborhoodPolicy.KNearest(k=10)),
+                                                         (LearningPolicy.UCB1(),
+                                                          NeighborhoodPolicy.LSHNearest(n_dimensions=3))]:
+
+                single = MAB([0, 1, 2], learning_policy, neighborhood_policy, seed=123456)
+                single.fit(decisions, rewards, contexts)
+
+                parallel = MAB([0, 1, 2], learning_policy, neighborhood_policy, seed=123456, n_jobs=2,
+                               backend=backend)
+                with parallel:
+                    parallel.fit(decisions, rewards, contexts)
+                    pool = parallel._imp._pool
+                    self.assertIsNotNone(pool)
+
+                    # Calls reuse the open pool, and the model is sent again after it changes
+                    for _ in range(3):
+                        self.assertListEqual(single.predict(test), parallel.predict(test))
+                    single.partial_fit(decisions[:10], rewards[:10], contexts[:10])
+                    parallel.partial_fit(decisions[:10], rewards[:10], contexts[:10])
+                    self.assertListEqual(single.predict(test), parallel.predict(test))
+                    self.assertIs(parallel._imp._pool, pool)
+
+                    # The pool is not pickled with the bandit
+                    self.assertIsNone(pickle.loads(pickle.dumps(parallel))._imp._pool)
+
+                self.assertIsNone(parallel._imp._pool)
+                self.assertListEqual(single.predict(test), parallel.predict(test))
+
+        # The pool can be opened and closed explicitly
+        single = MAB([0, 1, 2], LearningPolicy.EpsilonGreedy(epsilon=0))
+        single.fit(decisions, rewards)
+        mab = MAB([0, 1, 2], LearningPolicy.EpsilonGreedy(epsilon=0), n_jobs=2).open()
+        mab.fit(decisions, rewards)
+        self.assertEqual(mab.predict(), single.predict())
+        mab.close()
+        mab.close()
+        self.assertIsNone(mab._imp._pool)
+
+    def test_auto_jobs(self):
+
+        rng = np.random.default_rng(seed=7)
+        contexts = rng.standard_normal((500, 5))
+        decisions = rng.integers(0, 3, 500)
+        rewards = rng.integers(0, 2, 500)
+        test = rng.standard_normal((100, 5))
+
+        for learning_policy, neighborhood_policy in [(LearningPolicy.LinTS(alpha=1), None),
+                                                     (LearningPolicy.EpsilonGreedy(), NeighborhoodPolicy.Radius(2)),
+                                                     (LearningPolicy.UCB1(),
+                                                      NeighborhoodPolicy.LSHNearest(n_dimensions=3))]:
+            single = MAB([0, 1, 2], learning_policy, neighborhood_policy, seed=123456)
+            single.fit(decisions, rewards, contexts)
+            auto = MAB([0, 1, 2], learning_policy, neighborhood_policy, seed=123456, n_jobs='auto')
+            auto.fit(decisions, rewards, contexts)
+
+            # Predictions do not depend on the jobs chosen for each call
+            for batch in [test, test[:1], test[:10]]:
+                self.assertEqual(single.predict(batch), auto.predict(batch))
+            self.assertGreater(auto._imp._operation_to_cost["predict"], 0)
+
+        # Small work runs serially, large work is split between the available CPUs
+        self.assertEqual(BaseMAB._get_cheapest_jobs(1e-4, 16, ["threading", None]), (1, None))
+        self.assertEqual(BaseMAB._get_cheapest_jobs(1e-4, 16, [None]), (1, None))
+        self.assertEqual(BaseMAB._get_cheapest_jobs(10, 16, [None]), (16, None))
+        self.assertEqual(BaseMAB._get_cheapest_jobs(10, 16, ["loky"]), (16, "loky"))
+        self.assertEqual(BaseMAB._get_cheapest_jobs(10, 16, []), (1, None))
+        self.assertEqual(BaseMAB._get_cheapest_jobs(10, 1, ["threading"]), (1, None))
+
+        # Threads are chosen for moderate work that releases the GIL, before processes pay off
+        n_jobs, backend = BaseMAB._get_cheapest_jobs(1e-2, 16, ["threading", None])
+        self.assertEqual(backend, "threading")
+        self.assertTrue(1 < n_jobs < 16)
+        self.assertEqual(BaseMAB._get_cheapest_jobs(1e-2, 16, [None]), (1, None))
+
+        # CPUs are limited to the CPUs available to the process
+        self.assertEqual(BaseMAB._effective_jobs(1000, 'auto'), cpu_count())
+        self.assertEqual(BaseMAB._effective_jobs(1000, -1), cpu_count())
+
+    def test_single_context(self):
+
+        rng = np.random.default_rng(seed=11)
+        contexts = rng.standard_normal((300, 4))
+        decisions = rng.integers(0, 3, 300)
+        rewards = rng.integers(0, 2, 300)
+        test = rng.standard_normal((20, 4))
+
+        for learning_policy, neighborhood_policy in [(LearningPolicy.LinGreedy(epsilon=0.5), None),
+                                                     (LearningPolicy.ThompsonSampling(), NeighborhoodPolicy.KNearest(5)),
+                                                     (LearningPolicy.EpsilonGreedy(epsilon=0.5),
+                                                      NeighborhoodPolicy.Radius(1)),
+                                                     (LearningPolicy.ThompsonSampling(), NeighborhoodPolicy.Clusters(3)),
+                                                     (LearningPolicy.EpsilonGreedy(epsilon=0.5),
+                                                      NeighborhoodPolicy.TreeBandit()),
+                                                     (LearningPolicy.UCB1(),
+                                                      NeighborhoodPolicy.LSHNearest(n_dimensions=2))]:
+            def fitted(**kwargs):
+                mab = MAB([0, 1, 2], learning_policy, neighborhood_policy, seed=123456, **kwargs)
+                mab.fit(decisions, rewards, contexts)
+                return mab
+
+            # A single context gets the same decision and expectations as the first context of a batch
+            self.assertEqual(fitted().predict(test[:1]), fitted().predict(test)[0])
+            expectations = fitted().predict_expectations(test)[0]
+            for arm, expectation in fitted().predict_expectations(test[:1]).items():
+                self.assertAlmostEqual(expectation, expectations[arm])
+
+            # Policies used in place are left with their random state
+            single = fitted()
+            single.predict(test[:1])
+            if hasattr(single._imp, "lp"):
+                self.assertIs(single._imp.lp.rng, single._imp.rng)
+
+            # Threads predict with their own copies of the policies
+            self.assertListEqual(fitted(n_jobs=2, backend="threading").predict(test), fitted().predict(test))
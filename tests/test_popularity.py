@@ -84,7 +84,7 @@ class PopularityTest(BaseTest):
                                 seed=123456,
                                 num_run=3,
                                 is_predict=True)
-        self.assertListEqual(arm[0], [1, 1])
+        self.assertListEqual(arm[0], [4, 1])
         self.assertListEqual(arm[1], [1, 1])
         self.assertListEqual(arm[2], [3, 1])
 
@@ -6,7 +6,7 @@ import numpy as np
 from sklearn.preprocessing import StandardScaler
 
 from mabwiser.mab import LearningPolicy
-from mabwiser.linear import _RidgeRegression, fix_small_variance
+from mabwiser.linear import _RidgeRegression, _LinUCB, cholesky_update, fix_small_variance
 from tests.test_base import BaseTest
 
 
@@ -568,3 +568,223 @@ class RidgeRegressionTest(BaseTest):
 
         self.assertAlmostEqual(scaler.scale_[0], 1)
         self.assertAlmostEqual(scaler.var_[0], 0)
+
+    def test_incremental_sherman_morrison(self):
+        rng = np.random.default_rng(7)
+        context = rng.random((20, 5))
+        rewards = rng.random(20)
+
+        exact = _RidgeRegression(rng, l2_lambda=1.0, alpha=1.0, scale=False)
+        incremental = _RidgeRegression(rng, l2_lambda=1.0, alpha=1.0, scale=False, incremental=True)
+        exact.init(context.shape[1])
+        incremental.init(context.shape[1])
+
+        # Single row updates use Sherman-Morrison
+        for i in range(len(context)):
+            exact.fit(context[i:i + 1], rewards[i:i + 1])
+            incremental.fit(context[i:i + 1], rewards[i:i + 1])
+
+            self.assertTrue(np.allclose(incremental.A, exact.A))
+            self.assertTrue(np.allclose(incremental.A_inv, exact.A_inv, atol=1e-10))
+            self.assertTrue(np.allclose(incremental.beta, exact.beta, atol=1e-10))
+
+    def test_incremental_woodbury(self):
+        rng = np.random.default_rng(11)
+        context = rng.random((30, 8))
+        rewards = rng.random(30)
+
+        exact = _LinUCB(rng, l2_lambda=0.5, alpha=1.0, scale=False)
+        incremental = _LinUCB(rng, l2_lambda=0.5, alpha=1.0, scale=False, incremental=True)
+        exact.init(context.shape[1])
+        incremental.init(context.shape[1])
+
+        # Batches of 3 rows use Woodbury, the first one is recomputed since the initial A_inv is not exact
+        for start in range(0, len(context), 3):
+            exact.fit(context[start:start + 3], rewards[start:start + 3])
+            incremental.fit(context[start:start + 3], rewards[start:start + 3])
+
+            self.assertTrue(np.allclose(incremental.A_inv, exact.A_inv, atol=1e-10))
+            self.assertTrue(np.allclose(incremental.beta, exact.beta, atol=1e-10))
+
+        x = np.array([0.1, 0.5, 0.3, 0.2, 0.9, 0.4, 0.7, 0.6])
+        self.assertAlmostEqual(incremental.predict(x), exact.predict(x))
+
+    def test_incremental_large_batch(self):
+        rng = np.random.default_rng(3)
+        context = rng.random((10, 4))
+        rewards = rng.random(10)
+
+        exact = _RidgeRegression(rng, l2_lambda=1.0, alpha=1.0, scale=False)
+        incremental = _RidgeRegression(rng, l2_lambda=1.0, alpha=1.0, scale=False, incremental=True)
+        exact.init(context.shape[1])
+        incremental.init(context.shape[1])
+
+        # Batch with at least as many rows as features computes the full inverse
+        exact.fit(context, rewards)
+        incremental.fit(context, rewards)
+        self.assertTrue(np.array_equal(incremental.A_inv, exact.A_inv))
+        self.assertTrue(np.array_equal(incremental.beta, exact.beta))
+
+    def test_incremental_drift(self):
+        rng = np.random.default_rng(5)
+        context = rng.random((5, 4))
+        rewards = rng.random(5)
+
+        incremental = _RidgeRegression(rng, l2_lambda=1.0, alpha=1.0, scale=False, incremental=True)
+        incremental.init(context.shape[1])
+        incremental.fit(context[:1], rewards[:1])
+
+        # Perturb the inverse beyond tolerance, next update should recompute it
+        incremental.A_inv = incremental.A_inv + 1e-3
+        incremental.fit(context[1:2], rewards[1:2])
+        self.assertTrue(np.allclose(incremental.A_inv, np.linalg.inv(incremental.A), atol=1e-12))
+
+    def test_incremental_scaler(self):
+        rng = np.random.default_rng(17)
+        context = rng.random((12, 6))
+        rewards = rng.random(12)
+
+        exact = _RidgeRegression(rng, l2_lambda=1.0, alpha=1.0, scale=True)
+        incremental = _RidgeRegression(rng, l2_lambda=1.0, alpha=1.0, scale=True, incremental=True)
+        exact.init(context.shape[1])
+        incremental.init(context.shape[1])
+
+        for start in range(0, len(context), 2):
+            exact.fit(context[start:start + 2], rewards[start:start + 2])
+            incremental.fit(context[start:start + 2], rewards[start:start + 2])
+
+        self.assertTrue(np.allclose(incremental.A_inv, exact.A_inv, atol=1e-10))
+        self.assertAlmostEqual(incremental.predict(context[0]), exact.predict(context[0]))
+
+    def test_incremental_policies(self):
+        rng = np.random.default_rng(23)
+        contexts = rng.random((40, 6))
+        decisions = rng.integers(0, 3, 40)
+        rewards = rng.random(40)
+        test_contexts = rng.random((5, 6))
+
+        for lp, incremental_lp in [(LearningPolicy.LinGreedy(epsilon=0, l2_lambda=0.5),
+                                    LearningPolicy.LinGreedy(epsilon=0, l2_lambda=0.5, incremental=True)),
+                                   (LearningPolicy.LinUCB(alpha=1, l2_lambda=2),
+                                    LearningPolicy.LinUCB(alpha=1, l2_lambda=2, incremental=True)),
+                                   (LearningPolicy.LinTS(alpha=0.5),
+                                    LearningPolicy.LinTS(alpha=0.5, incremental=True))]:
+
+            exps, mab = self.predict(arms=[0, 1, 2], decisions=decisions[:10], rewards=rewards[:10],
+                                     learning_policy=lp, context_history=contexts[:10],
+                                     contexts=test_contexts, seed=123456, num_run=1, is_predict=False)
+            incremental_exps, incremental_mab = self.predict(arms=[0, 1, 2], decisions=decisions[:10],
+                                                             rewards=rewards[:10], learning_policy=incremental_lp,
+                                                             context_history=contexts[:10],
+                                                             contexts=test_contexts, seed=123456, num_run=1,
+                                                             is_predict=False)
+            self.assertTrue(incremental_mab.learning_policy.incremental)
+
+            # Online updates with small batches
+            for start in range(10, 40, 2):
+                mab.partial_fit(decisions[start:start + 2], rewards[start:start + 2], contexts[start:start + 2])
+                incremental_mab.partial_fit(decisions[start:start + 2], rewards[start:start + 2],
+                                            contexts[start:start + 2])
+
+            for arm in [0, 1, 2]:
+                self.assertTrue(np.allclose(incremental_mab._imp.arm_to_model[arm].A_inv,
+                                            mab._imp.arm_to_model[arm].A_inv, atol=1e-10))
+
+            exps = mab.predict_expectations(test_contexts)
+            incremental_exps = incremental_mab.predict_expectations(test_contexts)
+            for exp, incremental_exp in zip(exps, incremental_exps):
+                self.assertListAlmostEqual(exp.values(), incremental_exp.values())
+
+    def test_cholesky_update(self):
+        rng = np.random.default_rng(29)
+        X = rng.random((8, 5))
+        A = np.identity(5) + np.dot(X.T, X)
+        L = np.linalg.cholesky(A)
+        x = rng.random(5)
+
+        # Rank-one update gives the factor of A + x xt
+        updated = cholesky_update(L, x)
+        self.assertTrue(np.allclose(updated, np.linalg.cholesky(A + np.outer(x, x))))
+        self.assertTrue(np.allclose(np.tril(updated), updated))
+
+        # Downdate reverts the update, inputs are not modified
+        self.assertTrue(np.allclose(cholesky_update(updated, x, downdate=True), L))
+        self.assertTrue(np.allclose(np.dot(L, L.T), A))
+
+        # Downdate that is not positive definite
+        with self.assertRaises(np.linalg.LinAlgError):
+            cholesky_update(np.identity(2), np.array([2.0, 0.0]), downdate=True)
+
+    def test_cholesky_solver(self):
+        rng = np.random.default_rng(31)
+        context = rng.random((30, 6))
+        rewards = rng.random(30)
+
+        for l2_lambda in [0.5, 1.0, 100.0]:
+            for incremental in [False, True]:
+                inverse = _LinUCB(rng, l2_lambda=l2_lambda, alpha=1.5, scale=False, incremental=incremental)
+                cholesky = _LinUCB(rng, l2_lambda=l2_lambda, alpha=1.5, scale=False, incremental=incremental,
+                                   solver="cholesky")
+                inverse.init(context.shape[1])
+                cholesky.init(context.shape[1])
+                self.assertIsNone(cholesky.A_inv)
+
+                # Full batch and single row online updates
+                inverse.fit(context[:20], rewards[:20])
+                cholesky.fit(context[:20], rewards[:20])
+                for index in range(20, 30):
+                    inverse.fit(context[index:index + 1], rewards[index:index + 1])
+                    cholesky.fit(context[index:index + 1], rewards[index:index + 1])
+
+                self.assertTrue(np.allclose(np.dot(cholesky.L, cholesky.L.T), cholesky.A))
+                self.assertTrue(np.allclose(cholesky.beta, inverse.beta))
+                self.assertAlmostEqual(cholesky.predict(context[0]), inverse.predict(context[0]))
+
+    def test_covariance_sketch(self):
+        rng = np.random.default_rng(37)
+        context = rng.random((50, 8))
+        rewards = rng.random(50)
+
+        # Sketch with rank at least the number of features is exact
+        full = _LinUCB(rng, l2_lambda=2.0, alpha=1.0, scale=False)
+        sketch = _LinUCB(rng, l2_lambda=2.0, alpha=1.0, scale=False, covariance="sketch", rank=8)
+        full.init(8)
+        sketch.init(8)
+        full.fit(context, rewards)
+        sketch.fit(context[:20], rewards[:20])
+        sketch.fit(context[20:], rewards[20:])
+        self.assertTrue(np.allclose(full.beta, sketch.beta))
+        self.assertEqual(sketch.shrinkage, 0)
+        self.assertIsNone(sketch.A)
+        self.assertIsNone(sketch.A_inv)
+        for x in context[:5]:
+            self.assertAlmostEqual(full.predict(x), sketch.predict(x))
+
+        # Sketch with a lower rank keeps r rows and bounds XtX
+        sketch = _LinUCB(rng, l2_lambda=2.0, alpha=1.0, scale=False, covariance="sketch", rank=3)
+        sketch.init(8)
+        sketch.fit(context, rewards)
+        self.assertEqual(sketch.sketch.shape, (3, 8))
+        self.assertGreater(sketch.shrinkage, 0)
+        XtX = np.dot(context.T, context)
+        StS = np.dot(sketch.sketch.T, sketch.sketch)
+        self.assertGreaterEqual(np.linalg.eigvalsh(XtX - StS).min(), -1e-8)
+        self.assertGreaterEqual(np.linalg.eigvalsh(StS + sketch.shrinkage * np.identity(8) - XtX).min(), -1e-8)
+
+    def test_covariance_diagonal(self):
+        rng = np.random.default_rng(41)
+        context = rng.random((50, 8))
+        rewards = rng.random(50)
+
+        diagonal = _LinUCB(rng, l2_lambda=2.0, alpha=1.5, scale=False, covariance="diagonal")
+        diagonal.init(8)
+        diagonal.fit(context[:10], rewards[:10])
+        diagonal.fit(context[10:], rewards[10:])
+
+        A = 2.0 + np.sum(np.square(context), axis=0)
+        self.assertTrue(np.allclose(diagonal.A, A))
+        self.assertTrue(np.allclose(diagonal.beta, np.dot(context.T, rewards) / A))
+        self.assertIsNone(diagonal.A_inv)
+
+        x = context[0]
+        self.assertAlmostEqual(diagonal.predict(x), np.dot(x, diagonal.beta) + 1.5 * np.sqrt(np.sum(x * x / A)))
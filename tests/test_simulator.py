@@ -10,7 +10,7 @@ import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
 from mabwiser.base_mab import BaseMAB
-from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy
+from mabwiser.mab import MAB, LearningPolicy, NeighborhoodPolicy, DecisionBatch
 from mabwiser.simulator import Simulator, _NeighborsSimulator, _RadiusSimulator, _KNearestSimulator, default_evaluator
 from mabwiser.greedy import _EpsilonGreedy
 
@@ -457,7 +457,7 @@ class TestSimulator(unittest.TestCase):
                         scaler=StandardScaler(), test_size=0.4, batch_size=0,
                         is_ordered=True, seed=7, log_format='%(asctime)s %(message)s')
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_avg_arms(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -469,7 +469,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('avg', True)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_avg_net(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -481,7 +481,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('avg', False)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_min_arms(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -493,7 +493,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('min', True)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_min_net(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -505,7 +505,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('min', False)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_max_arms(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -517,7 +517,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('max', True)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_max_net(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -529,7 +529,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('max', False)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_avg_arms_online(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -541,7 +541,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('avg', True)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_avg_net_online(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -553,7 +553,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('avg', False)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_min_arms_online(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -565,7 +565,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('min', True)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_min_net_online(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -577,7 +577,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('min', False)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_max_arms_online(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -589,7 +589,7 @@ class TestSimulator(unittest.TestCase):
         sim.run()
         sim.plot('max', True)
 
-    @patch("mabwiser.simulator.plt.show")
+    @patch("matplotlib.pyplot.show")
     def test_plot_max_net_online(self, mock_show):
         rng = np.random.RandomState(seed=7)
         sim = Simulator(bandits=[("example", MAB([0, 1], LearningPolicy.EpsilonGreedy()))],
@@ -1304,3 +1304,31 @@ class TestSimulator(unittest.TestCase):
         self.assertListEqual(empty_nbhd, test_bandit.no_nhood_prob_of_arm)
         self.assertListEqual(out, [0, 1, 1, 1, 0])
 
+    def test_decision_batch(self):
+        rng = np.random.RandomState(seed=7)
+        decisions = [rng.randint(0, 2) for _ in range(100)]
+        rewards = [rng.randint(0, 2) for _ in range(100)]
+        contexts = [[rng.rand() for _ in range(5)] for _ in range(100)]
+
+        def get_bandits():
+            return [("eg", MAB([0, 1], LearningPolicy.EpsilonGreedy(epsilon=0.1), seed=7)),
+                    ("ts", MAB([0, 1], LearningPolicy.ThompsonSampling(), seed=7)),
+                    ("lints", MAB([0, 1], LearningPolicy.LinTS(), seed=7)),
+                    ("knn", MAB([0, 1], LearningPolicy.UCB1(), NeighborhoodPolicy.KNearest(k=5), seed=7))]
+
+        # The simulation of a decision batch is the simulation of its data, offline and online
+        for batch_size in [0, 5]:
+            sim = Simulator(get_bandits(), decisions, rewards, contexts,
+                            test_size=0.4, batch_size=batch_size, is_ordered=True, seed=7)
+            sim.run()
+            batch_sim = Simulator(get_bandits(), DecisionBatch(decisions, rewards, contexts),
+                                  test_size=0.4, batch_size=batch_size, is_ordered=True, seed=7)
+            batch_sim.run()
+
+            self.assertDictEqual(sim.bandit_to_predictions, batch_sim.bandit_to_predictions)
+            self.assertDictEqual(sim.bandit_to_arm_to_stats_avg, batch_sim.bandit_to_arm_to_stats_avg)
+
+        with self.assertRaises(ValueError):
+            Simulator(get_bandits(), DecisionBatch(decisions, rewards), rewards)
+        with self.assertRaises(ValueError):
+            Simulator(get_bandits(), DecisionBatch(contexts=contexts))
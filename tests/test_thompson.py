@@ -559,3 +559,22 @@ class ThompsonTest(BaseTest):
                                  num_run=1,
                                  is_predict=True)
         self.assertEqual(arms, [3, 1, 1, 1, 1, 3, 1, 1, 1, 1])
+
+    def test_ts_batch_samples(self):
+        arms, mab = self.predict(arms=[1, 2, 3],
+                                 decisions=[1, 1, 1, 3, 2, 2, 3, 1, 3],
+                                 rewards=[0, 1, 1, 0, 1, 0, 1, 1, 1],
+                                 learning_policy=LearningPolicy.ThompsonSampling(),
+                                 contexts=[[]] * 100,
+                                 seed=123456,
+                                 num_run=1,
+                                 is_predict=False)
+
+        # Samples of the batch are drawn arm by arm from the same stream as separate draws for each arm
+        rng = np.random.default_rng(123456)
+        for arm in [1, 2, 3]:
+            samples = rng.beta(mab._imp.arm_to_success_count[arm], mab._imp.arm_to_fail_count[arm], 100)
+            self.assertListEqual([row[arm] for row in arms], samples.tolist())
+
+        # Expectations of the last context are kept
+        self.assertDictEqual(mab._imp.arm_to_expectation, arms[-1])